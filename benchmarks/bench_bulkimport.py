@@ -0,0 +1,123 @@
+"""Parallel directory import vs. loading the same files one by one with compliance.loader.
+
+Writes a directory of synthetic template CSVs (vendors, POs with items
+JSON, invoices, instruments), imports it sequentially with the loader and
+then with ``compliance.bulkimport`` at each worker count (plus once with
+``defer_reports``), and checks that every run leaves identical tables and
+per-file counts.
+
+    python benchmarks/bench_bulkimport.py --rows 2000000 --files 12 --workers 1,4
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import synthetic  # noqa: E402
+from compliance import bulkimport, db, loader, reports  # noqa: E402
+
+TABLES = {'vendors': 'gstin', 'purchase_orders': 'po_number', 'invoices': 'invoice_number',
+          'financial_instruments': 'reference_no'}
+# Share of the rows per entity; vendors are referenced by id from the others.
+MIX = (('vendors', 0.05), ('pos', 0.30), ('invoices', 0.45), ('instruments', 0.20))
+
+
+def write_dir(path, rows, files):
+    """``files`` CSVs split across the entities by MIX; each file gets a distinct seed and key range."""
+    os.makedirs(path)
+    per_entity = max(files // len(MIX), 1)
+    for entity, share in MIX:
+        n = int(rows * share) // per_entity
+        for k in range(per_entity):
+            out = os.path.join(path, f'{entity}_{k:02d}.csv')
+            with open(out, 'w', newline='', encoding='utf-8') as f:
+                w = synthetic.csv.writer(f)
+                w.writerow(synthetic.header_for(entity))
+                for row in synthetic.rows_for(entity, n, seed=100 + k):
+                    # Keep keys unique across files of the same entity.
+                    if entity == 'vendors':
+                        row[0] = f'{row[0]} {k}'
+                    elif entity == 'instruments':
+                        row[2] = f'{row[2]}-{k}'
+                    else:
+                        row[0] = f'{row[0]}-{k}'
+                    w.writerow(row)
+    return sorted(os.listdir(path))
+
+
+def fingerprint(conn):
+    digest = hashlib.sha256()
+    for table, key in TABLES.items():
+        cols = [r[1] for r in conn.execute(f'PRAGMA table_info({table})') if r[1] not in ('created_at', 'updated_at')]
+        for row in conn.execute(f'SELECT {", ".join(cols)} FROM {table} ORDER BY {key}'):
+            digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+def sequential(db_path, directory):
+    conn = db.open_mirror(db_path, bulk=True)
+    jobs, _ = bulkimport.discover([directory])
+    results = {}
+    for job in jobs:
+        results[os.path.basename(job.path)] = loader.load_csv(conn, job.entity, job.path)
+    fp = fingerprint(conn)
+    conn.close()
+    return results, fp
+
+
+def parallel(db_path, directory, workers, defer_reports=False):
+    conn = db.open_mirror(db_path, bulk=True)
+    results = {os.path.basename(r.path): r.result
+               for r in bulkimport.import_files(conn, [directory], workers=workers, defer_reports=defer_reports)}
+    fp = fingerprint(conn)
+    if defer_reports and reports.check(conn):
+        raise SystemExit('summary tables inconsistent after --defer-reports')
+    conn.close()
+    return results, fp
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--files', type=int, default=12)
+    parser.add_argument('--workers', default=f'1,{os.cpu_count() or 1}', help='comma list of worker counts')
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix='bench-bulk-')
+    try:
+        directory = os.path.join(tmp, 'drop')
+        names = write_dir(directory, args.rows, args.files)
+        size = sum(os.path.getsize(os.path.join(directory, n)) for n in names)
+        print(f'{len(names)} files, {args.rows:,} rows, {size / 1e6:.0f} MB; {os.cpu_count()} CPU(s)')
+
+        t0 = time.perf_counter()
+        expected, expected_fp = sequential(os.path.join(tmp, 'seq.sqlite'), directory)
+        base = time.perf_counter() - t0
+        print(f'  {"loader, one file at a time":<40} {base:7.1f}s')
+
+        runs = [(w, False) for w in sorted({int(w) for w in args.workers.split(',')})]
+        runs.append((runs[-1][0], True))
+        for workers, defer in runs:
+            t0 = time.perf_counter()
+            got, fp = parallel(os.path.join(tmp, f'par{workers}{defer}.sqlite'), directory, workers, defer)
+            elapsed = time.perf_counter() - t0
+            if got != expected:
+                bad = [n for n in expected if got.get(n) != expected[n]]
+                raise SystemExit(f'per-file results differ: {bad[:3]}')
+            if fp != expected_fp:
+                raise SystemExit(f'table contents differ with {workers} worker(s)')
+            label = f'bulkimport, {workers:>2} worker(s)' + (' --defer-reports' if defer else '')
+            print(f'  {label:<40} {elapsed:7.1f}s  ({base / elapsed:.2f}x)')
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
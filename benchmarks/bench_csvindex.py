@@ -0,0 +1,135 @@
+"""Lookups and filtered scans on a CSV export: csv.reader passes vs. compliance.csvindex.
+
+Two synthetic exports: ``invoices`` (short unquoted rows) and ``pos``
+(purchase orders; every row carries a quoted ``items`` JSON cell). For
+each one the index is built once. Then each mode runs in a fresh
+interpreter, as a reopened export would:
+
+* ``lookup``: fetch N random rows by number. The baseline is one
+  ``csv.reader`` pass that keeps the wanted rows; the index maps both files
+  and slices the rows out;
+* ``scan``: a broad filter (``status=pending`` and ``amount>=40000``,
+  a quarter of the rows pass the first test) and a narrow one (the key
+  column contains ``12345``), projected to two columns. The baseline is
+  ``csv.reader`` plus the same filter; the index scans with 1 worker and
+  with ``--workers``.
+
+Every mode must return the same rows.
+
+    python benchmarks/bench_csvindex.py --rows 5000000 --lookups 5000 --workers 4
+"""
+import argparse
+import csv
+import hashlib
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import synthetic  # noqa: E402
+from compliance import csvindex  # noqa: E402
+
+ENTITIES = ('invoices', 'pos')
+COLUMNS = ('vendor_id', 'amount')
+QUERIES = ('broad', 'narrow')
+
+
+def _wanted(rows, lookups):
+    return sorted(random.Random(16).sample(range(rows), min(lookups, rows)))
+
+
+def csv_lookup(path, wanted):
+    want, out = set(wanted), []
+    with open(path, encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for i, row in enumerate(reader):
+            if i in want:
+                out.append(tuple(row))
+    return out
+
+
+def where(query, header):
+    return ('status=pending', 'amount>=40000') if query == 'broad' else (f'{header[0]}~12345',)
+
+
+def csv_scan(path, query):
+    with open(path, encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        status, amount = header.index('status'), header.index('amount')
+        at = [header.index(c) for c in COLUMNS]
+        if query == 'broad':
+            return [tuple(row[i] for i in at) for row in reader if row[status] == 'pending' and float(row[amount]) >= 40000]
+        return [tuple(row[i] for i in at) for row in reader if '12345' in row[0]]
+
+
+def child(mode, path, rows, lookups, workers):
+    t0 = time.perf_counter()
+    if mode == 'csv lookup':
+        got = csv_lookup(path, _wanted(rows, lookups))
+    elif mode.startswith('csv scan'):
+        got = csv_scan(path, mode.split()[-1])
+    else:
+        with csvindex.IndexedCSV(path, build=False) as table:
+            if mode == 'index lookup':
+                got = list(table.rows(_wanted(rows, lookups)))
+            else:
+                conditions = [csvindex.Condition.parse(w) for w in where(mode.split()[-1], table.header)]
+                got = [cells for _, cells in table.scan(conditions, COLUMNS, workers=workers)]
+    elapsed = time.perf_counter() - t0
+    print(f'{elapsed:.4f} {len(got)} {hashlib.sha256(repr(got).encode()).hexdigest()}')
+
+
+def run(mode, path, args, workers=1):
+    res = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, path, str(args.rows),
+                          str(args.lookups), str(workers)], check=True, capture_output=True, text=True)
+    elapsed, count, digest = res.stdout.split()
+    return float(elapsed), int(count), digest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--lookups', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--child', nargs=5, metavar=('MODE', 'CSV', 'ROWS', 'LOOKUPS', 'WORKERS'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        mode, path, rows, lookups, workers = args.child
+        return child(mode, path, int(rows), int(lookups), int(workers))
+
+    print(f'{os.cpu_count()} CPU(s)')
+    with tempfile.TemporaryDirectory() as tmp:
+        for entity in ENTITIES:
+            path = synthetic.write_csv(os.path.join(tmp, f'{entity}.csv'), entity, args.rows)
+            print(f'{entity}: rows={args.rows:,} file {os.path.getsize(path) / 1e6:.0f} MB')
+            t0 = time.perf_counter()
+            csvindex.build_index(path)
+            print(f'  {"build index":<34} {time.perf_counter() - t0:8.3f}s  '
+                  f'({os.path.getsize(csvindex.index_path(path)) / 1e6:.0f} MB)')
+            groups = [(('csv lookup', 1), ('index lookup', 1))]
+            groups += [((f'csv scan {q}', 1), (f'index scan {q}', 1), (f'index scan {q}', args.workers))
+                       for q in QUERIES]
+            for modes in groups:
+                base = expected = None
+                for mode, workers in modes:
+                    elapsed, count, digest = run(mode, path, args, workers)
+                    if expected is None:
+                        base, expected = elapsed, (count, digest)
+                    elif (count, digest) != expected:
+                        raise SystemExit(f'{entity}: {mode} with {workers} worker(s) returned different rows')
+                    label = f'{mode}, {workers} worker(s)' if mode.startswith('index scan') else mode
+                    print(f'  {label:<34} {elapsed:8.3f}s  {count:>8,} rows  ({base / elapsed:.1f}x)')
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""Typed records from template CSVs: pre-clean + csv.reader vs. compliance.csvstream.
+
+Three files with the same shipments:
+
+* ``transport`` quotes cells the transportation template's way
+  (``'Noida, UP'``). The baseline is what the import scripts do today: a
+  cleaning pass rewrites single-quoted cells as RFC 4180 into a temporary
+  file, then ``csv.reader`` reads it back and the date columns are decoded.
+  ``csv.reader`` on the raw file is shown for scale; it mis-splits the
+  rows;
+* ``dc`` double-quotes instead and adds a DC-style ``items`` column of
+  backslash-escaped JSON. ``csv.reader`` plus decoding is correct here and
+  is the baseline;
+* ``mixed`` has both quote styles on the same lines, which only the
+  tokenizer handles. Its baseline is pre-clean again.
+
+``csvstream`` reads the original file once, memory-mapped or through a file
+handle. Each mode runs in a fresh interpreter and reports its own peak
+RSS. The records are compared on a sample before timing, also in a child:
+Linux carries ``ru_maxrss`` over fork/exec.
+
+    python benchmarks/bench_csvstream.py --rows 1000000
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from compliance import csvstream  # noqa: E402
+
+HEADER = ('shipment_id', 'mode', 'carrier', 'vehicle_no', 'driver_name', 'origin', 'destination', 'eway_bill_no',
+          'eway_valid_till', 'dispatch_date', 'expected_delivery', 'items')
+MODES = {'transport': ('csv.reader, no cleaning', 'pre-clean + csv.reader', 'csvstream, mmap',
+                       'csvstream, file handle'),
+         'dc': ('csv.reader + decode', 'csvstream, mmap', 'csvstream, file handle'),
+         'mixed': ('pre-clean + csv.reader', 'csvstream, mmap', 'csvstream, file handle')}
+PLACES = ('Noida, UP', 'Mumbai, MH', 'Lucknow, UP', 'Pune, MH', 'Chennai, TN', "Kotwali, Dist. O'Neil", 'Delhi')
+SKUS = ('HP-LASER-1', 'CAB-ETH-5M', 'UPS-1KVA', 'LAPTOP-14', 'MON-24')
+DATES = ('dispatch_date', 'expected_delivery', 'eway_valid_till')
+
+# What the cleaning scripts do: 'a, b' -> "a, b" for whole single-quoted cells.
+_SINGLE_QUOTED = re.compile(r"(?<![^,\n])'((?:[^'\n]|'')*)'(?=,|\r?\n|$)")
+
+
+def _single_quoted(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _double_quoted(value):
+    return '"' + value.replace('"', '""') + '"' if ',' in value or '"' in value else value
+
+
+def write_file(path, rows, kind, seed=15):
+    rng = random.Random(seed)
+    q = _double_quoted if kind == 'dc' else _single_quoted
+    with_items = kind != 'transport'
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(','.join(HEADER if with_items else HEADER[:-1]) + '\n')
+        for i in range(rows):
+            day = date.fromordinal(739160 + i % 300)
+            items = [{'sku': rng.choice(SKUS), 'qty': rng.randrange(1, 50), 'note': 'fragile, "handle" with care'}
+                     for _ in range(rng.randrange(1, 4))]
+            items_cell = '"' + json.dumps(items, separators=(',', ':')).replace('\\', '\\\\').replace('"', '\\"') + '"'
+            own = i % 3 == 0
+            cells = (
+                f'T-{i:08d}', 'OwnFleet' if own else 'Courier', '' if own else 'BlueDart',
+                f'UP16AB{i % 10000:04d}' if own else '', q('Ramesh Kumar') if own else '',
+                q(rng.choice(PLACES)), q(rng.choice(PLACES)), q(f'12-{i % 10000:04d}-7890') if own else '',
+                q(day.isoformat()) if own else '', q(day.isoformat()), day.isoformat(), items_cell)
+            f.write(','.join(cells if with_items else cells[:-1]) + '\n')
+
+
+def _typed(header, rows):
+    """The decoding the scripts do after ``csv.reader``: JSON and date columns, empty -> None."""
+    json_at = [i for i, h in enumerate(header) if h in csvstream.JSON_COLUMNS]
+    date_at = [i for i, h in enumerate(header) if h in DATES]
+    for row in rows:
+        for i in json_at:
+            row[i] = json.loads(row[i]) if row[i] else None
+        for i in date_at:
+            row[i] = date.fromisoformat(row[i]) if row[i] else None
+        yield tuple(row)
+
+
+def preclean(path, tmp_path):
+    def clean(m):
+        return '"' + m.group(1).replace("''", "'").replace('"', '""') + '"'
+    with open(path, encoding='utf-8', newline='') as src, open(tmp_path, 'w', encoding='utf-8', newline='') as dst:
+        for line in src:
+            dst.write(_SINGLE_QUOTED.sub(clean, line))
+    with open(tmp_path, encoding='utf-8', newline='') as f:
+        reader = csv.reader(f, escapechar='\\')
+        yield from _typed(next(reader), reader)
+
+
+def raw_csv(path):
+    """``csv.reader`` straight on the file; splits ``'Noida, UP'`` in two."""
+    with open(path, encoding='utf-8', newline='') as f:
+        reader = csv.reader(f, escapechar='\\')
+        next(reader)
+        yield from reader
+
+
+def plain_csv(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        reader = csv.reader(f, escapechar='\\')
+        yield from _typed(next(reader), reader)
+
+
+def records(mode, path, tmp_path):
+    if mode == 'csv.reader, no cleaning':
+        return raw_csv(path)
+    if mode == 'csv.reader + decode':
+        return plain_csv(path)
+    if mode == 'pre-clean + csv.reader':
+        return preclean(path, tmp_path)
+    if mode == 'csvstream, mmap':
+        return csvstream.read_records(path)
+    return _from_handle(path)
+
+
+def _from_handle(path):
+    with open(path, 'rb') as f:
+        yield from csvstream.read_records(f)
+
+
+def child(mode, path, tmp_path):
+    t0 = time.perf_counter()
+    count = sum(1 for _ in records(mode, path, tmp_path))
+    elapsed = time.perf_counter() - t0
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'{count} {elapsed:.3f} {peak_mb:.0f}')
+
+
+def check(kind, tmp):
+    sample, tmp_csv = os.path.join(tmp, f'sample-{kind}.csv'), os.path.join(tmp, 'clean.csv')
+    write_file(sample, 20_000, kind)
+    expected = list(plain_csv(sample) if kind == 'dc' else preclean(sample, tmp_csv))
+    got = [tuple(r) for r in csvstream.read_records(sample, {h: date.fromisoformat for h in DATES})]
+    if got != expected:
+        bad = next(i for i, (a, b) in enumerate(zip(got, expected)) if a != b)
+        raise SystemExit(f'{kind}: record {bad} differs:\n  {got[bad]}\n  {expected[bad]}')
+    if kind == 'transport' and all(len(r) == len(HEADER) - 1 for r in raw_csv(sample)):
+        raise SystemExit('expected csv.reader to mis-split the single-quoted cells')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'CSV', 'TMP'), help=argparse.SUPPRESS)
+    parser.add_argument('--check', nargs=2, metavar=('KIND', 'TMP'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        return child(*args.child)
+    if args.check:
+        return check(*args.check)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_csv = os.path.join(tmp, 'clean.csv')
+        for kind, modes in MODES.items():
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--check', kind, tmp], check=True)
+            path = os.path.join(tmp, f'shipments-{kind}.csv')
+            write_file(path, args.rows, kind)
+            print(f'{kind}: rows={args.rows:,} file {os.path.getsize(path) / 1e6:.0f} MB')
+            for mode in modes:
+                res = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, path, tmp_csv],
+                                     check=True, capture_output=True, text=True)
+                count, elapsed, peak = res.stdout.split()
+                if int(count) != args.rows:
+                    raise SystemExit(f'{mode}: {count} records, expected {args.rows}')
+                print(f'  {mode:<26} {float(elapsed):7.2f}s  peak RSS {peak:>4} MB')
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Fuzzy vendor dedup: all-pairs comparison vs. blocking and a trigram index (compliance.dedup).
+
+Fills a mirror with synthetic vendors (``synthetic.vendors`` with generated
+company names). A share of them get a re-keyed duplicate later in the
+table, the way rows come in from ``vendors_import_template.csv``: no GSTIN,
+sometimes no PAN, the same state and PIN, and a reworded or misspelt name.
+
+* The baseline scores every pair in a sample of a few thousand vendors that
+  share PIN codes. Its pairs must equal ``find_pairs`` on the same rows, and
+  its time is extrapolated to the whole table.
+* ``dedup`` then runs in full over all but the last ``--new`` share of the
+  vendors. The rest are inserted and an incremental run is timed. Its pairs
+  and clusters must equal a final full run.
+* Recall and precision are measured against the planted duplicates.
+
+    python benchmarks/bench_dedup.py --vendors 800000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from itertools import combinations
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import synthetic  # noqa: E402
+from compliance import db, dedup  # noqa: E402
+from compliance.loader import STATUS_ALIASES  # noqa: E402
+
+SYLLABLES = ('ra', 'ma', 'shi', 'van', 'ka', 'de', 'lo', 'su', 'pra', 'bha', 'ti', 'nan', 'go', 'vi', 'ja',
+             'ya', 'har', 'dhi', 'mu', 'ne', 'sha', 'ku', 'ram', 'lak', 'ga', 'ni', 'pa', 'ro', 'te', 'chan')
+KINDS = ('Traders', 'Enterprises', 'Industries', 'Engineering', 'Solutions', 'Agencies', 'Exports',
+         'Infotech', 'Logistics', 'Associates', 'Steels', 'Pharma')
+SUFFIXES = (('Pvt Ltd', 'Private Limited'), ('Ltd', 'Limited'), ('LLP', 'LLP'), ('', ''))
+
+
+def _word(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+
+
+def _misspell(rng, name):
+    k = rng.randrange(len(name))
+    if not name[k].isalpha():
+        return name
+    return name[:k] + (rng.choice('aeiou') if rng.random() < 0.5 else '') + name[k + 1:]
+
+
+def vendor_rows(n, dup_share, seed=19):
+    """Template rows with generated names, and the planted (original, duplicate) row positions."""
+    rng = random.Random(seed)
+    rows, planted = [], []
+    for row in synthetic.vendors(n, seed):
+        base = f'{_word(rng)} {_word(rng)} {rng.choice(KINDS)}'
+        short, long = rng.choice(SUFFIXES)
+        row[0], row[1] = f'{base} {short}'.strip(), f'{base} {long}'.strip()
+        row[8] = STATUS_ALIASES.get(row[8], row[8])
+        rows.append(row)
+        if len(rows) > 1 and rng.random() < dup_share:
+            k = rng.randrange(len(rows) - 1)
+            dup = list(rows[k])
+            base = dup[0]
+            r = rng.random()
+            if r < 0.3:
+                base = base.replace('Pvt Ltd', 'Private Limited').replace(' Ltd', ' Limited')
+            elif r < 0.5:
+                base = 'M/s. ' + base.upper()
+            elif r < 0.7:
+                base = base.replace(' ', '  ').replace('Traders', 'Trading')
+            if rng.random() < 0.5:
+                base = _misspell(rng, base)
+            dup[0], dup[1], dup[2] = base, '', ''
+            if rng.random() < 0.5:
+                dup[3] = ''
+            planted.append((k, len(rows)))
+            rows.append(dup)
+    return rows, planted
+
+
+def insert(conn, rows):
+    conn.execute('BEGIN')
+    conn.executemany('INSERT INTO vendors (company_name, legal_name, gstin, pan, state, state_code, pin_code, '
+                     'business_type, status, rating) VALUES (?, ?, NULLIF(?, \'\'), ?, ?, ?, ?, ?, ?, ?)', rows)
+    conn.execute('COMMIT')
+
+
+def all_pairs(rows, min_confidence):
+    """Every pair that shares a block, scored the way dedup scores it."""
+    info = []
+    for vendor_id, company, legal, gstin, pan, state, pin in rows:
+        gstin = (gstin or '').strip().upper()
+        info.append((vendor_id, dedup.trigrams(dedup.normalise_name(company)) | dedup.trigrams(dedup.normalise_name(legal)),
+                     gstin, dedup._pan(pan, gstin), (state or '', pin or '')))
+    pairs, scored = set(), 0
+    for (a, ga, xa, pa, la), (b, gb, xb, pb, lb) in combinations(info, 2):
+        scored += 1
+        same_pan = bool(pa) and pa == pb
+        if not (same_pan or all(la) and la == lb) or pa and pb and pa != pb or xa and xb and xa != xb:
+            continue
+        if not ga or not gb:
+            continue
+        name = len(ga & gb) / len(ga | gb)
+        if (0.5 + 0.5 * name if same_pan else name) >= min_confidence:
+            pairs.add((min(a, b), max(a, b)))
+    return pairs, scored
+
+
+def stored(conn):
+    pairs = set(conn.execute('SELECT vendor_a, vendor_b FROM vendor_duplicate_pairs'))
+    groups = {}
+    for vendor_id, cluster_id in conn.execute('SELECT vendor_id, cluster_id FROM vendor_duplicates'):
+        groups.setdefault(cluster_id, set()).add(vendor_id)
+    return pairs, {frozenset(g) for g in groups.values()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vendors', type=int, default=800_000)
+    parser.add_argument('--duplicates', type=float, default=0.03, help='share of vendors given a duplicate')
+    parser.add_argument('--new', type=float, default=0.01, help='share loaded after the full run')
+    parser.add_argument('--sample', type=int, default=3000, help='vendors in the all-pairs check')
+    parser.add_argument('--min-confidence', type=float, default=dedup.DEFAULT_MIN_CONFIDENCE)
+    args = parser.parse_args(argv)
+
+    rows, planted = vendor_rows(args.vendors, args.duplicates)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = db.open_mirror(os.path.join(tmp, 'dedup.sqlite'), bulk=True)
+        split = len(rows) - int(len(rows) * args.new)
+        insert(conn, rows[:split])
+        print(f'{len(rows):,} vendors, {len(planted):,} planted duplicates, min confidence {args.min_confidence}')
+
+        pins = [r[0] for r in conn.execute('SELECT DISTINCT pin_code FROM vendors ORDER BY pin_code')]
+        sample, k = [], 0
+        while len(sample) < args.sample and k < len(pins):
+            sample += conn.execute(f'SELECT {dedup._COLUMNS} FROM vendors WHERE pin_code = ?', (pins[k],)).fetchall()
+            k += 1
+        t0 = time.perf_counter()
+        want, scored = all_pairs(sample, args.min_confidence)
+        per_pair = (time.perf_counter() - t0) / max(scored, 1)
+        got = {p[:2] for p in dedup.find_pairs(sample, args.min_confidence)[0]}
+        if got != want:
+            raise SystemExit(f'sample of {len(sample)}: pairs differ from all-pairs: {sorted(got ^ want)[:5]}')
+        total = split * (split - 1) / 2
+        print(f'  {"all pairs, extrapolated":<28} {per_pair * total / 3600:8.1f}h  '
+              f'({len(sample):,}-vendor sample: {len(want)} pairs, same as the index)')
+
+        run = dedup.dedup(conn, min_confidence=args.min_confidence)
+        full = run.seconds
+        print(f'  {"dedup, full":<28} {full:8.2f}s  {run.vendors:,} vendors, {run.candidates:,} candidates, '
+              f'{run.pairs:,} pairs, {run.clusters:,} clusters')
+
+        insert(conn, rows[split:])
+        run = dedup.dedup(conn, incremental=True, min_confidence=args.min_confidence)
+        print(f'  {"dedup, incremental":<28} {run.seconds:8.2f}s  {run.probed:,} new vs. {run.vendors - run.probed:,} '
+              f'block-mates, {run.candidates:,} candidates, {run.pairs:,} pairs')
+        incremental = stored(conn)
+
+        conn.execute('DELETE FROM dedup_runs')
+        run = dedup.dedup(conn, min_confidence=args.min_confidence)
+        print(f'  {"dedup, full (all vendors)":<28} {run.seconds:8.2f}s  {run.pairs:,} pairs, {run.clusters:,} clusters')
+        final = stored(conn)
+        if incremental != final:
+            raise SystemExit(f'incremental run differs from a full run: {len(incremental[0] ^ final[0])} pair(s), '
+                             f'{len(incremental[1] ^ final[1])} cluster(s)')
+
+        truth = {(a + 1, b + 1) for a, b in planted}
+        found = len(truth & final[0])
+        print(f'  planted duplicates found {found / len(truth):.1%}; '
+              f'{found / len(final[0]):.1%} of pairs are planted duplicates')
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
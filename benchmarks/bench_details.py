@@ -0,0 +1,181 @@
+"""Treasury totals over instrument details: json.loads per row vs. typed side tables and columns (compliance.instruments).
+
+Fills a mirror with instruments of every seeded type. Their ``details``
+blobs come from ``compliance.loader.instrument_details``, the port of the
+Worker's ``parseDetailsByType``, and the 0019 triggers shred them as rows
+arrive. Each report is then computed three ways, and all three must agree:
+
+* scan: read ``details`` for the type and ``json.loads`` every row, which
+  is what the reports did;
+* side table: ``GROUP BY`` over the typed side table joined to the
+  instruments;
+* columns: :func:`compliance.instruments.load_columns` once per table, then
+  :meth:`~compliance.instruments.DetailColumns.totals_by` per report.
+
+Also times the insert triggers, a full :func:`~compliance.instruments.shred`
+and :func:`~compliance.instruments.check`.
+
+    python benchmarks/bench_details.py --instruments 2000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compliance import db, instruments  # noqa: E402
+from compliance.instruments import GroupTotal  # noqa: E402
+from compliance.loader import instrument_details  # noqa: E402
+
+BANKS = ('SBI', 'HDFC Bank', 'ICICI Bank', 'Axis Bank', 'Bank of Baroda', 'Canara Bank', 'PNB', 'Union Bank',
+         'Kotak Mahindra Bank', 'IDBI Bank', 'Indian Bank', 'Yes Bank')
+SCHEMES = ('PMGSY', 'NHM', 'Samagra Shiksha', 'MGNREGA', 'AMRUT', 'Smart Cities', 'PMAY-G', 'Jal Jeevan')
+STATUSES = ('active', 'active', 'pending', 'approved', 'expired', 'rejected')
+
+# (report, side table, field, statuses, weight)
+REPORTS = (
+    ('BG amount by bank, active', 'bank_guarantees', 'bank_name', ('active',), None),
+    ('BG margin held by bank, active', 'bank_guarantees', 'bank_name', ('active',), 'margin_percent'),
+    ('LC amount by issuing bank', 'letters_of_credit', 'issuing_bank', None, None),
+    ('transfers by payee bank', 'transfers', 'payee_bank', None, None),
+    ('transfers by channel, active', 'transfers', 'channel', ('active',), None),
+    ('PFMS releases by scheme, active', 'pfms_releases', 'scheme', ('active',), None),
+)
+
+
+def rows(rng, n, types):
+    names = list(types)
+    for i in range(n):
+        name = rng.choice(names)
+        rec = {'bank_name': rng.choice(BANKS), 'bg_number': f'BG{i:09d}', 'beneficiary': f'Authority {i % 500}',
+               'margin_percent': str(rng.choice((0, 5, 10, 10, 15, 20, 25))), 'claimable_until': '2027-03-31',
+               'issuing_bank': rng.choice(BANKS), 'advising_bank': rng.choice(BANKS), 'lc_number': f'LC{i:09d}',
+               'shipment_terms': rng.choice(('FOB', 'CIF', 'EXW')), 'expiry_date': '2026-12-31',
+               'utr': f'UTR{i:013d}', 'txn_date': '2025-10-01', 'payer_bank': rng.choice(BANKS),
+               'payee_bank': rng.choice(BANKS), 'pfms_id': f'PF{i:010d}', 'sanction_no': f'SAN/{i}',
+               'scheme': rng.choice(SCHEMES), 'fund_source': rng.choice(('Central', 'State', 'Shared')),
+               'gem_order_no': f'GEMC-{i:012d}', 'gem_invoice_no': f'GI{i}', 'gem_seller_id': f'S{i % 9000}',
+               'signer_id': f'SIG{i % 300}', 'dsc_serial': f'{i:016x}', 'signed_at': '2025-10-01T10:00:00',
+               'audit_trail_url': ''}
+        details = instrument_details(name, rec)
+        yield (types[name], f'Instrument {i}', rng.randrange(1, 5001), rng.randrange(10_000, 10_000_000),
+               rng.choice(STATUSES), json.dumps(details, separators=(',', ':')))
+
+
+def scan(conn, cls, field, statuses, weight):
+    """The old way: decode every blob of the type and sum in Python."""
+    types = ', '.join('?' * len(cls.TYPES))
+    totals = {}
+    for status, amount, text in conn.execute(
+            'SELECT f.status, CAST(ROUND(COALESCE(f.amount, 0) * 100) AS INTEGER), f.details '
+            'FROM financial_instruments f JOIN instrument_types t ON t.id = f.type_id '
+            f'WHERE lower(t.name) IN ({types}) AND f.details IS NOT NULL', cls.TYPES):
+        if statuses and status not in statuses:
+            continue
+        details = json.loads(text)
+        if weight:
+            pct = details.get(weight)
+            if pct is None:
+                continue
+            amount = round(amount * float(pct) / 100)
+        label = details.get(field)
+        count, total = totals.get(label, (0, 0))
+        totals[label] = (count + 1, total + amount)
+    return sorted((GroupTotal(k, c, a) for k, (c, a) in totals.items()), key=lambda t: (-t.amount_paise, t.label or ''))
+
+
+def side_table(conn, cls, field, statuses):
+    where, params = '', []
+    if statuses:
+        where = f'WHERE f.status IN ({", ".join("?" * len(statuses))})'
+        params = list(statuses)
+    out = [GroupTotal(*r) for r in conn.execute(
+        f'SELECT d.{field}, COUNT(*), SUM(CAST(ROUND(COALESCE(f.amount, 0) * 100) AS INTEGER)) '
+        f'FROM {cls.TABLE} d JOIN financial_instruments f ON f.id = d.instrument_id {where} GROUP BY d.{field}',
+        params)]
+    return sorted(out, key=lambda t: (-t.amount_paise, t.label or ''))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--instruments', type=int, default=2_000_000)
+    parser.add_argument('--trigger-sample', type=int, default=50_000, help='rows inserted with and without triggers')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(22)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = db.open_mirror(os.path.join(tmp, 'details.sqlite'), bulk=True)
+        types = {name.lower(): type_id for type_id, name in conn.execute('SELECT id, name FROM instrument_types')}
+        insert = ('INSERT INTO financial_instruments (type_id, title, vendor_id, amount, status, details) '
+                  'VALUES (?, ?, ?, ?, ?, ?)')
+        triggers = [sql for sql, in conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' "
+                                                 "AND name LIKE 'trg_instr_details_%'")]
+        sample = list(rows(rng, args.trigger_sample, types))
+        conn.execute('BEGIN')
+        t0 = time.perf_counter()
+        conn.executemany(insert, sample)
+        with_triggers = time.perf_counter() - t0
+        conn.execute('ROLLBACK')
+        for name in ('trg_instr_details_ins', 'trg_instr_details_upd', 'trg_instr_details_del'):
+            conn.execute(f'DROP TRIGGER {name}')
+        conn.execute('BEGIN')
+        t0 = time.perf_counter()
+        conn.executemany(insert, sample)
+        bare = time.perf_counter() - t0
+        conn.execute('ROLLBACK')
+        print(f'insert {len(sample):,} instruments: {bare:.2f}s bare, {with_triggers:.2f}s with the shred triggers '
+              f'(+{(with_triggers - bare) / len(sample) * 1e6:.0f}us/row)')
+
+        conn.execute('BEGIN')
+        conn.executemany(insert, rows(rng, args.instruments, types))
+        conn.execute('COMMIT')
+        for sql in triggers:
+            conn.execute(sql)
+        t0 = time.perf_counter()
+        counts = instruments.shred(conn)
+        print(f'{args.instruments:,} instruments; shredded {sum(counts.values()):,} details in '
+              f'{time.perf_counter() - t0:.1f}s')
+        t0 = time.perf_counter()
+        mismatches = instruments.check(conn)
+        if mismatches:
+            raise SystemExit(f'check: {len(mismatches)} mismatch(es), e.g. {mismatches[0]}')
+        print(f'  check (Python decode of every blob vs. side tables) {time.perf_counter() - t0:.1f}s, consistent')
+
+        columns, load = {}, 0.0
+        print(f'  {"report":<34} {"scan":>9} {"side table":>11} {"columns":>9}')
+        total_scan = total_columns = 0.0
+        for label, table, field, statuses, weight in REPORTS:
+            cls = instruments.BY_TABLE[table]
+            t0 = time.perf_counter()
+            want = scan(conn, cls, field, statuses, weight)
+            scanned = time.perf_counter() - t0
+            side = ''
+            if weight is None:
+                t0 = time.perf_counter()
+                got = side_table(conn, cls, field, statuses)
+                side = f'{time.perf_counter() - t0:10.2f}s'
+                if got != want:
+                    raise SystemExit(f'{label}: side table differs from the scan')
+            if table not in columns:
+                t0 = time.perf_counter()
+                columns[table] = instruments.load_columns(conn, cls)
+                load += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            got = columns[table].totals_by(field, statuses, weight=weight)
+            elapsed = time.perf_counter() - t0
+            if got != want:
+                raise SystemExit(f'{label}: columns differ from the scan: {got[:3]} vs {want[:3]}')
+            total_scan += scanned
+            total_columns += elapsed
+            print(f'  {label:<34} {scanned:8.2f}s {side:>11} {elapsed * 1e3:7.1f}ms')
+        print(f'  {"all reports":<34} {total_scan:8.2f}s {"":>11} {total_columns * 1e3:7.1f}ms  '
+              f'(+{load:.2f}s to load {len(columns)} side tables into columns once)')
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Streaming exports vs. the Worker's materialize-then-join, with peak memory.
+
+Each export runs in a fresh interpreter and reports its own peak RSS, so
+the numbers are comparable across formats and row counts. The mirror is
+built in a child too: Linux carries ``ru_maxrss`` over fork/exec, so a fat
+parent would inflate every reading. The streamed CSV
+is byte-compared with the materialized one.
+
+    python benchmarks/bench_export.py --rows 1000000
+"""
+import argparse
+import filecmp
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from compliance import db, export  # noqa: E402
+
+MODES = ('materialized', 'csv', 'csv.gz', 'parquet', 'arrow')
+
+
+def build_mirror(path, rows):
+    conn = db.open_mirror(path, bulk=True)
+    statuses = ('pending', 'approved', 'rejected', 'paid')
+    conn.execute('BEGIN')
+    conn.executemany('INSERT INTO invoices (vendor_id, invoice_number, amount, status, due_date, created_at) '
+                     'VALUES (?, ?, ?, ?, ?, ?)',
+                     ((1 + i % 5000, f'INV/2025-26/{i:07d}', (i % 100000) * 10.25 if i % 3 else float(i % 7000),
+                       statuses[i % 4], f'2025-{1 + i % 12:02d}-{1 + i % 28:02d}',
+                       f'2025-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:00')
+                      for i in range(rows)))
+    conn.execute('COMMIT')
+    conn.close()
+
+
+def materialized(conn, out_path):
+    """What the Worker does: fetch everything, one string per row, one join."""
+    spec = export.EXPORTS['invoices']
+    sql, params = export.export_query(conn, 'invoices', js_numbers=True)
+    rows = conn.execute(sql, params).fetchall()
+
+    def esc(v):
+        if v is None:
+            return ''
+        s = str(v)
+        return '"' + s.replace('"', '""') + '"' if any(ch in s for ch in '",\n') else s
+    text = '\n'.join([','.join(spec.columns)] + [','.join(esc(v) for v in r) for r in rows])
+    with open(out_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    return len(rows)
+
+
+def child(mode, db_path, out_path):
+    conn = db.connect(db_path)
+    # Same small page cache and on-disk sort for every mode, so RSS reflects
+    # what Python holds rather than SQLite's cache (256 MB by default here).
+    conn.execute('PRAGMA cache_size=-16384')
+    conn.execute('PRAGMA temp_store=FILE')
+    t0 = time.perf_counter()
+    if mode == 'materialized':
+        count = materialized(conn, out_path)
+    else:
+        count = export.export(conn, 'invoices', out_path, mode)
+    elapsed = time.perf_counter() - t0
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'{count} {elapsed:.3f} {peak_mb:.0f}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--build', nargs=2, metavar=('DB', 'ROWS'), help=argparse.SUPPRESS)
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'DB', 'OUT'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.build:
+        return build_mirror(args.build[0], int(args.build[1]))
+    if args.child:
+        return child(*args.child)
+
+    try:
+        import pyarrow  # noqa: F401
+        modes = MODES
+    except ImportError:
+        modes = MODES[:3]
+        print('pyarrow not installed: skipping parquet/arrow')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in (args.rows // 10, args.rows):
+            db_path = os.path.join(tmp, f'mirror-{rows}.sqlite')
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--build', db_path, str(rows)], check=True)
+            outputs = {}
+            for mode in modes:
+                out = os.path.join(tmp, f'invoices-{rows}.{mode}')
+                res = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, db_path, out],
+                                     check=True, capture_output=True, text=True)
+                count, elapsed, peak = res.stdout.split()
+                if int(count) != rows:
+                    raise SystemExit(f'{mode}: exported {count} rows, expected {rows}')
+                outputs[mode] = out
+                print(f'rows={rows:>9,} {mode:<13} {float(elapsed):7.2f}s  peak RSS {peak:>5} MB  '
+                      f'file {os.path.getsize(out) / 1e6:7.1f} MB')
+            if not filecmp.cmp(outputs['materialized'], outputs['csv'], shallow=False):
+                raise SystemExit('streamed CSV differs from the materialized export')
+
+
+if __name__ == '__main__':
+    main()
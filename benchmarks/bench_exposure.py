@@ -0,0 +1,172 @@
+"""Instrument exposure and expiries: SQL scans with TEXT dates vs. the Fenwick index (compliance.exposure).
+
+Fills a mirror with instruments across 5,000 vendors and every seeded type,
+issued over four years with terms of one month to three years. A share of
+them has no expiry date. Then it runs treasury's questions both ways and
+requires identical answers:
+
+* exposure on a random date per type, per vendor and per (vendor, type);
+* instruments expiring in the next 30 days, overall and per type;
+* a 12-month ladder per type: amount expiring each month and in force at
+  each month end.
+
+Finally it applies a batch of status, amount and date changes, updates the
+index through ``refresh`` and checks it against a fresh load.
+
+    python benchmarks/bench_exposure.py --instruments 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compliance import db, exposure  # noqa: E402
+from compliance.exposure import Exposure, month_ends  # noqa: E402
+
+VENDORS = 5000
+START = date(2023, 1, 1)
+STATUSES = ('active', 'active', 'active', 'pending', 'expired', 'rejected')
+
+SCAN_EXPOSURE = ("SELECT COUNT(*), COALESCE(SUM(CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER)), 0) "
+                 "FROM financial_instruments WHERE status = 'active' AND COALESCE(issue_date, '') <= ? "
+                 "AND expiry_date >= ? AND expiry_date >= COALESCE(issue_date, '')")
+SCAN_EXPIRING = ("SELECT id, COALESCE(vendor_id, 0), COALESCE(type_id, 0), expiry_date, "
+                 "CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER) FROM financial_instruments "
+                 "WHERE status = 'active' AND expiry_date BETWEEN ? AND ? "
+                 "AND expiry_date >= COALESCE(issue_date, '') {}ORDER BY expiry_date, id")
+SCAN_EXPIRING_TOTAL = ("SELECT COUNT(*), COALESCE(SUM(CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER)), 0) "
+                       "FROM financial_instruments WHERE status = 'active' AND expiry_date BETWEEN ? AND ? "
+                       "AND expiry_date >= COALESCE(issue_date, '') AND type_id = ?")
+
+
+def instruments(rng, n, types):
+    for i in range(n):
+        issued = START + timedelta(days=rng.randrange(4 * 365))
+        expires = issued + timedelta(days=rng.randrange(30, 3 * 365))
+        yield (rng.choice(types), f'Instrument {i}', rng.randrange(1, VENDORS + 1),
+               rng.randrange(10_000, 10_000_000), rng.choice(STATUSES),
+               issued.isoformat() if rng.random() > 0.01 else None,
+               expires.isoformat() if rng.random() > 0.1 else None)
+
+
+def scan(conn, sql, params, vendor_id=None, type_id=None):
+    for column, value in (('vendor_id', vendor_id), ('type_id', type_id)):
+        if value is not None:
+            sql += f' AND {column} = ?'
+            params = [*params, value]
+    return Exposure(*conn.execute(sql, params).fetchone())
+
+
+def run(label, queries):
+    """Time (scan, index) pairs of callables; fail on the first disagreement."""
+    scanned = indexed = 0.0
+    for do_scan, do_index in queries:
+        t0 = time.perf_counter()
+        want = do_scan()
+        t1 = time.perf_counter()
+        got = do_index()
+        t2 = time.perf_counter()
+        if got != want:
+            raise SystemExit(f'{label}: index {got} != scan {want}')
+        scanned += t1 - t0
+        indexed += t2 - t1
+    n = len(queries)
+    print(f'  {label:<30} {n:>5} queries  scan {scanned / n * 1e3:8.2f}ms  index {indexed / n * 1e3:8.3f}ms  '
+          f'({scanned / max(indexed, 1e-9):,.0f}x)')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--instruments', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=50, help='per question')
+    parser.add_argument('--updates', type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(21)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = db.open_mirror(os.path.join(tmp, 'exposure.sqlite'), bulk=True)
+        types = [t for t, in conn.execute('SELECT id FROM instrument_types')]
+        conn.execute('BEGIN')
+        conn.executemany('INSERT INTO financial_instruments (type_id, title, vendor_id, amount, status, issue_date, '
+                         'expiry_date) VALUES (?, ?, ?, ?, ?, ?, ?)', instruments(rng, args.instruments, types))
+        conn.execute('COMMIT')
+
+        t0 = time.perf_counter()
+        index = exposure.ExposureIndex.load(conn)
+        print(f'{args.instruments:,} instruments; loaded {len(index):,} active with an expiry in '
+              f'{time.perf_counter() - t0:.2f}s ({index.skipped:,} without one skipped)')
+
+        def day():
+            return START + timedelta(days=rng.randrange(5 * 365))
+
+        q = args.queries
+        run('exposure on D, per type', [
+            (lambda d=d, t=t: scan(conn, SCAN_EXPOSURE, [d.isoformat()] * 2, type_id=t),
+             lambda d=d, t=t: index.exposure(d, type_id=t))
+            for d, t in ((day(), rng.choice(types)) for _ in range(q))])
+        run('exposure on D, per vendor', [
+            (lambda d=d, v=v: scan(conn, SCAN_EXPOSURE, [d.isoformat()] * 2, vendor_id=v),
+             lambda d=d, v=v: index.exposure(d, v))
+            for d, v in ((day(), rng.randrange(1, VENDORS + 1)) for _ in range(q))])
+        run('exposure on D, vendor and type', [
+            (lambda d=d, v=v, t=t: scan(conn, SCAN_EXPOSURE, [d.isoformat()] * 2, v, t),
+             lambda d=d, v=v, t=t: index.exposure(d, v, t))
+            for d, v, t in ((day(), rng.randrange(1, VENDORS + 1), rng.choice(types)) for _ in range(q))])
+
+        def expiring(first, type_id=None):
+            last = first + timedelta(days=29)
+            sql = SCAN_EXPIRING.format('AND type_id = ? ' if type_id else '')
+            params = [first.isoformat(), last.isoformat()] + ([type_id] if type_id else [])
+            return (lambda: [exposure.Expiring(i, v, t, date.fromisoformat(e), a)
+                             for i, v, t, e, a in conn.execute(sql, params)],
+                    lambda: index.expiring(first, last, type_id=type_id))
+
+        run('expiring in 30 days', [expiring(day()) for _ in range(q // 5 or 1)])
+        run('expiring in 30 days, per type', [expiring(day(), rng.choice(types)) for _ in range(q)])
+
+        def ladder(start, type_id):
+            ends = month_ends(start, 12)
+            firsts = [start] + [e + timedelta(days=1) for e in ends[:-1]]
+            return (lambda: [exposure.LadderRow(
+                        end, Exposure(*conn.execute(SCAN_EXPIRING_TOTAL, (first.isoformat(), end.isoformat(),
+                                                                           type_id)).fetchone()),
+                        scan(conn, SCAN_EXPOSURE, [end.isoformat()] * 2, type_id=type_id))
+                        for first, end in zip(firsts, ends)],
+                    lambda: index.ladder(start, ends, type_id=type_id))
+
+        run('12-month ladder, per type', [ladder(day(), rng.choice(types)) for _ in range(q // 5 or 1)])
+
+        ids = rng.sample(range(1, args.instruments + 1), args.updates)
+        conn.execute('BEGIN')
+        for k, i in enumerate(ids):
+            if k % 3 == 0:
+                conn.execute('UPDATE financial_instruments SET status = ? WHERE id = ?', (rng.choice(STATUSES), i))
+            elif k % 3 == 1:
+                conn.execute('UPDATE financial_instruments SET amount = ? WHERE id = ?',
+                             (rng.randrange(10_000, 10_000_000), i))
+            else:
+                conn.execute('UPDATE financial_instruments SET expiry_date = ? WHERE id = ?', (day().isoformat(), i))
+        conn.execute('COMMIT')
+        t0 = time.perf_counter()
+        index.refresh(conn, ids)
+        elapsed = time.perf_counter() - t0
+        fresh = exposure.ExposureIndex.load(conn)
+        for _ in range(200):
+            d, v, t = day(), rng.choice((None, rng.randrange(1, VENDORS + 1))), rng.choice((None, *types))
+            if index.exposure(d, v, t) != fresh.exposure(d, v, t) or \
+                    index.expiring(d, d + timedelta(days=29), v, t) != fresh.expiring(d, d + timedelta(days=29), v, t):
+                raise SystemExit(f'after updates: index differs from a fresh load on {d}, vendor {v}, type {t}')
+        if len(index) != len(fresh):
+            raise SystemExit(f'after updates: {len(index):,} indexed vs {len(fresh):,} on a fresh load')
+        print(f'  refresh {args.updates:,} changed instruments  {elapsed:.2f}s '
+              f'({elapsed / args.updates * 1e6:.0f}us each); same answers as a fresh load')
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
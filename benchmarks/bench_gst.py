@@ -0,0 +1,118 @@
+"""GST breakup of bulk orders: a per-line Decimal loop vs. the vectorized engine (compliance.gst).
+
+Builds a bulk order of ``--lines`` lines split over invoices of 10 to 200
+lines. Lines draw from a few thousand 8-digit HSN codes under a few hundred
+rated headings, and a tenth state their own rate. Each invoice has a
+seller in Delhi, Chandigarh or Maharashtra and ships within the seller's
+state a quarter of the time, elsewhere otherwise. Intra-state (CGST +
+SGST/UTGST) and inter-state (IGST) invoices both occur. The breakup is
+computed by:
+
+* :func:`compliance.gst.breakup_exact`, one line at a time in ``Decimal``,
+  with invoice totals summed in ``Decimal``. This is the reference;
+* :func:`compliance.gst.breakup` and :func:`compliance.gst.invoice_totals`.
+
+Every head of every line and every invoice total must agree to the paisa.
+
+    python benchmarks/bench_gst.py --lines 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compliance import gst  # noqa: E402
+from compliance.gstin import STATE_CODES  # noqa: E402
+
+RATES = (0, 5, 12, 18, 28)
+SELLER_STATES = ('07', '04', '27')      # Chandigarh levies UTGST
+
+
+def order(rng, n):
+    headings = sorted({f'{rng.randrange(1, 98):02d}{rng.randrange(100):02d}' for _ in range(400)})
+    prefixes = {h: Decimal(rng.choice(RATES)) for h in headings}
+    codes = [h + f'{rng.randrange(10_000):04d}' for h in headings for _ in range(8)]
+    states = [f'{s:02d}' for s in sorted(STATE_CODES)]
+    invoice, taxable, hsn, stated, seller, buyer = [], [], [], [], [], []
+    k = 0
+    while len(invoice) < n:
+        size, origin = min(rng.randint(10, 200), n - len(invoice)), rng.choice(SELLER_STATES)
+        state = origin if rng.random() < 0.25 else rng.choice(states)
+        for _ in range(size):
+            invoice.append(k)
+            taxable.append(rng.randrange(1, 5_000_000))
+            hsn.append(rng.choice(codes))
+            stated.append(float(rng.choice(RATES)) if rng.random() < 0.1 else float('nan'))
+            seller.append(origin)
+            buyer.append(state)
+        k += 1
+    return prefixes, invoice, taxable, hsn, stated, seller, buyer
+
+
+def reference(prefixes, invoice, taxable, hsn, stated, seller, buyer):
+    lines = gst.breakup_exact(taxable, seller, buyer, hsn, gst.RateTable(prefixes), stated)
+    totals = defaultdict(lambda: [0, Decimal(0), Decimal(0), Decimal(0), Decimal(0)])
+    for key, paise, line in zip(invoice, taxable, lines):
+        t = totals[key]
+        t[0] += 1
+        t[1] += Decimal(paise) / 100
+        t[2] += line.cgst
+        t[3] += line.sgst
+        t[4] += line.igst
+    invoices = {}
+    for key, (n, base, cgst, sgst, igst) in totals.items():
+        total = base + cgst + sgst + igst
+        payable = total.quantize(Decimal(1), rounding=ROUND_HALF_UP)
+        invoices[key] = (n, base, cgst, sgst, igst, total, payable - total, payable)
+    return lines, invoices
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=50_000)
+    parser.add_argument('--repeat', type=int, default=5, help='vectorized runs; the best is reported')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(24)
+    prefixes, invoice, taxable, hsn, stated, seller, buyer = order(rng, args.lines)
+    print(f'{args.lines:,} lines on {invoice[-1] + 1:,} invoices, {len(prefixes)} rated headings')
+
+    t0 = time.perf_counter()
+    want_lines, want_invoices = reference(prefixes, invoice, taxable, hsn, stated, seller, buyer)
+    exact = time.perf_counter() - t0
+
+    best = float('inf')
+    for _ in range(args.repeat):
+        table = gst.RateTable(prefixes)             # cold lookup cache every run
+        t0 = time.perf_counter()
+        lines = gst.breakup(taxable, seller, buyer, hsn, table, stated)
+        totals = gst.invoice_totals(lines, invoice)
+        best = min(best, time.perf_counter() - t0)
+
+    cents = Decimal('0.01')
+    for i, want in enumerate(want_lines):
+        got = (Decimal(int(lines.rate_bp[i])) / 100, Decimal(int(lines.cgst[i])) * cents,
+               Decimal(int(lines.sgst[i])) * cents, Decimal(int(lines.igst[i])) * cents)
+        if got != tuple(want):
+            raise SystemExit(f'line {i}: engine {got} != Decimal {tuple(want)}')
+    for k, key in enumerate(totals.invoice.tolist()):
+        got = (int(totals.lines[k]), *(Decimal(int(a[k])) * cents for a in totals[2:]))
+        if got != want_invoices[key]:
+            raise SystemExit(f'invoice {key}: engine {got} != Decimal {want_invoices[key]}')
+    inter = int(np.count_nonzero(lines.inter_state))
+    print(f'  {inter:,} inter-state (IGST) lines, {args.lines - inter:,} intra-state, '
+          f'{int(np.count_nonzero(lines.utgst)):,} with UTGST')
+    print(f'  Decimal loop {exact * 1e3:9.1f}ms  ({exact / args.lines * 1e6:.2f}us/line)')
+    print(f'  vectorized   {best * 1e3:9.1f}ms  ({best / args.lines * 1e6:.2f}us/line, {exact / best:,.0f}x); '
+          'identical to the paisa, per line and per invoice')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Vectorized GSTIN/PAN validation vs. a per-row regex + checksum loop.
+
+    python benchmarks/bench_gstin.py --rows 800000
+"""
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compliance import gstin  # noqa: E402
+
+GSTIN_RE = re.compile(r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z][1-9A-Z]Z[0-9A-Z]$')
+PAN_RE = re.compile(r'^[A-Z]{5}[0-9]{4}[A-Z]$')
+
+
+def make_vendors(rows, seed):
+    """Mostly valid vendors, with ~2% broken check digits and ~1% PAN/state mismatches."""
+    rng = random.Random(seed)
+    letters = string.ascii_uppercase
+    out_g, out_p, out_s = [], [], []
+    for _ in range(rows):
+        state = f'{rng.randint(1, 38):02d}'
+        pan = ''.join(rng.choices(letters, k=5)) + f'{rng.randrange(10000):04d}' + rng.choice(letters)
+        head = state + pan + rng.choice('123456789') + 'Z'
+        check = gstin.check_digit(head)
+        r = rng.random()
+        if r < 0.02:
+            check = '0' if check != '0' else '1'
+        g = head + check
+        out_g.append(g)
+        out_p.append(pan if r < 0.02 or r > 0.03 else pan[:-1] + 'X')
+        out_s.append(state if r < 0.025 or r > 0.03 else '99')
+    return out_g, out_p, out_s
+
+
+def row_loop(gstins, pans, states):
+    out = []
+    for g, p, s in zip(gstins, pans, states):
+        mask = 0
+        g = (g or '').strip()
+        if g:
+            if not GSTIN_RE.match(g):
+                mask |= gstin.ERR_FORMAT
+            else:
+                if gstin.check_digit(g[:14]) != g[14]:
+                    mask |= gstin.ERR_CHECKSUM
+                if int(g[:2]) not in gstin.STATE_CODES:
+                    mask |= gstin.ERR_STATE
+        p = (p or '').strip()
+        if p and not PAN_RE.match(p):
+            mask |= gstin.ERR_PAN_FORMAT
+        if g and not mask & gstin.ERR_FORMAT:
+            if p and p != g[2:12]:
+                mask |= gstin.ERR_PAN_MISMATCH
+            s = str(s or '').strip().zfill(2)
+            if s != '00' and s != g[:2]:
+                mask |= gstin.ERR_STATE_MISMATCH
+        out.append(mask)
+    return np.array(out, dtype=np.uint8)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=800_000)
+    parser.add_argument('--seed', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    g, p, s = make_vendors(args.rows, args.seed)
+
+    t0 = time.perf_counter()
+    fast = gstin.validate_vendors(g, p, s)
+    vec_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    slow = row_loop(g, p, s)
+    loop_time = time.perf_counter() - t0
+
+    if not np.array_equal(fast, slow):
+        bad = int(np.flatnonzero(fast != slow)[0])
+        raise SystemExit(f'mismatch at row {bad}: {g[bad]} {p[bad]} {s[bad]} -> {fast[bad]} vs {slow[bad]}')
+    flagged = int(np.count_nonzero(fast))
+    print(f'rows={args.rows:,} flagged={flagged:,}')
+    print(f'vectorized: {vec_time:.3f}s  row loop: {loop_time:.3f}s  ({loop_time / vec_time:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Import/startup cost of pandas vs. the built-in table writer.
+
+Each measurement spawns a fresh interpreter, so module caches do not help.
+When pandas is installed the writer's output is also checked byte-for-byte
+against ``DataFrame.to_csv`` on the generator's own data files.
+
+    python benchmarks/bench_import.py --repeat 7
+"""
+import argparse
+import csv
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from compliance import DOCS_DIR  # noqa: E402
+from compliance.tables import to_csv  # noqa: E402
+
+CASES = {
+    'baseline': 'pass',
+    'pandas': 'import pandas',
+    'compliance.tables': 'import compliance.tables',
+    'compliance.package': 'import compliance.package, compliance.tables',
+}
+
+
+def _spawn(code: str) -> float:
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - t0
+
+
+def _check_against_pandas():
+    try:
+        import pandas as pd
+    except ImportError:
+        print('pandas not installed: byte comparison skipped')
+        return
+    for name in ('document_field_summary.csv', 'purchase_requisition_fields.csv', 'purchase_order_fields.csv',
+                 'due_date_tracking_matrix.csv', 'rbi_compliance_checklist.csv'):
+        with open(DOCS_DIR / name, newline='', encoding='utf-8') as f:
+            records = [{k: (v == 'True' if v in ('True', 'False') else v) for k, v in row.items()}
+                       for row in csv.DictReader(f)]
+        if to_csv(records) != pd.DataFrame(records).to_csv(index=False):
+            raise SystemExit(f'{name}: output differs from pandas')
+    print('output matches pandas byte-for-byte')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    for label, code in CASES.items():
+        try:
+            times = [_spawn(code) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError:
+            print(f'{label:>20}: unavailable')
+            continue
+        print(f'{label:>20}: median {statistics.median(times) * 1000:7.1f} ms (min {min(times) * 1000:.1f})')
+    _check_against_pandas()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""HSN and SKU summaries: json.loads over every document vs. the exploded line tables (compliance.lineitems).
+
+Fills a mirror with synthetic POs (``items`` with sku, HSN, qty, rate and
+an IGST or CGST/SGST rate) and a DC for most of them. Then:
+
+* the HSN summary of non-rejected POs and the SKU summary of DCs, by
+  decoding every ``items`` cell in a loop. This is the baseline and the
+  reference for the results;
+* a full :func:`compliance.lineitems.normalize`, and the same summaries
+  from ``po_items``/``dc_items``;
+* about 1% of the documents edited or deleted and some added, an
+  incremental run, and :func:`~compliance.lineitems.check` against a fresh
+  explode.
+
+    python benchmarks/bench_items.py --lines 2000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import synthetic  # noqa: E402
+from compliance import db, lineitems  # noqa: E402
+from compliance.lineitems import ItemTotal  # noqa: E402
+
+LOADED_AT = '2025-04-01 00:00:00'
+RATES = {'8443': 18, '8544': 18, '8471': 18, '8504': 12, '998713': 18}
+
+
+def taxed(items, rng):
+    lines = json.loads(items)
+    for item in lines:
+        rate = RATES.get(item['hsn_sac'], 5)
+        if rng.random() < 0.3:
+            item['igst_rate'] = rate
+        else:
+            item['cgst_rate'] = item['sgst_rate'] = rate / 2
+    return lines
+
+
+def documents(rng, lines, start=0):
+    """PO and DC rows until ``lines`` PO lines."""
+    pos, dcs, n = [], [], 0
+    for i, (po_number, vendor_id, total, status, items) in enumerate(synthetic.purchase_orders(
+            lines, seed=rng.randrange(1 << 30))):
+        parsed = taxed(items, rng)
+        pos.append((vendor_id, f'PO/{start + i:08d}', json.dumps(parsed, separators=(',', ':')), total, status))
+        if rng.random() < 0.9:
+            delivered = [{'sku': item['sku'], 'qty': item['qty'] - (rng.random() < 0.1)} for item in parsed]
+            dcs.append((vendor_id, f'DC/{start + i:08d}', json.dumps(delivered, separators=(',', ':')), 'delivered'))
+        n += len(parsed)
+        if n >= lines:
+            break
+    return pos, dcs
+
+
+def insert(conn, pos, dcs, updated_at=None):
+    stamp = f"'{updated_at}'" if updated_at else 'CURRENT_TIMESTAMP'
+    conn.execute('BEGIN')
+    conn.executemany('INSERT INTO purchase_orders (vendor_id, po_number, items, amount, status, updated_at) '
+                     f'VALUES (?, ?, ?, ?, ?, {stamp})', pos)
+    conn.executemany('INSERT INTO delivery_challans (vendor_id, dc_number, items, status, updated_at) '
+                     f'VALUES (?, ?, ?, ?, {stamp})', dcs)
+    conn.execute('COMMIT')
+
+
+def scan_hsn(conn):
+    """The old way: decode every PO and add its lines into dicts keyed by HSN."""
+    totals = defaultdict(lambda: [0, 0.0, 0, 0])
+    for (items,) in conn.execute("SELECT items FROM purchase_orders WHERE status <> 'rejected'"):
+        for item in json.loads(items or '[]'):
+            taxable = round(item['qty'] * item['rate'] * 100)
+            rate = item['igst_rate'] if 'igst_rate' in item else item['cgst_rate'] + item['sgst_rate']
+            t = totals[item.get('hsn_sac')]
+            t[0] += 1
+            t[1] += item['qty']
+            t[2] += taxable
+            t[3] += lineitems.tax_on(taxable, rate)
+    return [ItemTotal(k, n, q, a, t, a + t) for k, (n, q, a, t) in sorted(totals.items())]
+
+
+def scan_sku(conn):
+    totals = defaultdict(lambda: [0, 0.0])
+    for (items,) in conn.execute('SELECT items FROM delivery_challans'):
+        for item in json.loads(items or '[]'):
+            t = totals[item.get('sku')]
+            t[0] += 1
+            t[1] += item['qty']
+    return [ItemTotal(k, n, q, 0, 0, 0) for k, (n, q) in sorted(totals.items())]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=2_000_000, help='PO lines')
+    parser.add_argument('--changes', type=float, default=0.01, help='share of documents edited or deleted')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(23)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = db.open_mirror(os.path.join(tmp, 'items.sqlite'), bulk=True)
+        pos, dcs = documents(rng, args.lines)
+        insert(conn, pos, dcs, LOADED_AT)
+        print(f'{len(pos):,} POs and {len(dcs):,} DCs, {args.lines:,}+ PO lines')
+        hsn_statuses = ('pending', 'approved')
+
+        t0 = time.perf_counter()
+        want_hsn = scan_hsn(conn)
+        want_sku = scan_sku(conn)
+        scanned = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        run = lineitems.normalize(conn)
+        elapsed = time.perf_counter() - t0
+        total = sum(run.lines.values())
+        print(f'  full normalize: {sum(run.documents.values()):,} documents, {total:,} lines in {elapsed:.1f}s '
+              f'({elapsed / total * 1e6:.1f}us/line)')
+
+        t0 = time.perf_counter()
+        got_hsn = lineitems.summary(conn, 'pos', 'hsn_sac', hsn_statuses)
+        got_sku = [t._replace(taxable_paise=0, tax_paise=0, total_paise=0)
+                   for t in lineitems.summary(conn, 'dcs', 'sku')]
+        summarized = time.perf_counter() - t0
+        if got_hsn != want_hsn:
+            raise SystemExit(f'HSN summary differs from the scan: {got_hsn[:2]} vs {want_hsn[:2]}')
+        if got_sku != want_sku:
+            raise SystemExit(f'SKU summary differs from the scan: {got_sku[:2]} vs {want_sku[:2]}')
+        print(f'  PO HSN + DC SKU summaries: scan {scanned:.2f}s, line tables {summarized:.2f}s '
+              f'({scanned / summarized:,.0f}x); identical')
+
+        po_ids = [i for (i,) in conn.execute('SELECT id FROM purchase_orders')]
+        changed = rng.sample(po_ids, max(int(len(po_ids) * args.changes), 1))
+        new_pos, new_dcs = documents(rng, max(int(args.lines * args.changes / 4), 1), start=len(po_ids))
+        conn.execute('BEGIN')
+        for k, i in enumerate(changed):
+            if k % 4 == 0:
+                conn.execute('DELETE FROM purchase_orders WHERE id = ?', (i,))
+            else:
+                lines = json.loads(conn.execute('SELECT items FROM purchase_orders WHERE id = ?', (i,)).fetchone()[0])
+                lines[0]['qty'] += 1
+                lines.append(dict(lines[-1], sku='EXTRA'))
+                conn.execute('UPDATE purchase_orders SET items = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                             (json.dumps(lines, separators=(',', ':')), i))
+        conn.execute('COMMIT')
+        # Backdated, as an import of old documents would be.
+        insert(conn, new_pos, new_dcs, LOADED_AT)
+
+        t0 = time.perf_counter()
+        run = lineitems.normalize(conn, incremental=True)
+        elapsed = time.perf_counter() - t0
+        print(f'  incremental after {len(changed):,} edits/deletes and {len(new_pos) + len(new_dcs):,} inserts: '
+              f'{sum(run.documents.values()):,} documents, {sum(run.lines.values()):,} lines in {elapsed:.2f}s')
+        t0 = time.perf_counter()
+        mismatches = lineitems.check(conn)
+        if mismatches:
+            raise SystemExit(f'check: {len(mismatches)} mismatch(es), e.g. {mismatches[0]}')
+        print(f'  check (fresh explode of every document) {time.perf_counter() - t0:.1f}s, consistent')
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Bulk invoice load into a fresh SQLite mirror, then a full re-import (all updates).
+
+    python benchmarks/bench_loader.py --rows 2000000
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compliance import db  # noqa: E402
+from compliance.loader import load_csv  # noqa: E402
+
+STATUSES = ('pending', 'approved', 'rejected', 'paid')
+
+
+def write_invoices(path, rows, seed):
+    rng = random.Random(seed)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f)
+        w.writerow(['invoice_number', 'vendor_id', 'amount', 'status', 'due_date'])
+        for i in range(rows):
+            w.writerow([f'INV/2025-26/{i:07d}', rng.randrange(1, 5000), rng.randrange(100, 5_000_000) / 100,
+                        STATUSES[i % 4], f'2025-{1 + i % 12:02d}-{1 + i % 28:02d}'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--batch-size', type=int, default=50_000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, 'invoices.csv')
+        t0 = time.perf_counter()
+        write_invoices(src, args.rows, args.seed)
+        print(f'rows={args.rows:,} csv={os.path.getsize(src) / 1e6:.0f} MB (generated in {time.perf_counter() - t0:.1f}s)')
+
+        conn = db.open_mirror(os.path.join(tmp, 'mirror.sqlite'), bulk=True)
+        for label, expect in (('initial load', (args.rows, 0)), ('re-import', (0, args.rows))):
+            t0 = time.perf_counter()
+            result = load_csv(conn, 'invoices', src, batch_size=args.batch_size)
+            elapsed = time.perf_counter() - t0
+            if (result.inserted, result.updated) != expect or result.errors:
+                raise SystemExit(f'{label}: unexpected result {result.to_json()[:300]}')
+            print(f'{label}: {elapsed:.1f}s ({args.rows / elapsed:,.0f} rows/s) '
+                  f'inserted={result.inserted:,} updated={result.updated:,}')
+        count = conn.execute('SELECT count(*) FROM invoices').fetchone()[0]
+        conn.close()
+        if count != args.rows:
+            raise SystemExit(f'expected {args.rows} invoices, found {count}')
+
+
+if __name__ == '__main__':
+    main()
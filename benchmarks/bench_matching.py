@@ -0,0 +1,182 @@
+"""Three-way PO / DC / invoice match: per-line Python dicts vs. compliance.matching.
+
+Fills a mirror with synthetic POs (``items`` with sku/qty/rate), one DC per
+PO (mostly delivered in full, some short or over) and invoices (some over
+the delivered value). Each side is then matched by:
+
+* a straightforward loop that decodes each document and adds its lines
+  into dicts keyed by (vendor, sku). This is the baseline and the reference
+  for the results;
+* ``compliance.matching.match``, in full.
+
+Then about 1% of the documents are edited, deleted or moved to another
+vendor, and an incremental run is timed. Its stored results must equal a
+full recomputation.
+
+    python benchmarks/bench_matching.py --lines 1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import synthetic  # noqa: E402
+from compliance import db, matching  # noqa: E402
+
+VENDORS = 50_000
+LOADED_AT = '2025-04-01 00:00:00'
+
+
+def populate(conn, lines, seed=17):
+    """POs until ``lines`` item lines, with a DC and an invoice for most of them."""
+    rng = random.Random(seed)
+    pos, dcs, invoices, n = [], [], [], 0
+    for i, (po_number, vendor_id, total, status, items) in enumerate(synthetic.purchase_orders(
+            lines, vendor_count=VENDORS)):
+        parsed = json.loads(items)
+        pos.append((vendor_id, po_number, items, total, status))
+        n += len(parsed)
+        if status == 'rejected' or rng.random() < 0.05:
+            continue                                    # not delivered (yet)
+        delivered, value = [], 0
+        for item in parsed:
+            r = rng.random()
+            qty = item['qty'] if r < 0.8 else max(item['qty'] - rng.randint(1, 5), 0) if r < 0.95 else item['qty'] + 1
+            delivered.append({'sku': item['sku'], 'qty': qty})
+            value += qty * item['rate']
+        dcs.append((vendor_id, f'DC/2025-26/{i:07d}', json.dumps(delivered, separators=(',', ':')),
+                    'rejected' if rng.random() < 0.01 else 'delivered'))
+        billed = value * 1.1 if rng.random() < 0.03 else value
+        invoices.append((vendor_id, f'INV/2025-26/{i:07d}', round(billed, 2), 'pending', '2025-12-31'))
+        if n >= lines:
+            break
+    # Loaded well before the first match run, as a real backlog would be.
+    conn.execute('BEGIN')
+    conn.executemany(f'INSERT INTO purchase_orders (vendor_id, po_number, items, amount, status, updated_at) '
+                     f"VALUES (?, ?, ?, ?, ?, '{LOADED_AT}')", pos)
+    conn.executemany(f'INSERT INTO delivery_challans (vendor_id, dc_number, items, status, updated_at) '
+                     f"VALUES (?, ?, ?, ?, '{LOADED_AT}')", dcs)
+    conn.executemany(f'INSERT INTO invoices (vendor_id, invoice_number, amount, status, due_date, updated_at) '
+                     f"VALUES (?, ?, ?, ?, ?, '{LOADED_AT}')", invoices)
+    conn.execute('COMMIT')
+    return n, len(pos), len(dcs), len(invoices)
+
+
+def reference(conn, tolerance_paise=matching.DEFAULT_TOLERANCE_PAISE):
+    """The same match with per-line dict updates; returns (lines, vendors) as stored rows."""
+    ordered, ordered_paise, delivered = defaultdict(float), defaultdict(int), defaultdict(float)
+    for vendor_id, amount, items in conn.execute("SELECT COALESCE(vendor_id, 0), amount, items FROM purchase_orders "
+                                                 "WHERE status <> 'rejected'"):
+        for item in json.loads(items or '[]'):
+            key = (vendor_id, str(item.get('sku') or ''))
+            ordered[key] += float(item['qty'])
+            ordered_paise[key] += round(float(item['qty']) * float(item['rate']) * 100)
+    for vendor_id, items in conn.execute("SELECT COALESCE(vendor_id, 0), items FROM delivery_challans "
+                                         "WHERE status <> 'rejected'"):
+        for item in json.loads(items or '[]'):
+            delivered[(vendor_id, str(item.get('sku') or ''))] += float(item['qty'])
+    lines, per_vendor = [], defaultdict(lambda: [0, 0, 0])
+    for key in sorted(ordered.keys() | delivered.keys()):
+        o, d, op = ordered.get(key, 0.0), delivered.get(key, 0.0), ordered_paise.get(key, 0)
+        dp = int(round(d * (op / o))) if o > 0 else 0
+        status = 'short' if d < o - 1e-9 else 'over_delivered' if d > o + 1e-9 else 'matched'
+        lines.append((*key, o, d, op, dp, status))
+        v = per_vendor[key[0]]
+        v[0] += op
+        v[1] += dp
+        v[2] += status == 'short'
+    counts = defaultdict(lambda: [0, 0, 0])
+    for k, table in enumerate(('purchase_orders', 'delivery_challans', 'invoices')):
+        for vendor_id, n in conn.execute(f'SELECT COALESCE(vendor_id, 0), COUNT(*) FROM {table} GROUP BY 1'):
+            counts[vendor_id][k] = n
+    invoiced = dict(conn.execute("SELECT COALESCE(vendor_id, 0), SUM(CAST(ROUND(amount * 100) AS INTEGER)) "
+                                 "FROM invoices WHERE status <> 'rejected' GROUP BY 1"))
+    vendors = []
+    for vendor_id in sorted(per_vendor.keys() | counts.keys()):
+        o, d, s = per_vendor.get(vendor_id, (0, 0, 0))
+        billed = invoiced.get(vendor_id, 0)
+        status = 'over_billed' if billed - d > tolerance_paise else 'short' if s else 'matched'
+        vendors.append((vendor_id, *counts[vendor_id], o, d, billed, s, status))
+    return lines, vendors
+
+
+def stored(conn):
+    lines = [tuple(r) for r in matching.line_matches(conn)]
+    vendors = [tuple(r) for r in matching.vendor_matches(conn)]
+    return lines, vendors
+
+
+def compare(conn, label):
+    want, got = reference(conn), stored(conn)
+    for name, a, b in (('match_lines', got[0], want[0]), ('match_vendors', got[1], want[1])):
+        if a != b:
+            bad = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+            raise SystemExit(f'{label}: {name} differs at row {bad} ({len(a)} vs {len(b)} rows):\n'
+                             f'  {a[bad] if bad < len(a) else None}\n  {b[bad] if bad < len(b) else None}')
+
+
+def churn(conn, share, seed=18):
+    """Edit DC quantities, delete invoices and move POs to another vendor for ``share`` of the documents."""
+    rng = random.Random(seed)
+    n = conn.execute('SELECT MAX(id) FROM delivery_challans').fetchone()[0]
+    picks = rng.sample(range(1, n + 1), max(int(n * share), 3))
+    third = len(picks) // 3
+    conn.execute('BEGIN')
+    for dc_id in picks[:third]:
+        row = conn.execute('SELECT items FROM delivery_challans WHERE id = ?', (dc_id,)).fetchone()
+        items = json.loads(row[0])
+        items[0]['qty'] += 2
+        conn.execute('UPDATE delivery_challans SET items = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                     (json.dumps(items), dc_id))
+    conn.executemany('DELETE FROM invoices WHERE id = ?', ((i,) for i in picks[third:2 * third]))
+    conn.executemany('UPDATE purchase_orders SET vendor_id = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                     ((rng.randint(1, VENDORS), i) for i in picks[2 * third:]))
+    conn.execute('COMMIT')
+    return len(picks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=1_000_000, help='PO item lines')
+    parser.add_argument('--churn', type=float, default=0.01, help='share of documents changed before the incremental run')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = db.open_mirror(os.path.join(tmp, 'match.sqlite'), bulk=True)
+        t0 = time.perf_counter()
+        lines, pos, dcs, invoices = populate(conn, args.lines)
+        print(f'{lines:,} PO lines in {pos:,} POs, {dcs:,} DCs, {invoices:,} invoices '
+              f'(loaded in {time.perf_counter() - t0:.1f}s)')
+
+        t0 = time.perf_counter()
+        reference(conn)
+        base = time.perf_counter() - t0
+        print(f'  {"per-line dicts":<32} {base:7.2f}s')
+
+        t0 = time.perf_counter()
+        run = matching.match(conn)
+        elapsed = time.perf_counter() - t0
+        print(f'  {"matching, full":<32} {elapsed:7.2f}s  ({base / elapsed:.1f}x)  {run.lines:,} lines, '
+              + ', '.join(f'{s} {n}' for s, n in run.statuses.items()))
+        compare(conn, 'full')
+
+        changed = churn(conn, args.churn)
+        t0 = time.perf_counter()
+        run = matching.match(conn, incremental=True)
+        elapsed = time.perf_counter() - t0
+        print(f'  {"matching, incremental":<32} {elapsed:7.2f}s  ({base / elapsed:.1f}x)  '
+              f'{changed:,} documents changed, {run.vendors:,} vendors re-matched')
+        compare(conn, 'incremental')
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Deep pages of a status-filtered invoice list: COUNT + OFFSET vs. keyset cursors.
+
+Builds two mirrors with the same invoices: one stopped before
+``0013_list_indexes.sql`` (the schema the Worker runs on today) and one
+fully migrated. Times the Worker's ``COUNT(*)`` + ``LIMIT/OFFSET`` on the
+old schema, the same SQL on the new indexes, ``ListStore`` with
+``?page=N`` (cold and warm cache) and with a cursor. Every page is checked
+against the reference ordering.
+
+    python benchmarks/bench_pagination.py --rows 300000 --page 5000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compliance import MIGRATIONS_DIR, db  # noqa: E402
+from compliance.listing import ListStore  # noqa: E402
+
+NEW_MIGRATION = '0013_list_indexes.sql'
+
+
+def build(path, rows, seed, migrations_dir=MIGRATIONS_DIR):
+    conn = db.connect(path, bulk=True)
+    db.apply_migrations(conn, migrations_dir)
+    rng = random.Random(seed)
+    # ~60% pending, created_at at one-second steps with bursts of ties (imports).
+    statuses = ['pending'] * 6 + ['approved'] * 2 + ['paid', 'rejected']
+    conn.execute('BEGIN')
+    conn.executemany('INSERT INTO invoices (vendor_id, invoice_number, amount, status, due_date, created_at) '
+                     'VALUES (?, ?, ?, ?, ?, ?)',
+                     ((rng.randrange(1, 5001), f'INV/{i:08d}', rng.randrange(100, 5_000_000) / 100,
+                       rng.choice(statuses), '2025-12-31',
+                       time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(1_700_000_000 + i - i % 7)))
+                      for i in range(rows)))
+    conn.execute('COMMIT')
+    conn.close()
+    return db.connect(path)
+
+
+def worker_page(conn, status, page, size):
+    """What ``GET /api/invoices?status=&page=`` runs today (with an id tie-break so pages compare)."""
+    total = conn.execute('SELECT COUNT(*) AS c FROM invoices WHERE status=?', (status,)).fetchone()[0]
+    ids = [r[0] for r in conn.execute('SELECT * FROM invoices WHERE status=? ORDER BY created_at DESC, id DESC '
+                                      'LIMIT ? OFFSET ?', (status, size, (page - 1) * size))]
+    return total, ids
+
+
+def timed(fn, repeat=5):
+    best, out = float('inf'), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=300_000)
+    parser.add_argument('--page', type=int, default=5000)
+    parser.add_argument('--size', type=int, default=25)
+    parser.add_argument('--status', default='pending')
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args(argv)
+    page, size, status = args.page, args.size, args.status
+
+    tmp = tempfile.mkdtemp(prefix='bench-pages-')
+    try:
+        old_dir = Path(tmp) / 'migrations'
+        old_dir.mkdir()
+        for p in MIGRATIONS_DIR.glob('*.sql'):
+            if p.name < NEW_MIGRATION:
+                shutil.copy(p, old_dir / p.name)
+        old = build(os.path.join(tmp, 'old.sqlite'), args.rows, args.seed, old_dir)
+        new = build(os.path.join(tmp, 'new.sqlite'), args.rows, args.seed)
+
+        reference = [r[0] for r in new.execute('SELECT id FROM invoices WHERE status=? '
+                                               'ORDER BY created_at DESC, id DESC', (status,))]
+        expected = reference[(page - 1) * size:page * size]
+        if not expected:
+            raise SystemExit(f'page {page} is past the end ({len(reference):,} {status} invoices)')
+
+        print(f'rows={args.rows:,} {status}={len(reference):,} page={page} size={size}')
+        results = {}
+        results['worker SQL, old indexes'] = timed(lambda: worker_page(old, status, page, size))
+        results['worker SQL, 0013 indexes'] = timed(lambda: worker_page(new, status, page, size))
+
+        def store_page(store):
+            p = store.list('invoices', status=status, size=size, page=page)
+            return p.total, [r['id'] for r in p.items]
+        results['ListStore ?page=N, cold cache'] = timed(lambda: store_page(ListStore(new)))
+        warm = ListStore(new)
+        store_page(warm)
+        results['ListStore ?page=N, warm cache'] = timed(lambda: store_page(warm))
+
+        cursor = warm.list('invoices', status=status, size=size, page=page - 1).next_cursor
+
+        def cursor_page():
+            p = warm.list('invoices', status=status, size=size, cursor=cursor)
+            return p.total, [r['id'] for r in p.items]
+        results['ListStore ?cursor='] = timed(cursor_page)
+
+        for name, (elapsed, (total, ids)) in results.items():
+            if total != len(reference) or ids != expected:
+                raise SystemExit(f'{name}: wrong page (total {total}, ids {ids[:3]}...)')
+            print(f'  {name:<32} {elapsed * 1000:9.2f} ms')
+
+        # Walking a run of pages with the cursor, as a client scrolling forward.
+        t0 = time.perf_counter()
+        seen, cur = [], None
+        for _ in range(200):
+            p = warm.list('invoices', status=status, size=size, cursor=cur)
+            seen += [r['id'] for r in p.items]
+            cur = p.next_cursor
+        if seen != reference[:len(seen)]:
+            raise SystemExit('cursor walk out of order')
+        print(f'  cursor walk, 200 pages            {(time.perf_counter() - t0) * 1000 / 200:9.2f} ms/page')
+        old.close()
+        new.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
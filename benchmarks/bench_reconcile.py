@@ -0,0 +1,179 @@
+"""Payment reconciliation: per-payment scans of the vendor's invoices vs. compliance.reconcile.
+
+Fills a mirror with invoices and the payments that settle them. Each
+invoice gets one scenario:
+
+* ``exact``: paid in full; half the payments quote the invoice number;
+* ``tolerance``: paid less bank charges (up to Rs 9);
+* ``subset``: one payment for two or three of the vendor's invoices due
+  close together;
+* ``partial``: paid in two instalments;
+* ``unpaid``: no payment.
+
+The baseline is the month-end job: for each payment, scan every invoice
+of the vendor for an exact match, then again for the nearest within
+tolerance. It does no subset or partial pass. Its exact and tolerance
+pairs must equal ``reconcile``'s. The run also checks that no payment is
+over-applied and that no invoice is applied beyond its amount plus
+tolerance. It reports how many payments of each scenario each pass
+settled.
+
+    python benchmarks/bench_reconcile.py --invoices 200000 --vendors 400
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from compliance import db, reconcile  # noqa: E402
+
+SCENARIOS = (('exact', 0.6), ('tolerance', 0.1), ('subset', 0.1), ('partial', 0.1), ('unpaid', 0.1))
+
+
+def populate(conn, invoices, vendors, seed=18):
+    """Returns {payment_id: scenario}."""
+    rng = random.Random(seed)
+    start = date(2025, 4, 1)
+    inv_rows, pay_rows, scenario_of = [], [], []
+    by_vendor = defaultdict(list)
+    for i in range(invoices):
+        vendor_id = rng.randint(1, vendors)
+        due = start + timedelta(days=rng.randrange(365))
+        paise = rng.randrange(50_000, 50_000_000)
+        inv_rows.append((vendor_id, f'INV/2025-26/{i:07d}', paise / 100, 'pending', due.isoformat()))
+        by_vendor[vendor_id].append(i)
+
+    def pay(vendor_id, ref, paise, day, scenario):
+        pay_rows.append((vendor_id, ref, paise / 100, 'done', f'{day.isoformat()} 10:00:00'))
+        scenario_of.append(scenario)
+
+    for vendor_id, ids in by_vendor.items():
+        ids.sort(key=lambda i: inv_rows[i][4])
+        k = 0
+        while k < len(ids):
+            i = ids[k]
+            _, number, amount, _, due = inv_rows[i]
+            paise, due = round(amount * 100), date.fromisoformat(due)
+            day = due + timedelta(days=rng.randint(-10, 20))
+            r, scenario = rng.random(), 'unpaid'
+            for name, share in SCENARIOS:
+                if r < share:
+                    scenario = name
+                    break
+                r -= share
+            if scenario == 'exact':
+                pay(vendor_id, number if rng.random() < 0.5 else '', paise, day, scenario)
+            elif scenario == 'tolerance':
+                pay(vendor_id, '', paise - rng.randint(100, 900), day, scenario)
+            elif scenario == 'subset' and k + 2 < len(ids):
+                group = ids[k:k + rng.randint(2, 3)]
+                pay(vendor_id, '', sum(round(inv_rows[j][2] * 100) for j in group), day, scenario)
+                k += len(group)
+                continue
+            elif scenario == 'partial':
+                first = paise * 2 // 5
+                pay(vendor_id, number, first, day, scenario)
+                pay(vendor_id, number, paise - first, day + timedelta(days=30), scenario)
+            k += 1
+    conn.execute('BEGIN')
+    conn.executemany("INSERT INTO invoices (vendor_id, invoice_number, amount, status, due_date, created_at) "
+                     "VALUES (?, ?, ?, ?, ?, '2025-04-01 00:00:00')", inv_rows)
+    conn.executemany('INSERT INTO payments (vendor_id, invoice_ref, amount, status, created_at) '
+                     'VALUES (?, ?, ?, ?, ?)', pay_rows)
+    conn.execute('COMMIT')
+    return {k + 1: s for k, s in enumerate(scenario_of)}
+
+
+def baseline(conn, tolerance=reconcile.DEFAULT_TOLERANCE_PAISE, window=reconcile.DEFAULT_WINDOW_DAYS):
+    """Exact, then nearest-within-tolerance, by scanning the vendor's invoices for every payment."""
+    invoices = defaultdict(list)
+    for invoice_id, vendor_id, number, paise, due in conn.execute(
+            "SELECT id, vendor_id, invoice_number, CAST(ROUND(amount * 100) AS INTEGER), due_date FROM invoices"):
+        invoices[vendor_id].append([invoice_id, number, paise, date.fromisoformat(due).toordinal(), True])
+    payments = conn.execute("SELECT id, vendor_id, invoice_ref, CAST(ROUND(amount * 100) AS INTEGER), "
+                            "created_at FROM payments ORDER BY created_at, id").fetchall()
+    pairs, done = set(), set()
+    for method in ('exact', 'tolerance'):
+        for payment_id, vendor_id, ref, paise, created in payments:
+            if payment_id in done:
+                continue
+            day = date.fromisoformat(created[:10]).toordinal()
+            best = None
+            for inv in invoices[vendor_id]:
+                if not inv[4] or abs(day - inv[3]) > window:
+                    continue
+                if method == 'exact':
+                    if inv[2] == paise:
+                        key = (inv[1] != ref, inv[3], inv[0])
+                        best = min(best, (key, inv)) if best else (key, inv)
+                elif abs(inv[2] - paise) <= tolerance:
+                    key = (abs(inv[2] - paise), inv[3], inv[2], inv[0])
+                    best = min(best, (key, inv)) if best else (key, inv)
+            if best:
+                best[1][4] = False
+                done.add(payment_id)
+                pairs.add((payment_id, best[1][0], method))
+    return pairs
+
+
+def check(conn, scenario_of, expected_pairs, tolerance):
+    got = {(p, i, m) for p, i, m in conn.execute(
+        "SELECT payment_id, invoice_id, method FROM payment_applications WHERE method IN ('exact', 'tolerance')")}
+    if got != expected_pairs:
+        diff = sorted(got ^ expected_pairs)[:5]
+        raise SystemExit(f'exact/tolerance pairs differ from the baseline: {diff}')
+    over = conn.execute('SELECT COUNT(*) FROM (SELECT a.payment_id, SUM(a.amount_paise) s, '
+                        'CAST(ROUND(p.amount * 100) AS INTEGER) amt FROM payment_applications a '
+                        'JOIN payments p ON p.id = a.payment_id GROUP BY a.payment_id) WHERE s > amt').fetchone()[0]
+    if over:
+        raise SystemExit(f'{over} payment(s) applied beyond their amount')
+    over = conn.execute(f'SELECT COUNT(*) FROM (SELECT a.invoice_id, SUM(a.amount_paise - a.difference_paise) s, '
+                        f'CAST(ROUND(i.amount * 100) AS INTEGER) amt FROM payment_applications a '
+                        f'JOIN invoices i ON i.id = a.invoice_id GROUP BY a.invoice_id) '
+                        f'WHERE s > amt + {tolerance}').fetchone()[0]
+    if over:
+        raise SystemExit(f'{over} invoice(s) applied beyond their amount')
+    settled = dict(conn.execute('SELECT payment_id, method FROM payment_applications GROUP BY payment_id'))
+    table = Counter((scenario_of[p], settled.get(p, 'unapplied')) for p in scenario_of)
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--invoices', type=int, default=200_000)
+    parser.add_argument('--vendors', type=int, default=400)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = db.open_mirror(os.path.join(tmp, 'recon.sqlite'), bulk=True)
+        scenario_of = populate(conn, args.invoices, args.vendors)
+        print(f'{args.invoices:,} invoices, {len(scenario_of):,} payments, {args.vendors} vendors')
+
+        t0 = time.perf_counter()
+        expected = baseline(conn)
+        base = time.perf_counter() - t0
+        print(f'  {"scan per payment (exact+tol)":<30} {base:8.2f}s')
+
+        t0 = time.perf_counter()
+        r = reconcile.reconcile(conn)
+        elapsed = time.perf_counter() - t0
+        passes = ', '.join(f'{k} {v:.2f}s' for k, v in r.timings.items())
+        print(f'  {"reconcile, all four passes":<30} {elapsed:8.2f}s  ({base / elapsed:.1f}x)  [{passes}]')
+        table = check(conn, scenario_of, expected, reconcile.DEFAULT_TOLERANCE_PAISE)
+        print(f'  match rate {r.match_rate:.1%} of payments, {r.amount_rate:.1%} of amount')
+        methods = reconcile.METHODS + ('unapplied',)
+        print(f'  {"scenario":<10}' + ''.join(f'{m:>11}' for m in methods))
+        for scenario, _ in SCENARIOS[:-1]:
+            print(f'  {scenario:<10}' + ''.join(f'{table[(scenario, m)]:>11,}' for m in methods))
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
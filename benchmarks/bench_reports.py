@@ -0,0 +1,159 @@
+"""Dashboard summary from trigger-maintained tables vs. the Worker's five COUNT(*) queries.
+
+Also measures what the triggers cost on inserts, times AP ageing and
+instrument exposure against the same GROUP BY over the base tables, and
+runs a batch of random updates and deletes before checking the summary
+tables against a full recount.
+
+    python benchmarks/bench_reports.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compliance import db, reports  # noqa: E402
+
+WORKER_SUMMARY = ['SELECT COUNT(*) FROM vendors', "SELECT COUNT(*) FROM vendors WHERE status='pending'",
+                  "SELECT COUNT(*) FROM payments WHERE status='pending'",
+                  "SELECT COUNT(*) FROM payments WHERE status='done'",
+                  "SELECT COUNT(*) FROM financial_instruments WHERE status='active'"]
+
+
+def worker_summary(conn):
+    return dict(zip(reports.SUMMARY_KPIS, (conn.execute(q).fetchone()[0] for q in WORKER_SUMMARY)))
+
+
+def invoices(rng, start, n):
+    for i in range(start, start + n):
+        yield (rng.randrange(1, 5001), f'INV/{i:08d}', rng.randrange(100, 5_000_000) / 100,
+               rng.choice(('pending', 'pending', 'approved', 'paid', 'rejected')),
+               f'2025-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}' if i % 50 else None)
+
+
+def insert_invoices(conn, rng, start, n):
+    conn.execute('BEGIN')
+    conn.executemany('INSERT INTO invoices (vendor_id, invoice_number, amount, status, due_date) '
+                     'VALUES (?, ?, ?, ?, ?)', invoices(rng, start, n))
+    conn.execute('COMMIT')
+
+
+def build(path, rows, rng):
+    conn = db.open_mirror(path, bulk=True)
+    conn.execute('BEGIN')
+    conn.executemany('INSERT INTO vendors (company_name, status) VALUES (?, ?)',
+                     ((f'Vendor {i}', rng.choice(('pending', 'approved', 'approved', 'suspended')))
+                      for i in range(rows // 20)))
+    conn.executemany('INSERT INTO payments (vendor_id, invoice_ref, amount, status) VALUES (?, ?, ?, ?)',
+                     ((rng.randrange(1, 5001), f'INV/{i:08d}', rng.randrange(100, 5_000_000) / 100,
+                       rng.choice(('pending', 'approved', 'done', 'done'))) for i in range(rows)))
+    conn.executemany('INSERT INTO financial_instruments (type_id, title, vendor_id, amount, status) '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     ((rng.randrange(1, 10), f'Instrument {i}', rng.randrange(1, 5001),
+                       rng.randrange(10_000, 10_000_000), rng.choice(('active', 'pending', 'expired')))
+                      for i in range(rows // 5)))
+    conn.execute('COMMIT')
+    insert_invoices(conn, rng, 0, rows // 2)
+    return conn
+
+
+def timed(fn, repeat=5):
+    best, out = float('inf'), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='payments; vendors, instruments, invoices scale')
+    parser.add_argument('--seed', type=int, default=13)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    tmp = tempfile.mkdtemp(prefix='bench-reports-')
+    try:
+        conn = build(os.path.join(tmp, 'mirror.sqlite'), args.rows, rng)
+        conn.close()
+        conn = db.connect(os.path.join(tmp, 'mirror.sqlite'))
+        counts = {t: conn.execute(f'SELECT COUNT(*) FROM {t}').fetchone()[0]
+                  for t in ('vendors', 'payments', 'financial_instruments', 'invoices')}
+        print(', '.join(f'{t}={n:,}' for t, n in counts.items()))
+
+        slow, expected = timed(lambda: worker_summary(conn))
+        fast, got = timed(lambda: reports.summary(conn), repeat=50)
+        if got != expected:
+            raise SystemExit(f'summary differs: {got} vs {expected}')
+        print(f'summary: five COUNT(*) {slow * 1000:8.2f} ms   summary tables {fast * 1000:8.3f} ms')
+
+        as_of = date(2025, 10, 1)
+        t_age, ageing = timed(lambda: reports.ap_ageing(conn, as_of), repeat=3)
+        t_raw, raw = timed(lambda: conn.execute(
+            "SELECT vendor_id, COUNT(*), SUM(CAST(ROUND(amount * 100) AS INTEGER)) FROM invoices "
+            "WHERE status IN ('pending', 'approved') GROUP BY vendor_id ORDER BY vendor_id").fetchall(), repeat=3)
+        if [(r.vendor_id, r.invoices, r.total) for r in ageing] != raw:
+            raise SystemExit('ageing totals differ from the base table')
+        t_exp, _ = timed(lambda: reports.instrument_exposure(conn), repeat=3)
+        print(f'ap ageing: {len(ageing):,} vendors {t_age * 1000:8.2f} ms (GROUP BY invoices, no buckets: '
+              f'{t_raw * 1000:.2f} ms); exposure {t_exp * 1000:.2f} ms')
+
+        # Trigger cost: the same insert batch with and without the report triggers.
+        n = max(args.rows // 10, 1000)
+        t0 = time.perf_counter()
+        insert_invoices(conn, random.Random(1), 10_000_000, n)
+        with_triggers = time.perf_counter() - t0
+        triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+                                "AND name LIKE 'trg_report_invoices_%'").fetchall()
+        for name, _ in triggers:
+            conn.execute(f'DROP TRIGGER {name}')
+        t0 = time.perf_counter()
+        insert_invoices(conn, random.Random(1), 20_000_000, n)
+        without = time.perf_counter() - t0
+        conn.execute('BEGIN')
+        for _, sql in triggers:
+            conn.execute(sql)
+        conn.execute('COMMIT')
+        print(f'insert {n:,} invoices: {with_triggers:.2f}s with triggers, {without:.2f}s without '
+              f'(+{with_triggers / without - 1:.0%})')
+
+        t_rebuild, _ = timed(lambda: reports.rebuild(conn), repeat=1)
+
+        # Random writes through plain SQL, then a recount check.
+        conn.execute('BEGIN')
+        max_id = conn.execute('SELECT MAX(id) FROM invoices').fetchone()[0]
+        for _ in range(20_000):
+            i = rng.randrange(1, max_id + 1)
+            op = rng.random()
+            if op < 0.5:
+                conn.execute('UPDATE invoices SET status = ? WHERE id = ?', (rng.choice(('paid', 'approved')), i))
+            elif op < 0.8:
+                conn.execute('UPDATE invoices SET amount = amount + 1.01, due_date = ? WHERE id = ?',
+                             (f'2025-{rng.randrange(1, 13):02d}-15', i))
+            else:
+                conn.execute('DELETE FROM invoices WHERE id = ?', (i,))
+            j = rng.randrange(1, args.rows // 5)
+            conn.execute("UPDATE financial_instruments SET status = 'expired', vendor_id = ? WHERE id = ?",
+                         (rng.randrange(1, 5001), j))
+            conn.execute("UPDATE payments SET status = 'done' WHERE id = ?", (rng.randrange(1, args.rows),))
+        conn.execute('COMMIT')
+        t_check, mismatches = timed(lambda: reports.check(conn), repeat=1)
+        if mismatches:
+            raise SystemExit(f'{len(mismatches)} mismatches after random writes, e.g. {mismatches[:3]}')
+        if reports.summary(conn) != worker_summary(conn):
+            raise SystemExit('summary differs after random writes')
+        print(f'rebuild {t_rebuild:.2f}s; check after 60k random writes {t_check:.2f}s: consistent')
+        conn.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Vendor search: LIKE '%x%' scans vs. the FTS5 index (compliance.search).
+
+Fills a mirror with synthetic vendors with generated company names
+(``bench_dedup.vendor_rows``). The bulk load runs with the FTS insert
+trigger dropped and the index is then rebuilt in one pass. A further batch
+is inserted with and without the trigger to price it per row.
+
+* List search: the Worker's ``/api/vendors?search=`` first page (``COUNT(*)``
+  plus 25 rows newest first), once with the old LIKE filter and once with
+  :func:`compliance.search.search_clause`. For single-word queries the FTS
+  matches must equal the LIKE matches (over all four indexed columns) that
+  start a word, which is the change in meaning the index brings.
+* Type-ahead: :func:`compliance.search.lookup` on every keystroke of a
+  sample of company names, against the PO screen's 20 ms budget. The
+  vendor whose name was typed in full has to come back in the top 10.
+
+    python benchmarks/bench_search.py --vendors 1000000
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from bench_dedup import insert, vendor_rows  # noqa: E402
+from compliance import db, search  # noqa: E402
+
+BUDGET_MS = 20.0
+PAGE_SQL = ('SELECT id, company_name, legal_name, gstin, pan, state, state_code, pin_code, business_type, status, '
+            'rating, created_at FROM vendors WHERE {} ORDER BY created_at DESC LIMIT 25')
+LIKE_SQL = '(company_name LIKE ? OR legal_name LIKE ? OR gstin LIKE ?)'
+
+
+def _like(text):
+    return LIKE_SQL, [f'%{text}%'] * 3
+
+
+def _ms(seconds):
+    return seconds * 1000
+
+
+def list_page(conn, clause, params):
+    """The Worker's first page: a count and 25 rows; returns (seconds, total)."""
+    t0 = time.perf_counter()
+    total = conn.execute(f'SELECT COUNT(*) FROM vendors WHERE {clause}', params).fetchone()[0]
+    conn.execute(PAGE_SQL.format(clause), params).fetchall()
+    return time.perf_counter() - t0, total
+
+
+def word_prefix_matches(conn, token):
+    """Vendors where ``token`` starts a word of an indexed column, found by scanning."""
+    cols = ('company_name', 'legal_name', 'gstin', 'pan')
+    like = ' OR '.join(f'{c} LIKE ?' for c in cols)
+    starts = re.compile(rf'(?<![^\W_]){re.escape(token)}', re.I)
+    return {vendor_id for vendor_id, *values in
+            conn.execute(f'SELECT id, {", ".join(cols)} FROM vendors WHERE {like}', [f'%{token}%'] * len(cols))
+            if any(v and starts.search(v) for v in values)}
+
+
+def list_queries(rows, rng, n):
+    """Single words at 2-6 characters, two-word prefixes, GSTIN and PAN prefixes."""
+    queries = []
+    for _ in range(n):
+        company, _, gstin, pan = rng.choice(rows)[:4]
+        words = company.split()
+        queries.append(words[0][:rng.randint(2, 6)])
+        if len(words) > 1:
+            queries.append(f'{words[0][:rng.randint(3, 5)]} {words[1][:rng.randint(2, 4)]}')
+        if gstin:
+            queries.append(gstin[:rng.randint(4, 10)])
+        if pan:
+            queries.append(pan[:rng.randint(4, 10)])
+    return queries
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vendors', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=10, help='vendors to build list queries from')
+    parser.add_argument('--typed', type=int, default=100, help='company names typed into the lookup')
+    parser.add_argument('--extra', type=int, default=10_000, help='vendors inserted to time the trigger')
+    args = parser.parse_args(argv)
+
+    rows, _ = vendor_rows(args.vendors + 2 * args.extra, 0.0)
+    rng = random.Random(20)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = db.open_mirror(os.path.join(tmp, 'search.sqlite'), bulk=True)
+        trigger = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'trg_vendors_fts_insert'").fetchone()[0]
+        conn.execute('DROP TRIGGER trg_vendors_fts_insert')
+        insert(conn, rows[:args.vendors])
+        t0 = time.perf_counter()
+        search.rebuild(conn)
+        print(f'{args.vendors:,} vendors; index rebuilt in {time.perf_counter() - t0:.1f}s')
+
+        extra = rows[args.vendors:]
+        t0 = time.perf_counter()
+        insert(conn, extra[:args.extra])
+        bare = time.perf_counter() - t0
+        conn.execute(trigger)
+        t0 = time.perf_counter()
+        insert(conn, extra[args.extra:])
+        synced = time.perf_counter() - t0
+        search.rebuild(conn)
+        search.check(conn)
+        print(f'  insert {args.extra:,} vendors: {bare:.2f}s bare, {synced:.2f}s with the index trigger '
+              f'(+{(synced - bare) / args.extra * 1e6:.0f}us/row)')
+        data = conn.execute('SELECT company_name, legal_name, gstin, pan FROM vendors').fetchall()
+
+        print('\nlist search (COUNT(*) + first page of 25):')
+        print(f'  {"query":<14} {"LIKE":>9} {"FTS":>9} {"rows LIKE":>10} {"rows FTS":>9}')
+        like_times, fts_times = [], []
+        for text in list_queries(data, rng, args.queries):
+            like_s, like_total = list_page(conn, *_like(text))
+            fts_s, fts_total = list_page(conn, *search.search_clause(text))
+            like_times.append(like_s)
+            fts_times.append(fts_s)
+            print(f'  {text:<14} {_ms(like_s):7.1f}ms {_ms(fts_s):7.1f}ms {like_total:>10,} {fts_total:>9,}')
+            if ' ' not in text:
+                clause, params = search.search_clause(text)
+                got = {r[0] for r in conn.execute(f'SELECT id FROM vendors WHERE {clause}', params)}
+                want = word_prefix_matches(conn, text)
+                if got != want:
+                    raise SystemExit(f'{text!r}: FTS and word-prefix LIKE differ on {len(got ^ want)} vendor(s)')
+        print(f'  {"median":<14} {_ms(statistics.median(like_times)):7.1f}ms '
+              f'{_ms(statistics.median(fts_times)):7.1f}ms')
+
+        latencies, missed = [], 0
+        for company, *_ in rng.sample(data, args.typed):
+            for k in range(1, len(company) + 1):
+                t0 = time.perf_counter()
+                hits = search.lookup(conn, company[:k])
+                latencies.append(time.perf_counter() - t0)
+            missed += company not in {h.company_name for h in hits}
+        over = sum(_ms(t) > BUDGET_MS for t in latencies)
+        print(f'\ntype-ahead ({args.typed} names, {len(latencies):,} keystrokes): '
+              f'p50 {_ms(pct(latencies, 50)):.1f}ms, p95 {_ms(pct(latencies, 95)):.1f}ms, '
+              f'p99 {_ms(pct(latencies, 99)):.1f}ms, max {_ms(max(latencies)):.1f}ms; '
+              f'{over} over {BUDGET_MS:.0f}ms; full name not in the top 10: {missed}')
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Vectorized slab engine vs. a per-row Python loop.
+
+    python benchmarks/bench_taxslabs.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from compliance.taxslabs import compare_regimes, load_regimes  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--loop-rows', type=int, default=None,
+                        help='rows for the Python loop (default: same as --rows)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    regimes = load_regimes()
+    rng = np.random.default_rng(args.seed)
+    incomes = np.round(rng.lognormal(mean=13.8, sigma=0.7, size=args.rows))
+
+    t0 = time.perf_counter()
+    result = compare_regimes(incomes, regimes)
+    vec = time.perf_counter() - t0
+
+    loop_rows = min(args.loop_rows or args.rows, args.rows)
+    sample = incomes[:loop_rows].tolist()
+    tables = list(regimes.values())
+    t0 = time.perf_counter()
+    loop_net = [[t.liability_py(x) for x in sample] for t in tables]
+    loop = time.perf_counter() - t0
+
+    if not np.allclose(np.asarray(loop_net), result.net[:, :loop_rows]):
+        raise SystemExit('vectorized and loop results disagree')
+    loop_per_row = loop / loop_rows
+    print(f'rows={args.rows:,} regimes={len(tables)}')
+    print(f'vectorized: {vec:.3f}s ({args.rows / vec:,.0f} rows/s)')
+    print(f'python loop: {loop:.3f}s over {loop_rows:,} rows ({1 / loop_per_row:,.0f} rows/s)')
+    print(f'speedup: {loop_per_row * args.rows / vec:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
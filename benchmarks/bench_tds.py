@@ -0,0 +1,152 @@
+"""TDS decisions: per-payment year-to-date SQL vs. running accumulators vs. a full-year recompute (compliance.tds).
+
+Fills a mirror with ``--payments`` payments of FY 2025-26 over
+``--vendors`` vendors. Most are under 194C or 194J. Some have no section,
+a few have a section that is not in ``tds_sections``, and about 5% are
+rejected. Then:
+
+* the old way, on a sample of payments: year-to-date sums of the vendor's
+  payments and of what was already taxed, by SQL, for each payment. This is
+  the reference for the sample;
+* :func:`compliance.tds.record`, in ``--runs`` rounds as payments arrive,
+  with one long-lived :class:`~compliance.tds.TdsEngine`;
+* :func:`compliance.tds.recompute` of the year, which must match the
+  incremental ledger decision for decision. :func:`~compliance.tds.check`
+  must come out clean.
+
+Finally 1% of the payments are rejected after the fact. ``check`` must
+report the drift, and ``recompute(..., write=True)`` must clear it.
+
+    python benchmarks/bench_tds.py --payments 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compliance import db, tds  # noqa: E402
+
+FY = 2025
+SECTIONS = ('194C',) * 6 + ('194J',) * 3 + (None,)
+SAMPLE = 2000
+
+
+def payments(rng, n, vendors):
+    """(vendor_id, tds_section, amount, status, created_at) rows in created_at order."""
+    start, step = datetime(FY, 4, 1), timedelta(days=365) / n
+    for i in range(n):
+        section = rng.choice(SECTIONS)
+        if section and rng.random() < 0.01:
+            section = '194Q'
+        # Mostly under the single-payment threshold, some well over it.
+        amount = round(rng.uniform(500, 28_000) if rng.random() < 0.85 else rng.uniform(28_000, 250_000), 2)
+        status = 'rejected' if rng.random() < 0.05 else rng.choice(('pending', 'approved', 'done'))
+        yield (rng.randrange(1, vendors + 1), section, amount, status,
+               (start + step * i).strftime('%Y-%m-%d %H:%M:%S'))
+
+
+def naive(conn, sections, payment_id):
+    """One payment's decision from year-to-date sums over ``payments`` and ``tds_ledger``."""
+    vendor_id, section, fy, amount, status = conn.execute(
+        f'SELECT COALESCE(vendor_id, 0), tds_section, {tds._FY}, {tds._PAISE}, status FROM payments WHERE id = ?',
+        (payment_id,)).fetchone()
+    if section not in sections or status in tds.NOT_COUNTED_STATUSES or amount <= 0:
+        return None
+    rule = sections[section]
+    (paid,) = conn.execute(
+        f'SELECT COALESCE(SUM({tds._PAISE}), 0) FROM payments WHERE vendor_id = ? AND tds_section = ? '
+        f"AND {tds._FY} = ? AND id < ? AND status <> 'rejected' AND amount > 0",
+        (vendor_id, section, fy, payment_id)).fetchone()
+    (taxed,) = conn.execute('SELECT COALESCE(SUM(base_paise), 0) FROM tds_ledger '
+                            'WHERE vendor_id = ? AND section = ? AND fy = ? AND payment_id < ?',
+                            (vendor_id, section, fy, payment_id)).fetchone()
+    if paid + amount > rule.aggregate_paise:
+        base = paid + amount - taxed
+    elif amount > rule.single_paise:
+        base = amount
+    else:
+        base = 0
+    return base, tds.tds_on(base, rule.rate_bp)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--payments', type=int, default=1_000_000)
+    parser.add_argument('--vendors', type=int, default=20_000)
+    parser.add_argument('--runs', type=int, default=10, help='record() rounds over the year')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(25)
+    rows = list(payments(rng, args.payments, args.vendors))
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = db.open_mirror(os.path.join(tmp, 'tds.sqlite'), bulk=True)
+        engine = tds.TdsEngine.load(conn)
+        recorded, per_run = 0.0, args.payments // args.runs + 1
+        for k in range(0, args.payments, per_run):
+            conn.execute('BEGIN')
+            conn.executemany('INSERT INTO payments (vendor_id, tds_section, amount, status, created_at) '
+                             'VALUES (?, ?, ?, ?, ?)', rows[k:k + per_run])
+            conn.execute('COMMIT')
+            t0 = time.perf_counter()
+            tds.record(conn, engine)
+            recorded += time.perf_counter() - t0
+        print(f'{args.payments:,} payments of FY {tds.fy_label(FY)} over {args.vendors:,} vendors, '
+              f'{len(engine.accumulators):,} (vendor, section) accumulators')
+
+        ledger = {d.payment_id: d for d in map(tds.Decision._make, conn.execute(
+            f'SELECT {", ".join(tds._LEDGER_COLUMNS)} FROM tds_ledger'))}
+        sample = rng.sample(sorted(ledger), min(SAMPLE, len(ledger)))
+        t0 = time.perf_counter()
+        want = {i: naive(conn, engine.sections, i) for i in sample}
+        per_payment = (time.perf_counter() - t0) / len(sample)
+        for i, expected in want.items():
+            got = ledger[i]
+            if expected is not None and (got.base_paise, got.tds_paise) != expected:
+                raise SystemExit(f'payment {i}: engine {got} != year-to-date SQL {expected}')
+
+        t0 = time.perf_counter()
+        decisions, _ = tds.recompute(conn, FY)
+        batch = time.perf_counter() - t0
+        if decisions != sorted(ledger.values()):
+            first = next(d for d in decisions if d != ledger[d.payment_id])
+            raise SystemExit(f'recompute {first} != ledger {ledger[first.payment_id]}')
+        t0 = time.perf_counter()
+        mismatches = tds.check(conn, FY)
+        checked = time.perf_counter() - t0
+        if mismatches:
+            raise SystemExit(f'check: {len(mismatches)} mismatch(es), e.g. {mismatches[0]}')
+
+        taxed = [d for d in decisions if d.tds_paise]
+        print(f'  {len(taxed):,} payments with TDS, '
+              f'{sum(d.reason == "aggregate" for d in taxed):,} of them over the aggregate threshold')
+        print(f'  year-to-date SQL {per_payment * 1e6:9.1f}us/payment  '
+              f'(~{per_payment * args.payments:.0f}s for the year, from {len(sample):,} samples)')
+        print(f'  record()         {recorded / args.payments * 1e6:9.1f}us/payment  '
+              f'({recorded:.1f}s in {args.runs} runs, {per_payment * args.payments / recorded:,.0f}x)')
+        print(f'  recompute()      {batch / args.payments * 1e6:9.1f}us/payment  ({batch:.1f}s); '
+              f'identical to the ledger; check {checked:.1f}s, consistent')
+
+        ids = rng.sample(sorted(ledger), max(args.payments // 100, 1))
+        conn.execute('BEGIN')
+        conn.executemany("UPDATE payments SET status = 'rejected' WHERE id = ?", ((i,) for i in ids))
+        conn.execute('COMMIT')
+        drift = tds.check(conn, FY)
+        if not drift:
+            raise SystemExit('check missed payments rejected after they were decided')
+        t0 = time.perf_counter()
+        tds.recompute(conn, FY, write=True)
+        rewritten = time.perf_counter() - t0
+        if tds.check(conn, FY):
+            raise SystemExit('check still reports drift after recompute(write=True)')
+        print(f'  {len(ids):,} payments rejected later: {len(drift):,} mismatch(es); '
+              f'rewritten in {rewritten:.1f}s, consistent')
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Compiled PO validator vs. interpreting the field spec table per row.
+
+    python benchmarks/bench_validator.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compliance import validator as v  # noqa: E402
+
+
+def make_rows(header, rows, seed):
+    """Valid PO rows with ~3% of cells broken in one way or another."""
+    rng = random.Random(seed)
+    good = {'po_number': lambda i: f'PO/2025-26/{i:05d}'[:16], 'po_date': lambda i: f'2025-{1 + i % 12:02d}-15',
+            'buyer_gstin': lambda i: '07AADCI9794D1Z8', 'supplier_gstin': lambda i: '27AAPFU0939F1ZV',
+            'hsn_sac_code': lambda i: str(8471 + i % 50), 'quantity': lambda i: str(1 + i % 20),
+            'unit_price': lambda i: f'{rng.randrange(100, 100000)}.50', 'cgst_rate': lambda i: '9',
+            'sgst_rate': lambda i: '9', 'igst_rate': lambda i: '0', 'total_amount': lambda i: '1180.00',
+            'payment_terms': lambda i: 'Net 30'}
+    bad = ['', 'x' * 600, 'abc', '12-13-2025', '1.2.3']
+    out = []
+    for i in range(rows):
+        row = [good.get(h, lambda i: 'Text value')(i) for h in header]
+        if rng.random() < 0.03:
+            row[rng.randrange(len(row))] = rng.choice(bad)
+        out.append(row)
+    return out
+
+
+def interpreted(schema, header, rows):
+    """The loop the compiled validator replaces: spec table and dicts consulted per cell."""
+    position = {name: i for i, name in enumerate(header)}
+    position.update({a: position[m] for m, a in v.FIELD_ALIASES.items() if m in position})
+    checks = {'Alphanumeric': v._ALNUM_RE.match, 'Numeric': lambda s: s.isascii() and s.isdigit()}
+    results = []
+    for row in rows:
+        errors = []
+        values = []
+        for spec in schema.fields:
+            col = position.get(spec.name)
+            value = row[col].strip() if col is not None else None
+            if col is None:
+                if spec.required:
+                    errors.append(f'{spec.name}: missing column')
+                values.append(None)
+                continue
+            if not value:
+                if spec.required:
+                    errors.append(f'{spec.name}: required')
+                values.append(None)
+                continue
+            if spec.max_length is not None and spec.data_type in ('Alphanumeric', 'Text', 'Numeric', 'Dropdown'):
+                if len(value) > spec.max_length:
+                    errors.append(f'{spec.name}: longer than {spec.max_length} characters')
+            if spec.data_type in checks and not checks[spec.data_type](value):
+                errors.append(f'{spec.name}: not {spec.data_type.lower()}')
+            if spec.data_type == 'Decimal':
+                try:
+                    value = v.Decimal(value)
+                except v.InvalidOperation:
+                    value = None
+                if value is None or not value.is_finite():
+                    errors.append(f'{spec.name}: not a decimal number')
+                    value = None
+            elif spec.data_type == 'Date':
+                try:
+                    value = v.date.fromisoformat(value)
+                except ValueError:
+                    errors.append(f'{spec.name}: not a date (YYYY-MM-DD)')
+                    value = None
+            values.append(value)
+        results.append((tuple(values), errors))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    schema = v.load_schemas()['PURCHASE_ORDER']
+    header = [('supplier_name' if n == 'supplier_legal_name' else n) for n in schema.field_names()]
+    rows = make_rows(header, args.rows, args.seed)
+
+    t0 = time.perf_counter()
+    compiled = v.compile_validator(schema, header)
+    fast = [compiled.validate(r) for r in rows]
+    fast_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    slow = interpreted(schema, header, rows)
+    slow_time = time.perf_counter() - t0
+
+    for i, ((fv, fe), (sv, se)) in enumerate(zip(fast, slow)):
+        if fv != sv or len(fe) != len(se):
+            raise SystemExit(f'row {i} differs: {fe} vs {se}')
+    invalid = sum(1 for _, e in fast if e)
+    print(f'rows={args.rows:,} fields={len(schema.fields)} invalid={invalid:,}')
+    print(f'compiled: {fast_time:.2f}s ({args.rows / fast_time:,.0f} rows/s)  '
+          f'interpreted: {slow_time:.2f}s  ({slow_time / fast_time:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""Benchmark suite for the compliance toolkit, with JSON results for regression checks.
+
+Cases cover the package build, CSV generation, validation, tax computation
+and SQLite loading, each at the requested scales. Data comes from
+``synthetic.py``, so runs at the same scale and seed see the same input.
+Each case is timed ``--repeat`` times after its setup; the JSON keeps
+the minimum and median.
+
+    python benchmarks/suite.py --scales 10k,100k --output before.json
+    python benchmarks/suite.py --scales 10k,100k --compare before.json --output after.json
+    python benchmarks/suite.py --scales 1M --only load. --repeat 1
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import numpy as np  # noqa: E402
+
+import synthetic  # noqa: E402
+from compliance import DOCS_DIR, db, gstin, loader, tables, taxslabs, validator  # noqa: E402
+from compliance.penalty import PenaltyEngine, RateCurve, load_rules  # noqa: E402
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1M': 1_000_000}
+DEFAULT_SCALES = '10k,100k'
+DEFAULT_THRESHOLD = 0.10
+
+
+class Case(NamedTuple):
+    name: str
+    setup: Callable        # (rows, workdir) -> zero-argument callable that does the timed work
+    scaled: bool = True    # False: run once, independent of --scales
+
+
+CASES: List[Case] = []
+
+
+def case(name: str, scaled: bool = True):
+    def register(setup):
+        CASES.append(Case(name, setup, scaled))
+        return setup
+    return register
+
+
+def _run_script(script: str, workdir: str, *args: str):
+    subprocess.run([sys.executable, str(DOCS_DIR / script), *args], cwd=workdir, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+@case('package.full_build', scaled=False)
+def _package_full(rows, workdir):
+    def run():
+        _run_script('script.py', workdir, '--full')
+        _run_script('script_1.py', workdir, '--full')
+    return run
+
+
+@case('package.noop_rebuild', scaled=False)
+def _package_noop(rows, workdir):
+    _run_script('script.py', workdir)
+    _run_script('script_1.py', workdir)
+    return lambda: _run_script('script_1.py', workdir)
+
+
+@case('generate.to_csv')
+def _generate_csv(rows, workdir):
+    header = synthetic.header_for('vendors')
+    records = [dict(zip(header, r)) for r in synthetic.vendors(rows)]
+    path = os.path.join(workdir, 'vendors.csv')
+    return lambda: tables.to_csv(records, path)
+
+
+@case('generate.synthetic_invoices')
+def _generate_invoices(rows, workdir):
+    path = os.path.join(workdir, 'invoices.csv')
+    return lambda: synthetic.write_csv(path, 'invoices', rows)
+
+
+@case('validate.gstin')
+def _validate_gstin(rows, workdir):
+    data = list(synthetic.vendors(rows))
+    g, p, s = [r[2] for r in data], [r[3] for r in data], [r[5] for r in data]
+    return lambda: gstin.validate_vendors(g, p, s)
+
+
+@case('validate.po_fields')
+def _validate_po(rows, workdir):
+    schema = validator.load_schemas()['PURCHASE_ORDER']
+    header = schema.field_names()
+    sample = ['PO/25-26/000001', '2025-10-01', 'Buyer Ltd', '07AADCI9794D1Z8', 'Supplier Ltd',
+              '27AAPFU0939F1ZV', 'Laptop', '8471', '2', '55000.00', '9', '9', '0', 'Net 30', '129800.00']
+    data = [list(sample) for _ in range(rows)]
+    compiled = validator.compile_validator(schema, header)
+
+    def run():
+        validate = compiled.validate
+        for row in data:
+            validate(row)
+    return run
+
+
+@case('tax.compare_regimes')
+def _tax_regimes(rows, workdir):
+    regimes = taxslabs.load_regimes()
+    incomes = np.round(np.random.default_rng(7).lognormal(mean=13.8, sigma=0.7, size=rows))
+    return lambda: taxslabs.compare_regimes(incomes, regimes)
+
+
+@case('tax.penalty_accrue')
+def _tax_penalty(rows, workdir):
+    rules = load_rules()
+    engine = PenaltyEngine({'base': RateCurve(['2025-01-01', '2025-06-01'], [0.09, 0.0875]),
+                            'bank_rate': RateCurve.constant(0.0675)})
+    rng = np.random.default_rng(9)
+    documents = np.array(list(rules))[rng.integers(0, len(rules), rows)]
+    amounts = rng.uniform(1_000, 500_000, rows).round(2)
+    days = rng.integers(0, 180, rows)
+    start = np.datetime64('2025-04-01') + rng.integers(0, 365, rows)
+    return lambda: engine.accrue_documents(rules, documents, amounts, days, start)
+
+
+def _load_case(entity: str):
+    def setup(rows, workdir):
+        path = synthetic.write_csv(os.path.join(workdir, f'{entity}.csv'), entity, rows)
+        runs = iter(range(1_000_000))
+
+        def run():
+            conn = db.open_mirror(os.path.join(workdir, f'{entity}-{next(runs)}.sqlite'), bulk=True)
+            result = loader.load_csv(conn, entity, path)
+            conn.close()
+            if result.errors or result.inserted != rows:
+                raise RuntimeError(f'load.{entity}: {result.to_json()[:200]}')
+        return run
+    return setup
+
+
+for _entity in ('vendors', 'pos', 'invoices', 'instruments'):
+    case(f'load.{_entity}')(_load_case(_entity))
+
+
+class Result(NamedTuple):
+    case: str
+    rows: Optional[int]
+    repeat: int
+    min_s: float
+    median_s: float
+
+    @property
+    def key(self) -> str:
+        return f'{self.case}@{self.rows}' if self.rows else self.case
+
+
+def run_case(c: Case, rows: Optional[int], repeat: int) -> Result:
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    try:
+        run = c.setup(rows, workdir)
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - t0)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return Result(c.name, rows, repeat, min(times), statistics.median(times))
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def metadata() -> Dict[str, object]:
+    return {'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'commit': _git_commit(),
+            'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+            'cpus': os.cpu_count()}
+
+
+def compare(current: List[Result], baseline_path: str, threshold: float) -> List[str]:
+    """Print ratios against a previous run; return the keys that got slower than ``threshold``."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {r['key']: r for r in json.load(f)['results']}
+    regressions = []
+    print(f'\ncompared with {baseline_path} (min times; regression above +{threshold:.0%}):')
+    for r in current:
+        old = baseline.get(r.key)
+        if old is None:
+            print(f'  {r.key:<40} new')
+            continue
+        change = r.min_s / old['min_s'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(r.key)
+        elif change < -threshold:
+            flag = '  faster'
+        print(f'  {r.key:<40} {old["min_s"]:9.4f}s -> {r.min_s:9.4f}s  {change:+7.1%}{flag}')
+    return regressions
+
+
+def _parse_scales(text: str) -> List[int]:
+    out = []
+    for item in text.split(','):
+        item = item.strip()
+        out.append(SCALES[item] if item in SCALES else int(item))
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default=DEFAULT_SCALES, help='comma list of 10k/100k/1M or row counts')
+    parser.add_argument('--only', action='append', default=[],
+                        help='case name prefix or glob (repeatable), e.g. load. or "validate.*"')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--compare', help='results JSON from an earlier run')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='relative slowdown reported as a regression (default 0.10)')
+    parser.add_argument('--list', action='store_true', help='list cases and exit')
+    args = parser.parse_args(argv)
+
+    def selected(name: str) -> bool:
+        return not args.only or any(name.startswith(p) or fnmatch.fnmatch(name, p) for p in args.only)
+
+    cases = [c for c in CASES if selected(c.name)]
+    if args.list:
+        for c in cases:
+            print(c.name + ('' if c.scaled else '  (unscaled)'))
+        return
+    scales = _parse_scales(args.scales)
+
+    results = []
+    for c in cases:
+        for rows in (scales if c.scaled else [None]):
+            r = run_case(c, rows, args.repeat)
+            results.append(r)
+            rate = f'{rows / r.min_s:12,.0f} rows/s' if rows else ''
+            print(f'{r.key:<40} min {r.min_s:9.4f}s  median {r.median_s:9.4f}s {rate}', flush=True)
+
+    if args.output:
+        payload = {'meta': metadata(),
+                   'results': [dict(r._asdict(), key=r.key) for r in results]}
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2)
+            f.write('\n')
+    if args.compare:
+        if compare(results, args.compare, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Synthetic import data scaled up from the templates in ``public/data``.
+
+Every generator takes ``(n, seed)`` and yields CSV rows matching the
+template's header, so files written here go through the same code paths as
+real imports. Values are deterministic for a given seed.
+
+    python benchmarks/synthetic.py vendors 100000 > vendors.csv
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import string
+import sys
+from typing import Dict, Iterator, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compliance import TEMPLATES_DIR  # noqa: E402
+from compliance.gstin import check_digit  # noqa: E402
+
+STATES = [('Delhi', '07', '110'), ('Maharashtra', '27', '400'), ('Karnataka', '29', '560'),
+          ('Tamil Nadu', '33', '600'), ('Uttar Pradesh', '09', '201'), ('Gujarat', '24', '380')]
+BUSINESS_TYPES = ('Service Provider', 'Distributor', 'Trader', 'OEM', 'Manufacturer')
+SKUS = [('HP-LASER-1', 8443, 18500), ('CAB-ETH-5M', 8544, 350), ('LAPTOP-14', 8471, 55000),
+        ('TONER-12A', 8443, 4200), ('UPS-1KVA', 8504, 7800), ('SERVICE-AMC', 998713, 12000)]
+INSTRUMENT_TYPES = ('Bank Guarantee', 'Letter of Credit', 'RTGS', 'NEFT', 'UPI_B2B', 'GeM Payment')
+
+
+def template_header(name: str) -> List[str]:
+    with open(TEMPLATES_DIR / f'{name}_import_template.csv', newline='', encoding='utf-8') as f:
+        return next(csv.reader(f))
+
+
+def _gstin(rng: random.Random, state_code: str) -> tuple:
+    pan = ''.join(rng.choices(string.ascii_uppercase, k=3)) + rng.choice('CPFH') + rng.choice(string.ascii_uppercase)
+    pan += f'{rng.randrange(10000):04d}' + rng.choice(string.ascii_uppercase)
+    head = state_code + pan + rng.choice('123456789') + 'Z'
+    return head + check_digit(head), pan
+
+
+def vendors(n: int, seed: int = 1) -> Iterator[list]:
+    rng = random.Random(seed)
+    for i in range(n):
+        state, code, pin = STATES[i % len(STATES)]
+        gstin, pan = _gstin(rng, code)
+        name = f'Vendor {i:07d}'
+        yield [f'{name} Pvt Ltd', f'{name} Private Limited', gstin, pan, state, code,
+               f'{pin}{rng.randrange(1000):03d}', BUSINESS_TYPES[i % 5], ('approved', 'pending', 'active')[i % 3],
+               f'{rng.randrange(10, 50) / 10:.1f}']
+
+
+def _items(rng: random.Random) -> tuple:
+    items, total = [], 0
+    for _ in range(rng.randint(1, 4)):
+        sku, hsn, rate = rng.choice(SKUS)
+        qty = rng.randint(1, 20)
+        items.append({'sku': sku, 'hsn_sac': str(hsn), 'qty': qty, 'rate': rate})
+        total += qty * rate
+    return json.dumps(items, separators=(',', ':')), total
+
+
+def purchase_orders(n: int, seed: int = 2, vendor_count: int = 5000) -> Iterator[list]:
+    """PO template columns plus an ``items`` JSON array."""
+    rng = random.Random(seed)
+    for i in range(n):
+        items, total = _items(rng)
+        yield [f'PO/2025-26/{i:07d}', rng.randrange(1, vendor_count + 1), total,
+               ('pending', 'approved', 'rejected')[i % 3], items]
+
+
+def invoices(n: int, seed: int = 3, vendor_count: int = 5000) -> Iterator[list]:
+    rng = random.Random(seed)
+    for i in range(n):
+        yield [f'INV/2025-26/{i:07d}', rng.randrange(1, vendor_count + 1), rng.randrange(100, 5_000_000) / 100,
+               ('pending', 'approved', 'rejected', 'paid')[i % 4], f'2025-{1 + i % 12:02d}-{1 + i % 28:02d}']
+
+
+def instruments(n: int, seed: int = 4, vendor_count: int = 5000) -> Iterator[list]:
+    rng = random.Random(seed)
+    for i in range(n):
+        kind = INSTRUMENT_TYPES[i % len(INSTRUMENT_TYPES)]
+        issue = f'2025-{1 + i % 12:02d}-{1 + i % 28:02d}'
+        yield [f'{kind} {i:07d}', kind, f'REF-{i:08d}', rng.randrange(1, vendor_count + 1),
+               rng.randrange(10_000, 10_000_000), 'INR', ('active', 'pending', 'expired')[i % 3], issue,
+               f'2026-{1 + i % 12:02d}-{1 + i % 28:02d}', '', '']
+
+
+GENERATORS: Dict[str, tuple] = {
+    # name: (template header name, generator, extra columns beyond the template)
+    'vendors': ('vendors', vendors, ()),
+    'pos': ('po', purchase_orders, ('items',)),
+    'invoices': ('invoice', invoices, ()),
+    'instruments': ('instruments', instruments, ()),
+}
+
+
+def header_for(entity: str) -> List[str]:
+    template, _, extra = GENERATORS[entity]
+    return template_header(template) + list(extra)
+
+
+def rows_for(entity: str, n: int, seed: int = None) -> Iterator[list]:
+    _, gen, _ = GENERATORS[entity]
+    return gen(n) if seed is None else gen(n, seed)
+
+
+def write_csv(path, entity: str, n: int, seed: int = None) -> str:
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f)
+        w.writerow(header_for(entity))
+        w.writerows(rows_for(entity, n, seed))
+    return str(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write synthetic import CSVs to stdout.')
+    parser.add_argument('entity', choices=sorted(GENERATORS))
+    parser.add_argument('rows', type=int)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+    w = csv.writer(sys.stdout)
+    w.writerow(header_for(args.entity))
+    w.writerows(rows_for(args.entity, args.rows, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+"""ODIC compliance data toolkit.
+
+Batch-oriented Python helpers that work on the same reference data as the
+generator scripts in ``data/docs`` and the D1 schema in ``migrations/``.
+Submodules are imported on demand so that short-lived CLI runs only pay for
+what they use.
+"""
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DOCS_DIR = REPO_ROOT / 'data' / 'docs'
+TEMPLATES_DIR = REPO_ROOT / 'public' / 'data'
+MIGRATIONS_DIR = REPO_ROOT / 'migrations'
@@ -0,0 +1,520 @@
+"""Parallel import of a directory of template-shaped CSVs into the SQLite mirror.
+
+:mod:`compliance.loader` handles one file at a time in one process. For a
+quarter-end onboarding drop (dozens of files, millions of rows) this module
+splits the work:
+
+* each file is cut into byte ranges at record boundaries. A newline only
+  counts as a boundary when the number of quote characters before it is
+  even, so quoted fields with embedded newlines stay whole. Backslash-escaped
+  quotes (``\\"``) are not counted, since the readers take them as data;
+* worker processes parse and validate the ranges (``csv``, the loader's row
+  rules, ``--verify`` checks). ``vendor_id`` cells holding a GSTIN or a
+  company name are resolved through dictionaries preloaded from the mirror,
+  and ``type_name`` through ``instrument_types``. They hand back ready-to-
+  bind tuples;
+* the parent is the only writer. Each file is one transaction, written in
+  large ``executemany`` batches. A file either commits completely, with
+  row-level problems as ``Row N: ...`` errors as in the loader, or is rolled
+  back and reported as failed. Other files are unaffected.
+
+Vendor files go first, so the other files can refer to vendors they add.
+
+With ``defer_reports`` the report triggers are dropped for the run and
+recorded in ``report_triggers_suspended`` (``0023``) in the same transaction.
+If the process dies before putting them back, :func:`compliance.db.open_mirror`
+restores them and recounts the summary tables on the next open.
+
+    python -m compliance.bulkimport local.sqlite onboarding/ -j 8
+    python -m compliance.bulkimport local.sqlite onboarding/ --dry-run --verify
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from bisect import bisect_left
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from compliance import db, loader
+
+DEFAULT_CHUNK_BYTES = 8 << 20
+DEFAULT_BATCH_SIZE = 200_000
+_SCAN_BLOCK = 1 << 20
+# A backslash escapes the next byte (including another backslash or a
+# quote); a lone backslash at the end of a block escapes the next block's first.
+_ESCAPE_OR_QUOTE = re.compile(rb'\\.?|"', re.DOTALL)
+
+_ctx: Dict[str, object] = {}   # per worker process, set by _init_worker
+
+
+class FileResult(NamedTuple):
+    path: str
+    entity: Optional[str]
+    result: Optional[loader.ImportResult]
+    error: Optional[str] = None     # set when the file was rolled back
+    rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _Chunk(NamedTuple):
+    params: List[tuple]
+    lines: List[int]                # record numbers within the chunk, from 1
+    skipped: int
+    errors: List[Tuple[int, str]]   # (record number within the chunk, message)
+    records: int
+
+
+def read_header(path) -> Tuple[List[str], int]:
+    """Header cells and the byte offset where the data starts."""
+    with open(path, 'rb') as f:
+        first = f.readline()
+    if not first.strip():
+        raise ValueError('Empty CSV')
+    text = first.decode('utf-8-sig')
+    return next(csv.reader([text], escapechar='\\')), len(first)
+
+
+def split_ranges(path, start: int, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> List[Tuple[int, int]]:
+    """Cut ``path`` from ``start`` into byte ranges that end on a record boundary."""
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as f:
+        f.seek(start)
+        quotes = 0          # unescaped quote characters between ``start`` and the read position
+        escaped = False     # the previous block ended on a lone backslash
+        pos = start
+        cut = start
+        target = start + chunk_bytes
+        while pos < size:
+            block = f.read(_SCAN_BLOCK)
+            if not block:
+                break
+            end = pos + len(block)
+            if escaped or b'\\' in block:
+                quote_at, escaped = _unescaped_quotes(block, escaped)
+                count = len(quote_at)
+                before = (lambda i: bisect_left(quote_at, i))
+            else:
+                count = block.count(b'"')
+                before = (lambda i: block.count(b'"', 0, i))
+            while target < end:
+                i = block.find(b'\n', max(target - pos, 0))
+                while i != -1 and (quotes + before(i)) % 2:
+                    i = block.find(b'\n', i + 1)     # inside a quoted field; try the next newline
+                if i == -1:
+                    break
+                boundary = pos + i + 1
+                ranges.append((cut, boundary))
+                cut = boundary
+                target = boundary + chunk_bytes
+            quotes += count
+            pos = end
+    if cut < size:
+        ranges.append((cut, size))
+    return ranges
+
+
+def _unescaped_quotes(block: bytes, escaped: bool) -> Tuple[List[int], bool]:
+    """Offsets of the quotes in ``block`` not escaped by a backslash, and whether it ends on a lone one."""
+    quote_at, trailing = [], False
+    for m in _ESCAPE_OR_QUOTE.finditer(block, 1 if escaped else 0):
+        if m.group() == b'"':
+            quote_at.append(m.start())
+        else:
+            trailing = m.end() - m.start() == 1
+    return quote_at, trailing
+
+
+def _vendor_lookup(conn: sqlite3.Connection) -> Dict[str, int]:
+    """GSTIN (upper case) and company/legal name (case-folded) -> vendor id; the first id wins."""
+    out: Dict[str, int] = {}
+    for vid, gstin, company, legal in conn.execute('SELECT id, gstin, company_name, legal_name FROM vendors '
+                                                   'ORDER BY id DESC'):
+        for key in ((legal or '').strip().casefold(), (company or '').strip().casefold(),
+                    (gstin or '').strip().upper()):
+            if key:
+                out[key] = vid
+    return out
+
+
+def build_context(conn: sqlite3.Connection) -> Dict[str, object]:
+    ctx = loader._context(conn)
+    ctx['vendors'] = _vendor_lookup(conn)
+    return ctx
+
+
+def _init_worker(ctx: Dict[str, object]):
+    _ctx.clear()
+    _ctx.update(ctx)
+
+
+def _resolve_vendor(rec: Dict[str, str], vendors: Dict[str, int]):
+    value = (rec.get('vendor_id') or '').strip()
+    if not value or value.isdigit():
+        return
+    vid = vendors.get(value.upper()) or vendors.get(value.casefold())
+    if vid is None:
+        try:
+            float(value)
+        except ValueError:
+            raise ValueError(f'unknown vendor {value!r}') from None
+        return                                    # numeric, e.g. "12.0": the loader's rules apply
+    rec['vendor_id'] = str(vid)
+
+
+def _parse_chunk(task) -> _Chunk:
+    """Worker: parse one byte range into bound parameters (runs in a pool process)."""
+    path, entity, header, start, end, verify = task
+    spec = loader.ENTITIES[entity]
+    make_row = spec.row
+    vendors = _ctx.get('vendors', {})
+    resolve = 'vendor_id' in header and entity != 'vendors'
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start).decode('utf-8')
+    params, lines, errors = [], [], []
+    skipped = records = 0
+    width = len(header)
+    for cells in csv.reader(io.StringIO(data, newline=''), escapechar='\\'):
+        if not cells or (len(cells) == 1 and not cells[0].strip()):
+            continue
+        records += 1
+        if len(cells) < width:
+            cells = list(cells) + [''] * (width - len(cells))
+        rec = dict(zip(header, cells))
+        try:
+            if resolve:
+                _resolve_vendor(rec, vendors)
+            params.append(make_row(rec, _ctx))
+        except loader.SkipRow:
+            skipped += 1
+            continue
+        except ValueError as exc:
+            errors.append((records, str(exc)))
+            continue
+        lines.append(records)
+    if verify and spec.verify is not None and params:
+        messages = spec.verify(params)
+        if any(messages):
+            keep = []
+            for i, message in enumerate(messages):
+                if message:
+                    errors.append((lines[i], message))
+                else:
+                    keep.append(i)
+            params, lines = [params[i] for i in keep], [lines[i] for i in keep]
+    return _Chunk(params, lines, skipped, errors, records)
+
+
+class _InlinePool:
+    """``-j 1``: parse in the writer's process and skip pickling the rows."""
+
+    def __init__(self, max_workers=None, initializer=None, initargs=()):
+        initializer(*initargs)
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Job(NamedTuple):
+    path: str
+    entity: str
+    header: List[str]
+    ranges: List[Tuple[int, int]]
+
+
+def discover(paths: Sequence[str], entity: Optional[str] = None,
+             chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Tuple[List[_Job], List[FileResult]]:
+    """Expand directories to ``*.csv`` and plan each file; files that cannot be read are failures."""
+    files: List[str] = []
+    for p in paths:
+        p = Path(p)
+        files += sorted(str(f) for f in p.rglob('*.csv')) if p.is_dir() else [str(p)]
+    jobs, failed = [], []
+    for path in files:
+        try:
+            ent = entity or loader.entity_for_path(path)
+            header, start = read_header(path)
+            header = [h.strip() for h in header]
+            if loader.REQUIRED_COLUMNS[ent] not in header:
+                raise ValueError(f'Missing required column: {loader.REQUIRED_COLUMNS[ent]}')
+            jobs.append(_Job(path, ent, header, split_ranges(path, start, chunk_bytes)))
+        except (OSError, ValueError, UnicodeDecodeError) as exc:
+            failed.append(FileResult(path, None if entity is None else entity, None, str(exc)))
+    # Vendors first so later files can refer to the vendors they add.
+    jobs.sort(key=lambda j: (j.entity != 'vendors', j.path))
+    return jobs, failed
+
+
+def _chunks(pool: ProcessPoolExecutor, jobs: List[_Job], verify: bool, ahead: int) -> Iterator[tuple]:
+    """``(job, chunk or exception)`` in file and range order, with at most ``ahead`` ranges in flight."""
+    tasks = [(job, (job.path, job.entity, job.header, s, e, verify)) for job in jobs for s, e in job.ranges]
+    pending = []
+    it = iter(tasks)
+    for job, task in it:
+        pending.append((job, pool.submit(_parse_chunk, task)))
+        if len(pending) >= ahead:
+            break
+    while pending:
+        job, future = pending.pop(0)
+        nxt = next(it, None)
+        if nxt is not None:
+            pending.append((nxt[0], pool.submit(_parse_chunk, nxt[1])))
+        try:
+            yield job, future.result()
+        except Exception as exc:  # a worker failure fails its file, not the run
+            yield job, exc
+
+
+class _FileWriter:
+    """Single writer for one file: one transaction, large batches, loader semantics."""
+
+    def __init__(self, conn, job: _Job, dry_run: bool, batch_size: int, actor_level):
+        self.conn, self.job, self.dry_run = conn, job, dry_run
+        self.batch_size, self.actor_level = batch_size, actor_level
+        self.spec = loader.ENTITIES[job.entity]
+        self.sql = self.spec.upsert_sql()
+        self.counts = loader._Counts()
+        self.params: List[tuple] = []
+        self.lines: List[int] = []
+        self.line = 1                       # header; the first data record is row 2
+        self.error: Optional[str] = None
+        self.started = time.perf_counter()
+        conn.execute('BEGIN')
+
+    def add(self, chunk: _Chunk):
+        base = self.line
+        self.counts.skipped += chunk.skipped
+        for line, message in chunk.errors:
+            self.counts.error(base + line, message)
+        self.params += chunk.params
+        self.lines += [base + n for n in chunk.lines]
+        self.line += chunk.records
+        if len(self.params) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self.params:
+            loader._flush(self.conn, self.spec, self.sql, self.params, self.lines, self.counts, verify=False)
+        self.params, self.lines = [], []
+
+    def fail(self, message: str):
+        self.error = self.error or message
+
+    def finish(self) -> FileResult:
+        c = self.counts
+        result = None
+        try:
+            if self.error is None:
+                self._flush()
+                payload = json.dumps({'inserted': c.inserted, 'updated': c.updated, 'skipped': c.skipped,
+                                      'errorsCount': len(c.errors)}, separators=(',', ':'))
+                self.conn.execute('INSERT INTO audit_log (actor_level, action, entity_type, payload) '
+                                  'VALUES (?, ?, ?, ?)',
+                                  (self.actor_level, 'import_dry_run' if self.dry_run else 'import',
+                                   self.spec.audit_entity, payload))
+                result = loader.ImportResult(self.dry_run, c.inserted, c.updated, c.skipped, c.messages())
+        except sqlite3.DatabaseError as exc:
+            self.fail(f'database error: {exc}')
+            result = None
+        self.conn.execute('COMMIT' if self.error is None and not self.dry_run else 'ROLLBACK')
+        return FileResult(self.job.path, self.job.entity, result, self.error, self.line - 1,
+                          time.perf_counter() - self.started)
+
+
+def suspend_report_triggers(conn: sqlite3.Connection) -> List[str]:
+    """Drop the ``0014_report_summary`` triggers; returns their names.
+
+    Their SQL goes to ``report_triggers_suspended`` in the same transaction,
+    so a process killed before :func:`restore_report_triggers` leaves a
+    record for :func:`recover_report_triggers`.
+    """
+    triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+                            "AND name LIKE 'trg_report_%' ORDER BY name").fetchall()
+    conn.execute('BEGIN')
+    try:
+        conn.executemany('INSERT OR REPLACE INTO report_triggers_suspended (name, sql, pid) VALUES (?, ?, ?)',
+                         [(name, sql, os.getpid()) for name, sql in triggers])
+        for name, _ in triggers:
+            conn.execute(f'DROP TRIGGER {name}')
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return [name for name, _ in triggers]
+
+
+def _alive(pid: int) -> bool:
+    if os.name == 'nt':
+        return False        # no cheap probe; restoring under a live import only costs it speed
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True         # exists, owned by someone else
+    return True
+
+
+def _restore(conn: sqlite3.Connection, rows: List[Tuple[str, str]]) -> List[str]:
+    """Recreate the missing triggers, recount the summary tables, then drop the records.
+
+    Every step can be repeated, so an interrupted restore is finished by the next one.
+    """
+    from compliance import reports
+
+    if not rows:
+        return []
+    present = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    conn.execute('BEGIN')
+    try:
+        for name, sql in rows:
+            if name not in present:
+                conn.execute(sql)
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    # The triggers are back before the recount, so writes from now on are either
+    # in the recount or counted by the triggers.
+    reports.rebuild(conn)
+    conn.executemany('DELETE FROM report_triggers_suspended WHERE name = ?', [(name,) for name, _ in rows])
+    return [name for name, _ in rows]
+
+
+def restore_report_triggers(conn: sqlite3.Connection) -> List[str]:
+    """Put back the triggers this process suspended (and any whose process died); returns their names."""
+    rows = conn.execute('SELECT name, sql, pid FROM report_triggers_suspended ORDER BY name').fetchall()
+    return _restore(conn, [(name, sql) for name, sql, pid in rows if pid == os.getpid() or not _alive(pid)])
+
+
+def recover_report_triggers(conn: sqlite3.Connection) -> List[str]:
+    """Put back triggers left suspended by a process that is no longer running; returns their names."""
+    rows = conn.execute('SELECT name, sql, pid FROM report_triggers_suspended ORDER BY name').fetchall()
+    return _restore(conn, [(name, sql) for name, sql, pid in rows if pid != os.getpid() and not _alive(pid)])
+
+
+def import_files(conn: sqlite3.Connection, paths: Sequence[str], entity: Optional[str] = None,
+                 workers: Optional[int] = None, dry_run: bool = False, verify: bool = False,
+                 batch_size: int = DEFAULT_BATCH_SIZE, chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+                 actor_level: Optional[int] = None, progress=None,
+                 defer_reports: bool = False) -> List[FileResult]:
+    """Import every CSV under ``paths``; returns one :class:`FileResult` per file, failures included.
+
+    ``defer_reports`` drops the report summary triggers for the run and
+    rebuilds the summary tables once at the end, instead of paying for the
+    triggers on every row.
+    """
+    jobs, results = discover(paths, entity, chunk_bytes)
+    if progress:
+        for r in results:
+            progress(r)
+    if not (defer_reports and jobs and not dry_run):
+        return results + _import_jobs(conn, jobs, workers, dry_run, verify, batch_size, actor_level, progress)
+    suspend_report_triggers(conn)
+    try:
+        return results + _import_jobs(conn, jobs, workers, dry_run, verify, batch_size, actor_level, progress)
+    finally:
+        restore_report_triggers(conn)
+
+
+def _import_jobs(conn, jobs: List[_Job], workers, dry_run, verify, batch_size, actor_level,
+                 progress) -> List[FileResult]:
+    results: List[FileResult] = []
+    workers = workers or os.cpu_count() or 1
+    # Vendor files run first, in their own pool, so the lookup the other workers load includes them.
+    phases = [[j for j in jobs if j.entity == 'vendors'], [j for j in jobs if j.entity != 'vendors']]
+    for phase in phases:
+        if not phase:
+            continue
+        empty = [j for j in phase if not j.ranges]
+        for job in empty:
+            writer = _FileWriter(conn, job, dry_run, batch_size, actor_level)
+            results.append(writer.finish())
+            if progress:
+                progress(results[-1])
+        phase = [j for j in phase if j.ranges]
+        pool_class = ProcessPoolExecutor if workers > 1 else _InlinePool
+        with pool_class(max_workers=workers, initializer=_init_worker, initargs=(build_context(conn),)) as pool:
+            writer, remaining = None, 0
+            for job, chunk in _chunks(pool, phase, verify, ahead=workers * 2):
+                if writer is None or writer.job is not job:
+                    writer, remaining = _FileWriter(conn, job, dry_run, batch_size, actor_level), len(job.ranges)
+                remaining -= 1
+                if isinstance(chunk, Exception):
+                    writer.fail(f'{type(chunk).__name__}: {chunk}')
+                elif writer.error is None:
+                    try:
+                        writer.add(chunk)
+                    except sqlite3.DatabaseError as exc:
+                        writer.fail(f'database error: {exc}')
+                if remaining == 0:
+                    results.append(writer.finish())
+                    if progress:
+                        progress(results[-1])
+    return results
+
+
+def _report(r: FileResult):
+    if r.ok:
+        rate = f', {r.rows / r.seconds:,.0f} rows/s' if r.seconds > 0 else ''
+        print(f'{r.path} ({r.entity}): {r.result.to_json()} [{r.seconds:.1f}s{rate}]', flush=True)
+    else:
+        print(f'{r.path}: FAILED: {r.error}', file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import a directory of CSV templates in parallel.')
+    parser.add_argument('db', help='SQLite file; migrations are applied first')
+    parser.add_argument('paths', nargs='+', help='CSV files or directories (searched for *.csv)')
+    parser.add_argument('-e', '--entity', choices=sorted(loader.ENTITIES), help='default: guessed per file name')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='parser processes (default: CPUs)')
+    parser.add_argument('--dry-run', action='store_true', help='roll every file back after counting')
+    parser.add_argument('--verify', action='store_true',
+                        help='also reject GSTIN check-digit and PAN/state_code mismatches')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--chunk-mb', type=float, default=DEFAULT_CHUNK_BYTES / (1 << 20),
+                        help='bytes of CSV per worker task')
+    parser.add_argument('--defer-reports', action='store_true',
+                        help='drop the report triggers during the run and rebuild the summary tables at the end')
+    parser.add_argument('--safe', action='store_true', help='keep fsync and WAL (default: bulk pragmas)')
+    args = parser.parse_args(argv)
+
+    conn = db.open_mirror(args.db, bulk=not args.safe)
+    t0 = time.perf_counter()
+    results = import_files(conn, args.paths, args.entity, args.workers, args.dry_run, args.verify,
+                           args.batch_size, int(args.chunk_mb * (1 << 20)), progress=_report,
+                           defer_reports=args.defer_reports)
+    conn.close()
+    elapsed = time.perf_counter() - t0
+    failed = [r for r in results if not r.ok]
+    rows = sum(r.rows for r in results if r.ok)
+    print(f'{len(results) - len(failed)} file(s) imported, {len(failed)} failed; {rows:,} rows in {elapsed:.1f}s'
+          + (f' ({rows / elapsed:,.0f} rows/s)' if elapsed > 0 else ''))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
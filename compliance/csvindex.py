@@ -0,0 +1,382 @@
+"""Random access and parallel scans over large CSV exports through a sidecar row index.
+
+The exports (:mod:`compliance.export`, the Worker's ``export.csv``) get
+scanned over and over for reconciliation, and every ad-hoc question has
+meant re-reading gigabytes through ``csv``. :class:`IndexedCSV` memory-maps
+the export and keeps the byte offset of every row in a sidecar file
+(``invoices.csv.idx``). The index is built once. Reopening maps both files
+and reads nothing, so fetching a few thousand rows from a 4 GB export takes
+milliseconds.
+
+The index is a small header (magic, byte order, the export's size and
+mtime, row count, data offset) followed by one native ``uint64`` per row
+plus an end sentinel. It is read through ``memoryview.cast('Q')``, not
+loaded. A size or mtime change makes it stale, and it is rebuilt. Building
+splits 64 MB slices on newlines in C and tracks quote parity only on lines
+that contain a quote, so a quoted cell holding a newline stays in its row.
+
+Rows stay bytes until asked for. A row without a quote is split on commas,
+and only the projected cells are decoded. Others go through ``csv``.
+:meth:`IndexedCSV.scan` filters on ``column op value`` conditions, compared
+as strings or as numbers. An ``=`` or ``~`` value is first searched for in
+the map, and only the rows it lands in are parsed, so a selective filter
+skips most of the file. With ``workers`` the scan fans row ranges out to
+processes that each map the same two files.
+
+    python -m compliance.csvindex invoices.csv --rows 10,20000,4000000
+    python -m compliance.csvindex invoices.csv --where status=pending --where 'amount>100000' -c invoice_number,amount -j 4
+"""
+import argparse
+import csv
+import io
+import mmap
+import operator
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, chain, compress, repeat
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+MAGIC = b'ODICIDX1'
+_HEADER = struct.Struct('=8sBxxxxxxxQqQQ')      # magic, little-endian?, size, mtime_ns, rows, data offset
+_BUILD_SLICE = 64 << 20
+DEFAULT_CHUNK_ROWS = 250_000
+
+_OPS = {'=': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le, '>': operator.gt,
+        '>=': operator.ge, '~': operator.contains}
+_CONDITION_RE = re.compile(r'\s*([^=!<>~]+?)\s*(=|!=|<=|>=|<|>|~)\s*(.*)\Z', re.S)
+
+
+class Condition(NamedTuple):
+    column: str
+    op: str                     # one of _OPS
+    value: str
+
+    @classmethod
+    def parse(cls, text: str) -> 'Condition':
+        """``status=pending``, ``amount>=1000``, ``company_name~Traders``."""
+        m = _CONDITION_RE.match(text)
+        if not m:
+            raise ValueError(f'cannot parse condition {text!r}; expected column<op>value with op in '
+                             f'{" ".join(_OPS)}')
+        return cls(*m.groups())
+
+
+def index_path(path) -> str:
+    return f'{path}.idx'
+
+
+def _row_starts(mm, start: int, size: int) -> array:
+    """Byte offset of every row from ``start``, then the end sentinel (one past the last newline)."""
+    starts = array('Q')
+    in_quote = False            # a quoted cell left open by the previous slice
+    pos = start
+    while pos < size:
+        end = min(pos + _BUILD_SLICE, size)
+        if end < size:
+            nl = mm.find(b'\n', end - 1)
+            end = size if nl == -1 else nl + 1
+        chunk = mm[pos:end]
+        parts = chunk.split(b'\n')
+        if len(parts) > 1 and not parts[-1]:
+            parts.pop()         # the empty tail after the slice's last newline
+        # Every line's start from the line lengths, without a Python-level loop.
+        line_starts = array('Q', accumulate(chain((pos,), map(operator.add, map(len, parts[:-1]), repeat(1)))))
+        if in_quote or b'"' in chunk:
+            # A line with an odd number of quotes opens or closes a quoted cell;
+            # the lines up to the one that closes it continue the same row.
+            keep = bytearray(b'\x01') * len(parts)
+            opened = -1 if in_quote else None
+            for i in [i for i, p in enumerate(parts) if b'"' in p]:
+                if parts[i].count(b'"') & 1:
+                    if opened is None:
+                        opened = i
+                    else:
+                        keep[opened + 1:i + 1] = bytes(i - opened)
+                        opened = None
+            if opened is not None:
+                keep[opened + 1:] = bytes(len(parts) - opened - 1)
+            in_quote = opened is not None
+            line_starts = array('Q', compress(line_starts, keep))
+        starts.extend(line_starts)
+        pos = end
+    # Rows are mm[start:next_start - 1], so the sentinel pretends the file ends in a newline.
+    starts.append(size if mm[size - 1:size] == b'\n' else size + 1)
+    return starts
+
+
+def build_index(path, idx_path: Optional[str] = None) -> str:
+    """Scan ``path`` and write its sidecar index (atomically); returns the index path."""
+    idx_path = idx_path or index_path(path)
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        if st.st_size == 0:
+            raise ValueError(f'{path}: empty file')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            nl = mm.find(b'\n')
+            data = st.st_size if nl == -1 else nl + 1
+            header_quotes = mm[:data].count(b'"') & 1
+            if header_quotes:
+                raise ValueError(f'{path}: header has an unterminated quote')
+            starts = _row_starts(mm, data, st.st_size)
+    tmp = f'{idx_path}.tmp{os.getpid()}'
+    with open(tmp, 'wb') as out:
+        out.write(_HEADER.pack(MAGIC, sys.byteorder == 'little', st.st_size, st.st_mtime_ns, len(starts) - 1, data))
+        starts.tofile(out)
+    os.replace(tmp, idx_path)
+    return idx_path
+
+
+def _index_is_current(idx_path: str, st: os.stat_result) -> bool:
+    try:
+        with open(idx_path, 'rb') as f:
+            head = f.read(_HEADER.size)
+    except OSError:
+        return False
+    if len(head) != _HEADER.size:
+        return False
+    magic, little, size, mtime_ns, _, _ = _HEADER.unpack(head)
+    return (magic == MAGIC and bool(little) == (sys.byteorder == 'little') and size == st.st_size
+            and mtime_ns == st.st_mtime_ns)
+
+
+class IndexedCSV:
+    """A CSV export plus its row index, both memory-mapped. Use as a context manager."""
+
+    __slots__ = ('path', 'header', 'columns', '_file', '_mm', '_idx_file', '_idx_mm', '_offsets', '_rows')
+
+    def __init__(self, path, build: bool = True, idx_path: Optional[str] = None):
+        self.path = str(path)
+        idx_path = idx_path or index_path(path)
+        self._file = open(self.path, 'rb')
+        try:
+            st = os.fstat(self._file.fileno())
+            if not _index_is_current(idx_path, st):
+                if not build:
+                    raise ValueError(f'{idx_path} is missing or stale; build it first')
+                build_index(self.path, idx_path)
+            self._idx_file = open(idx_path, 'rb')
+            self._idx_mm = mmap.mmap(self._idx_file.fileno(), 0, access=mmap.ACCESS_READ)
+            _, _, _, _, self._rows, data = _HEADER.unpack_from(self._idx_mm)
+            self._offsets = memoryview(self._idx_mm)[_HEADER.size:].cast('Q')
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+        self.header = next(csv.reader([self._mm[:data].decode('utf-8-sig').rstrip('\r\n')]))
+        self.columns = {name: i for i, name in enumerate(self.header)}
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._offsets.release()
+        self._idx_mm.close()
+        self._idx_file.close()
+        self._mm.close()
+        self._file.close()
+
+    def raw(self, i: int) -> bytes:
+        """Row ``i`` (0-based, header excluded) as it sits in the file."""
+        if not 0 <= i < self._rows:
+            raise IndexError(f'row {i} out of range (0..{self._rows - 1})')
+        line = self._mm[self._offsets[i]:self._offsets[i + 1] - 1]
+        return line[:-1] if line.endswith(b'\r') else line
+
+    def _positions(self, columns: Optional[Sequence[str]]) -> Optional[List[int]]:
+        if columns is None:
+            return None
+        try:
+            return [self.columns[c] for c in columns]
+        except KeyError as exc:
+            raise ValueError(f'unknown column {exc.args[0]!r}; have {", ".join(self.header)}') from None
+
+    def row(self, i: int, columns: Optional[Sequence[str]] = None) -> tuple:
+        return _project(self.raw(i), self._positions(columns))
+
+    def rows(self, indices: Iterable[int], columns: Optional[Sequence[str]] = None) -> Iterator[tuple]:
+        positions = self._positions(columns)
+        for i in indices:
+            yield _project(self.raw(i), positions)
+
+    def scan(self, where: Sequence[Condition] = (), columns: Optional[Sequence[str]] = None,
+             start: int = 0, stop: Optional[int] = None, workers: int = 1,
+             chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[Tuple[int, tuple]]:
+        """``(row number, projected cells)`` for every row in ``[start, stop)`` matching all of ``where``.
+
+        With ``workers > 1`` the range is cut into ``chunk_rows`` pieces
+        scanned by that many processes. Results still come back in row
+        order.
+        """
+        stop = self._rows if stop is None else min(stop, self._rows)
+        self._positions(columns)
+        tests = _compile(self, where)
+        tasks = [(self.path, lo, min(lo + chunk_rows, stop), tests, columns)
+                 for lo in range(start, stop, chunk_rows)]
+        # Bad columns and conditions raise here, not on the first next().
+        return self._run(tasks, workers)
+
+    def _run(self, tasks, workers: int) -> Iterator[Tuple[int, tuple]]:
+        if workers <= 1 or len(tasks) <= 1:
+            for task in tasks:
+                yield from _scan_range(self, *task[1:])
+            return
+        with ProcessPoolExecutor(workers) as pool:
+            for matches in pool.map(_scan_task, tasks):
+                yield from matches
+
+
+def _project(line: bytes, positions: Optional[List[int]]) -> tuple:
+    if b'"' in line:
+        cells = next(csv.reader([line.decode('utf-8')]))
+        return tuple(cells) if positions is None else tuple(cells[i] if i < len(cells) else '' for i in positions)
+    cells = line.split(b',')
+    if positions is None:
+        return tuple(c.decode() for c in cells)
+    return tuple(cells[i].decode() if i < len(cells) else '' for i in positions)
+
+
+def _number(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return _NAN
+
+
+_NAN = float('nan')
+
+
+def _compile(table: IndexedCSV, where: Sequence[Condition]) -> List[Tuple[int, str, object]]:
+    """Column position, op and the value in the form it is compared in: a float if the
+    condition value is a number (except for ``~``), else the string. A cell that is
+    not a number only satisfies a numeric ``!=``."""
+    tests = []
+    for cond in where:
+        if cond.op not in _OPS:
+            raise ValueError(f'unknown operator {cond.op!r}')
+        pos = table._positions([cond.column])[0]
+        number = None if cond.op == '~' else _number(cond.value)
+        tests.append((pos, cond.op, cond.value if number is None or number != number else number))
+    return tests
+
+
+def _candidates(table: IndexedCSV, start: int, stop: int, needle: bytes) -> List[int]:
+    """Rows in ``[start, stop)`` whose bytes contain ``needle``, found with ``mmap.find``."""
+    mm, offsets = table._mm, table._offsets
+    end = offsets[stop] - 1
+    out = []
+    pos = mm.find(needle, offsets[start], end)
+    while pos != -1:
+        i = bisect_right(offsets, pos, start, stop) - 1
+        out.append(i)
+        pos = mm.find(needle, offsets[i + 1], end)
+    return out
+
+
+def _scan_range(table: IndexedCSV, start: int, stop: int, tests, columns) -> List[Tuple[int, tuple]]:
+    positions = table._positions(columns)
+    if start >= stop:
+        return []
+    mm, offsets = table._mm, table._offsets
+    # Every row matching an = or ~ test contains its value: search the map for
+    # the longest one and parse only the rows it lands in. A quote in a cell is
+    # written doubled, so the needle doubles it too.
+    needles = [value.replace('"', '""').encode() for _, op, value in tests
+               if op in ('=', '~') and value.__class__ is str and value]
+    if needles:
+        numbers: Sequence[int] = _candidates(table, start, stop, max(needles, key=len))
+        lines = [mm[offsets[i]:offsets[i + 1] - 1] for i in numbers]
+    else:
+        numbers = range(start, stop)
+        block = mm[offsets[start]:offsets[stop] - 1]
+        # A quoted cell may hold a newline; otherwise rows are lines.
+        lines = [mm[offsets[i]:offsets[i + 1] - 1] for i in numbers] if b'"' in block else block.split(b'\n')
+    rows = list(csv.reader([line.decode('utf-8') for line in lines]))
+    width = max([pos for pos, _, _ in tests] + (positions or [])) + 1 if tests or positions else 0
+    if rows and min(map(len, rows)) < width:
+        rows = [r if len(r) >= width else r + [''] * (width - len(r)) for r in rows]
+    # The tests run as map/compress over whole columns so the per-row work stays in C.
+    for pos, op, value in tests:
+        cells = map(operator.itemgetter(pos), rows)
+        if value.__class__ is float:
+            cells = map(_number, cells)
+        keep = list(map(_OPS[op], cells, repeat(value)))
+        rows, numbers = list(compress(rows, keep)), list(compress(numbers, keep))
+    if positions is None:
+        return list(zip(numbers, map(tuple, rows)))
+    if len(positions) < 2:
+        return [(i, tuple(cells[p] for p in positions)) for i, cells in zip(numbers, rows)]
+    return list(zip(numbers, map(operator.itemgetter(*positions), rows)))
+
+
+_open: Dict[str, IndexedCSV] = {}
+
+
+def _scan_task(task) -> List[Tuple[int, tuple]]:
+    path, start, stop, tests, columns = task
+    table = _open.get(path)
+    if table is None:
+        table = _open[path] = IndexedCSV(path, build=False)
+    return _scan_range(table, start, stop, tests, columns)
+
+
+def _parse_rows(text: str) -> List[int]:
+    out = []
+    for part in text.split(','):
+        lo, _, hi = part.partition('-')
+        out.extend(range(int(lo), int(hi) + 1) if hi else [int(lo)])
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Indexed random access and scans over a CSV export.')
+    parser.add_argument('path', help='CSV export (the index is PATH.idx)')
+    parser.add_argument('--rows', help='row numbers to print, 0-based: 5,17,100-120')
+    parser.add_argument('-c', '--columns', help='comma-separated columns to print (default: all)')
+    parser.add_argument('--where', action='append', default=[], metavar='COND',
+                        help="repeatable: column=value, !=, <, <=, >, >=, ~ (substring); numbers compare as numbers")
+    parser.add_argument('-j', '--workers', type=int, default=1)
+    parser.add_argument('--count', action='store_true', help='only print the number of matching rows')
+    parser.add_argument('--build', action='store_true', help='(re)build the index and exit')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.build:
+            build_index(args.path)
+        with IndexedCSV(args.path) as table:
+            if args.build:
+                print(f'{len(table)} rows indexed in {index_path(args.path)}')
+                return
+            columns = args.columns.split(',') if args.columns else None
+            if args.rows:
+                matches: Iterator = zip(repeat(None), table.rows(_parse_rows(args.rows), columns))
+            else:
+                matches = table.scan([Condition.parse(w) for w in args.where], columns, workers=args.workers)
+            out = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', newline='', write_through=False)
+            writer = csv.writer(out, lineterminator='\n')
+            if not args.count:
+                writer.writerow(columns or table.header)
+            n = 0
+            for _, cells in matches:
+                n += 1
+                if not args.count:
+                    writer.writerow(cells)
+            if args.count:
+                out.write(f'{n}\n')
+            out.flush()
+    except (ValueError, IndexError, OSError) as exc:
+        parser.exit(2, f'{exc}\n')
+
+
+if __name__ == '__main__':
+    main()
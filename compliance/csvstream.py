@@ -0,0 +1,366 @@
+"""Streaming CSV reader for the import templates' quoting quirks.
+
+The templates are not all RFC 4180:
+
+* JSON sits inside cells (``items`` in ``dc_import_template.csv``,
+  ``Reminder_Days`` in ``due_date_tracking_matrix.csv``). The DC template
+  escapes the inner quotes with a backslash (``"[{\\"sku\\":...}]"``) rather
+  than doubling them;
+* ``transportation_import_template.csv`` quotes some cells with single
+  quotes (``'Noida, UP'``) and leaves others bare.
+
+The Worker's regex splitter breaks on all of these, and ``csv`` only
+knows one quote character, so such files have been pre-cleaned by scripts
+that read and write every byte twice. :func:`iter_rows` reads them as they
+are. A cell is one of:
+
+* double-quoted, with ``""`` or ``\\"`` inside;
+* single-quoted, with ``''`` or ``\\'`` inside. It never spans a line, and
+  only counts when the closing quote is followed by a delimiter;
+* bare, where ``\\`` escapes the next character, as with
+  ``csv.reader(escapechar='\\\\')``.
+
+An apostrophe inside a bare cell (``O'Brien``) stays a literal. Windows of
+whole lines quoted only one way go through ``csv``'s C parser with that
+quote character. The rest, mixing both styles, go through one compiled
+tokenizer pattern.
+
+Input is a path (memory-mapped), a binary or text file handle, or a
+bytes-like object. It is decoded ``block_size`` at a time, and only the
+current block plus one unfinished record are held. :func:`read_records`
+adds the header, decodes the JSON columns and converts typed columns,
+yielding one named tuple per row.
+
+    python -m compliance.csvstream public/data/transportation_import_template.csv
+    python -m compliance.csvstream history.csv --raw --count
+"""
+import argparse
+import codecs
+import csv
+import io
+import json
+import mmap
+import os
+import re
+import sys
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+FIELD_SIZE_LIMIT = 16 << 20    # an unterminated quote is an error once the open record is this long
+
+# One cell and the separator after it. Each quoted body is an unrolled loop
+# (plain run, then escape + plain run, ...), which keeps ``re`` out of
+# per-character backtracking. The last group flags a position where no cell
+# parses, so ``findall`` never skips input silently.
+_TOKEN = re.compile(r'''
+    (?: "([^"\\]*(?:(?:""|\\.)[^"\\]*)*)"
+      | '([^'\\\r\n]*(?:(?:''|\\.)[^'\\\r\n]*)*)'(?=[,\r\n]|\Z)
+      | ((?!")[^,\r\n\\]*(?:\\.[^,\r\n\\]*)*)
+    )
+    (,|\r\n|\n|\r|\Z)
+    | (.)                                   # no cell parses here''', re.S | re.X)
+_CLOSED_QUOTE = re.compile(r'"[^"\\]*(?:(?:""|\\.)[^"\\]*)*"(?!")', re.S)
+_DOUBLE_ESCAPES = re.compile(r'""|\\(.)', re.S)
+_SINGLE_ESCAPES = re.compile(r"''|\\(.)", re.S)
+
+JSON_COLUMNS = frozenset({'items', 'details', 'Reminder_Days'})
+
+# Template columns that are not text; cells that are empty become None.
+COLUMN_TYPES: Dict[str, Callable[[str], object]] = {
+    'vendor_id': int, 'opening_qty': int, 'reorder_level': int,
+    'amount': Decimal, 'budget': Decimal, 'rating': Decimal,
+    **dict.fromkeys(('due_date', 'issue_date', 'expiry_date', 'start_date', 'end_date', 'dispatch_date',
+                     'expected_delivery', 'eway_valid_till'), date.fromisoformat),
+}
+
+
+class CSVError(ValueError):
+    """Malformed input or an unconvertible cell; ``line`` is where the record starts."""
+
+    def __init__(self, message: str, line: int):
+        super().__init__(message)
+        self.line = line
+
+
+def _unbackslash(text: str) -> str:
+    """Drop each escaping backslash. Pairs split left to right, as the escapes pair up."""
+    if '\\\\' in text:
+        return '\\'.join(part.replace('\\', '') for part in text.split('\\\\'))
+    return text.replace('\\', '')
+
+
+def _double(body: str) -> str:
+    if '\\' not in body:
+        return body.replace('""', '"') if '"' in body else body
+    if '""' in body:                    # both escape styles in one cell
+        return _DOUBLE_ESCAPES.sub(lambda m: m.group(1) or '"', body)
+    return _unbackslash(body)
+
+
+def _single(body: str) -> str:
+    if '\\' not in body:
+        return body.replace("''", "'") if "'" in body else body
+    if "''" in body:
+        return _SINGLE_ESCAPES.sub(lambda m: m.group(1) or "'", body)
+    return _unbackslash(body)
+
+
+def _blocks(source, encoding: str, block_size: int) -> Iterator[str]:
+    """Decoded text from ``source``, ``block_size`` bytes (or characters) at a time."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield from _mapped_blocks(mm, encoding, block_size, release=hasattr(mm, 'madvise'))
+        return
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        yield from _mapped_blocks(source, encoding, block_size)
+        return
+    decoder = codecs.getincrementaldecoder(encoding)()
+    while True:
+        block = source.read(block_size)
+        if not block:
+            break
+        yield block if isinstance(block, str) else decoder.decode(block)
+    yield decoder.decode(b'', final=True)
+
+
+def _mapped_blocks(source, encoding: str, block_size: int, release: bool = False) -> Iterator[str]:
+    """Slices of an in-memory buffer. With ``release``, pages already decoded are dropped from
+    the mapping (``MADV_DONTNEED``), so resident memory stays at about one block; only safe on
+    a read-only file mapping of our own.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    view = memoryview(source)
+    done = 0
+    try:
+        for off in range(0, len(view), block_size):
+            yield decoder.decode(view[off:off + block_size])
+            if release:
+                upto = (off + block_size) // mmap.PAGESIZE * mmap.PAGESIZE
+                if upto > done:
+                    source.madvise(mmap.MADV_DONTNEED, done, upto - done)
+                    done = upto
+    finally:
+        view.release()
+    yield decoder.decode(b'', final=True)
+
+
+def _single_quotes(text: str, end: int) -> bool:
+    """Whether a cell in ``text[:end]`` may start with a single quote (three C scans, no regex)."""
+    return (text.startswith("'") or text.find(",'", 0, end) != -1 or text.find("\n'", 0, end) != -1
+            or text.find("\r'", 0, end) != -1)
+
+
+def _cell(double: str, single: str, bare: str) -> str:
+    if double:
+        return _double(double)
+    if single:
+        return _single(single)
+    return _unbackslash(bare) if '\\' in bare else bare
+
+
+def _scan_csv(window: str, quotechar: str) -> Optional[List[List[str]]]:
+    """Every record in ``window`` via ``csv.reader``, or None if it does not parse strictly.
+
+    A window quoted only one way follows ``csv``'s rules with that quote
+    character and ``escapechar='\\\\'``. The C parser is several times
+    faster than the tokenizer. A quoted cell cut off by the window edge, or
+    over ``csv.field_size_limit()``, raises ``csv.Error``, and so does a
+    single-quoted cell spanning lines. The window then falls back to the
+    tokenizer.
+    """
+    reader = csv.reader(io.StringIO(window, newline=''), escapechar='\\', quotechar=quotechar, strict=True)
+    try:
+        rows = list(reader)
+    except csv.Error:
+        return None
+    if quotechar == "'" and len(rows) != reader.line_num:
+        return None
+    return [row for row in rows if len(row) > 1 or row and row[0]]
+
+
+def _scan(text: str, end: int, eof: bool) -> Optional[List[List[str]]]:
+    """Every record in ``text[:end]`` via the tokenizer, or None if the window needs the careful scan.
+
+    ``findall`` builds all the tokens in C. That covers nearly every window;
+    the rest are ones that cut through a quoted cell, end the file
+    mid-record, or hold a malformed cell.
+    """
+    rows: List[List[str]] = []
+    row: List[str] = []
+    for double, single, bare, sep, bad in _TOKEN.findall(text, 0, end):
+        if bad:
+            return None
+        row.append(_cell(double, single, bare))
+        if sep == ',':
+            continue
+        if len(row) > 1 or row[0]:
+            if not sep and not eof:
+                return None
+            rows.append(row)
+        if not sep:
+            break
+        row = []
+    return rows
+
+
+def _scan_slow(text: str, end: int, eof: bool, line: int) -> Tuple[List[List[str]], int]:
+    """The records in ``text[:end]`` that are complete, and where the first incomplete one starts."""
+    rows: List[List[str]] = []
+    pos = start = 0                     # parse position; start of the current record
+    row: List[str] = []
+    for m in _TOKEN.finditer(text, 0, end):
+        if m.start() != pos or m.group(5):
+            break
+        double, single, bare, sep = m.group(1, 2, 3, 4)
+        row.append(_double(double) if double is not None else
+                   _single(single) if single is not None else _cell('', '', bare))
+        pos = m.end()
+        if sep == ',':
+            continue
+        if not sep and not eof:         # the window ended inside this record
+            break
+        if len(row) > 1 or row[0]:
+            rows.append(row)
+        row = []
+        start = pos
+        if pos == end:
+            break
+    if pos < end:                       # no cell parses at ``pos``
+        where = line + text.count('\n', 0, start)
+        if not text.startswith('"', pos) or _CLOSED_QUOTE.match(text, pos, end):
+            raise CSVError(f'line {where}: unexpected character after field: {text[pos:pos + 40]!r}', where)
+        if eof:
+            raise CSVError(f'line {where}: unterminated quoted field', where)
+    return rows, start
+
+
+def iter_rows(source, encoding: str = 'utf-8-sig', block_size: int = DEFAULT_BLOCK_SIZE,
+              field_size_limit: int = FIELD_SIZE_LIMIT) -> Iterator[List[str]]:
+    """Raw cells of every record in ``source``, header included; blank lines are skipped."""
+    text = ''
+    line = 1                            # physical line of ``text[0]``
+    blocks = _blocks(source, encoding, block_size)
+    eof = False
+    while not eof:
+        block = next(blocks, None)
+        if block is None:
+            eof = True
+        else:
+            text += block
+        # Single-quoted cells never span lines, so stop at the last line end:
+        # a single quote cut off by the block edge would otherwise read as bare.
+        end = len(text) if eof else max(text.rfind('\n'), text.rfind('\r')) + 1
+        rows = None if end else []
+        if end and not _single_quotes(text, end):
+            rows = _scan_csv(text[:end], '"')
+        elif end and text.find('"', 0, end) == -1:
+            rows = _scan_csv(text[:end], "'")
+        if rows is None and end:
+            rows = _scan(text, end, eof)
+        if rows is None:
+            rows, end = _scan_slow(text, end, eof, line)
+        yield from rows
+        if len(text) - end > field_size_limit:
+            where = line + text.count('\n', 0, end)
+            raise CSVError(f'line {where}: record longer than {field_size_limit} characters', where)
+        line += text.count('\n', 0, end)
+        text = text[end:]
+
+
+def read_records(source, types: Optional[Mapping[str, Callable[[str], object]]] = None,
+                 json_columns: Iterable[str] = JSON_COLUMNS, strict: bool = True,
+                 encoding: str = 'utf-8-sig', block_size: int = DEFAULT_BLOCK_SIZE) -> Iterator[tuple]:
+    """One named tuple per data row, fields named after the header.
+
+    JSON columns are decoded, and columns in ``types`` (default
+    :data:`COLUMN_TYPES`) are converted. Empty cells in either become None.
+    A cell that does not convert raises :class:`CSVError` when ``strict``,
+    and becomes None otherwise. Short rows are padded with None; extra cells
+    are dropped. Errors from conversion say ``Row N``, counting the header as
+    row 1 like :mod:`compliance.loader`.
+    """
+    rows = iter_rows(source, encoding, block_size)
+    header = next(rows, None)
+    if header is None:
+        raise CSVError('Empty CSV', 1)
+    header = [h.strip() for h in header]
+    Record = namedtuple('Record', header, rename=True)
+    types = COLUMN_TYPES if types is None else types
+    json_columns = frozenset(json_columns)
+    plan: List[Tuple[int, Callable[[str], object]]] = []
+    for i, column in enumerate(header):
+        if column in json_columns:
+            plan.append((i, json.loads))
+        elif column in types:
+            plan.append((i, types[column]))
+    width = len(header)
+    padding = [None] * width
+    for n, row in enumerate(rows, 2):
+        if len(row) != width:
+            row = (row + padding)[:width]
+        done = 0
+        try:
+            for i, convert in plan:
+                value = row[i]
+                row[i] = convert(value) if value and not value.isspace() else None
+                done += 1
+        except (ValueError, InvalidOperation):
+            i, convert = plan[done]
+            if strict:
+                raise CSVError(f'Row {n}: invalid {header[i]} {row[i]!r}', n) from None
+            row[i] = None
+            for i, convert in plan[done + 1:]:
+                value = row[i]
+                try:
+                    row[i] = convert(value) if value and not value.isspace() else None
+                except (ValueError, InvalidOperation):
+                    row[i] = None
+        yield Record._make(row)
+
+
+def _jsonable(value):
+    if isinstance(value, (date, Decimal)):
+        return str(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serialisable')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Read a template CSV with JSON cells and single-quoted fields.')
+    parser.add_argument('path', help="CSV file, or '-' for stdin")
+    parser.add_argument('--raw', action='store_true', help='print the raw cells, header included, untyped')
+    parser.add_argument('--no-types', action='store_true', help='decode JSON columns only; leave the rest as text')
+    parser.add_argument('--lenient', action='store_true', help='unconvertible cells become null instead of an error')
+    parser.add_argument('--count', action='store_true', help='only print the number of records')
+    parser.add_argument('--head', type=int, help='stop after this many records')
+    args = parser.parse_args(argv)
+
+    source = sys.stdin.buffer if args.path == '-' else args.path
+    try:
+        if args.raw:
+            records: Iterator = iter_rows(source)
+        else:
+            records = (r._asdict() for r in read_records(source, {} if args.no_types else None,
+                                                         strict=not args.lenient))
+        n = 0
+        out = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', newline='\n', write_through=False)
+        for rec in records:
+            if args.head is not None and n >= args.head:
+                break
+            n += 1
+            if not args.count:
+                out.write(json.dumps(rec, default=_jsonable, ensure_ascii=False) + '\n')
+        if args.count:
+            out.write(f'{n}\n')
+        out.flush()
+    except (CSVError, OSError) as exc:
+        parser.exit(2, f'{exc}\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Local SQLite mirror of the D1 database.
+
+D1 is SQLite, and ``wrangler dev`` keeps its state in a plain SQLite file
+under ``.wrangler/state/v3/d1``. Applying ``migrations/*.sql`` in order to
+any SQLite file gives the same schema. Applied migrations are tracked in
+``d1_migrations``, the table wrangler uses, so the toolkit and wrangler
+agree on what has run.
+
+    python -m compliance.db local.sqlite
+"""
+import argparse
+import sqlite3
+from typing import List
+
+from compliance import MIGRATIONS_DIR
+
+_MIGRATIONS_TABLE = """CREATE TABLE IF NOT EXISTS d1_migrations(
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    name       TEXT UNIQUE,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+)"""
+
+
+def connect(path, bulk: bool = False) -> sqlite3.Connection:
+    """Open ``path`` in autocommit mode (transactions are explicit).
+
+    ``bulk=True`` trades durability for load speed: no fsync and an
+    in-memory journal, for rebuildable local mirrors only.
+    """
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute('PRAGMA foreign_keys = OFF')  # D1 default; the Worker never relies on FK enforcement
+    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute('PRAGMA cache_size = -262144')  # 256 MiB
+    if bulk:
+        conn.execute('PRAGMA journal_mode = MEMORY')
+        conn.execute('PRAGMA synchronous = OFF')
+    else:
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+    return conn
+
+
+def pending_migrations(conn: sqlite3.Connection, migrations_dir=MIGRATIONS_DIR) -> List[str]:
+    conn.execute(_MIGRATIONS_TABLE)
+    applied = {name for (name,) in conn.execute('SELECT name FROM d1_migrations')}
+    return [p.name for p in sorted(migrations_dir.glob('*.sql')) if p.name not in applied]
+
+
+def apply_migrations(conn: sqlite3.Connection, migrations_dir=MIGRATIONS_DIR) -> List[str]:
+    """Apply every migration not yet recorded, each in its own transaction."""
+    applied = []
+    for name in pending_migrations(conn, migrations_dir):
+        sql = (migrations_dir / name).read_text(encoding='utf-8')
+        conn.execute('BEGIN')
+        try:
+            # executescript would COMMIT first; run statement by statement instead.
+            for statement in _split_statements(sql):
+                conn.execute(statement)
+            conn.execute('INSERT INTO d1_migrations (name) VALUES (?)', (name,))
+            conn.execute('COMMIT')
+        except sqlite3.Error as exc:
+            conn.execute('ROLLBACK')
+            raise sqlite3.OperationalError(f'{name}: {exc}') from exc
+        applied.append(name)
+    return applied
+
+
+def _split_statements(sql: str) -> List[str]:
+    statements, buf = [], ''
+    for line in sql.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            if buf.strip():
+                statements.append(buf)
+            buf = ''
+    if buf.strip():
+        statements.append(buf)  # trailing comments, or a final statement without ';'
+    return statements
+
+
+def open_mirror(path, bulk: bool = False) -> sqlite3.Connection:
+    """:func:`connect` and bring the schema up to date.
+
+    Report triggers left dropped by a bulk import that died are put back and
+    the summary tables recounted (:func:`compliance.bulkimport.recover_report_triggers`).
+    """
+    conn = connect(path, bulk=bulk)
+    apply_migrations(conn)
+    if conn.execute('SELECT 1 FROM report_triggers_suspended LIMIT 1').fetchone():
+        from compliance.bulkimport import recover_report_triggers
+
+        recover_report_triggers(conn)
+    return conn
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Create or migrate a local SQLite mirror of the D1 schema.')
+    parser.add_argument('db', help='SQLite file (created if missing)')
+    args = parser.parse_args(argv)
+    conn = connect(args.db)
+    applied = apply_migrations(conn)
+    conn.close()
+    print(f'{args.db}: applied {len(applied)} migration(s)' + (': ' + ', '.join(applied) if applied else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,427 @@
+"""Fuzzy vendor deduplication with blocking and a trigram index.
+
+``0006_unique_gstin.sql`` only removes vendors that share a GSTIN. Rows
+imported from ``vendors_import_template.csv`` without one therefore pile up
+as duplicates under slightly different names, and comparing every pair is
+out of the question at 800k vendors. :func:`dedup` only compares vendors
+that share a *block*: the same PAN (the ``pan`` column, or the one inside
+the GSTIN), or the same ``state_code`` and ``pin_code``.
+
+Within a block, candidates come from a trigram inverted index over the
+normalised ``company_name`` and ``legal_name``. Legal suffixes such as Pvt
+and Ltd are dropped, as is "M/S". The index uses prefix filtering: each
+vendor's grams are ordered rarest first, and only as many are indexed as it
+takes for any pair at or above the threshold to share one. So common grams
+("TRA", "ERS") never produce candidates. Each candidate pair is then scored
+exactly:
+
+* the name score is the Jaccard similarity of the two trigram sets;
+* the confidence is the name score, or ``0.5 + 0.5 * name`` for the same PAN;
+* vendors with two different PANs, or two different GSTINs, are never paired.
+
+Pairs at or above ``min_confidence`` are linked into clusters by single
+linkage. A cluster is named after the vendor to keep: its lowest id with a
+GSTIN, else its lowest id. Its confidence is that of its weakest link.
+Results go to ``vendor_duplicate_pairs`` and ``vendor_duplicates``
+(``0017_vendor_dedup.sql``). Nothing is merged. An incremental run compares
+only vendors added since the last run, against the blocks they fall in, and
+grows the stored clusters.
+
+    python -m compliance.dedup local.sqlite run [--incremental] [--min-confidence 0.8]
+    python -m compliance.dedup local.sqlite clusters [--min-confidence 0.9] [--limit 50]
+"""
+import argparse
+import csv
+import re
+import sqlite3
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+_SUFFIXES = frozenset({b'PVT', b'PRIVATE', b'LTD', b'LIMITED', b'LLP', b'PLC', b'CO', b'COMPANY', b'CORP',
+                       b'CORPORATION', b'INC', b'THE'})
+_MS = re.compile(r'^\s*M\s*/\s*S\b\.?')
+_SEPARATORS = bytes(c if 48 <= c <= 57 or 65 <= c <= 90 else 32 for c in range(256))
+_COLUMNS = 'id, company_name, legal_name, gstin, pan, state_code, pin_code'
+
+# Trigram codes: NUL (padding, the company/legal separator) is 0 and ends no
+# gram; then space, digits and letters.
+_ALPHABET = 38
+_GRAM_SPACE = _ALPHABET ** 3
+_CHAR_CODES = np.zeros(256, dtype=np.int64)
+for _k, _c in enumerate(b' 0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ', 1):
+    _CHAR_CODES[_c] = _k
+_CHUNK = 65_536
+
+
+class Pair(NamedTuple):
+    vendor_a: int                   # vendor_a < vendor_b
+    vendor_b: int
+    name_score: float
+    same_pan: bool
+    confidence: float
+
+
+class Cluster(NamedTuple):
+    cluster_id: int                 # the vendor to keep
+    confidence: float
+    members: List[Tuple[int, str]]  # (vendor_id, company_name), cluster_id first
+
+
+class DedupRun(NamedTuple):
+    run_id: int
+    mode: str                       # 'full' or 'incremental'
+    vendors: int                    # vendors loaded: the new ones and their block-mates
+    probed: int                     # vendors looked up in the index
+    candidates: int                 # pairs scored exactly
+    pairs: int                      # pairs at or above min_confidence
+    clusters: int                   # clusters written
+    seconds: float
+
+
+def _name_key(name: Optional[str]) -> bytes:
+    if not name:
+        return b''
+    if '/' in name[:6]:
+        name = _MS.sub('', name.upper())
+    words = name.upper().replace('&', ' AND ').encode('ascii', 'replace').translate(_SEPARATORS).split()
+    return b' '.join([w for w in words if w not in _SUFFIXES])
+
+
+def normalise_name(name: Optional[str]) -> str:
+    """Upper case, "M/S" and legal suffixes dropped, punctuation to single spaces."""
+    return _name_key(name).decode('ascii')
+
+
+def trigrams(name: str) -> Set[str]:
+    padded = f' {name} '
+    return {padded[k:k + 3] for k in range(len(padded) - 2)} if name else set()
+
+
+def _pan(pan: Optional[str], gstin: str) -> str:
+    pan = (pan or '').strip().upper()
+    return pan or (gstin[2:12] if len(gstin) == 15 else '')
+
+
+def _check(min_confidence: float):
+    if not 0.5 < min_confidence <= 1:
+        raise ValueError('min_confidence must be above 0.5 and at most 1')
+
+
+def _expand(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """``concatenate([arange(s, s + c) for s, c in zip(starts, counts)])`` without the loop."""
+    total = int(counts.sum())
+    if not total:
+        return np.zeros(0, dtype=np.int64)
+    ends = np.cumsum(counts)
+    return np.repeat(starts - (ends - counts), counts) + np.arange(total)
+
+
+def _distinct(a: np.ndarray) -> np.ndarray:
+    """Sorted distinct values; faster than ``np.unique`` on large int64 arrays."""
+    a = np.sort(a)
+    return a[np.r_[True, a[1:] != a[:-1]]] if len(a) else a
+
+
+def _factorize(values: List[str]) -> np.ndarray:
+    """Dense ids for ``values``; -1 for ''."""
+    if not values:
+        return np.zeros(0, dtype=np.int64)
+    distinct, ids = np.unique(np.asarray(values), return_inverse=True)
+    ids = ids.astype(np.int64).ravel()
+    return ids - 1 if distinct[0] == '' else ids
+
+
+def _gram_codes(names: List[bytes]) -> np.ndarray:
+    """Sorted, distinct ``row * _GRAM_SPACE + gram`` keys for padded, NUL-separated names."""
+    out = []
+    for lo in range(0, len(names), _CHUNK):
+        chunk = names[lo:lo + _CHUNK]
+        width = max(3, max(map(len, chunk), default=0))
+        mat = _CHAR_CODES[np.asarray(chunk, dtype=f'S{width}').view(np.uint8).reshape(len(chunk), width)]
+        a, b, c = mat[:, :-2], mat[:, 1:-1], mat[:, 2:]
+        codes = (a * _ALPHABET + b) * _ALPHABET + c
+        rows = np.arange(lo, lo + len(chunk), dtype=np.int64)[:, None]
+        out.append(_distinct((rows * _GRAM_SPACE + codes)[(a > 0) & (b > 0) & (c > 0)]))
+    return np.concatenate(out) if out else np.zeros(0, dtype=np.int64)
+
+
+def find_pairs(vendors: Sequence[tuple], min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+               new_from: int = 0) -> Tuple[List[Pair], int]:
+    """Pairs at or above ``min_confidence`` among ``vendors`` rows, and the number scored.
+
+    Rows are ``(id, company_name, legal_name, gstin, pan, state_code,
+    pin_code)``. Only pairs with at least one row at position ``new_from``
+    or later are looked for; earlier rows are only indexed. Same-PAN blocks
+    are indexed for a name score of ``2 * min_confidence - 1`` (their
+    confidence starts at 0.5), place blocks for ``min_confidence``.
+
+    The index is a sorted array of ``(block, gram, row)`` postings. Vendors
+    sharing a posting key are candidates, and the trigram sets of all
+    candidates are intersected together, by sorting.
+    """
+    _check(min_confidence)
+    n = len(vendors)
+    names: List[bytes] = []
+    for row in vendors:
+        company, legal = _name_key(row[1]), _name_key(row[2])
+        padded = b' ' + company + b' ' if company else b''
+        if legal and legal != company:
+            padded += b'\0 ' + legal + b' '
+        names.append(padded)
+    gstin_col = [(row[3] or '').strip().upper() for row in vendors]
+    gstins = _factorize(gstin_col)
+    pans = _factorize([_pan(row[4], gstin) for row, gstin in zip(vendors, gstin_col)])
+    places = _factorize([f'{s}|{p}' if s and p else '' for s, p in
+                         (((row[5] or '').strip(), (row[6] or '').strip()) for row in vendors)])
+    del gstin_col
+    # Same-PAN blocks, then place blocks numbered after them.
+    blocks = np.stack((pans, np.where(places >= 0, places + pans.max(initial=-1) + 1, -1)))
+
+    # Each row's grams, ranked rarest first and sorted by (row, rank).
+    keys = _gram_codes(names)
+    del names
+    rows, codes = np.divmod(keys, _GRAM_SPACE)
+    df = np.bincount(codes, minlength=_GRAM_SPACE)
+    rank = np.empty(_GRAM_SPACE, dtype=np.int64)
+    rank[np.lexsort((np.arange(_GRAM_SPACE), df))] = np.arange(_GRAM_SPACE)
+    keys = rows * _GRAM_SPACE + rank[codes]
+    keys.sort()
+    rows, ranks = np.divmod(keys, _GRAM_SPACE)
+    del keys, codes, df
+    lengths = np.bincount(rows, minlength=n)
+    starts = np.cumsum(lengths) - lengths
+    position = np.arange(len(rows)) - starts[rows]
+
+    # Postings for the first few grams of each row, per block.
+    posting_keys, posting_rows = [], []
+    for kind, threshold in enumerate((2 * min_confidence - 1, min_confidence)):
+        prefix = lengths - np.ceil(threshold * lengths - 1e-9).astype(np.int64) + 1
+        block = blocks[kind, rows]
+        keep = (position < prefix[rows]) & (block >= 0)
+        posting_keys.append(block[keep] * _GRAM_SPACE + ranks[keep])
+        posting_rows.append(rows[keep])
+    posting_keys, posting_rows = np.concatenate(posting_keys), np.concatenate(posting_rows)
+    order = np.lexsort((posting_rows, posting_keys))
+    posting_keys, posting_rows = posting_keys[order], posting_rows[order]
+    del order, blocks, position
+
+    # Every posting pairs with the earlier ones under the same key.
+    first = np.r_[True, posting_keys[1:] != posting_keys[:-1]] if len(posting_keys) else np.zeros(0, dtype=bool)
+    group_start = np.maximum.accumulate(np.where(first, np.arange(len(posting_keys)), 0))
+    earlier = np.arange(len(posting_keys)) - group_start
+    earlier[posting_rows < new_from] = 0
+    later = np.flatnonzero(earlier)
+    u = posting_rows[_expand(group_start[later], earlier[later])]
+    v = posting_rows[np.repeat(later, earlier[later])]
+    pair_codes = _distinct(u * n + v)
+    candidates = len(pair_codes)
+    u, v = np.divmod(pair_codes, n)
+    del posting_keys, posting_rows, first, group_start, earlier, later, pair_codes
+
+    ok = ~(((pans[u] >= 0) & (pans[v] >= 0) & (pans[u] != pans[v]))
+           | ((gstins[u] >= 0) & (gstins[v] >= 0) & (gstins[u] != gstins[v])))
+    u, v = u[ok], v[ok]
+    same_pan = (pans[u] >= 0) & (pans[u] == pans[v])
+
+    # Shared grams per candidate: both rows' grams keyed by candidate, sorted,
+    # and equal neighbours counted.
+    shared = np.zeros(len(u), dtype=np.int64)
+    for lo in range(0, len(u), _CHUNK):
+        cu, cv = u[lo:lo + _CHUNK], v[lo:lo + _CHUNK]
+        pair = np.arange(len(cu), dtype=np.int64)
+        merged = np.concatenate((np.repeat(pair, lengths[cu]) * _GRAM_SPACE + ranks[_expand(starts[cu], lengths[cu])],
+                                 np.repeat(pair, lengths[cv]) * _GRAM_SPACE + ranks[_expand(starts[cv], lengths[cv])]))
+        merged.sort()
+        dup = merged[1:][merged[1:] == merged[:-1]]
+        shared[lo:lo + _CHUNK] = np.bincount(dup // _GRAM_SPACE, minlength=len(cu))
+    union = lengths[u] + lengths[v] - shared
+    name = np.divide(shared, union, out=np.zeros(len(u)), where=union > 0)
+    confidence = np.where(same_pan, 0.5 + 0.5 * name, name)
+    hit = np.flatnonzero(confidence >= min_confidence)
+    ids = [r[0] for r in vendors]
+    pairs = []
+    for k in hit.tolist():
+        a, b = sorted((ids[u[k]], ids[v[k]]))
+        pairs.append(Pair(a, b, round(float(name[k]), 4), bool(same_pan[k]), round(float(confidence[k]), 4)))
+    return pairs, candidates
+
+
+class _Clusters:
+    """Union-find over vendor ids that tracks each cluster's weakest link."""
+
+    __slots__ = ('parent', 'weakest')
+
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+        self.weakest: Dict[int, float] = {}
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int, confidence: float):
+        ra, rb = self.find(a), self.find(b)
+        weakest = min(confidence, self.weakest.get(ra, 1.0), self.weakest.get(rb, 1.0))
+        if ra != rb:
+            self.parent[rb] = ra
+            self.weakest.pop(rb, None)
+        self.weakest[ra] = weakest
+
+    def groups(self) -> Dict[int, List[int]]:
+        out: Dict[int, List[int]] = {}
+        for x in self.parent:
+            out.setdefault(self.find(x), []).append(x)
+        return out
+
+
+def _load(conn: sqlite3.Connection, last_id: Optional[int]) -> Tuple[List[tuple], int]:
+    """Vendors to compare and the position of the first new one; all of them when ``last_id`` is None."""
+    if last_id is None:
+        return conn.execute(f'SELECT {_COLUMNS} FROM vendors ORDER BY id').fetchall(), 0
+    new = conn.execute(f'SELECT {_COLUMNS} FROM vendors WHERE id > ? ORDER BY id', (last_id,)).fetchall()
+    if not new:
+        return [], 0
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS dedup_pans (pan TEXT PRIMARY KEY)')
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS dedup_places (state_code TEXT, pin_code TEXT, '
+                 'PRIMARY KEY (state_code, pin_code))')
+    conn.execute('DELETE FROM temp.dedup_pans')
+    conn.execute('DELETE FROM temp.dedup_places')
+    conn.executemany('INSERT OR IGNORE INTO temp.dedup_pans VALUES (?)',
+                     {(p,) for p in (_pan(r[4], (r[3] or '').strip().upper()) for r in new) if p})
+    conn.executemany('INSERT OR IGNORE INTO temp.dedup_places VALUES (?, ?)',
+                     {(r[5].strip(), r[6].strip()) for r in new if (r[5] or '').strip() and (r[6] or '').strip()})
+    old = conn.execute(f'SELECT {_COLUMNS} FROM vendors WHERE id <= ? AND ('
+                       f'pan IN (SELECT pan FROM temp.dedup_pans) '
+                       f'OR substr(gstin, 3, 10) IN (SELECT pan FROM temp.dedup_pans) '
+                       f'OR (state_code, pin_code) IN (SELECT state_code, pin_code FROM temp.dedup_places)) '
+                       f'ORDER BY id', (last_id,)).fetchall()
+    return old + new, len(old)
+
+
+def dedup(conn: sqlite3.Connection, incremental: bool = False,
+          min_confidence: float = DEFAULT_MIN_CONFIDENCE) -> DedupRun:
+    """Find duplicate vendors and store pairs and clusters.
+
+    With ``incremental``, only vendors added since the last run are
+    compared (with each other and with the vendors in their blocks). Their
+    pairs are merged into the stored clusters. It falls back to a full run
+    when there is no earlier run or it used a different ``min_confidence``.
+    """
+    _check(min_confidence)
+    t0 = time.perf_counter()
+    conn.execute('BEGIN')
+    try:
+        last = conn.execute('SELECT last_vendor_id, min_confidence FROM dedup_runs ORDER BY id DESC LIMIT 1'
+                            ).fetchone()
+        incremental = incremental and last is not None and last[1] == min_confidence
+        top = conn.execute('SELECT COALESCE(MAX(id), 0) FROM vendors').fetchone()[0]
+        rows, new_from = _load(conn, last[0] if incremental else None)
+    finally:
+        conn.execute('ROLLBACK')
+    pairs, candidates = find_pairs(rows, min_confidence, new_from)
+    has_gstin = {r[0]: bool((r[3] or '').strip()) for r in rows}
+    loaded = len(rows)
+    del rows
+
+    clusters = _Clusters()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        run_id = conn.execute("INSERT INTO dedup_runs (mode, last_vendor_id, min_confidence, vendors, candidates, "
+                              "pairs, clusters) VALUES (?, ?, ?, 0, 0, 0, 0)",
+                              ('incremental' if incremental else 'full', top, min_confidence)).lastrowid
+        if incremental:
+            touched = {v for p in pairs for v in p[:2]}
+            stored = conn.execute('SELECT vendor_id, cluster_id, confidence FROM vendor_duplicates WHERE cluster_id '
+                                  'IN (SELECT cluster_id FROM vendor_duplicates WHERE vendor_id IN (%s))'
+                                  % ','.join(map(str, touched))).fetchall() if touched else []
+            for vendor_id, cluster_id, confidence in stored:
+                clusters.union(cluster_id, vendor_id, confidence)
+            missing = [v for v, _, _ in stored if v not in has_gstin]
+            for k in range(0, len(missing), 500):
+                chunk = missing[k:k + 500]
+                has_gstin.update(conn.execute("SELECT id, COALESCE(TRIM(gstin), '') <> '' FROM vendors "
+                                              "WHERE id IN (%s)" % ','.join(map(str, chunk))))
+            conn.executemany('DELETE FROM vendor_duplicates WHERE vendor_id = ?', ((v,) for v, _, _ in stored))
+        else:
+            conn.execute('DELETE FROM vendor_duplicates')
+            conn.execute('DELETE FROM vendor_duplicate_pairs')
+        for p in pairs:
+            clusters.union(p.vendor_a, p.vendor_b, p.confidence)
+        members = []
+        groups = clusters.groups()
+        for root, ids in groups.items():
+            keep = min(ids, key=lambda v: (not has_gstin.get(v), v))
+            members.extend((v, keep, clusters.weakest[root], run_id) for v in ids)
+        conn.executemany('INSERT OR REPLACE INTO vendor_duplicate_pairs (vendor_a, vendor_b, name_score, same_pan, '
+                         f'confidence, run_id) VALUES (?, ?, ?, ?, ?, {run_id})', pairs)
+        conn.executemany('INSERT INTO vendor_duplicates (vendor_id, cluster_id, confidence, run_id) '
+                         'VALUES (?, ?, ?, ?)', members)
+        conn.execute('UPDATE dedup_runs SET vendors = ?, candidates = ?, pairs = ?, clusters = ? WHERE id = ?',
+                     (loaded, candidates, len(pairs), len(groups), run_id))
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return DedupRun(run_id, 'incremental' if incremental else 'full', loaded, loaded - new_from, candidates,
+                    len(pairs), len(groups), time.perf_counter() - t0)
+
+
+def duplicate_clusters(conn: sqlite3.Connection, min_confidence: float = 0.0,
+                       limit: Optional[int] = None) -> List[Cluster]:
+    """Stored clusters, most confident first."""
+    sql = ('SELECT d.cluster_id, d.confidence, d.vendor_id, v.company_name FROM vendor_duplicates d '
+           'LEFT JOIN vendors v ON v.id = d.vendor_id WHERE d.confidence >= ? '
+           'ORDER BY d.confidence DESC, d.cluster_id, d.vendor_id <> d.cluster_id, d.vendor_id')
+    out: List[Cluster] = []
+    for cluster_id, confidence, vendor_id, name in conn.execute(sql, (min_confidence,)):
+        if not out or out[-1].cluster_id != cluster_id:
+            if limit is not None and len(out) == limit:
+                break
+            out.append(Cluster(cluster_id, confidence, []))
+        out[-1].members.append((vendor_id, name))
+    return out
+
+
+def main(argv=None):
+    from compliance import db
+
+    parser = argparse.ArgumentParser(description='Find likely duplicate vendors.')
+    parser.add_argument('db', help='SQLite mirror of the D1 database')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('run', help='score vendor pairs and store the clusters')
+    p.add_argument('--incremental', action='store_true', help='only vendors added since the last run')
+    p.add_argument('--min-confidence', type=float, default=DEFAULT_MIN_CONFIDENCE,
+                   help='above 0.5, at most 1 (default: %(default)s)')
+    p = sub.add_parser('clusters', help='stored clusters, most confident first')
+    p.add_argument('--min-confidence', type=float, default=0.0)
+    p.add_argument('--limit', type=int)
+    args = parser.parse_args(argv)
+
+    conn = db.open_mirror(args.db)
+    if args.command == 'run':
+        try:
+            run = dedup(conn, args.incremental, args.min_confidence)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f'{run.mode}: {run.vendors:,} vendor(s) loaded, {run.probed:,} probed, '
+              f'{run.candidates:,} candidate pair(s), {run.pairs:,} above {args.min_confidence}, '
+              f'{run.clusters:,} cluster(s) in {run.seconds:.2f}s')
+    else:
+        out = csv.writer(sys.stdout, lineterminator='\n')
+        out.writerow(('cluster_id', 'confidence', 'vendor_id', 'company_name'))
+        for c in duplicate_clusters(conn, args.min_confidence, args.limit):
+            out.writerows((c.cluster_id, f'{c.confidence:.3f}', vendor_id, name) for vendor_id, name in c.members)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""Streaming exports from the SQLite mirror: CSV (optionally gzipped), Parquet, Arrow IPC.
+
+The Worker's ``/api/*/export.csv`` handlers call ``.all()``, build one
+string per row and ``join('\\n')`` the lot, so memory grows with the table.
+Here a cursor is read ``chunk_size`` rows at a time with ``fetchmany`` and
+each chunk is written out before the next is fetched. Peak memory is one
+chunk whatever the row count.
+
+CSV output matches the Worker byte for byte: same columns and order, values
+quoted only when they contain ``"``, ``,`` or a newline, ``\\n`` between rows
+and none after the last, and whole-number REAL values without ``.0``.
+Parquet and Arrow IPC (``pyarrow``, optional) get one row group / record
+batch per chunk, typed from the column affinities.
+
+    python -m compliance.export local.sqlite invoices -o invoices.csv.gz
+    python -m compliance.export local.sqlite vendors --status approved -o vendors.parquet
+"""
+import argparse
+import gzip
+import io
+import sqlite3
+import sys
+from datetime import date
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from compliance.search import search_clause
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+VENDOR_STATUSES = frozenset({'pending', 'approved', 'rejected', 'suspended'})
+STATUS_ALIASES = {'active': 'approved', 'inactive': 'suspended'}
+
+FORMATS = ('csv', 'csv.gz', 'parquet', 'arrow')
+
+
+class ExportSpec(NamedTuple):
+    table: str
+    columns: Tuple[str, ...]
+    filename: str            # Worker's Content-Disposition prefix; the date is appended
+
+
+EXPORTS: Dict[str, ExportSpec] = {
+    'vendors': ExportSpec('vendors', ('id', 'company_name', 'legal_name', 'gstin', 'pan', 'state', 'state_code',
+                                      'pin_code', 'business_type', 'status', 'rating', 'created_at'),
+                          'vendors_export'),
+    'pos': ExportSpec('purchase_orders', ('id', 'vendor_id', 'po_number', 'amount', 'status', 'created_at'), 'pos'),
+    'invoices': ExportSpec('invoices', ('id', 'vendor_id', 'invoice_number', 'amount', 'status', 'due_date',
+                                        'created_at'), 'invoices'),
+    'dcs': ExportSpec('delivery_challans', ('id', 'vendor_id', 'dc_number', 'status', 'created_at'), 'dcs'),
+    'instruments': ExportSpec('financial_instruments', ('id', 'type_id', 'title', 'reference_no', 'vendor_id',
+                                                        'amount', 'currency', 'status', 'issue_date', 'expiry_date',
+                                                        'document_url', 'created_at'), 'instruments'),
+    'payments': ExportSpec('payments', ('id', 'vendor_id', 'invoice_ref', 'amount', 'status', 'proof_url',
+                                        'created_at'), 'payments'),
+}
+
+
+def column_types(conn: sqlite3.Connection, table: str) -> Dict[str, str]:
+    """Declared type affinity per column: ``'integer'``, ``'real'`` or ``'text'``."""
+    out = {}
+    for _, name, decl, *_ in conn.execute(f'PRAGMA table_info({table})'):
+        decl = (decl or '').upper()
+        out[name] = 'integer' if 'INT' in decl else 'real' if any(t in decl for t in ('REAL', 'FLOA', 'DOUB')) \
+            else 'text'
+    return out
+
+
+def export_query(conn: sqlite3.Connection, entity: str, status: Optional[str] = None,
+                 search: Optional[str] = None, js_numbers: bool = False) -> Tuple[str, list]:
+    """The Worker's ``SELECT ... ORDER BY created_at DESC`` with its vendor filters.
+
+    ``js_numbers`` renders whole REAL values as integers in SQL, the way
+    JavaScript's ``String(25000)`` prints them.
+    """
+    spec = EXPORTS[entity]
+    types = column_types(conn, spec.table)
+    cols = []
+    for c in spec.columns:
+        if js_numbers and types.get(c) == 'real':
+            cols.append(f'CASE WHEN {c} = CAST({c} AS INTEGER) THEN CAST({c} AS INTEGER) ELSE {c} END')
+        else:
+            cols.append(c)
+    where, params = [], []
+    if search:
+        if entity != 'vendors':
+            raise ValueError('search is only supported for vendors')
+        clause, args = search_clause(search)
+        if clause:
+            where.append(clause)
+            params += args
+    if status:
+        if entity == 'vendors':
+            status = STATUS_ALIASES.get(status.strip().lower(), status.strip().lower())
+            if status not in VENDOR_STATUSES:
+                raise ValueError(f'Invalid status filter. Allowed: {", ".join(sorted(VENDOR_STATUSES))}')
+        where.append('status = ?')
+        params.append(status)
+    where_sql = f' WHERE {" AND ".join(where)}' if where else ''
+    return f'SELECT {", ".join(cols)} FROM {spec.table}{where_sql} ORDER BY created_at DESC', params
+
+
+def iter_chunks(conn: sqlite3.Connection, sql: str, params: Sequence = (),
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[tuple]]:
+    """Step the statement ``chunk_size`` rows at a time; only one chunk is alive."""
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.close()
+
+
+def _cell(value) -> str:
+    """The Worker's ``esc()``: quoted on ``"``, ``,`` and ``\\n`` only, not on csv.writer's dialect rules."""
+    if value is None:
+        return ''
+    text = str(value)
+    if '"' in text or ',' in text or '\n' in text:
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def write_csv(chunks: Iterator[List[tuple]], columns: Sequence[str], out) -> int:
+    """Write Worker-format CSV to the text stream ``out``; returns the row count."""
+    out.write(','.join(columns))
+    count = 0
+    for rows in chunks:
+        # Rows are separated, not terminated: emit the separator in front.
+        out.write('\n')
+        out.write('\n'.join([','.join([_cell(v) for v in row]) for row in rows]))
+        count += len(rows)
+    return count
+
+
+def _arrow_schema(pa, columns: Sequence[str], types: Dict[str, str]):
+    mapping = {'integer': pa.int64(), 'real': pa.float64(), 'text': pa.string()}
+    return pa.schema([(c, mapping[types.get(c, 'text')]) for c in columns])
+
+
+def _column(pa, values, field):
+    try:
+        return pa.array(values, type=field.type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if field.type != pa.string():
+            raise
+        # SQLite typing is per value: a TEXT column may still hold the odd integer.
+        return pa.array([None if v is None else str(v) for v in values], type=field.type)
+
+
+def _batches(pa, schema, chunks: Iterator[List[tuple]]):
+    for rows in chunks:
+        columns = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays([_column(pa, col, field) for col, field in zip(columns, schema)],
+                                         schema=schema)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError('Parquet/Arrow export needs pyarrow (pip install pyarrow)') from None
+    return pyarrow
+
+
+def write_parquet(chunks, columns: Sequence[str], types: Dict[str, str], path, compression: str = 'zstd') -> int:
+    pa = _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(pa, columns, types)
+    count = 0
+    with pq.ParquetWriter(str(path), schema, compression=compression) as writer:
+        for batch in _batches(pa, schema, chunks):
+            writer.write_batch(batch)
+            count += batch.num_rows
+        if not count:
+            writer.write_table(schema.empty_table())
+    return count
+
+
+def write_arrow(chunks, columns: Sequence[str], types: Dict[str, str], path) -> int:
+    pa = _require_pyarrow()
+    schema = _arrow_schema(pa, columns, types)
+    count = 0
+    with pa.OSFile(str(path), 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in _batches(pa, schema, chunks):
+            writer.write_batch(batch)
+            count += batch.num_rows
+    return count
+
+
+def format_for_path(path: str) -> str:
+    name = str(path).lower()
+    if name.endswith('.csv.gz') or name.endswith('.gz'):
+        return 'csv.gz'
+    if name.endswith('.parquet'):
+        return 'parquet'
+    if name.endswith(('.arrow', '.feather', '.ipc')):
+        return 'arrow'
+    return 'csv'
+
+
+def export(conn: sqlite3.Connection, entity: str, path, fmt: Optional[str] = None, status: Optional[str] = None,
+           search: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Export ``entity`` to ``path`` (``'-'`` for CSV on stdout); returns the row count."""
+    fmt = fmt or format_for_path(path)
+    if fmt not in FORMATS:
+        raise ValueError(f'unknown format {fmt!r}; choose from {", ".join(FORMATS)}')
+    spec = EXPORTS[entity]
+    sql, params = export_query(conn, entity, status, search, js_numbers=fmt in ('csv', 'csv.gz'))
+    chunks = iter_chunks(conn, sql, params, chunk_size)
+    if fmt == 'csv':
+        if str(path) == '-':
+            return write_csv(chunks, spec.columns, sys.stdout)
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            return write_csv(chunks, spec.columns, f)
+    if fmt == 'csv.gz':
+        # mtime=0 keeps the archive byte-identical across runs.
+        with open(path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as gz, \
+                io.TextIOWrapper(gz, encoding='utf-8', newline='') as f:
+            return write_csv(chunks, spec.columns, f)
+    types = column_types(conn, spec.table)
+    if fmt == 'parquet':
+        return write_parquet(chunks, spec.columns, types, path)
+    return write_arrow(chunks, spec.columns, types, path)
+
+
+def default_filename(entity: str, fmt: str = 'csv', today: Optional[date] = None) -> str:
+    """The Worker's download name, e.g. ``invoices_2025-10-01.csv``."""
+    suffix = {'csv': '.csv', 'csv.gz': '.csv.gz', 'parquet': '.parquet', 'arrow': '.arrow'}[fmt]
+    return f'{EXPORTS[entity].filename}_{(today or date.today()).isoformat()}{suffix}'
+
+
+def main(argv=None):
+    from compliance import db
+
+    parser = argparse.ArgumentParser(description='Stream an export from the SQLite mirror.')
+    parser.add_argument('db', help='SQLite mirror of the D1 database')
+    parser.add_argument('entity', choices=sorted(EXPORTS))
+    parser.add_argument('-o', '--output', help="file, or '-' for CSV on stdout (default: the Worker's file name)")
+    parser.add_argument('--format', choices=FORMATS, help='default: from the output suffix')
+    parser.add_argument('--status')
+    parser.add_argument('--search', help='vendors only: name, GSTIN or PAN word prefixes')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    output = args.output or default_filename(args.entity, args.format or 'csv')
+    conn = db.connect(args.db)
+    try:
+        count = export(conn, args.entity, output, args.format, args.status, args.search, args.chunk_size)
+    except (ValueError, RuntimeError) as exc:
+        parser.exit(2, f'{exc}\n')
+    finally:
+        conn.close()
+    if output != '-':
+        print(f'{output}: {count} rows', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
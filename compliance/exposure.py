@@ -0,0 +1,436 @@
+"""Instrument exposure and expiry index: Fenwick ledgers over issue and expiry days.
+
+``financial_instruments`` keeps ``issue_date``/``expiry_date`` as TEXT and is
+indexed only on status and type. So "BG exposure on 31 March" and "what
+expires in the next 30 days" are full scans with string date comparisons,
+and treasury asks them all day. :meth:`ExposureIndex.load` reads the
+instruments in force once and parses each date once. It then builds two
+structures:
+
+* a ledger per (vendor, type), per vendor, per type and for the whole book.
+  Each ledger is a sorted axis of the days on which an instrument was issued
+  or expires. Over that axis sit Fenwick trees of the count and amount
+  issued and expiring up to each day. An instrument is in force from its
+  issue date through its expiry date, both inclusive. So exposure on D is
+  what was issued by D less what expired before D, and the amount expiring
+  in a window is one difference of prefix sums. Each costs O(log k) in the
+  ledger's k distinct days, whatever the number of instruments;
+* the instruments sorted by expiry day, for listing what expires in a
+  window: a binary search, then one pass over the k hits.
+
+:meth:`~ExposureIndex.add` and :meth:`~ExposureIndex.remove` keep both
+current after a write, at O(log k) per ledger. A day new to a ledger
+re-encodes that ledger's trees, which is linear in its days, not in its
+instruments. Changed instruments sit in a small overlay next to the sorted
+array until there are enough of them to merge.
+:meth:`~ExposureIndex.refresh` re-reads given ids from the mirror.
+
+Instruments with no parseable expiry date (payments through RTGS/NEFT
+usually have none) hold no exposure and are skipped, as are those expiring
+before they were issued. A missing issue date counts as issued from the
+start. Amounts are integer paise.
+
+    python -m compliance.exposure local.sqlite exposure --on 2026-03-31 [--type "Bank Guarantee"]
+    python -m compliance.exposure local.sqlite expiring --days 30 [--from 2026-01-01] [--vendor-id 12]
+    python -m compliance.exposure local.sqlite ladder --months 12 [--type "Bank Guarantee"]
+"""
+import argparse
+import sqlite3
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+IN_FORCE = ('active',)
+COMPACT_AT = 4096          # overlay size that triggers a merge, at the least
+
+_EVER = 1                  # date.min: the issue day of instruments without one
+
+# Issued count, issued amount, expiring count, expiring amount.
+_COLUMNS = 4
+
+Record = Tuple[int, int, int, int, int]    # vendor_id, type_id, issue day, expiry day, amount_paise
+
+
+class Exposure(NamedTuple):
+    instruments: int
+    amount_paise: int
+
+
+class Expiring(NamedTuple):
+    id: int
+    vendor_id: int
+    type_id: int
+    expiry_date: date
+    amount_paise: int
+
+
+class LadderRow(NamedTuple):
+    until: date                   # the bucket ends on this day
+    expiring: Exposure            # expiring within the bucket
+    in_force: Exposure            # exposure on ``until``
+
+
+def _day(value) -> Optional[int]:
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def _prefix(tree: List[int], n: int) -> int:
+    """Sum of the first ``n`` raw values of a Fenwick tree."""
+    total = 0
+    while n > 0:
+        total += tree[n - 1]
+        n &= n - 1
+    return total
+
+
+def _add(tree: List[int], i: int, value: int):
+    n = len(tree)
+    while i < n:
+        tree[i] += value
+        i |= i + 1
+
+
+def _encode(raw: List[int]) -> List[int]:
+    tree = list(raw)
+    n = len(tree)
+    for i in range(n):
+        j = i | (i + 1)
+        if j < n:
+            tree[j] += tree[i]
+    return tree
+
+
+def _decode(tree: List[int]) -> List[int]:
+    raw = list(tree)
+    n = len(raw)
+    for i in range(n - 1, -1, -1):
+        j = i | (i + 1)
+        if j < n:
+            raw[j] -= raw[i]
+    return raw
+
+
+class _Ledger:
+    """Fenwick trees of issued/expiring count and amount over one key's event days."""
+
+    __slots__ = ('days', 'trees')
+
+    def __init__(self, days: List[int], trees: List[List[int]]):
+        self.days = days
+        self.trees = trees      # one per _COLUMNS entry
+
+    def add(self, day: int, column: int, count: int, amount: int):
+        days = self.days
+        i = bisect_left(days, day)
+        if i == len(days) or days[i] != day:
+            raws = [_decode(t) for t in self.trees]
+            days.insert(i, day)
+            for raw in raws:
+                raw.insert(i, 0)
+            self.trees = [_encode(raw) for raw in raws]
+        _add(self.trees[column], i, count)
+        _add(self.trees[column + 1], i, amount)
+
+    def through(self, day: int, column: int) -> Exposure:
+        """Count and amount of the column's events on or before ``day``."""
+        n = bisect_right(self.days, day)
+        return Exposure(_prefix(self.trees[column], n), _prefix(self.trees[column + 1], n))
+
+    def in_force(self, day: int) -> Exposure:
+        issued, expired = self.through(day, 0), self.through(day - 1, 2)
+        return Exposure(issued[0] - expired[0], issued[1] - expired[1])
+
+    def expiring(self, first: int, last: int) -> Exposure:
+        upto, before = self.through(last, 2), self.through(first - 1, 2)
+        return Exposure(upto[0] - before[0], upto[1] - before[1])
+
+
+def _ledger_keys(vendor_id: int, type_id: int) -> Tuple[tuple, ...]:
+    return (vendor_id, type_id), (vendor_id, None), (None, type_id), (None, None)
+
+
+def _build_ledgers(vendor, type_, issue, expiry, amount) -> Dict[tuple, _Ledger]:
+    """All four levels of ledgers from column arrays, with the trees built in vectorised passes."""
+    ledgers = {}
+    n = len(vendor)
+    if not n:
+        return ledgers
+    ones, zeros = np.ones(n, np.int64), np.zeros(n, np.int64)
+    day = np.concatenate([issue, expiry])
+    values = np.stack([np.concatenate(c) for c in ((ones, zeros), (amount, zeros), (zeros, ones), (zeros, amount))],
+                      axis=1)
+    width = int(type_.max()) + 2
+    for kv, kt in ((vendor, type_), (vendor, None), (None, type_), (None, None)):
+        code = np.zeros(n, np.int64)
+        if kv is not None:
+            code += (kv + 1) * width
+        if kt is not None:
+            code += kt + 1
+        code = np.concatenate([code, code])
+        order = np.lexsort((day, code))
+        c, d = code[order], day[order]
+        first = np.flatnonzero(np.r_[True, (c[1:] != c[:-1]) | (d[1:] != d[:-1])])
+        c, d = c[first], d[first]
+        raw = np.add.reduceat(values[order], first, axis=0)
+        starts = np.flatnonzero(np.r_[True, c[1:] != c[:-1]])
+        # Fenwick node j (1-based within its key) holds the sum of the lowbit(j) raw values ending at j.
+        end = np.arange(1, len(c) + 1)
+        local = end - np.repeat(starts, np.diff(np.r_[starts, len(c)]))
+        cum = np.vstack([np.zeros((1, _COLUMNS), np.int64), np.cumsum(raw, axis=0)])
+        trees = (cum[end] - cum[end - (local & -local)]).T.tolist()
+        days, bounds = d.tolist(), np.r_[starts, len(c)].tolist()
+        for k, code_value in enumerate(c[starts].tolist()):
+            lo, hi = bounds[k], bounds[k + 1]
+            v, t = divmod(code_value, width)
+            key = (v - 1 if kv is not None else None, t - 1 if kt is not None else None)
+            ledgers[key] = _Ledger(days[lo:hi], [tree[lo:hi] for tree in trees])
+    return ledgers
+
+
+class ExposureIndex:
+    """In-force instruments by vendor, type, issue day and expiry day."""
+
+    def __init__(self):
+        self._ledgers: Dict[tuple, _Ledger] = {}
+        empty = np.zeros(0, np.int64)
+        self._set_base(empty, empty, empty, empty, empty, empty)
+        self.skipped = 0
+
+    def __len__(self):
+        return self._live
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection, statuses: Sequence[str] = IN_FORCE) -> 'ExposureIndex':
+        """Batch-load every instrument with one of ``statuses`` from the mirror."""
+        index = cls()
+        index.add_many(_select(conn, statuses))
+        return index
+
+    def add_many(self, rows: Iterable[tuple]):
+        """Bulk-load ``(id, vendor_id, type_id, amount_paise, issue_date, expiry_date)`` rows.
+
+        Rebuilds every structure in vectorised passes. Instruments already
+        indexed stay, unless a row replaces them.
+        """
+        records = dict(self._records())
+        days: Dict[object, Optional[int]] = {}
+        for instrument_id, vendor_id, type_id, amount, issued, expires in rows:
+            for text in (issued, expires):
+                if text not in days:
+                    days[text] = _day(text) if text else None
+            rec = self._record(vendor_id, type_id, amount, days[issued], days[expires])
+            if rec is None:
+                records.pop(instrument_id, None)
+            else:
+                records[instrument_id] = rec
+        self._set_records(records)
+        self._ledgers = _build_ledgers(self._vendor, self._type, self._issue, self._expiry, self._amount)
+
+    def _record(self, vendor_id, type_id, amount, issued: Optional[int], expires: Optional[int]) -> Optional[Record]:
+        issued = issued or _EVER
+        if expires is None or expires < issued:
+            self.skipped += 1
+            return None
+        return int(vendor_id or 0), int(type_id or 0), issued, expires, int(amount or 0)
+
+    def _records(self) -> Iterable[Tuple[int, Record]]:
+        alive = np.flatnonzero(self._alive)
+        cols = [a[alive].tolist() for a in (self._vendor, self._type, self._issue, self._expiry, self._amount)]
+        yield from zip(self._ids[alive].tolist(), zip(*cols))
+        yield from self._overlay.items()
+
+    def _set_records(self, records: Dict[int, Record]):
+        ids = np.fromiter(sorted(records), np.int64, len(records))
+        cols = np.array([records[i] for i in ids.tolist()], np.int64).reshape(-1, 5).T
+        self._set_base(ids, *cols)
+
+    def _set_base(self, ids, vendor, type_, issue, expiry, amount):
+        self._ids, self._vendor, self._type = ids, vendor, type_
+        self._issue, self._expiry, self._amount = issue, expiry, amount
+        self._alive = np.ones(len(ids), bool)
+        self._by_expiry = np.lexsort((ids, expiry))             # base positions by (expiry, id)
+        self._expiry_sorted = expiry[self._by_expiry]
+        self._overlay: Dict[int, Record] = {}                   # added or changed since
+        self._live = len(ids)
+
+    def _base_position(self, instrument_id: int) -> Optional[int]:
+        k = int(np.searchsorted(self._ids, instrument_id))
+        if k < len(self._ids) and self._ids[k] == instrument_id and self._alive[k]:
+            return k
+        return None
+
+    def _post(self, rec: Record, sign: int):
+        vendor_id, type_id, issued, expires, amount = rec
+        for key in _ledger_keys(vendor_id, type_id):
+            ledger = self._ledgers.get(key)
+            if ledger is None:
+                ledger = self._ledgers[key] = _Ledger([], [[] for _ in range(_COLUMNS)])
+            ledger.add(issued, 0, sign, sign * amount)
+            ledger.add(expires, 2, sign, sign * amount)
+
+    def remove(self, instrument_id: int) -> bool:
+        """Drop an instrument (rejected, expired, deleted). False if it was not indexed."""
+        rec = self._overlay.pop(instrument_id, None)
+        if rec is None:
+            k = self._base_position(instrument_id)
+            if k is None:
+                return False
+            self._alive[k] = False
+            rec = (int(self._vendor[k]), int(self._type[k]), int(self._issue[k]), int(self._expiry[k]),
+                   int(self._amount[k]))
+        self._post(rec, -1)
+        self._live -= 1
+        return True
+
+    def add(self, instrument_id: int, vendor_id: Optional[int], type_id: Optional[int], amount_paise: int,
+            issue_date, expiry_date) -> bool:
+        """Index an instrument, replacing any earlier version of it. False if it holds no exposure."""
+        self.remove(instrument_id)
+        rec = self._record(vendor_id, type_id, amount_paise, _day(issue_date) if issue_date else None,
+                           _day(expiry_date) if expiry_date else None)
+        if rec is None:
+            return False
+        self._post(rec, 1)
+        self._overlay[instrument_id] = rec
+        self._live += 1
+        if len(self._overlay) > max(COMPACT_AT, len(self._ids) // 64):
+            self._set_records(dict(self._records()))
+        return True
+
+    def refresh(self, conn: sqlite3.Connection, ids: Iterable[int], statuses: Sequence[str] = IN_FORCE):
+        """Re-read the given instruments after a write; those gone or out of ``statuses`` are dropped."""
+        ids = list(ids)
+        found = set()
+        for k in range(0, len(ids), 500):
+            for row in _select(conn, statuses, ids[k:k + 500]):
+                found.add(row[0])
+                self.add(*row)
+        for instrument_id in ids:
+            if instrument_id not in found:
+                self.remove(instrument_id)
+
+    def types(self, vendor_id: Optional[int] = None) -> List[int]:
+        """Type ids with a ledger for ``vendor_id`` (every vendor when None)."""
+        return sorted(t for v, t in self._ledgers if v == vendor_id and t is not None)
+
+    def exposure(self, on: date, vendor_id: Optional[int] = None, type_id: Optional[int] = None) -> Exposure:
+        """Instruments in force on ``on``: issued by then and not yet expired."""
+        ledger = self._ledgers.get((vendor_id, type_id))
+        return ledger.in_force(on.toordinal()) if ledger else Exposure(0, 0)
+
+    def expiring_total(self, first: date, last: date, vendor_id: Optional[int] = None,
+                       type_id: Optional[int] = None) -> Exposure:
+        """Count and amount expiring from ``first`` through ``last``."""
+        ledger = self._ledgers.get((vendor_id, type_id))
+        return ledger.expiring(first.toordinal(), last.toordinal()) if ledger else Exposure(0, 0)
+
+    def ladder(self, start: date, ends: Sequence[date], vendor_id: Optional[int] = None,
+               type_id: Optional[int] = None) -> List[LadderRow]:
+        """Buckets from ``start`` to each of ``ends`` in turn: what expires in each, what is left at its end."""
+        out, first = [], start
+        for end in ends:
+            out.append(LadderRow(end, self.expiring_total(first, end, vendor_id, type_id),
+                                 self.exposure(end, vendor_id, type_id)))
+            first = end + timedelta(days=1)
+        return out
+
+    def expiring(self, first: date, last: date, vendor_id: Optional[int] = None,
+                 type_id: Optional[int] = None) -> List[Expiring]:
+        """Instruments expiring from ``first`` through ``last``, soonest first."""
+        lo_day, hi_day = first.toordinal(), last.toordinal()
+        lo, hi = np.searchsorted(self._expiry_sorted, [lo_day, hi_day + 1])
+        pos = self._by_expiry[lo:hi]
+        keep = self._alive[pos]
+        if vendor_id is not None:
+            keep &= self._vendor[pos] == vendor_id
+        if type_id is not None:
+            keep &= self._type[pos] == type_id
+        pos = pos[keep]
+        hits = list(zip(self._expiry[pos].tolist(), self._ids[pos].tolist(), self._vendor[pos].tolist(),
+                        self._type[pos].tolist(), self._amount[pos].tolist()))
+        extra = [(expires, i, v, t, amount) for i, (v, t, _, expires, amount) in self._overlay.items()
+                 if lo_day <= expires <= hi_day and vendor_id in (None, v) and type_id in (None, t)]
+        if extra:
+            hits = sorted(hits + extra)
+        return [Expiring(i, v, t, date.fromordinal(d), amount) for d, i, v, t, amount in hits]
+
+
+def _select(conn: sqlite3.Connection, statuses: Sequence[str], ids: Optional[Sequence[int]] = None):
+    where, params = [f'status IN ({", ".join("?" * len(statuses))})'], list(statuses)
+    if ids is not None:
+        where.append(f'id IN ({", ".join("?" * len(ids))})')
+        params += ids
+    return conn.execute('SELECT id, vendor_id, type_id, CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER), '
+                        f'issue_date, expiry_date FROM financial_instruments WHERE {" AND ".join(where)}', params)
+
+
+def month_ends(start: date, months: int) -> List[date]:
+    """The last day of ``start``'s month and of the ``months - 1`` months after it."""
+    out = []
+    year, month = start.year, start.month
+    for _ in range(months):
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        out.append(date(year, month, 1) - timedelta(days=1))
+    return out
+
+
+def main(argv=None):
+    from compliance import db
+    from compliance.reports import rupees
+
+    parser = argparse.ArgumentParser(description='Instrument exposure on a date and upcoming expiries.')
+    parser.add_argument('db', help='SQLite mirror of the D1 database')
+    parser.add_argument('--status', action='append', help='repeatable (default: active)')
+    parser.add_argument('--type', help='instrument type name or id')
+    parser.add_argument('--vendor-id', type=int)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('exposure', help='count and amount in force on a date, per type')
+    p.add_argument('--on', type=date.fromisoformat, default=None, help='default: today')
+    p = sub.add_parser('expiring', help='instruments expiring in the next N days')
+    p.add_argument('--from', dest='start', type=date.fromisoformat, default=None, help='default: today')
+    p.add_argument('--days', type=int, default=30)
+    p = sub.add_parser('ladder', help='amount expiring per month and in force at each month end')
+    p.add_argument('--from', dest='start', type=date.fromisoformat, default=None, help='default: today')
+    p.add_argument('--months', type=int, default=12)
+    args = parser.parse_args(argv)
+
+    conn = db.open_mirror(args.db)
+    names = dict(conn.execute('SELECT id, name FROM instrument_types'))
+    type_id = None
+    if args.type:
+        by_name = {name.lower(): i for i, name in names.items()}
+        type_id = int(args.type) if args.type.isdigit() else by_name.get(args.type.lower())
+        if type_id is None:
+            raise SystemExit(f'unknown instrument type {args.type!r}')
+    index = ExposureIndex.load(conn, args.status or IN_FORCE)
+    conn.close()
+    today = date.today()
+    if args.command == 'exposure':
+        on = args.on or today
+        print('type_id,type,instruments,amount')
+        for t in ([type_id] if type_id is not None else index.types(args.vendor_id)):
+            e = index.exposure(on, args.vendor_id, t)
+            if e.instruments:
+                print(f'{t},{names.get(t, "")},{e.instruments},{rupees(e.amount_paise)}')
+        e = index.exposure(on, args.vendor_id, type_id)
+        print(f',total,{e.instruments},{rupees(e.amount_paise)}')
+    elif args.command == 'expiring':
+        start = args.start or today
+        print('id,vendor_id,type,expiry_date,amount')
+        for x in index.expiring(start, start + timedelta(days=args.days - 1), args.vendor_id, type_id):
+            print(f'{x.id},{x.vendor_id},{names.get(x.type_id, "")},{x.expiry_date},{rupees(x.amount_paise)}')
+    else:
+        start = args.start or today
+        print('month_end,expiring,expiring_amount,in_force,in_force_amount')
+        for row in index.ladder(start, month_ends(start, args.months), args.vendor_id, type_id):
+            print(f'{row.until},{row.expiring.instruments},{rupees(row.expiring.amount_paise)},'
+                  f'{row.in_force.instruments},{rupees(row.in_force.amount_paise)}')
+
+
+if __name__ == '__main__':
+    main()
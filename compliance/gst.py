@@ -0,0 +1,316 @@
+"""GST breakup of invoice lines: CGST + SGST within a state, IGST across states.
+
+A supply is intra-state when the seller's and the place of supply's state
+codes match. Its tax is then split into equal CGST and SGST halves, with
+UTGST in place of SGST in a union territory without a legislature.
+Otherwise it is inter-state and the whole rate is IGST.
+``purchase_order_fields.csv`` carries the three rates per line, and
+``gst_rates`` (0001) lists the rates in use. ``hsn_gst_rates``
+(``0021_hsn_gst_rates.sql``) maps HSN/SAC prefixes to them, and a code
+takes the rate of its longest matching prefix.
+
+:func:`breakup` works on whole arrays of lines, such as a 50,000-line bulk
+order. Each distinct HSN code is resolved once through :class:`RateTable`,
+and the tax heads are then integer NumPy operations on paise. Each head is
+rounded half up to the paisa per line: ``taxable x rate`` in hundredths of
+a percent, divided with the half added. That is exactly what
+``Decimal.quantize(ROUND_HALF_UP)`` gives, and :func:`breakup_exact` is
+that ``Decimal`` path for cross-checking. :func:`invoice_totals` adds the
+lines up per invoice and rounds the payable amount to the rupee. The
+difference is reported as the round-off.
+
+    python -m compliance.gst local.sqlite rates
+    python -m compliance.gst local.sqlite set-rate 8471 18 --description "Computers"
+    python -m compliance.gst local.sqlite po 42 --buyer-state 07
+"""
+import argparse
+import sqlite3
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from compliance.gstin import STATE_CODES
+from compliance.reports import rupees
+
+PAISE = Decimal('0.01')
+# Union territories without a legislature levy UTGST instead of SGST.
+UTGST_STATE_CODES = frozenset({4, 25, 26, 31, 35, 38})
+UNKNOWN = -1                # rate_bp of a code no prefix matches
+
+
+class Breakup(NamedTuple):
+    """Per-line arrays; amounts in paise."""
+    rate_bp: np.ndarray         # total GST rate in hundredths of a percent
+    inter_state: np.ndarray     # True: IGST; False: CGST + SGST/UTGST
+    utgst: np.ndarray           # True where the SGST half is UTGST
+    taxable: np.ndarray
+    cgst: np.ndarray
+    sgst: np.ndarray            # SGST or UTGST
+    igst: np.ndarray
+
+    @property
+    def tax(self) -> np.ndarray:
+        return self.cgst + self.sgst + self.igst
+
+    @property
+    def total(self) -> np.ndarray:
+        return self.taxable + self.tax
+
+
+class InvoiceTotals(NamedTuple):
+    """Per-invoice arrays, in the order of the sorted invoice keys; amounts in paise."""
+    invoice: np.ndarray
+    lines: np.ndarray
+    taxable: np.ndarray
+    cgst: np.ndarray
+    sgst: np.ndarray
+    igst: np.ndarray
+    total: np.ndarray
+    round_off: np.ndarray       # payable minus total
+    payable: np.ndarray         # total rounded half up to the rupee
+
+
+class LineTax(NamedTuple):
+    """One line from :func:`breakup_exact`, in rupees."""
+    rate: Decimal
+    cgst: Decimal
+    sgst: Decimal
+    igst: Decimal
+
+
+def _half_up(numerator: np.ndarray, denominator: int) -> np.ndarray:
+    """``numerator / denominator`` rounded half away from zero, in integers."""
+    half = denominator // 2
+    return np.where(numerator >= 0, (numerator + half) // denominator, -((half - numerator) // denominator))
+
+
+def normal_hsn(code) -> str:
+    """An HSN/SAC code as a digit string: ``8443.31``, ``'8443 31 00'`` and ``84433100`` compare equal."""
+    if code is None:
+        return ''
+    if code.__class__ is float and code.is_integer():
+        code = int(code)
+    return ''.join(ch for ch in str(code) if ch.isdigit())
+
+
+def _state(value, what: str) -> int:
+    text = str(value).strip()
+    if not text.isdigit() or int(text) not in STATE_CODES:
+        raise ValueError(f'{what} {value!r} is not a GST state code')
+    return int(text)
+
+
+def _states(values, n: int, what: str) -> np.ndarray:
+    """State codes (``'07'``, ``'7'`` or ``7``) as ints; a scalar applies to every line."""
+    if np.ndim(values) == 0:
+        return np.full(n, _state(values, what), dtype=np.int64)
+    uniq, inverse = np.unique(np.asarray(values).astype(str), return_inverse=True)
+    codes = np.array([_state(u, what) for u in uniq], dtype=np.int64)[inverse.reshape(-1)]
+    if len(codes) != n:
+        raise ValueError(f'{what}: {len(codes)} values for {n} lines')
+    return codes
+
+
+def _bp(rate) -> int:
+    """A percentage as hundredths of a percent; rates carry at most two decimals (DECIMAL(5,2))."""
+    bp = Decimal(str(rate)) * 100
+    if bp != bp.to_integral_value():
+        raise ValueError(f'GST rate {rate} has more than two decimals')
+    return int(bp)
+
+
+class RateTable:
+    """HSN/SAC prefix -> rate, resolved by longest prefix; each distinct code is looked up once."""
+
+    __slots__ = ('prefixes', '_resolved')
+
+    def __init__(self, prefixes: Dict[str, Decimal]):
+        self.prefixes = {normal_hsn(p): _bp(r) for p, r in prefixes.items()}
+        self._resolved: Dict[str, int] = {}
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> 'RateTable':
+        return cls({p: Decimal(str(r)) for p, r in conn.execute('SELECT hsn_prefix, rate FROM hsn_gst_rates')})
+
+    def lookup(self, hsn) -> int:
+        """Rate of one code in hundredths of a percent, or :data:`UNKNOWN`."""
+        code = normal_hsn(hsn)
+        bp = self._resolved.get(code)
+        if bp is None:
+            bp = next((self.prefixes[code[:k]] for k in range(len(code), 1, -1) if code[:k] in self.prefixes),
+                      UNKNOWN)
+            self._resolved[code] = bp
+        return bp
+
+    def rate(self, hsn) -> Optional[Decimal]:
+        bp = self.lookup(hsn)
+        return None if bp == UNKNOWN else Decimal(bp) / 100
+
+    def rates_bp(self, hsn_codes) -> np.ndarray:
+        """:meth:`lookup` over an array of codes, normalising each distinct value once."""
+        seen: Dict[object, int] = {}
+
+        def rate_bp(code) -> int:
+            bp = seen.get(code)
+            if bp is None:
+                bp = seen[code] = self.lookup(code)
+            return bp
+
+        return np.fromiter((rate_bp(c) for c in hsn_codes), dtype=np.int64, count=len(hsn_codes))
+
+
+def _line_rates(n: int, hsn, table: Optional[RateTable], rates) -> np.ndarray:
+    """Per-line rate_bp: a stated rate where given (not NaN), else the HSN lookup."""
+    out = np.full(n, UNKNOWN, dtype=np.int64)
+    if rates is not None:
+        stated = np.asarray(rates, dtype=np.float64)
+        given = ~np.isnan(stated)
+        out[given] = np.rint(stated[given] * 100).astype(np.int64)
+    missing = out == UNKNOWN
+    if missing.any() and hsn is not None and table is not None:
+        codes = np.asarray(hsn, dtype=object)
+        out[missing] = table.rates_bp(codes[missing])
+    unknown = out == UNKNOWN
+    if unknown.any():
+        codes = sorted({normal_hsn(c) for c in np.asarray(hsn, dtype=object)[unknown]}) if hsn is not None else []
+        detail = f'; no hsn_gst_rates prefix for {", ".join(c or "(blank)" for c in codes[:10])}' if codes else ''
+        raise ValueError(f'{int(unknown.sum())} line(s) without a GST rate{detail}')
+    return out
+
+
+def breakup(taxable_paise, seller_state, buyer_state, hsn=None, table: Optional[RateTable] = None,
+            rates=None) -> Breakup:
+    """Tax heads for arrays of lines.
+
+    ``seller_state`` and ``buyer_state`` (the place of supply) are state
+    codes, one per line or one for all. A line's rate is ``rates`` (percent,
+    NaN to look up) where given, else its ``hsn`` code's rate in ``table``.
+    Raises ValueError for a line with neither, or for an unknown state code.
+    """
+    taxable = np.asarray(taxable_paise, dtype=np.int64)
+    n = len(taxable)
+    rate_bp = _line_rates(n, hsn, table, rates)
+    seller, buyer = _states(seller_state, n, 'seller state'), _states(buyer_state, n, 'buyer state')
+    inter = seller != buyer
+    utgst = ~inter & np.isin(buyer, sorted(UTGST_STATE_CODES))
+    basis = taxable * rate_bp
+    zero = np.zeros(n, dtype=np.int64)
+    igst = np.where(inter, _half_up(basis, 10000), zero)
+    half = np.where(inter, zero, _half_up(basis, 20000))
+    return Breakup(rate_bp, inter, utgst, taxable, half, half.copy(), igst)
+
+
+def invoice_totals(lines: Breakup, invoice) -> InvoiceTotals:
+    """Sum :func:`breakup` lines per ``invoice`` key and round each payable amount to the rupee."""
+    keys, inverse = np.unique(np.asarray(invoice), return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    def per_invoice(values: np.ndarray) -> np.ndarray:
+        out = np.zeros(len(keys), dtype=np.int64)
+        np.add.at(out, inverse, values)
+        return out
+
+    total = per_invoice(lines.total)
+    payable = _half_up(total, 100) * 100
+    return InvoiceTotals(keys, np.bincount(inverse, minlength=len(keys)), per_invoice(lines.taxable),
+                         per_invoice(lines.cgst), per_invoice(lines.sgst), per_invoice(lines.igst), total,
+                         payable - total, payable)
+
+
+def breakup_exact(taxable_paise, seller_state, buyer_state, hsn=None, table: Optional[RateTable] = None,
+                  rates=None) -> List[LineTax]:
+    """Same as :func:`breakup`, one line at a time in ``Decimal``."""
+    n = len(taxable_paise)
+    seller = [seller_state] * n if np.ndim(seller_state) == 0 else list(seller_state)
+    buyer = [buyer_state] * n if np.ndim(buyer_state) == 0 else list(buyer_state)
+    out = []
+    for i, paise in enumerate(taxable_paise):
+        stated = None if rates is None else rates[i]
+        if stated is not None and stated == stated:
+            rate = Decimal(str(stated))
+        else:
+            rate = table.rate(hsn[i]) if table is not None and hsn is not None else None
+            if rate is None:
+                raise ValueError(f'line {i} without a GST rate')
+        taxable = Decimal(int(paise)) / 100
+        if _state(seller[i], 'seller state') != _state(buyer[i], 'buyer state'):
+            out.append(LineTax(rate, Decimal(0), Decimal(0),
+                               (taxable * rate / 100).quantize(PAISE, rounding=ROUND_HALF_UP)))
+        else:
+            half = (taxable * rate / 200).quantize(PAISE, rounding=ROUND_HALF_UP)
+            out.append(LineTax(rate, half, half, Decimal(0)))
+    return out
+
+
+def set_rate(conn: sqlite3.Connection, hsn_prefix: str, rate, description: Optional[str] = None) -> None:
+    """Add or change a prefix; the rate must be an active ``gst_rates`` rate."""
+    prefix = normal_hsn(hsn_prefix)
+    if not 2 <= len(prefix) <= 8 or prefix != str(hsn_prefix).strip():
+        raise ValueError(f'HSN/SAC prefix must be 2 to 8 digits, got {hsn_prefix!r}')
+    allowed = {_bp(Decimal(str(r))) for r, in conn.execute('SELECT rate FROM gst_rates WHERE is_active')}
+    if _bp(rate) not in allowed:
+        raise ValueError(f'{rate}% is not an active rate in gst_rates')
+    conn.execute('INSERT INTO hsn_gst_rates (hsn_prefix, rate, description) VALUES (?, ?, ?) '
+                 'ON CONFLICT(hsn_prefix) DO UPDATE SET rate = excluded.rate, '
+                 'description = COALESCE(excluded.description, description), updated_at = CURRENT_TIMESTAMP',
+                 (prefix, float(Decimal(str(rate))), description))
+
+
+def main(argv=None):
+    from compliance import db
+
+    parser = argparse.ArgumentParser(description='GST breakup (CGST/SGST/IGST) of invoice lines.')
+    parser.add_argument('db', help='SQLite mirror of the D1 database')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('rates', help='HSN/SAC prefixes and their rates')
+    p = sub.add_parser('set-rate', help='add or change an HSN/SAC prefix rate')
+    p.add_argument('hsn_prefix')
+    p.add_argument('rate', type=Decimal)
+    p.add_argument('--description')
+    p = sub.add_parser('po', help="tax breakup of a purchase order's lines (po_items, see compliance.lineitems)")
+    p.add_argument('po_id', type=int)
+    p.add_argument('--buyer-state', required=True, help='place of supply state code, e.g. 07')
+    p.add_argument('--seller-state', help="default: the vendor's state_code")
+    args = parser.parse_args(argv)
+
+    conn = db.open_mirror(args.db)
+    try:
+        if args.command == 'rates':
+            print('hsn_prefix,rate,description')
+            for prefix, rate, description in conn.execute(
+                    'SELECT hsn_prefix, rate, description FROM hsn_gst_rates ORDER BY hsn_prefix'):
+                print(f'{prefix},{rate},{description or ""}')
+        elif args.command == 'set-rate':
+            set_rate(conn, args.hsn_prefix, args.rate, args.description)
+        else:
+            seller = args.seller_state or (conn.execute(
+                'SELECT v.state_code FROM purchase_orders p JOIN vendors v ON v.id = p.vendor_id WHERE p.id = ?',
+                (args.po_id,)).fetchone() or [None])[0]
+            if not seller:
+                raise ValueError('no --seller-state and the vendor has no state_code')
+            rows = conn.execute('SELECT sn, hsn_sac, taxable_paise, tax_rate FROM po_items '
+                                'WHERE po_id = ? AND taxable_paise IS NOT NULL ORDER BY sn', (args.po_id,)).fetchall()
+            if not rows:
+                raise ValueError(f'PO {args.po_id} has no valued lines in po_items (run compliance.lineitems)')
+            sn, hsn, taxable, stated = zip(*rows)
+            lines = breakup(taxable, seller, args.buyer_state, hsn, RateTable.load(conn),
+                            [np.nan if r is None else r for r in stated])
+            second = 'utgst' if lines.utgst.any() else 'sgst'
+            print(f'sn,hsn_sac,rate,taxable,cgst,{second},igst,total')
+            for k in range(len(sn)):
+                print(f'{sn[k]},{hsn[k] or ""},{Decimal(int(lines.rate_bp[k])) / 100},'
+                      f'{rupees(int(lines.taxable[k]))},{rupees(int(lines.cgst[k]))},{rupees(int(lines.sgst[k]))},'
+                      f'{rupees(int(lines.igst[k]))},{rupees(int(lines.total[k]))}')
+            t = invoice_totals(lines, np.zeros(len(sn), dtype=np.int64))
+            print(f'total,,,{rupees(int(t.taxable[0]))},{rupees(int(t.cgst[0]))},{rupees(int(t.sgst[0]))},'
+                  f'{rupees(int(t.igst[0]))},{rupees(int(t.total[0]))}')
+            print(f'round off {rupees(int(t.round_off[0]))}, payable {rupees(int(t.payable[0]))}')
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
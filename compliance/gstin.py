@@ -0,0 +1,237 @@
+"""Column-at-a-time GSTIN and PAN validation.
+
+The Worker's ``GSTIN_REGEX`` only checks the shape of a GSTIN. A real one
+also carries:
+
+* a state code (``01``-``38``, ``97`` other territory, ``99`` centre
+  jurisdiction) in positions 1-2;
+* the holder's PAN in positions 3-12;
+* a mod-36 check character in position 15. Each of the first 14 characters
+  is worth 0-35 (``0-9A-Z``) and is weighted 1, 2, 1, 2, ... The product's
+  quotient and remainder by 36 are both added to the sum, and the check
+  character is ``(36 - sum % 36) % 36``.
+
+:func:`check_gstins` does all of this for a whole column at once. The
+column is packed into ASCII byte strings and viewed as an ``(n, 15)`` byte
+matrix, so each step is one NumPy operation over the whole column. :func:`validate_vendors` also compares
+the embedded PAN and state code with the vendor row's ``pan`` and
+``state_code``. Results are per-row bitmasks; :func:`describe` turns one
+into messages.
+
+    python -m compliance.gstin public/data/vendors_import_template.csv
+    python -m compliance.gstin --db local.sqlite
+"""
+import argparse
+import csv
+import sys
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+ERR_FORMAT = 1            # not 2 digits + PAN + entity char + 'Z' + check char
+ERR_CHECKSUM = 2          # mod-36 check character does not match
+ERR_STATE = 4             # embedded state code is not a GST state code
+ERR_PAN_FORMAT = 8        # vendor pan is not AAAAA9999A
+ERR_PAN_MISMATCH = 16     # vendor pan differs from the PAN inside the GSTIN
+ERR_STATE_MISMATCH = 32   # vendor state_code differs from the GSTIN's
+
+MESSAGES = {
+    ERR_FORMAT: 'invalid GSTIN format',
+    ERR_CHECKSUM: 'GSTIN check digit mismatch',
+    ERR_STATE: 'unknown GSTIN state code',
+    ERR_PAN_FORMAT: 'invalid PAN',
+    ERR_PAN_MISMATCH: 'PAN does not match GSTIN',
+    ERR_STATE_MISMATCH: 'state_code does not match GSTIN',
+}
+
+STATE_CODES = frozenset(range(1, 39)) | {97, 99}
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# Byte -> value 0..35, or -1 outside [0-9A-Z] (lowercase included).
+_VALUE = np.full(256, -1, dtype=np.int16)
+for _i, _ch in enumerate(ALPHABET):
+    _VALUE[ord(_ch)] = _i
+_STATE_OK = np.zeros(100, dtype=bool)
+_STATE_OK[sorted(STATE_CODES)] = True
+_SPACES = np.frombuffer(b' \t\r\n', dtype=np.uint8)
+_WEIGHTS = np.tile(np.array([1, 2], dtype=np.int16), 7)
+
+_D, _L, _A = 'digit', 'letter', 'alnum'
+_GSTIN_CLASSES = [_D, _D] + [_L] * 5 + [_D] * 4 + [_L] + ['entity', 'z', _A]
+_PAN_CLASSES = [_L] * 5 + [_D] * 4 + [_L]
+
+
+def check_digit(gstin14: str) -> str:
+    """Check character for the first 14 characters of a GSTIN."""
+    total = 0
+    for i, ch in enumerate(gstin14.upper()):
+        product = ALPHABET.index(ch) * (2 if i % 2 else 1)
+        total += product // 36 + product % 36
+    return ALPHABET[(36 - total % 36) % 36]
+
+
+def _strings(values: Sequence, width: int = 32) -> np.ndarray:
+    """Stripped ASCII byte-string column (``S<width>``); ``None`` becomes b''.
+
+    Non-ASCII characters become ``?``, which no check accepts. Values longer
+    than ``width`` are cut short, which keeps them invalid.
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'S':
+        arr = values.astype(f'S{width}')
+    else:
+        values = [v or '' for v in values]
+        try:
+            arr = np.asarray(values, dtype=f'S{width}')
+        except UnicodeEncodeError:
+            arr = np.asarray([str(v).encode('ascii', 'replace') for v in values], dtype=f'S{width}')
+    if len(arr):
+        # Strip only the rows that need it; np.char.strip is slow on the whole column.
+        codes = arr.view(np.uint8).reshape(len(arr), width)
+        last = codes[np.arange(len(arr)), np.maximum(np.char.str_len(arr) - 1, 0)]
+        dirty = np.flatnonzero(np.isin(codes[:, 0], _SPACES) | np.isin(last, _SPACES))
+        if len(dirty):
+            arr[dirty] = np.char.strip(arr[dirty])
+    return arr
+
+
+def _substr(codes: np.ndarray, start: int, stop: int) -> np.ndarray:
+    return np.ascontiguousarray(codes[:, start:stop]).view(f'S{stop - start}').ravel()
+
+
+def _as_column(values: Sequence, width: int):
+    """Stripped column, its lengths, and bytes and values as ``(n, width)`` matrices."""
+    arr = _strings(values)
+    lengths = np.char.str_len(arr)
+    codes = arr.astype(f'S{width}').view(np.uint8).reshape(len(arr), width)
+    return arr, lengths, codes, _VALUE[codes]
+
+
+def _shape_ok(codes: np.ndarray, values: np.ndarray, classes: List[str]) -> np.ndarray:
+    ok = np.ones(len(codes), dtype=bool)
+    for col, kind in enumerate(classes):
+        v = values[:, col]
+        if kind == _D:
+            ok &= (v >= 0) & (v <= 9)
+        elif kind == _L:
+            ok &= v >= 10
+        elif kind == _A:
+            ok &= v >= 0
+        elif kind == 'entity':
+            ok &= v >= 1
+        else:
+            ok &= codes[:, col] == ord('Z')
+    return ok
+
+
+class GstinCheck(NamedTuple):
+    gstin: np.ndarray        # stripped input, as bytes (dtype S)
+    present: np.ndarray      # non-empty
+    errors: np.ndarray       # ERR_* bitmask per row (0 for valid or empty)
+    pan: np.ndarray          # embedded PAN, b'' where the format is wrong
+    state_code: np.ndarray   # embedded state code b'01'..b'99', b'' where the format is wrong
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self.present & (self.errors == 0)
+
+
+def check_gstins(values: Sequence) -> GstinCheck:
+    """Validate a column of GSTINs. Empty/``None`` cells are not errors."""
+    arr, lengths, codes, vals = _as_column(values, 15)
+    present = lengths > 0
+    shape = (lengths == 15) & _shape_ok(codes, vals, _GSTIN_CLASSES)
+    errors = np.where(present & ~shape, ERR_FORMAT, 0).astype(np.uint8)
+
+    head = np.maximum(vals[:, :14], 0) * _WEIGHTS
+    total = (head // 36 + head % 36).sum(axis=1)
+    expected = (36 - total % 36) % 36
+    errors |= np.where(shape & (expected != vals[:, 14]), ERR_CHECKSUM, 0).astype(np.uint8)
+
+    state = np.clip(vals[:, 0], 0, 9) * 10 + np.clip(vals[:, 1], 0, 9)
+    errors |= np.where(shape & ~_STATE_OK[state], ERR_STATE, 0).astype(np.uint8)
+
+    pan = np.where(shape, _substr(codes, 2, 12), b'')
+    state_code = np.where(shape, _substr(codes, 0, 2), b'')
+    return GstinCheck(arr, present, errors, pan, state_code)
+
+
+def check_pans(values: Sequence) -> np.ndarray:
+    """``ERR_PAN_FORMAT`` mask for a column of PANs; empty cells pass."""
+    arr, lengths, codes, vals = _as_column(values, 10)
+    ok = (lengths == 10) & _shape_ok(codes, vals, _PAN_CLASSES)
+    return np.where((lengths > 0) & ~ok, ERR_PAN_FORMAT, 0).astype(np.uint8)
+
+
+def validate_vendors(gstin: Sequence, pan: Optional[Sequence] = None,
+                     state_code: Optional[Sequence] = None) -> np.ndarray:
+    """Bitmask per vendor row: GSTIN checks plus consistency with ``pan``/``state_code``.
+
+    A vendor ``state_code`` of ``7`` is compared as ``07``. Mismatches are only
+    reported when both sides are present and the GSTIN itself is well formed.
+    """
+    g = check_gstins(gstin)
+    errors = g.errors.copy()
+    if not len(errors):
+        return errors
+    shape = g.present & ((g.errors & ERR_FORMAT) == 0)
+    if pan is not None:
+        p = _strings(pan)
+        errors |= check_pans(p)
+        errors |= np.where(shape & (np.char.str_len(p) > 0) & (p != g.pan), ERR_PAN_MISMATCH, 0).astype(np.uint8)
+    if state_code is not None:
+        s = np.char.zfill(_strings(state_code), 2)
+        errors |= np.where(shape & (s != b'00') & (s != g.state_code), ERR_STATE_MISMATCH, 0).astype(np.uint8)
+    return errors
+
+
+def describe(mask: int) -> List[str]:
+    """Messages for one row's bitmask, most fundamental first."""
+    return [message for bit, message in MESSAGES.items() if mask & bit]
+
+
+def failures(errors: np.ndarray) -> List[tuple]:
+    """``(row_index, [messages])`` for every row with errors."""
+    idx = np.flatnonzero(errors)
+    return [(int(i), describe(int(errors[i]))) for i in idx]
+
+
+def _read_columns(path) -> tuple:
+    gstin, pan, state_code = [], [], []
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for rec in csv.DictReader(f):
+            gstin.append(rec.get('gstin') or '')
+            pan.append(rec.get('pan') or '')
+            state_code.append(rec.get('state_code') or '')
+    return gstin, pan, state_code
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate vendor GSTINs, PANs and state codes.')
+    parser.add_argument('csv', nargs='?', help='vendor CSV with gstin/pan/state_code columns')
+    parser.add_argument('--db', help='SQLite mirror; checks the vendors table instead')
+    parser.add_argument('--limit', type=int, default=50, help='failures to print')
+    args = parser.parse_args(argv)
+    if bool(args.csv) == bool(args.db):
+        parser.error('give either a CSV file or --db')
+
+    if args.db:
+        from compliance import db
+        conn = db.connect(args.db)
+        rows = conn.execute('SELECT id, gstin, pan, state_code FROM vendors ORDER BY id').fetchall()
+        conn.close()
+        labels = [f'vendor {r[0]}' for r in rows]
+        gstin, pan, state_code = ([r[k] for r in rows] for k in (1, 2, 3))
+    else:
+        gstin, pan, state_code = _read_columns(args.csv)
+        labels = [f'row {i + 2}' for i in range(len(gstin))]
+
+    errors = validate_vendors(gstin, pan, state_code)
+    bad = failures(errors)
+    for i, messages in bad[:args.limit]:
+        print(f'{labels[i]}: {gstin[i] or "-"}: {"; ".join(messages)}')
+    print(f'{len(gstin)} checked, {len(bad)} with problems')
+    sys.exit(1 if bad else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,355 @@
+"""Typed records and side tables for ``financial_instruments.details``.
+
+The Worker's ``parseDetailsByType`` (and :func:`compliance.loader.instrument_details`)
+stores a per-type JSON blob in ``details``, so every treasury report used to
+``json.loads`` every row it touched. ``0019_instrument_details.sql`` shreds
+the blobs into one typed side table per shape. Triggers keep the tables
+current, using ``json_extract`` and SQLite's column affinity, and the
+migration backfills them.
+
+Each shape has a ``__slots__`` record class (:class:`BankGuarantee`,
+:class:`LetterOfCredit`, :class:`Transfer`, :class:`PfmsRelease`,
+:class:`GemPayment`, :class:`DigitalSignature`). Its ``TABLE`` and
+``TYPES`` tie it to the side table and to the ``instrument_types`` names
+that use it.
+
+* :func:`shred` rebuilds every side table in one set-based pass, e.g. after
+  a bulk load with the triggers dropped.
+* :func:`check` decodes every blob in Python and compares it with the side
+  tables.
+* :func:`load_columns` reads one side table, joined to the instrument's
+  status, vendor and amount, into NumPy arrays. Text fields are
+  dictionary-encoded, so :meth:`DetailColumns.totals_by` groups with one
+  ``np.add.at`` instead of a Python loop. Load once, then ask any number
+  of questions.
+
+    python -m compliance.instruments local.sqlite shred
+    python -m compliance.instruments local.sqlite check
+    python -m compliance.instruments local.sqlite totals bank_guarantees bank_name [--status active]
+"""
+import argparse
+import json
+import sqlite3
+import sys
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+import numpy as np
+
+
+class InstrumentDetails:
+    """One instrument's decoded ``details``; subclasses name the fields in ``__slots__``."""
+
+    __slots__ = ('instrument_id',)
+    TABLE = ''
+    TYPES: Tuple[str, ...] = ()           # instrument_types.name, lower-cased
+    NUMERIC: Tuple[str, ...] = ()         # REAL columns; the rest are TEXT
+
+    def __init__(self, instrument_id: int, *values):
+        self.instrument_id = instrument_id
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_json(cls, instrument_id: int, text: Optional[str]) -> Optional['InstrumentDetails']:
+        """Decode a ``details`` blob as the triggers do; None unless it is a JSON object."""
+        try:
+            obj = json.loads(text) if text else None
+        except ValueError:
+            return None
+        if not isinstance(obj, dict):
+            return None
+        return cls(instrument_id, *(_affinity(obj.get(f), f in cls.NUMERIC) for f in cls.__slots__))
+
+    def values(self) -> tuple:
+        return tuple(getattr(self, f) for f in self.__slots__)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.instrument_id == self.instrument_id \
+            and other.values() == self.values()
+
+    def __repr__(self):
+        fields = ', '.join(f'{f}={getattr(self, f)!r}' for f in self.__slots__)
+        return f'{type(self).__name__}(instrument_id={self.instrument_id}, {fields})'
+
+
+class BankGuarantee(InstrumentDetails):
+    __slots__ = ('bank_name', 'bg_number', 'beneficiary', 'margin_percent', 'claimable_until')
+    TABLE = 'instrument_bank_guarantees'
+    TYPES = ('bank guarantee',)
+    NUMERIC = ('margin_percent',)
+
+
+class LetterOfCredit(InstrumentDetails):
+    __slots__ = ('issuing_bank', 'advising_bank', 'lc_number', 'shipment_terms', 'expiry_date')
+    TABLE = 'instrument_letters_of_credit'
+    TYPES = ('letter of credit',)
+
+
+class Transfer(InstrumentDetails):
+    __slots__ = ('utr', 'txn_date', 'payer_bank', 'payee_bank', 'channel')
+    TABLE = 'instrument_transfers'
+    TYPES = ('rtgs', 'neft', 'upi_b2b')
+
+
+class PfmsRelease(InstrumentDetails):
+    __slots__ = ('pfms_id', 'sanction_no', 'scheme', 'fund_source')
+    TABLE = 'instrument_pfms_releases'
+    TYPES = ('e-kuber', 'pfms')
+
+
+class GemPayment(InstrumentDetails):
+    __slots__ = ('gem_order_no', 'gem_invoice_no', 'gem_seller_id')
+    TABLE = 'instrument_gem_payments'
+    TYPES = ('gem payment',)
+
+
+class DigitalSignature(InstrumentDetails):
+    __slots__ = ('signer_id', 'dsc_serial', 'signed_at', 'audit_trail_url')
+    TABLE = 'instrument_signatures'
+    TYPES = ('digital signature',)
+
+
+DETAIL_CLASSES: Tuple[Type[InstrumentDetails], ...] = (BankGuarantee, LetterOfCredit, Transfer, PfmsRelease,
+                                                       GemPayment, DigitalSignature)
+BY_TYPE_NAME: Dict[str, Type[InstrumentDetails]] = {t: cls for cls in DETAIL_CLASSES for t in cls.TYPES}
+BY_TABLE: Dict[str, Type[InstrumentDetails]] = {cls.TABLE.replace('instrument_', '', 1): cls
+                                                for cls in DETAIL_CLASSES}
+
+_OBJECT = "CASE WHEN json_valid(f.details) THEN json_type(f.details) END = 'object'"
+
+
+def _affinity(value, numeric: bool):
+    """What ``json_extract`` plus the column's affinity stores for a decoded JSON value."""
+    if isinstance(value, bool):
+        value = int(value)
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+    if numeric:
+        if isinstance(value, str):
+            text = value.strip()
+            # REAL affinity converts decimal text only; float() also takes "nan", "inf" and "1_0".
+            if not text or any(c == '_' or c.isalpha() and c not in 'eE' for c in text):
+                return value
+            try:
+                return float(text)
+            except ValueError:
+                return value
+        return float(value) if isinstance(value, (int, float)) else value
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        return str(int(value)) + '.0' if value.is_integer() else repr(value)
+    return value
+
+
+def parse_details(type_name: Optional[str], instrument_id: int, text: Optional[str]) -> Optional[InstrumentDetails]:
+    """The typed record for one instrument, or None when its type has no details shape."""
+    cls = BY_TYPE_NAME.get((type_name or '').lower())
+    return cls.from_json(instrument_id, text) if cls else None
+
+
+def _shred_sql(cls: Type[InstrumentDetails]) -> str:
+    extracts = ', '.join(f"json_extract(f.details, '$.{name}')" for name in cls.__slots__)
+    types = ', '.join(f"'{t}'" for t in cls.TYPES)
+    return (f'INSERT INTO {cls.TABLE} (instrument_id, {", ".join(cls.__slots__)}) SELECT f.id, {extracts} '
+            f'FROM financial_instruments f JOIN instrument_types t ON t.id = f.type_id '
+            f'WHERE lower(t.name) IN ({types}) AND {_OBJECT}')
+
+
+def shred(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Rebuild every side table from ``details`` in one transaction; returns row counts."""
+    out = {}
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for cls in DETAIL_CLASSES:
+            conn.execute(f'DELETE FROM {cls.TABLE}')
+            out[cls.TABLE] = conn.execute(_shred_sql(cls)).rowcount
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return out
+
+
+def records(conn: sqlite3.Connection, cls: Type[InstrumentDetails],
+            ids: Optional[Sequence[int]] = None) -> Iterator[InstrumentDetails]:
+    """Typed records from a side table, in instrument id order."""
+    sql = f'SELECT instrument_id, {", ".join(cls.__slots__)} FROM {cls.TABLE}'
+    params: list = []
+    if ids is not None:
+        sql += f' WHERE instrument_id IN ({", ".join("?" * len(ids))})'
+        params = list(ids)
+    for row in conn.execute(sql + ' ORDER BY instrument_id', params):
+        yield cls(*row)
+
+
+class Mismatch(NamedTuple):
+    table: str
+    instrument_id: int
+    stored: Optional[tuple]
+    decoded: Optional[tuple]
+
+
+def check(conn: sqlite3.Connection) -> List[Mismatch]:
+    """Differences between the side tables and a Python decode of every blob (empty when consistent)."""
+    out = []
+    conn.execute('BEGIN')   # one snapshot for both sides
+    try:
+        decoded: Dict[str, Dict[int, tuple]] = {cls.TABLE: {} for cls in DETAIL_CLASSES}
+        for instrument_id, type_name, text in conn.execute(
+                'SELECT f.id, t.name, f.details FROM financial_instruments f '
+                'JOIN instrument_types t ON t.id = f.type_id WHERE f.details IS NOT NULL'):
+            rec = parse_details(type_name, instrument_id, text)
+            if rec is not None:
+                decoded[rec.TABLE][instrument_id] = rec.values()
+        for cls in DETAIL_CLASSES:
+            stored = {rec.instrument_id: rec.values() for rec in records(conn, cls)}
+            want = decoded[cls.TABLE]
+            for instrument_id in sorted(stored.keys() | want.keys()):
+                if stored.get(instrument_id) != want.get(instrument_id):
+                    out.append(Mismatch(cls.TABLE, instrument_id, stored.get(instrument_id), want.get(instrument_id)))
+    finally:
+        conn.execute('ROLLBACK')
+    return out
+
+
+class GroupTotal(NamedTuple):
+    label: Optional[str]
+    instruments: int
+    amount_paise: int
+
+
+class DetailColumns:
+    """One side table as arrays, row-aligned with the instrument's id, vendor, status and amount.
+
+    ``text[field]`` is ``(codes, labels)``: ``labels[codes[i]]`` is row i's
+    value and code 0 is NULL. ``numbers[field]`` is float64 with NaN for NULL
+    or non-numeric values.
+    """
+
+    __slots__ = ('cls', 'ids', 'vendor_id', 'status', 'statuses', 'amount_paise', 'text', 'numbers')
+
+    def __init__(self, cls, ids, vendor_id, status, statuses, amount_paise, text, numbers):
+        self.cls = cls
+        self.ids = ids
+        self.vendor_id = vendor_id
+        self.status = status            # codes into ``statuses``
+        self.statuses = statuses
+        self.amount_paise = amount_paise
+        self.text: Dict[str, Tuple[np.ndarray, List[Optional[str]]]] = text
+        self.numbers: Dict[str, np.ndarray] = numbers
+
+    def __len__(self):
+        return len(self.ids)
+
+    def mask(self, statuses: Optional[Sequence[str]] = None, vendor_id: Optional[int] = None) -> np.ndarray:
+        keep = np.ones(len(self.ids), bool)
+        if statuses:
+            codes = [k for k, s in enumerate(self.statuses) if s in statuses]
+            keep &= np.isin(self.status, codes)
+        if vendor_id is not None:
+            keep &= self.vendor_id == vendor_id
+        return keep
+
+    def totals_by(self, field: str, statuses: Optional[Sequence[str]] = None, vendor_id: Optional[int] = None,
+                  weight: Optional[str] = None) -> List[GroupTotal]:
+        """Count and amount per value of a text field, largest amount first.
+
+        ``weight`` names a numeric field taken as a percentage of the amount,
+        e.g. ``margin_percent`` for the cash margin held against guarantees.
+        Rows where it is NULL add nothing.
+        """
+        if field not in self.text:
+            raise ValueError(f'{self.cls.TABLE} has no text field {field!r}')
+        codes, labels = self.text[field]
+        keep = self.mask(statuses, vendor_id)
+        amount = self.amount_paise
+        if weight is not None:
+            if weight not in self.numbers:
+                raise ValueError(f'{self.cls.TABLE} has no numeric field {weight!r}')
+            pct = self.numbers[weight]
+            keep &= ~np.isnan(pct)
+            amount = np.rint(amount * np.where(np.isnan(pct), 0, pct) / 100).astype(np.int64)
+        codes, amount = codes[keep], amount[keep]
+        counts = np.bincount(codes, minlength=len(labels))
+        sums = np.zeros(len(labels), np.int64)
+        np.add.at(sums, codes, amount)
+        order = sorted(np.flatnonzero(counts).tolist(), key=lambda k: (-sums[k], labels[k] or ''))
+        return [GroupTotal(labels[k], int(counts[k]), int(sums[k])) for k in order]
+
+
+def _encode(values: List[Optional[str]]) -> Tuple[np.ndarray, List[Optional[str]]]:
+    labels: List[Optional[str]] = [None]
+    lookup: Dict[Optional[str], int] = {None: 0}
+    return np.fromiter((_code(lookup, labels, v) for v in values), np.int32, len(values)), labels
+
+
+def _code(lookup: Dict[Optional[str], int], labels: List[Optional[str]], value: Optional[str]) -> int:
+    code = lookup.get(value)
+    if code is None:
+        code = lookup[value] = len(labels)
+        labels.append(value)
+    return code
+
+
+def load_columns(conn: sqlite3.Connection, cls: Type[InstrumentDetails]) -> DetailColumns:
+    """Read a side table, with each instrument's vendor, status and amount, into arrays."""
+    rows = conn.execute(f'SELECT d.instrument_id, COALESCE(f.vendor_id, 0), f.status, '
+                        f'CAST(ROUND(COALESCE(f.amount, 0) * 100) AS INTEGER), '
+                        f'{", ".join("d." + name for name in cls.__slots__)} '
+                        f'FROM {cls.TABLE} d JOIN financial_instruments f ON f.id = d.instrument_id '
+                        f'ORDER BY d.instrument_id').fetchall()
+    cols = list(zip(*rows)) if rows else [()] * (4 + len(cls.__slots__))
+    status, statuses = _encode(list(cols[2]))
+    text, numbers = {}, {}
+    for name, values in zip(cls.__slots__, cols[4:]):
+        if name in cls.NUMERIC:
+            numbers[name] = np.array([v if isinstance(v, (int, float)) else np.nan for v in values], np.float64)
+        else:
+            text[name] = _encode([None if v is None else str(v) for v in values])
+    return DetailColumns(cls, np.array(cols[0], np.int64), np.array(cols[1], np.int64), status, statuses,
+                         np.array(cols[3], np.int64), text, numbers)
+
+
+def main(argv=None):
+    from compliance import db
+    from compliance.reports import rupees
+
+    parser = argparse.ArgumentParser(description='Typed side tables for financial_instruments.details.')
+    parser.add_argument('db', help='SQLite mirror of the D1 database')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('shred', help='rebuild every side table from the details JSON')
+    sub.add_parser('check', help='compare the side tables with a Python decode; exit 1 on drift')
+    p = sub.add_parser('totals', help='instrument count and amount per value of a details field')
+    p.add_argument('table', choices=sorted(BY_TABLE))
+    p.add_argument('field')
+    p.add_argument('--status', action='append', help='repeatable (default: every status)')
+    p.add_argument('--vendor-id', type=int)
+    p.add_argument('--weight', help='numeric field applied as a percentage of the amount, e.g. margin_percent')
+    args = parser.parse_args(argv)
+
+    conn = db.open_mirror(args.db)
+    if args.command == 'shred':
+        for table, n in shred(conn).items():
+            print(f'{table}: {n} rows')
+    elif args.command == 'check':
+        mismatches = check(conn)
+        for m in mismatches[:50]:
+            print(f'{m.table} {m.instrument_id}: stored {m.stored} decoded {m.decoded}')
+        print(f'{len(mismatches)} mismatch(es)')
+        conn.close()
+        sys.exit(1 if mismatches else 0)
+    else:
+        columns = load_columns(conn, BY_TABLE[args.table])
+        try:
+            totals = columns.totals_by(args.field, args.status, args.vendor_id, args.weight)
+        except ValueError as exc:
+            raise SystemExit(str(exc))
+        print(f'{args.field},instruments,amount')
+        for t in totals:
+            print(f'{t.label or ""},{t.instruments},{rupees(t.amount_paise)}')
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,392 @@
+"""Line items of purchase orders and delivery challans as rows.
+
+``purchase_orders.items`` and ``delivery_challans.items`` are JSON arrays,
+so every HSN-wise or SKU-wise report decoded every document. This module
+explodes them into ``po_items`` and ``dc_items``
+(``0020_line_items.sql``): one row per line with sku, HSN/SAC, quantity,
+rate, taxable value, tax type, rate and amount, and the line total. Reports
+then ``GROUP BY`` indexed columns.
+
+Lines are read the way the sample documents write them:
+
+* HSN/SAC from ``hsn_sac``, ``hsn_sac_code`` or ``hsn``;
+* taxable value from ``taxable_amount``/``taxable_value``, else quantity
+  times ``rate``. A PO line without a rate takes the PO's amount spread
+  evenly over its quantity, as in :mod:`compliance.matching`;
+* tax from a ``tax`` object (``type``, ``rate``, ``amount``), flat
+  ``tax_type``/``tax_rate``/``gst_rate``/``tax_amount`` fields, or
+  ``igst_rate`` / ``cgst_rate`` + ``sgst_rate``. The rate stored is the
+  total GST rate. Without a stated amount the tax is the taxable value at
+  that rate, rounded half up to the paisa.
+
+:func:`normalize` streams documents in batches of :data:`BATCH` and
+commits each batch, so memory stays flat and writers are never blocked for
+long. An incremental run re-explodes only documents with ``updated_at`` at
+or after the last finished run's watermark, plus ids above the highest it
+saw (rows inserted with an old ``updated_at``). Triggers drop the lines of
+deleted documents and copy status changes onto the lines, so a summary
+by status reads only the covering index. :func:`check` re-explodes everything and diffs it
+against the stored rows.
+
+    python -m compliance.lineitems local.sqlite run [--incremental]
+    python -m compliance.lineitems local.sqlite summary --by hsn_sac [--entity dcs] [--status approved]
+    python -m compliance.lineitems local.sqlite check
+"""
+import argparse
+import json
+import sqlite3
+import sys
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from compliance.reports import rupees
+
+BATCH = 5000                # documents per write transaction
+
+
+class Entity(NamedTuple):
+    table: str              # document table
+    items: str              # line table
+    key: str                # line table column holding the document id
+    valued: bool            # a line without a rate takes a share of the document amount
+
+
+ENTITIES: Dict[str, Entity] = {
+    'pos': Entity('purchase_orders', 'po_items', 'po_id', True),
+    'dcs': Entity('delivery_challans', 'dc_items', 'dc_id', False),
+}
+LINE_COLUMNS = ('sn', 'sku', 'hsn_sac', 'description', 'qty', 'uom', 'rate', 'taxable_paise', 'tax_type',
+                'tax_rate', 'tax_paise', 'total_paise')
+SUMMARY_KEYS = ('hsn_sac', 'sku')
+TAX_TYPES = {'IGST': 'IGST', 'CGST': 'CGST_SGST', 'SGST': 'CGST_SGST', 'UTGST': 'CGST_SGST',
+             'CGST+SGST': 'CGST_SGST', 'CGST/SGST': 'CGST_SGST', 'CGST_SGST': 'CGST_SGST',
+             'CGST+UTGST': 'CGST_SGST'}
+
+
+class LineItem(NamedTuple):
+    sn: int
+    sku: Optional[str]
+    hsn_sac: Optional[str]
+    description: Optional[str]
+    qty: float
+    uom: Optional[str]
+    rate: Optional[float]
+    taxable_paise: Optional[int]
+    tax_type: Optional[str]         # 'IGST', 'CGST_SGST' or None when the line does not say
+    tax_rate: Optional[float]
+    tax_paise: Optional[int]
+    total_paise: Optional[int]
+
+
+class ItemTotal(NamedTuple):
+    key: Optional[str]              # HSN/SAC or SKU
+    lines: int
+    qty: float
+    taxable_paise: int
+    tax_paise: int
+    total_paise: int
+
+
+class NormalizeRun(NamedTuple):
+    mode: str                       # 'full' or 'incremental'
+    documents: Dict[str, int]       # entity -> documents re-exploded
+    lines: Dict[str, int]           # entity -> lines written
+    undecodable: int                # documents whose ``items`` is not a JSON array
+
+
+class Mismatch(NamedTuple):
+    table: str
+    document_id: int
+    sn: int
+    stored: Optional[Tuple[str, LineItem]]      # (status, line)
+    expected: Optional[Tuple[str, LineItem]]
+
+
+def _number(value, default=None) -> Optional[float]:
+    if value is None or value == '' or value.__class__ is bool:
+        return default
+    if value.__class__ is int or value.__class__ is float:
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _text(value) -> Optional[str]:
+    if value is None or value.__class__ is dict or value.__class__ is list:
+        return None
+    if value.__class__ is float and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def _paise(value) -> Optional[int]:
+    value = _number(value)
+    return None if value is None else round(value * 100)
+
+
+def _first(item: dict, *keys):
+    for key in keys:
+        value = item.get(key)
+        if value is not None and value != '':
+            return value
+    return None
+
+
+def _tax(item: dict) -> Tuple[Optional[str], Optional[float], Optional[int]]:
+    """(tax type, total rate, stated amount in paise) of one line."""
+    tax = item.get('tax')
+    if tax.__class__ is dict:
+        kind = _text(tax.get('type'))
+        rate, amount = _number(tax.get('rate')), _paise(tax.get('amount'))
+    else:
+        kind = _text(item.get('tax_type'))
+        rate, amount = _number(_first(item, 'tax_rate', 'gst_rate')), _paise(item.get('tax_amount'))
+    if rate is None:
+        igst = _number(item.get('igst_rate'))
+        halves = [r for r in (_number(item.get('cgst_rate')), _number(item.get('sgst_rate'))) if r is not None]
+        if igst:
+            kind, rate = kind or 'IGST', igst
+        elif halves:
+            kind, rate = kind or 'CGST_SGST', sum(halves)
+        elif igst is not None:
+            kind, rate = kind or 'IGST', igst
+    return TAX_TYPES.get(kind.upper().replace(' ', '')) if kind else None, rate, amount
+
+
+def tax_on(taxable_paise: int, rate: float) -> int:
+    """Tax at ``rate`` percent on ``taxable_paise``, rounded half up (away from zero) to the paisa."""
+    basis = round(rate * 100) * taxable_paise           # rate in hundredths of a percent
+    if basis < 0:
+        return -((-basis + 5000) // 10000)
+    return (basis + 5000) // 10000
+
+
+def explode(items: Optional[str], amount=None, valued: bool = False) -> Optional[List[LineItem]]:
+    """Lines of one ``items`` cell; None when it is set but not a JSON array.
+
+    ``amount`` is the document amount a line without a rate shares in
+    when ``valued`` (POs). Entries that are not objects are skipped.
+    """
+    if not items:
+        return []
+    try:
+        lines = json.loads(items)
+    except ValueError:
+        return None
+    if lines.__class__ is not list:
+        return None
+    out, fallback = [], None
+    for sn, item in enumerate(lines, 1):
+        if item.__class__ is not dict:
+            continue
+        qty = _number(item.get('qty'), _number(item.get('quantity'), 0.0))
+        rate = _number(_first(item, 'rate', 'unit_price'))
+        taxable = _paise(_first(item, 'taxable_amount', 'taxable_value'))
+        if taxable is None:
+            if rate is None and valued:
+                if fallback is None:
+                    total = sum(_number(i.get('qty'), 0.0) for i in lines if i.__class__ is dict)
+                    fallback = (_number(amount, 0.0) / total) if total else 0.0
+                taxable = round(qty * fallback * 100)
+            elif rate is not None:
+                taxable = round(qty * rate * 100)
+        kind, tax_rate, tax = _tax(item)
+        if tax is None and tax_rate is not None and taxable is not None:
+            tax = tax_on(taxable, tax_rate)
+        out.append(LineItem(sn, _text(item.get('sku')), _text(_first(item, 'hsn_sac', 'hsn_sac_code', 'hsn')),
+                            _text(_first(item, 'description', 'item_description')), float(qty),
+                            _text(item.get('uom')), None if rate is None else float(rate), taxable, kind,
+                            None if tax_rate is None else float(tax_rate), tax,
+                            None if taxable is None else taxable + (tax or 0)))
+    return out
+
+
+def _explode_rows(rows: Iterable[tuple], entity: Entity) -> Tuple[List[tuple], List[int], int]:
+    """(line rows to insert, document ids, undecodable count) for ``(id, amount, status, items)`` rows."""
+    lines, ids, bad = [], [], 0
+    for doc_id, amount, status, items in rows:
+        ids.append(doc_id)
+        exploded = explode(items, amount, entity.valued)
+        if exploded is None:
+            bad += 1
+            continue
+        lines.extend((doc_id, status, *line) for line in exploded)
+    return lines, ids, bad
+
+
+def _write(conn: sqlite3.Connection, entity: Entity, ids: List[int], lines: List[tuple]) -> None:
+    conn.executemany(f'DELETE FROM {entity.items} WHERE {entity.key} = ?', ((i,) for i in ids))
+    conn.executemany(f'INSERT INTO {entity.items} ({entity.key}, status, {", ".join(LINE_COLUMNS)}) '
+                     f'VALUES ({", ".join("?" * (len(LINE_COLUMNS) + 2))})', lines)
+
+
+def _changed(conn: sqlite3.Connection, table: str, since: str, max_id: int) -> List[int]:
+    return sorted({i for (i,) in conn.execute(f'SELECT id FROM {table} WHERE updated_at >= ?', (since,))}
+                  | {i for (i,) in conn.execute(f'SELECT id FROM {table} WHERE id > ?', (max_id,))})
+
+
+def _batches(conn: sqlite3.Connection, table: str, ids: Optional[List[int]]) -> Iterator[List[tuple]]:
+    """``(id, amount, status, items)`` rows of every document (``ids`` None) or of ``ids``, BATCH at a time."""
+    columns = f'id, {"amount" if table == "purchase_orders" else "NULL"}, status, items'
+    if ids is None:
+        last = 0
+        while True:
+            rows = conn.execute(f'SELECT {columns} FROM {table} WHERE id > ? ORDER BY id LIMIT ?',
+                                (last, BATCH)).fetchall()
+            if not rows:
+                return
+            yield rows
+            last = rows[-1][0]
+    for start in range(0, len(ids), BATCH):
+        chunk = ids[start:start + BATCH]
+        rows = conn.execute(f'SELECT {columns} FROM {table} WHERE id IN (SELECT value FROM json_each(?))',
+                            (json.dumps(chunk),)).fetchall()
+        # Deleted since the ids were read: the trigger already dropped their lines.
+        yield rows
+
+
+def normalize(conn: sqlite3.Connection, incremental: bool = False) -> NormalizeRun:
+    """Explode every document, or with ``incremental`` only those changed since the last run.
+
+    An incremental call runs in full when no run has finished yet or the
+    latest full run was interrupted. Each batch commits on its own, and
+    the run is marked finished only after the last one.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        latest = conn.execute('SELECT mode, finished_at FROM line_item_runs ORDER BY id DESC LIMIT 1').fetchone()
+        last = conn.execute('SELECT watermark, po_max_id, dc_max_id FROM line_item_runs '
+                            'WHERE finished_at IS NOT NULL ORDER BY id DESC LIMIT 1').fetchone()
+        full = not incremental or last is None or (latest[0] == 'full' and latest[1] is None)
+        # Anything written from this second on is re-read next time.
+        watermark = conn.execute('SELECT CURRENT_TIMESTAMP').fetchone()[0]
+        max_ids = {name: conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {e.table}').fetchone()[0]
+                   for name, e in ENTITIES.items()}
+        scope = {name: None if full else _changed(conn, e.table, last[0], last[1 + k])
+                 for k, (name, e) in enumerate(ENTITIES.items())}
+        if full:
+            for e in ENTITIES.values():
+                conn.execute(f'DELETE FROM {e.items}')
+        run_id = conn.execute('INSERT INTO line_item_runs (mode, watermark, po_max_id, dc_max_id) VALUES (?, ?, ?, ?)',
+                              ('full' if full else 'incremental', watermark, max_ids['pos'],
+                               max_ids['dcs'])).lastrowid
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+    documents, written, bad = dict.fromkeys(ENTITIES, 0), dict.fromkeys(ENTITIES, 0), 0
+    for name, entity in ENTITIES.items():
+        for rows in _batches(conn, entity.table, scope[name]):
+            lines, ids, undecodable = _explode_rows(rows, entity)
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                _write(conn, entity, ids, lines)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            documents[name] += len(ids)
+            written[name] += len(lines)
+            bad += undecodable
+    conn.execute('UPDATE line_item_runs SET documents = ?, lines = ?, undecodable = ?, '
+                 'finished_at = CURRENT_TIMESTAMP WHERE id = ?',
+                 (sum(documents.values()), sum(written.values()), bad, run_id))
+    return NormalizeRun('full' if full else 'incremental', documents, written, bad)
+
+
+def lines(conn: sqlite3.Connection, entity: str, document_id: int) -> List[LineItem]:
+    e = ENTITIES[entity]
+    return [LineItem(*r) for r in conn.execute(
+        f'SELECT {", ".join(LINE_COLUMNS)} FROM {e.items} WHERE {e.key} = ? ORDER BY sn', (document_id,))]
+
+
+def summary(conn: sqlite3.Connection, entity: str = 'pos', by: str = 'hsn_sac',
+            statuses: Optional[Sequence[str]] = None, vendor_id: Optional[int] = None) -> List[ItemTotal]:
+    """Lines, quantity, taxable value, tax and total per HSN/SAC or SKU (the GSTR-1 HSN summary shape)."""
+    if by not in SUMMARY_KEYS:
+        raise ValueError(f'by must be one of {", ".join(SUMMARY_KEYS)}')
+    e = ENTITIES[entity]
+    where, params, join = [], [], ''
+    if statuses:
+        where.append(f'i.status IN ({", ".join("?" * len(statuses))})')
+        params.extend(statuses)
+    if vendor_id is not None:
+        join = f'JOIN {e.table} d ON d.id = i.{e.key} '
+        where.append('d.vendor_id = ?')
+        params.append(vendor_id)
+    sql = (f'SELECT i.{by}, COUNT(*), TOTAL(i.qty), COALESCE(SUM(i.taxable_paise), 0), '
+           f'COALESCE(SUM(i.tax_paise), 0), COALESCE(SUM(i.total_paise), 0) FROM {e.items} i {join}'
+           + (f'WHERE {" AND ".join(where)} ' if where else '') + f'GROUP BY i.{by} ORDER BY i.{by}')
+    return [ItemTotal(*r) for r in conn.execute(sql, params)]
+
+
+def check(conn: sqlite3.Connection) -> List[Mismatch]:
+    """Stored lines that differ from a fresh explode of every document, in one read snapshot."""
+    out: List[Mismatch] = []
+    conn.execute('BEGIN')
+    try:
+        for entity in ENTITIES.values():
+            for rows in _batches(conn, entity.table, None):
+                expected: Dict[Tuple[int, int], Tuple[str, LineItem]] = {}
+                for doc_id, amount, status, items in rows:
+                    for line in explode(items, amount, entity.valued) or ():
+                        expected[doc_id, line.sn] = (status, line)
+                lo, hi = rows[0][0], rows[-1][0]
+                stored = {(r[0], r[2]): (r[1], LineItem(*r[2:])) for r in conn.execute(
+                    f'SELECT {entity.key}, status, {", ".join(LINE_COLUMNS)} FROM {entity.items} '
+                    f'WHERE {entity.key} BETWEEN ? AND ?', (lo, hi))}
+                for key in sorted(expected.keys() | stored.keys()):
+                    if stored.get(key) != expected.get(key):
+                        out.append(Mismatch(entity.items, *key, stored.get(key), expected.get(key)))
+            # Lines left over from documents no longer there.
+            out.extend(Mismatch(entity.items, doc_id, sn, (status, LineItem(sn, *rest)), None)
+                       for doc_id, status, sn, *rest in
+                       conn.execute(f'SELECT {entity.key}, status, {", ".join(LINE_COLUMNS)} FROM {entity.items} i '
+                                    f'WHERE NOT EXISTS (SELECT 1 FROM {entity.table} d WHERE d.id = i.{entity.key})'))
+    finally:
+        conn.execute('ROLLBACK')
+    return out
+
+
+def main(argv=None):
+    from compliance import db
+
+    parser = argparse.ArgumentParser(description='PO and DC line items exploded from the items JSON.')
+    parser.add_argument('db', help='SQLite mirror of the D1 database')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('run', help='explode items into po_items and dc_items')
+    p.add_argument('--incremental', action='store_true', help='only documents changed since the last run')
+    p = sub.add_parser('summary', help='lines, quantity and amounts per HSN/SAC or SKU')
+    p.add_argument('--entity', choices=sorted(ENTITIES), default='pos')
+    p.add_argument('--by', choices=SUMMARY_KEYS, default='hsn_sac')
+    p.add_argument('--status', action='append', help='repeatable (default: every status)')
+    p.add_argument('--vendor-id', type=int)
+    sub.add_parser('check', help='compare the stored lines with a fresh explode; exit 1 on drift')
+    args = parser.parse_args(argv)
+
+    conn = db.open_mirror(args.db)
+    if args.command == 'run':
+        run = normalize(conn, args.incremental)
+        print(f'{run.mode}: ' + ', '.join(f'{name} {run.documents[name]} document(s) / {run.lines[name]} line(s)'
+                                          for name in ENTITIES)
+              + (f'; {run.undecodable} document(s) with unreadable items' if run.undecodable else ''))
+    elif args.command == 'summary':
+        print(f'{args.by},lines,qty,taxable,tax,total')
+        for t in summary(conn, args.entity, args.by, args.status, args.vendor_id):
+            print(f'{t.key or ""},{t.lines},{t.qty:g},{rupees(t.taxable_paise)},{rupees(t.tax_paise)},'
+                  f'{rupees(t.total_paise)}')
+    else:
+        mismatches = check(conn)
+        for m in mismatches[:50]:
+            print(f'{m.table} {m.document_id} line {m.sn}: stored {m.stored} expected {m.expected}')
+        print(f'{len(mismatches)} mismatch(es)')
+        conn.close()
+        sys.exit(1 if mismatches else 0)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,375 @@
+"""Keyset pagination and cached counts for the list endpoints.
+
+``/api/vendors``, ``/api/payments``, ``/api/pos``, ``/api/invoices`` and
+``/api/dcs`` run ``COUNT(*)`` and ``LIMIT ? OFFSET ?`` for every page, so
+page N costs N pages of scanning plus a full count. This module serves the
+same lists newest first, ordered on ``(created_at, id)`` so ties are
+stable, and adds two things:
+
+* an opaque ``cursor`` that resumes after the last row seen. Each page is
+  an index range scan on the ``(filter, created_at, id)`` indexes from
+  ``0013_list_indexes.sql``, whatever the depth;
+* a per-filter cache of ``total`` and of page anchors (the first key of
+  each page already served). ``?page=N`` starts from the nearest cached
+  anchor and skips the rest on the covering index, without reading rows.
+
+Cache entries are dropped on write. Writes made through :class:`ListStore`
+invalidate only the filters the old and new rows match. A commit from any
+other connection (the loader, wrangler) bumps ``PRAGMA data_version`` and
+clears the whole cache.
+
+Rows with a NULL ``created_at`` sort last and cannot be reached by a
+cursor. The schema default makes them rare; the loader never writes them.
+
+    python -m compliance.listing local.sqlite invoices --status pending --page 5000
+"""
+import argparse
+import base64
+import json
+import sqlite3
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from compliance import search as vendor_search
+from compliance.export import EXPORTS, STATUS_ALIASES, VENDOR_STATUSES
+
+DEFAULT_SIZE = 25
+MAX_SIZE = 100
+
+
+class ListSpec(NamedTuple):
+    table: str
+    columns: Optional[Tuple[str, ...]]   # None: SELECT *, as the Worker does
+    filters: Tuple[str, ...]             # equality filters the endpoint accepts
+    writable: Tuple[str, ...]            # the Worker's PUT field list
+    required: str                        # must be present on create
+    json_columns: Tuple[str, ...] = ()
+
+
+LISTS: Dict[str, ListSpec] = {
+    'vendors': ListSpec('vendors', EXPORTS['vendors'].columns, ('status',),
+                        ('company_name', 'legal_name', 'gstin', 'pan', 'address_lines', 'state', 'state_code',
+                         'pin_code', 'contact_person', 'contact_number', 'email', 'business_type', 'status', 'rating',
+                         'tags'),
+                        'company_name', ('address_lines', 'tags')),
+    'payments': ListSpec('payments', None, ('status', 'vendor_id'),
+                         ('vendor_id', 'invoice_ref', 'amount', 'status', 'proof_url', 'tds_section'), 'invoice_ref'),
+    'pos': ListSpec('purchase_orders', None, ('status', 'vendor_id'),
+                    ('vendor_id', 'po_number', 'items', 'amount', 'status'), 'po_number', ('items',)),
+    'invoices': ListSpec('invoices', None, ('status', 'vendor_id'),
+                         ('vendor_id', 'invoice_number', 'amount', 'status', 'due_date'), 'invoice_number'),
+    'dcs': ListSpec('delivery_challans', None, ('status', 'vendor_id'),
+                    ('vendor_id', 'dc_number', 'items', 'status'), 'dc_number', ('items',)),
+}
+
+FilterKey = Tuple[Tuple[str, object], ...]
+
+
+class Page(NamedTuple):
+    items: List[dict]
+    size: int
+    total: int
+    next_cursor: Optional[str]
+    page: Optional[int] = None       # set for ?page=N requests
+
+    def to_json(self) -> dict:
+        """The Worker's ``{page, size, total, items}`` plus ``next_cursor``."""
+        out = {'size': self.size, 'total': self.total, 'items': self.items, 'next_cursor': self.next_cursor}
+        if self.page is not None:
+            out = {'page': self.page, **out}
+        return out
+
+
+def encode_cursor(created_at, row_id: int) -> str:
+    raw = json.dumps([created_at, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[object, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor') from None
+    if not isinstance(row_id, int):
+        raise ValueError('Invalid cursor')
+    return created_at, row_id
+
+
+def clamp_size(size) -> int:
+    """``Math.min(Math.max(size, 1), 100)`` with the Worker's default for junk."""
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        return DEFAULT_SIZE
+    return min(max(size, 1), MAX_SIZE)
+
+
+class _Entry:
+    __slots__ = ('total', 'anchors')
+
+    def __init__(self):
+        self.total: Optional[int] = None
+        self.anchors: Dict[Tuple[int, int], Tuple[object, int]] = {}   # (size, page) -> key of its first row
+
+
+class CountCache:
+    """``total`` and page anchors per ``(entity, filters)``, dropped on write."""
+    __slots__ = ('_entries', 'hits', 'misses')
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, FilterKey], _Entry] = {}
+        self.hits = self.misses = 0
+
+    def entry(self, entity: str, key: FilterKey) -> _Entry:
+        entry = self._entries.get((entity, key))
+        if entry is None:
+            entry = self._entries[(entity, key)] = _Entry()
+        return entry
+
+    def invalidate(self, entity: str, rows: Optional[Iterable[dict]] = None):
+        """Drop the entity's entries whose filters match any of ``rows`` (all of them if None)."""
+        rows = None if rows is None else [r for r in rows if r]
+        for ent, key in list(self._entries):
+            if ent != entity:
+                continue
+            if rows is None or any(_matches(key, r) for r in rows):
+                del self._entries[(ent, key)]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _matches(key: FilterKey, row: dict) -> bool:
+    # A text search could match anything; treat it as always affected.
+    return all(col == 'search' or row.get(col) == value for col, value in key)
+
+
+def _normalize_vendor_status(status: str) -> str:
+    status = status.strip().lower()
+    status = STATUS_ALIASES.get(status, status)
+    if status not in VENDOR_STATUSES:
+        raise ValueError(f'Invalid status filter. Allowed: {", ".join(sorted(VENDOR_STATUSES))}')
+    return status
+
+
+class ListStore:
+    """List/get/create/update over one connection, with keyset pages and cached counts."""
+
+    def __init__(self, conn: sqlite3.Connection, cache: Optional[CountCache] = None):
+        self.conn = conn
+        self.cache = cache if cache is not None else CountCache()
+        self._data_version = self._current_data_version()
+
+    def _current_data_version(self) -> int:
+        return self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def _check_external_writes(self):
+        version = self._current_data_version()
+        if version != self._data_version:
+            self._data_version = version
+            self.cache.clear()
+
+    def _where(self, entity: str, status=None, vendor_id=None, search=None) -> Tuple[List[str], list, FilterKey]:
+        spec = LISTS[entity]
+        where, params, key = [], [], []
+        if search:
+            if entity != 'vendors':
+                raise ValueError('search is only supported for vendors')
+            search = str(search).strip()
+            clause, args = vendor_search.search_clause(search)
+            if clause:
+                where.append(clause)
+                params += args
+                key.append(('search', vendor_search.match_expression(search)))
+        if status:
+            status = str(status).strip()
+            if entity == 'vendors':
+                status = _normalize_vendor_status(status)
+            if status:
+                where.append('status = ?')
+                params.append(status)
+                key.append(('status', status))
+        if vendor_id not in (None, ''):
+            if 'vendor_id' not in spec.filters:
+                raise ValueError(f'vendor_id filter is not supported for {entity}')
+            try:
+                vendor_id = int(vendor_id)
+            except (TypeError, ValueError):
+                raise ValueError('Invalid vendor_id') from None
+            where.append('vendor_id = ?')
+            params.append(vendor_id)
+            key.append(('vendor_id', vendor_id))
+        return where, params, tuple(sorted(key))
+
+    def count(self, entity: str, status=None, vendor_id=None, search=None) -> int:
+        self._check_external_writes()
+        where, params, key = self._where(entity, status, vendor_id, search)
+        return self._total(entity, where, params, key)
+
+    def _total(self, entity, where, params, key) -> int:
+        entry = self.cache.entry(entity, key)
+        if entry.total is None:
+            self.cache.misses += 1
+            sql = f'SELECT COUNT(*) FROM {LISTS[entity].table}' + (f' WHERE {" AND ".join(where)}' if where else '')
+            entry.total = self.conn.execute(sql, params).fetchone()[0]
+        else:
+            self.cache.hits += 1
+        return entry.total
+
+    def list(self, entity: str, status=None, vendor_id=None, search=None, size=DEFAULT_SIZE,
+             cursor: Optional[str] = None, page: Optional[int] = None) -> Page:
+        """One page, newest first. ``cursor`` wins over ``page``; neither means page 1."""
+        self._check_external_writes()
+        spec = LISTS[entity]
+        size = clamp_size(size)
+        where, params, key = self._where(entity, status, vendor_id, search)
+        total = self._total(entity, where, params, key)
+        entry = self.cache.entry(entity, key)
+
+        bound, inclusive = None, False
+        if cursor:
+            bound = decode_cursor(cursor)
+            page = None
+        else:
+            page = max(int(page or 1), 1)
+            if page > 1:
+                bound = self._anchor(spec, where, params, entry, page, size)
+                if bound is None:
+                    return Page([], size, total, None, page)
+                inclusive = True
+
+        sql_where, sql_params = list(where), list(params)
+        if bound is not None:
+            sql_where.append(f'(created_at, id) {"<=" if inclusive else "<"} (?, ?)')
+            sql_params += list(bound)
+        columns = ', '.join(spec.columns) if spec.columns else '*'
+        sql = (f'SELECT {columns} FROM {spec.table}' + (f' WHERE {" AND ".join(sql_where)}' if sql_where else '')
+               + ' ORDER BY created_at DESC, id DESC LIMIT ?')
+        cur = self.conn.execute(sql, sql_params + [size + 1])
+        names = [d[0] for d in cur.description]
+        rows = cur.fetchall()
+
+        next_cursor = None
+        if len(rows) > size:
+            last, nxt = dict(zip(names, rows[size - 1])), dict(zip(names, rows[size]))
+            next_cursor = encode_cursor(last['created_at'], last['id'])
+            if page is not None:
+                entry.anchors[(size, page + 1)] = (nxt['created_at'], nxt['id'])
+            rows = rows[:size]
+        if page is not None and rows:
+            first = dict(zip(names, rows[0]))
+            entry.anchors[(size, page)] = (first['created_at'], first['id'])
+        return Page([dict(zip(names, r)) for r in rows], size, total, next_cursor, page)
+
+    def _anchor(self, spec: ListSpec, where, params, entry: _Entry, page: int, size: int):
+        """Key of the first row of ``page``: nearest cached anchor, then skip on the index."""
+        if (size, page) in entry.anchors:
+            return entry.anchors[(size, page)]
+        start = max((p for s, p in entry.anchors if s == size and p < page), default=1)
+        sql_where, sql_params = list(where), list(params)
+        if start > 1:
+            sql_where.append('(created_at, id) <= (?, ?)')
+            sql_params += list(entry.anchors[(size, start)])
+        # Only (created_at, id) is read, so the skip stays inside the covering index.
+        sql = (f'SELECT created_at, id FROM {spec.table}'
+               + (f' WHERE {" AND ".join(sql_where)}' if sql_where else '')
+               + ' ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?')
+        row = self.conn.execute(sql, sql_params + [(page - start) * size]).fetchone()
+        if row is None:
+            return None
+        entry.anchors[(size, page)] = (row[0], row[1])
+        return entry.anchors[(size, page)]
+
+    def get(self, entity: str, row_id: int) -> Optional[dict]:
+        cur = self.conn.execute(f'SELECT * FROM {LISTS[entity].table} WHERE id = ?', (row_id,))
+        row = cur.fetchone()
+        return None if row is None else dict(zip([d[0] for d in cur.description], row))
+
+    def _values(self, spec: ListSpec, entity: str, body: dict) -> Dict[str, object]:
+        values = {}
+        for col in spec.writable:
+            if col not in body:
+                continue
+            value = body[col]
+            if col in spec.json_columns and value is not None and not isinstance(value, str):
+                value = json.dumps(value)
+            if col == 'status' and entity == 'vendors':
+                value = _normalize_vendor_status(str(value or ''))
+            if col == 'tds_section':
+                value = self._tds_section(value)
+            values[col] = value
+        return values
+
+    def _tds_section(self, value) -> Optional[str]:
+        """A blank section clears it; anything else must be an active ``tds_sections`` row."""
+        section = str(value if value is not None else '').strip()
+        if not section:
+            return None
+        if not self.conn.execute('SELECT 1 FROM tds_sections WHERE section = ? AND is_active', (section,)).fetchone():
+            raise ValueError(f'Unknown tds_section {section}')
+        return section
+
+    def create(self, entity: str, body: dict, actor_level: Optional[int] = None) -> dict:
+        spec = LISTS[entity]
+        values = self._values(spec, entity, body)
+        if not str(values.get(spec.required) or '').strip():
+            raise ValueError(f'{spec.required} required')
+        if entity != 'vendors':          # the Worker does not record a level on vendors
+            values['created_by_level'] = actor_level
+        cols = list(values)
+        try:
+            cur = self.conn.execute(f'INSERT INTO {spec.table} ({", ".join(cols)}) '
+                                    f'VALUES ({", ".join("?" * len(cols))})', [values[c] for c in cols])
+        except sqlite3.IntegrityError as exc:
+            raise ValueError(str(exc)) from None
+        row = self.get(entity, cur.lastrowid)
+        self.cache.invalidate(entity, [row])
+        return row
+
+    def update(self, entity: str, row_id: int, body: dict) -> Optional[dict]:
+        spec = LISTS[entity]
+        values = self._values(spec, entity, body)
+        if not values:
+            raise ValueError('No updatable fields provided')
+        old = self.get(entity, row_id)
+        if old is None:
+            return None
+        sets = ', '.join(f'{c} = ?' for c in values)
+        try:
+            self.conn.execute(f'UPDATE {spec.table} SET {sets}, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                              [*values.values(), row_id])
+        except sqlite3.IntegrityError as exc:
+            raise ValueError(str(exc)) from None
+        row = self.get(entity, row_id)
+        self.cache.invalidate(entity, [old, row])
+        return row
+
+
+def main(argv=None):
+    from compliance import db
+
+    parser = argparse.ArgumentParser(description='Print one page of a list endpoint from the SQLite mirror.')
+    parser.add_argument('db', help='SQLite mirror of the D1 database')
+    parser.add_argument('entity', choices=sorted(LISTS))
+    parser.add_argument('--status')
+    parser.add_argument('--vendor-id')
+    parser.add_argument('--search', help='vendors only')
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--page', type=int)
+    group.add_argument('--cursor')
+    args = parser.parse_args(argv)
+
+    store = ListStore(db.connect(args.db))
+    try:
+        page = store.list(args.entity, args.status, args.vendor_id, args.search, args.size, args.cursor, args.page)
+    except ValueError as exc:
+        parser.exit(2, f'{exc}\n')
+    print(json.dumps(page.to_json(), indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,375 @@
+"""Bulk CSV import into a local SQLite mirror of the D1 schema.
+
+The Worker's ``/api/*/import.csv`` handlers upsert one row per D1 round trip,
+which is fine for the templates and hopeless for a year of history. This
+loader applies the same per-entity rules (required keys, skip/error
+semantics, status normalisation, upsert targets, instrument ``details``) to
+a local file from :mod:`compliance.db`. Rows are streamed through
+``csv.reader`` and bound with ``executemany`` in batches, one transaction per
+batch, so memory stays flat and SQLite does the work.
+
+Counts come back in the Worker's response shape. Unlike the Worker, which
+reports every PO/invoice/DC row as inserted, ``inserted`` and ``updated``
+are exact: new rows are the ones whose rowid lands above the batch's
+starting maximum. A batch that hits a constraint is replayed row by row so
+only the offending rows become ``Row N: ...`` errors.
+
+    python -m compliance.loader local.sqlite -e invoices history.csv
+    python -m compliance.loader local.sqlite public/data/*_import_template.csv --dry-run
+"""
+import argparse
+import csv
+import json
+import re
+import sqlite3
+import sys
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from compliance import db
+
+DEFAULT_BATCH_SIZE = 50_000
+MAX_ERRORS = 1000  # keep the report readable on a badly broken file
+
+GSTIN_RE = re.compile(r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z][1-9A-Z]Z[0-9A-Z]$')
+STATUS_ALIASES = {'active': 'approved', 'inactive': 'suspended'}
+INSTRUMENT_STATUSES = frozenset({'pending', 'active', 'approved', 'rejected', 'expired'})
+IDENTIFIER_COLUMNS = ('bg_number', 'lc_number', 'utr', 'pfms_id', 'gem_order_no', 'signer_id')
+
+
+class SkipRow(Exception):
+    """Row has no key; counted as skipped, as the Worker does."""
+
+
+class ImportResult(NamedTuple):
+    dryRun: bool
+    inserted: int
+    updated: int
+    skipped: int
+    errors: List[str]
+
+    def to_json(self) -> str:
+        return json.dumps(self._asdict())
+
+
+def _number(value: str, column: str):
+    """``Number(x)`` for a non-empty cell; ints stay ints."""
+    try:
+        f = float(value)
+    except ValueError:
+        raise ValueError(f'invalid {column} {value!r}') from None
+    return int(f) if f.is_integer() and column.endswith('_id') else f
+
+
+def _optional_number(rec: Dict[str, str], column: str, default=None):
+    value = rec.get(column, '')
+    return _number(value, column) if value else default
+
+
+def _required(rec: Dict[str, str], column: str) -> str:
+    value = (rec.get(column) or '').strip()
+    if not value:
+        raise SkipRow()
+    return value
+
+
+def _items_json(rec: Dict[str, str]) -> Optional[str]:
+    """Re-serialise an ``items`` cell; unparsable JSON becomes NULL like the Worker."""
+    value = rec.get('items')
+    if not value:
+        return None
+    try:
+        return json.dumps(json.loads(value), separators=(',', ':'), ensure_ascii=False)
+    except ValueError:
+        return None
+
+
+def instrument_details(type_name: str, rec: Dict[str, str]) -> Dict[str, object]:
+    """Port of the Worker's ``parseDetailsByType``."""
+    name = (type_name or '').lower()
+    get = lambda k: rec.get(k) or None  # noqa: E731
+    if name == 'bank guarantee':
+        margin = rec.get('margin_percent')
+        return {'bank_name': get('bank_name'), 'bg_number': get('bg_number'), 'beneficiary': get('beneficiary'),
+                'margin_percent': None if margin is None else (float(margin) if margin else 0),
+                'claimable_until': get('claimable_until')}
+    if name == 'letter of credit':
+        return {'issuing_bank': get('issuing_bank'), 'advising_bank': get('advising_bank'),
+                'lc_number': get('lc_number'), 'shipment_terms': get('shipment_terms'),
+                'expiry_date': get('expiry_date')}
+    if name in ('rtgs', 'neft', 'upi_b2b'):
+        return {'utr': get('utr'), 'txn_date': get('txn_date'), 'payer_bank': get('payer_bank'),
+                'payee_bank': get('payee_bank'), 'channel': type_name.upper()}
+    if name in ('e-kuber', 'pfms'):
+        return {'pfms_id': get('pfms_id'), 'sanction_no': get('sanction_no'), 'scheme': get('scheme'),
+                'fund_source': get('fund_source')}
+    if name == 'gem payment':
+        return {'gem_order_no': get('gem_order_no'), 'gem_invoice_no': get('gem_invoice_no'),
+                'gem_seller_id': get('gem_seller_id')}
+    if name == 'digital signature':
+        return {'signer_id': get('signer_id'), 'dsc_serial': get('dsc_serial'), 'signed_at': get('signed_at'),
+                'audit_trail_url': get('audit_trail_url')}
+    return {}
+
+
+class EntitySpec(NamedTuple):
+    table: str
+    key: str                      # upsert target (UNIQUE column)
+    columns: Sequence[str]        # bound columns, in ``row()`` order
+    row: Callable                 # (rec, context) -> tuple; raises SkipRow / ValueError
+    audit_entity: str             # audit_log.entity_type, as the Worker writes it
+    partial_key: bool = False     # unique index is ``WHERE key IS NOT NULL``
+    verify: Optional[Callable] = None  # batch check: rows -> error message or None per row
+
+    def upsert_sql(self) -> str:
+        cols = ', '.join(self.columns)
+        marks = ', '.join('?' * len(self.columns))
+        target = f'{self.key}) WHERE {self.key} IS NOT NULL' if self.partial_key else f'{self.key})'
+        sets = ', '.join(f'{c}=excluded.{c}' for c in self.columns if c != self.key)
+        return (f'INSERT INTO {self.table} ({cols}) VALUES ({marks}) '
+                f'ON CONFLICT({target} DO UPDATE SET {sets}, updated_at=CURRENT_TIMESTAMP')
+
+
+def _vendor_row(rec, ctx):
+    company_name = _required(rec, 'company_name')
+    gstin = (rec.get('gstin') or '').strip() or None
+    if gstin and not GSTIN_RE.match(gstin):
+        raise ValueError('invalid GSTIN')
+    status = (rec.get('status') or '').strip().lower()
+    return (company_name, rec.get('legal_name') or None, gstin, rec.get('pan') or None, rec.get('state') or None,
+            rec.get('state_code') or None, rec.get('pin_code') or None, rec.get('business_type') or None,
+            STATUS_ALIASES.get(status, status) or 'pending', _optional_number(rec, 'rating', 0))
+
+
+def _verify_vendors(rows: List[tuple]) -> List[Optional[str]]:
+    """GSTIN check digit, state code and PAN/state_code consistency for a batch."""
+    from compliance import gstin
+
+    errors = gstin.validate_vendors([r[2] for r in rows], [r[3] for r in rows], [r[5] for r in rows])
+    return [None if not mask else '; '.join(gstin.describe(int(mask))) for mask in errors.tolist()]
+
+
+def _po_row(rec, ctx):
+    return (_optional_number(rec, 'vendor_id'), _required(rec, 'po_number'), _items_json(rec),
+            _optional_number(rec, 'amount', 0), rec.get('status') or 'pending')
+
+
+def _invoice_row(rec, ctx):
+    return (_optional_number(rec, 'vendor_id'), _required(rec, 'invoice_number'),
+            _optional_number(rec, 'amount', 0), rec.get('status') or 'pending', rec.get('due_date') or None)
+
+
+def _dc_row(rec, ctx):
+    return (_optional_number(rec, 'vendor_id'), _required(rec, 'dc_number'), _items_json(rec),
+            rec.get('status') or 'pending')
+
+
+def _instrument_row(rec, ctx):
+    title = _required(rec, 'title')
+    type_name = rec.get('type_name') or ''
+    status = rec.get('status') or 'pending'
+    details = instrument_details(type_name, rec)
+    has_details = any(v is not None and str(v) != '' for v in details.values())
+    return ((ctx['instrument_types'].get(type_name.lower()) if type_name else None), title,
+            (rec.get('reference_no') or '').strip() or None, _optional_number(rec, 'vendor_id'),
+            _optional_number(rec, 'amount', 0), rec.get('currency') or 'INR',
+            status if status in INSTRUMENT_STATUSES else 'pending',
+            rec.get('issue_date') or None, rec.get('expiry_date') or None, rec.get('document_url') or None,
+            rec.get('notes') or None, json.dumps(details, separators=(',', ':')) if has_details else None,
+            *(details.get(c) or None for c in IDENTIFIER_COLUMNS))
+
+
+ENTITIES: Dict[str, EntitySpec] = {
+    'vendors': EntitySpec('vendors', 'gstin',
+                          ('company_name', 'legal_name', 'gstin', 'pan', 'state', 'state_code', 'pin_code',
+                           'business_type', 'status', 'rating'),
+                          _vendor_row, 'vendors_csv', partial_key=True, verify=_verify_vendors),
+    'pos': EntitySpec('purchase_orders', 'po_number', ('vendor_id', 'po_number', 'items', 'amount', 'status'),
+                      _po_row, 'pos_csv'),
+    'invoices': EntitySpec('invoices', 'invoice_number',
+                           ('vendor_id', 'invoice_number', 'amount', 'status', 'due_date'),
+                           _invoice_row, 'invoices_csv'),
+    'dcs': EntitySpec('delivery_challans', 'dc_number', ('vendor_id', 'dc_number', 'items', 'status'),
+                      _dc_row, 'dcs_csv'),
+    'instruments': EntitySpec('financial_instruments', 'reference_no',
+                              ('type_id', 'title', 'reference_no', 'vendor_id', 'amount', 'currency', 'status',
+                               'issue_date', 'expiry_date', 'document_url', 'notes', 'details') + IDENTIFIER_COLUMNS,
+                              _instrument_row, 'instruments_csv', partial_key=True),
+}
+
+# The key each import requires in the header (the Worker rejects the file otherwise).
+REQUIRED_COLUMNS = {'vendors': 'company_name', 'pos': 'po_number', 'invoices': 'invoice_number',
+                    'dcs': 'dc_number', 'instruments': 'title'}
+
+
+def entity_for_path(path: str) -> str:
+    """Guess the entity from a template-style file name (``po_import_template.csv`` -> ``pos``)."""
+    stem = str(path).replace('\\', '/').rsplit('/', 1)[-1].lower()
+    for prefix, entity in (('vendor', 'vendors'), ('po', 'pos'), ('purchase_order', 'pos'),
+                           ('invoice', 'invoices'), ('dc', 'dcs'), ('delivery_challan', 'dcs'),
+                           ('instrument', 'instruments')):
+        if stem.startswith(prefix):
+            return entity
+    raise ValueError(f'cannot tell the entity of {path!r}; pass it explicitly')
+
+
+def _context(conn: sqlite3.Connection) -> Dict[str, object]:
+    return {'instrument_types': {name.lower(): type_id
+                                 for type_id, name in conn.execute('SELECT id, name FROM instrument_types')}}
+
+
+def _max_rowid(conn: sqlite3.Connection, table: str) -> int:
+    return conn.execute(f'SELECT coalesce(max(rowid), 0) FROM {table}').fetchone()[0]
+
+
+class _Counts:
+    __slots__ = ('inserted', 'updated', 'skipped', 'errors')
+
+    def __init__(self):
+        self.inserted = self.updated = self.skipped = 0
+        self.errors: List[tuple] = []
+
+    def error(self, line: int, message: str):
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+    def messages(self) -> List[str]:
+        return [f'Row {line}: {message}' for line, message in sorted(self.errors)]
+
+
+def _flush(conn, spec: EntitySpec, sql: str, params: List[tuple], lines: List[int], counts: _Counts,
+           verify: bool):
+    if verify and spec.verify is not None:
+        messages = spec.verify(params)
+        if any(messages):
+            for line, message in zip(lines, messages):
+                if message:
+                    counts.error(line, message)
+            keep = [i for i, message in enumerate(messages) if not message]
+            params, lines = [params[i] for i in keep], [lines[i] for i in keep]
+    before = _max_rowid(conn, spec.table)
+    conn.execute('SAVEPOINT load_batch')  # BEGIN when outside a transaction, nested inside a dry run
+    try:
+        conn.executemany(sql, params)
+        written = len(params)
+    except sqlite3.DatabaseError:
+        conn.execute('ROLLBACK TO load_batch')
+        written = 0
+        for line, values in zip(lines, params):
+            try:
+                conn.execute(sql, values)  # statement-atomic: a failing row leaves no trace
+                written += 1
+            except sqlite3.DatabaseError as exc:
+                counts.error(line, str(exc))
+    new_rows = conn.execute(f'SELECT count(*) FROM {spec.table} WHERE rowid > ?', (before,)).fetchone()[0]
+    conn.execute('RELEASE load_batch')
+    counts.inserted += new_rows
+    counts.updated += written - new_rows
+
+
+def load_rows(conn: sqlite3.Connection, entity: str, header: Sequence[str], rows: Iterable[Sequence[str]],
+              dry_run: bool = False, batch_size: int = DEFAULT_BATCH_SIZE,
+              actor_level: Optional[int] = None, verify: bool = False) -> ImportResult:
+    """Import parsed CSV rows (header excluded) for ``entity``.
+
+    ``dry_run`` performs the whole import inside one transaction and rolls
+    it back, so the counts are what a real run would report. ``verify`` adds
+    the stricter batch checks (vendors: :mod:`compliance.gstin`) on top of
+    the Worker's rules.
+    """
+    spec = ENTITIES[entity]
+    header = [h.strip() for h in header]
+    required = REQUIRED_COLUMNS[entity]
+    if required not in header:
+        raise ValueError(f'Missing required column: {required}')
+    sql = spec.upsert_sql()
+    ctx = _context(conn)
+    make_row = spec.row
+    counts = _Counts()
+    params: List[tuple] = []
+    lines: List[int] = []
+    width = len(header)
+
+    if dry_run:
+        conn.execute('BEGIN')
+    try:
+        line = 1
+        for cells in rows:
+            if not cells or (len(cells) == 1 and not cells[0].strip()):
+                continue  # blank line; the Worker drops these before numbering rows
+            line += 1
+            if len(cells) < width:
+                cells = list(cells) + [''] * (width - len(cells))
+            try:
+                params.append(make_row(dict(zip(header, cells)), ctx))
+            except SkipRow:
+                counts.skipped += 1
+                continue
+            except ValueError as exc:
+                counts.error(line, str(exc))
+                continue
+            lines.append(line)
+            if len(params) >= batch_size:
+                _flush(conn, spec, sql, params, lines, counts, verify)
+                params, lines = [], []
+        if params:
+            _flush(conn, spec, sql, params, lines, counts, verify)
+    finally:
+        if dry_run:
+            conn.execute('ROLLBACK')
+
+    payload = json.dumps({'inserted': counts.inserted, 'updated': counts.updated, 'skipped': counts.skipped,
+                          'errorsCount': len(counts.errors)}, separators=(',', ':'))
+    conn.execute('INSERT INTO audit_log (actor_level, action, entity_type, payload) VALUES (?, ?, ?, ?)',
+                 (actor_level, 'import_dry_run' if dry_run else 'import', spec.audit_entity, payload))
+    return ImportResult(dry_run, counts.inserted, counts.updated, counts.skipped, counts.messages())
+
+
+def load_csv(conn: sqlite3.Connection, entity: str, path, dry_run: bool = False,
+             batch_size: int = DEFAULT_BATCH_SIZE, actor_level: Optional[int] = None,
+             verify: bool = False) -> ImportResult:
+    """Stream one CSV file into ``conn``.
+
+    Backslash-escaped quotes (``"[{\\"sku\\":...}]"`` in the DC template) are
+    read as quotes, alongside the standard doubled ``""``.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f, escapechar='\\')
+        try:
+            header = next(reader)
+        except StopIteration:
+            raise ValueError('Empty CSV') from None
+        return load_rows(conn, entity, header, reader, dry_run=dry_run, batch_size=batch_size,
+                         actor_level=actor_level, verify=verify)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk-load import CSVs into a local SQLite mirror.')
+    parser.add_argument('db', help='SQLite file; migrations are applied first')
+    parser.add_argument('-e', '--entity', choices=sorted(ENTITIES), help='default: guessed from each file name')
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--verify', action='store_true',
+                        help='also reject GSTIN check-digit and PAN/state_code mismatches')
+    parser.add_argument('--safe', action='store_true', help='keep fsync and WAL (default: bulk pragmas)')
+    args = parser.parse_args(argv)
+
+    conn = db.open_mirror(args.db, bulk=not args.safe)
+    status = 0
+    for path in args.files:
+        entity = args.entity
+        try:
+            entity = entity or entity_for_path(path)
+            result = load_csv(conn, entity, path, dry_run=args.dry_run, batch_size=args.batch_size,
+                               verify=args.verify)
+        except (OSError, ValueError) as exc:
+            print(f'{path}: {exc}', file=sys.stderr)
+            status = 1
+            continue
+        print(f'{path} ({entity}): {result.to_json()}')
+    conn.close()
+    sys.exit(status)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+"""Three-way match of purchase orders, delivery challans and invoices.
+
+``purchase_orders.items`` and ``delivery_challans.items`` are JSON arrays of
+``{sku, qty[, rate]}`` lines, and invoices are only an amount per vendor.
+The match works on two levels:
+
+* per vendor and SKU, ordered quantity (POs) against delivered quantity
+  (DCs). A line is ``matched``, ``short`` (less delivered than ordered) or
+  ``over_delivered``;
+* per vendor, the invoiced amount against the delivered quantity valued at
+  the vendor's average PO rate for each SKU. A vendor is ``over_billed``
+  when invoices exceed that value by more than the tolerance; otherwise it
+  is ``short`` if any line is short, and ``matched`` if none is.
+
+Rejected documents are left out. A PO line without a ``rate`` takes the
+PO's amount spread evenly over its quantity.
+
+Each ``items`` cell is decoded once into flat columns (vendor, SKU code,
+quantity, value). Both sides are grouped on a single ``vendor * skus +
+code`` integer key with ``np.unique``/``np.bincount`` and joined on it with
+``searchsorted``. After the decode, the work is one NumPy operation per
+column, not per line. Results go to ``match_lines`` and ``match_vendors``
+(``0015_three_way_match.sql``). An incremental run re-matches only vendors
+with a document updated (``updated_at``) since the last run started, plus
+any vendor whose document counts changed (inserts, deletes, moves between
+vendors). Each vendor's rows are recomputed from all of its documents.
+
+    python -m compliance.matching local.sqlite run [--incremental] [--tolerance 1.00]
+    python -m compliance.matching local.sqlite vendors --status over_billed
+    python -m compliance.matching local.sqlite lines --vendor-id 42
+"""
+import argparse
+import json
+import sqlite3
+from array import array
+from decimal import Decimal
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from compliance.reports import rupees
+
+DEFAULT_TOLERANCE_PAISE = 100           # invoices may exceed delivered value by one rupee
+LINE_STATUSES = ('matched', 'short', 'over_delivered')
+VENDOR_STATUSES = ('matched', 'short', 'over_billed')
+_QTY_EPSILON = 1e-9
+
+_PAISE = 'CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER)'
+# Entity -> (table, count column in match_vendors).
+_DOCUMENTS = {'pos': ('purchase_orders', 'po_count'), 'dcs': ('delivery_challans', 'dc_count'),
+              'invoices': ('invoices', 'invoice_count')}
+
+
+class LineMatch(NamedTuple):
+    vendor_id: int
+    sku: str
+    ordered_qty: float
+    delivered_qty: float
+    ordered_paise: int
+    delivered_paise: int
+    status: str
+
+    @property
+    def qty_variance(self) -> float:
+        """Delivered minus ordered; negative when short."""
+        return self.delivered_qty - self.ordered_qty
+
+
+class VendorMatch(NamedTuple):
+    vendor_id: int
+    po_count: int
+    dc_count: int
+    invoice_count: int
+    ordered_paise: int
+    delivered_paise: int
+    invoiced_paise: int
+    short_lines: int
+    status: str
+
+    @property
+    def amount_variance(self) -> Decimal:
+        """Invoiced minus delivered value, in rupees; positive when over-billed."""
+        return rupees(self.invoiced_paise - self.delivered_paise)
+
+
+class MatchRun(NamedTuple):
+    mode: str                   # 'full' or 'incremental'
+    vendors: int                # vendors re-matched
+    lines: int                  # match_lines rows written
+    statuses: Dict[str, int]    # vendor status -> count among the re-matched vendors
+    undecodable: int            # documents skipped because ``items`` is not a JSON array
+
+
+class _Columns:
+    """Item lines flattened into parallel columns."""
+
+    __slots__ = ('vendor', 'sku', 'qty', 'paise', 'bad')
+
+    def __init__(self):
+        self.vendor, self.sku, self.qty, self.paise = array('q'), array('q'), array('d'), array('d')
+        self.bad = 0            # documents whose items cell is not a JSON array
+
+
+def _number(value, default: float = 0.0) -> float:
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _decode(rows, codes: Dict[str, int], valued: bool) -> _Columns:
+    """Decode ``(vendor_id, amount, items)`` rows; ``codes`` interns SKUs to small ints."""
+    out = _Columns()
+    vendor, sku, qty, paise = out.vendor.append, out.sku.append, out.qty.append, out.paise.append
+    for vendor_id, amount, items in rows:
+        if not items:
+            continue
+        try:
+            lines = json.loads(items)
+        except ValueError:
+            lines = None
+        if not isinstance(lines, list):
+            out.bad += 1
+            continue
+        fallback = None
+        for item in lines:
+            if not isinstance(item, dict):
+                continue
+            q = item.get('qty')
+            if q.__class__ is not int and q.__class__ is not float:
+                q = _number(q)
+            vendor(vendor_id)
+            key = str(item.get('sku') or '')
+            code = codes.get(key)
+            if code is None:
+                code = codes[key] = len(codes)
+            sku(code)
+            qty(q)
+            if valued:
+                rate = item.get('rate')
+                if rate.__class__ is not int and rate.__class__ is not float:
+                    rate = _number(rate, None)
+                if rate is None:
+                    if fallback is None:
+                        total = sum(_number(i.get('qty')) for i in lines if isinstance(i, dict))
+                        fallback = _number(amount) / total if total else 0.0
+                    rate = fallback
+                paise(round(q * rate * 100))
+    return out
+
+
+def _group(keys: np.ndarray, *weights: np.ndarray) -> Tuple[np.ndarray, List[np.ndarray]]:
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    return uniq, [np.bincount(inverse, weights=w, minlength=len(uniq)) for w in weights]
+
+
+def _spread(keys: np.ndarray, part_keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """``values`` keyed by ``part_keys`` (a subset of ``keys``) laid out along ``keys``."""
+    out = np.zeros(len(keys))
+    out[np.searchsorted(keys, part_keys)] = values
+    return out
+
+
+def _documents(conn: sqlite3.Connection, table: str, columns: str, scoped: bool, scope_has_null: bool,
+               group: str = '') -> Iterator[tuple]:
+    """Rows of ``table`` that are not rejected; with ``scoped``, only vendors in
+    ``temp.match_scope`` (0 standing for NULL)."""
+    where = "status <> 'rejected'"
+    if not scoped:
+        yield from conn.execute(f'SELECT {columns} FROM {table} WHERE {where} {group}')
+        return
+    yield from conn.execute(f'SELECT {columns} FROM {table} WHERE {where} '
+                            f'AND vendor_id IN (SELECT vendor_id FROM temp.match_scope) {group}')
+    if scope_has_null:
+        yield from conn.execute(f'SELECT {columns} FROM {table} WHERE {where} AND vendor_id IS NULL {group}')
+
+
+def _counts(conn: sqlite3.Connection) -> Dict[int, List[int]]:
+    """Documents of every status per vendor: [pos, dcs, invoices]."""
+    out: Dict[int, List[int]] = {}
+    for k, (table, _) in enumerate(_DOCUMENTS.values()):
+        for vendor_id, n in conn.execute(f'SELECT COALESCE(vendor_id, 0), COUNT(*) FROM {table} GROUP BY vendor_id'):
+            out.setdefault(vendor_id, [0, 0, 0])[k] = n
+    return out
+
+
+def _changed_vendors(conn: sqlite3.Connection, since: str, counts: Dict[int, List[int]]) -> Set[int]:
+    changed: Set[int] = set()
+    for table, _ in _DOCUMENTS.values():
+        changed.update(v for (v,) in conn.execute(
+            f'SELECT DISTINCT COALESCE(vendor_id, 0) FROM {table} WHERE updated_at >= ?', (since,)))
+    stored = {r[0]: list(r[1:]) for r in conn.execute(
+        f'SELECT vendor_id, {", ".join(c for _, c in _DOCUMENTS.values())} FROM match_vendors')}
+    for vendor_id in counts.keys() | stored.keys():
+        if counts.get(vendor_id, [0, 0, 0]) != stored.get(vendor_id, [0, 0, 0]):
+            changed.add(vendor_id)
+    return changed
+
+
+def _compute(conn: sqlite3.Connection, scope: Optional[Set[int]], counts: Dict[int, List[int]],
+             tolerance_paise: int) -> Tuple[List[tuple], List[tuple], int]:
+    """match_lines and match_vendors rows for every vendor (``scope`` None) or just ``scope``,
+    and the number of undecodable documents."""
+    scoped, has_null = scope is not None, scope is not None and 0 in scope
+    codes: Dict[str, int] = {}
+    po = _decode(_documents(conn, 'purchase_orders', 'COALESCE(vendor_id, 0), amount, items', scoped, has_null),
+                 codes, valued=True)
+    dc = _decode(_documents(conn, 'delivery_challans', 'COALESCE(vendor_id, 0), 0, items', scoped, has_null),
+                 codes, valued=False)
+    invoiced = dict(_documents(conn, 'invoices', f'COALESCE(vendor_id, 0), SUM({_PAISE})', scoped, has_null,
+                               'GROUP BY vendor_id'))
+    names = sorted(codes, key=codes.get)
+    width = max(len(codes), 1)
+
+    # Group each side on vendor+sku, then join the two key sets.
+    po_keys, (po_qty, po_paise) = _group(np.frombuffer(po.vendor, np.int64) * width + np.frombuffer(po.sku, np.int64),
+                                         np.frombuffer(po.qty), np.frombuffer(po.paise))
+    dc_keys, (dc_qty,) = _group(np.frombuffer(dc.vendor, np.int64) * width + np.frombuffer(dc.sku, np.int64),
+                                np.frombuffer(dc.qty))
+    keys = np.union1d(po_keys, dc_keys)
+    ordered, delivered = _spread(keys, po_keys, po_qty), _spread(keys, dc_keys, dc_qty)
+    ordered_paise = np.rint(_spread(keys, po_keys, po_paise))
+    rate = np.divide(ordered_paise, ordered, out=np.zeros(len(keys)), where=ordered > 0)
+    delivered_paise = np.rint(delivered * rate)
+    status = np.where(delivered < ordered - _QTY_EPSILON, 1, np.where(delivered > ordered + _QTY_EPSILON, 2, 0))
+
+    line_vendor = keys // width
+    vendors, (v_ordered, v_delivered, v_short) = _group(line_vendor, ordered_paise, delivered_paise,
+                                                        (status == 1).astype(np.float64))
+    lines = list(zip(line_vendor.tolist(), [names[c] for c in (keys % width).tolist()], ordered.tolist(),
+                     delivered.tolist(), ordered_paise.astype(np.int64).tolist(),
+                     delivered_paise.astype(np.int64).tolist(), [LINE_STATUSES[s] for s in status.tolist()]))
+
+    per_vendor = {v: (int(o), int(d), int(s)) for v, o, d, s in
+                  zip(vendors.tolist(), v_ordered.tolist(), v_delivered.tolist(), v_short.tolist())}
+    everyone = per_vendor.keys() | invoiced.keys() | (counts.keys() if scope is None else counts.keys() & scope)
+    rows = []
+    for vendor_id in sorted(everyone):
+        o, d, s = per_vendor.get(vendor_id, (0, 0, 0))
+        billed = invoiced.get(vendor_id) or 0
+        state = 'over_billed' if billed - d > tolerance_paise else 'short' if s else 'matched'
+        rows.append((vendor_id, *counts.get(vendor_id, (0, 0, 0)), o, d, billed, s, state))
+    return lines, rows, po.bad + dc.bad
+
+
+def match(conn: sqlite3.Connection, incremental: bool = False,
+          tolerance_paise: int = DEFAULT_TOLERANCE_PAISE) -> MatchRun:
+    """Match every vendor, or with ``incremental`` only those changed since the last run.
+
+    An incremental call with no earlier run matches everything. Reads
+    happen in one snapshot; the results are written in a second
+    transaction, and anything written in between is picked up next time.
+    """
+    conn.execute('BEGIN')
+    try:
+        last = conn.execute('SELECT watermark FROM match_runs ORDER BY id DESC LIMIT 1').fetchone()
+        # Anything written from this second on is re-read next time; earlier
+        # writes are in this snapshot.
+        watermark = conn.execute('SELECT CURRENT_TIMESTAMP').fetchone()[0]
+        counts = _counts(conn)
+        scope = None
+        if incremental and last is not None:
+            scope = _changed_vendors(conn, last[0] or '', counts)
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS match_scope (vendor_id INTEGER PRIMARY KEY)')
+            conn.execute('DELETE FROM temp.match_scope')
+            conn.executemany('INSERT INTO temp.match_scope VALUES (?)', ((v,) for v in scope))
+        lines, vendors, bad = _compute(conn, scope, counts, tolerance_paise) if scope != set() else ([], [], 0)
+    finally:
+        conn.execute('ROLLBACK')
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if scope is None:
+            conn.execute('DELETE FROM match_lines')
+            conn.execute('DELETE FROM match_vendors')
+        else:
+            conn.executemany('DELETE FROM match_lines WHERE vendor_id = ?', ((v,) for v in scope))
+            conn.executemany('DELETE FROM match_vendors WHERE vendor_id = ?', ((v,) for v in scope))
+        conn.executemany('INSERT INTO match_lines (vendor_id, sku, ordered_qty, delivered_qty, ordered_paise, '
+                         'delivered_paise, status) VALUES (?, ?, ?, ?, ?, ?, ?)', lines)
+        conn.executemany('INSERT INTO match_vendors (vendor_id, po_count, dc_count, invoice_count, ordered_paise, '
+                         'delivered_paise, invoiced_paise, short_lines, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                         vendors)
+        mode = 'full' if scope is None else 'incremental'
+        conn.execute('INSERT INTO match_runs (mode, watermark, tolerance_paise, vendors, lines) VALUES (?, ?, ?, ?, ?)',
+                     (mode, watermark, tolerance_paise, len(vendors), len(lines)))
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    statuses = dict.fromkeys(VENDOR_STATUSES, 0)
+    for row in vendors:
+        statuses[row[-1]] += 1
+    return MatchRun(mode, len(vendors), len(lines), statuses, bad)
+
+
+def vendor_matches(conn: sqlite3.Connection, status: Optional[str] = None,
+                   vendor_id: Optional[int] = None) -> List[VendorMatch]:
+    where, params = [], []
+    if status is not None:
+        where.append('status = ?')
+        params.append(status)
+    if vendor_id is not None:
+        where.append('vendor_id = ?')
+        params.append(vendor_id)
+    sql = (f'SELECT {", ".join(VendorMatch._fields)} FROM match_vendors'
+           + (f' WHERE {" AND ".join(where)}' if where else '') + ' ORDER BY vendor_id')
+    return [VendorMatch(*r) for r in conn.execute(sql, params)]
+
+
+def line_matches(conn: sqlite3.Connection, vendor_id: Optional[int] = None,
+                 status: Optional[str] = None) -> List[LineMatch]:
+    where, params = [], []
+    if vendor_id is not None:
+        where.append('vendor_id = ?')
+        params.append(vendor_id)
+    if status is not None:
+        where.append('status = ?')
+        params.append(status)
+    sql = (f'SELECT {", ".join(LineMatch._fields)} FROM match_lines'
+           + (f' WHERE {" AND ".join(where)}' if where else '') + ' ORDER BY vendor_id, sku')
+    return [LineMatch(*r) for r in conn.execute(sql, params)]
+
+
+def main(argv=None):
+    from compliance import db
+
+    parser = argparse.ArgumentParser(description='Three-way PO / DC / invoice match.')
+    parser.add_argument('db', help='SQLite mirror of the D1 database')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('run', help='match and store the results')
+    p.add_argument('--incremental', action='store_true', help='only vendors changed since the last run')
+    p.add_argument('--tolerance', type=Decimal, default=rupees(DEFAULT_TOLERANCE_PAISE),
+                   help='rupees invoices may exceed the delivered value by (default: %(default)s)')
+    p = sub.add_parser('vendors', help='stored per-vendor results')
+    p.add_argument('--status', choices=VENDOR_STATUSES)
+    p.add_argument('--vendor-id', type=int)
+    p = sub.add_parser('lines', help='stored per-vendor, per-SKU results')
+    p.add_argument('--status', choices=LINE_STATUSES)
+    p.add_argument('--vendor-id', type=int)
+    args = parser.parse_args(argv)
+
+    conn = db.open_mirror(args.db)
+    if args.command == 'run':
+        run = match(conn, args.incremental, int(args.tolerance.scaleb(2)))
+        print(f'{run.mode}: {run.vendors} vendor(s), {run.lines} line(s); '
+              + ', '.join(f'{s} {n}' for s, n in run.statuses.items())
+              + (f'; {run.undecodable} document(s) with unreadable items' if run.undecodable else ''))
+    elif args.command == 'vendors':
+        print('vendor_id,pos,dcs,invoices,ordered,delivered,invoiced,amount_variance,short_lines,status')
+        for m in vendor_matches(conn, args.status, args.vendor_id):
+            print(f'{m.vendor_id},{m.po_count},{m.dc_count},{m.invoice_count},{rupees(m.ordered_paise)},'
+                  f'{rupees(m.delivered_paise)},{rupees(m.invoiced_paise)},{m.amount_variance},{m.short_lines},'
+                  f'{m.status}')
+    else:
+        print('vendor_id,sku,ordered_qty,delivered_qty,qty_variance,ordered,delivered,status')
+        for m in line_matches(conn, args.vendor_id, args.status):
+            print(f'{m.vendor_id},{m.sku},{m.ordered_qty:g},{m.delivered_qty:g},{m.qty_variance:g},'
+                  f'{rupees(m.ordered_paise)},{rupees(m.delivered_paise)},{m.status}')
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
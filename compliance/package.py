@@ -0,0 +1,223 @@
+"""Incremental, content-addressed build of the compliance package zip.
+
+``script.py``/``script_1.py`` used to rewrite every source file, delete the
+zip and deflate everything again. :func:`write_if_changed` leaves identical
+source files untouched, and :func:`build_package` hashes every member,
+copies the deflated bytes of unchanged members straight from the previous
+archive and records the hashes in ``<zip>.manifest.json``. When nothing
+changed the archive is not touched at all, so it stays byte-identical.
+
+    python -m compliance.package out.zip a.csv b.json --extra README.txt=readme.txt
+"""
+import argparse
+import hashlib
+import json
+import os
+import zipfile
+import zlib
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from compliance.zipstream import DEFLATED, ZipStreamWriter, arcname, choose_method, deflate, read_raw
+
+MANIFEST_SUFFIX = '.manifest.json'
+MANIFEST_VERSION = 1
+
+Content = Union[str, bytes]
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _as_bytes(content: Content, encoding: str = 'utf-8') -> bytes:
+    return content.encode(encoding) if isinstance(content, str) else content
+
+
+def write_if_changed(path, content: Content, encoding: str = 'utf-8', force: bool = False) -> bool:
+    """Write ``content`` to ``path`` unless the file already holds exactly it.
+
+    Returns True when the file was (re)written. Unchanged files keep their
+    mtime, so downstream caches keyed on it stay warm.
+    """
+    data = _as_bytes(content, encoding)
+    if not force:
+        try:
+            with open(path, 'rb') as f:
+                if f.read() == data:
+                    return False
+        except FileNotFoundError:
+            pass
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+
+class BuildReport(NamedTuple):
+    zip_path: str
+    manifest_path: str
+    compressed: List[str]   # members deflated in this run
+    reused: List[str]       # members copied verbatim from the previous archive
+    missing: List[str]      # requested source files that do not exist
+    unchanged: bool         # True when the archive was left untouched
+
+
+def _load_manifest(path) -> Optional[dict]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def _file_sha256(path) -> Optional[str]:
+    h = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    except FileNotFoundError:
+        return None
+    return h.hexdigest()
+
+
+def _encode_members(pending: List[Tuple[bytes, int]], level: int, jobs: int) -> Iterator[bytes]:
+    """Payloads for ``(data, method)`` pairs, deflated in a process pool when ``jobs > 1``.
+
+    Whole-member deflate keeps the bytes independent of ``jobs``.
+    """
+    if jobs > 1 and sum(1 for _, m in pending if m == DEFLATED) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(jobs) as pool:
+            futures = [pool.submit(deflate, data, level) if m == DEFLATED else None for data, m in pending]
+            payloads = [f.result() if f is not None else data for f, (data, _) in zip(futures, pending)]
+        return iter(payloads)
+    return (deflate(data, level) if m == DEFLATED else data for data, m in pending)
+
+
+def build_package(zip_path, files: Iterable[str], extra: Optional[Dict[str, Content]] = None,
+                  manifest_path=None, level: int = 6, full: bool = False, jobs: int = 1) -> BuildReport:
+    """Build ``zip_path`` from ``files`` (in order) plus in-memory ``extra`` members.
+
+    Missing files are reported and skipped, like the original scripts did.
+    ``full=True`` ignores the previous archive and re-deflates everything.
+    ``jobs > 1`` deflates changed members in a process pool; already-compressed
+    inputs (see :data:`compliance.zipstream.STORE_SUFFIXES`) are stored.
+    """
+    zip_path = os.fspath(zip_path)
+    manifest_path = os.fspath(manifest_path or zip_path + MANIFEST_SUFFIX)
+
+    members = []  # (arcname, data, sha256)
+    missing = []
+    for path in files:
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            missing.append(path)
+            continue
+        members.append((arcname(path), data, sha256_hex(data)))
+    for name, content in (extra or {}).items():
+        data = _as_bytes(content)
+        members.append((name, data, sha256_hex(data)))
+
+    previous = None if full else _load_manifest(manifest_path)
+    wanted = [{'name': n, 'sha256': h, 'size': len(d)} for n, d, h in members]
+    if previous and previous.get('level') == level and [
+            {k: m[k] for k in ('name', 'sha256', 'size')} for m in previous['members']] == wanted \
+            and _file_sha256(zip_path) == previous.get('sha256'):
+        names = [n for n, _, _ in members]
+        return BuildReport(zip_path, manifest_path, [], names, missing, True)
+
+    old_members = {}
+    if previous and previous.get('level') == level:
+        old_members = {m['name']: m for m in previous['members']}
+
+    methods = [choose_method(name, level) for name, _, _ in members]
+    compressed, reused = [], []
+    tmp_path = zip_path + '.tmp'
+    old_zip = None
+    try:
+        if old_members and os.path.exists(zip_path):
+            try:
+                old_zip = zipfile.ZipFile(zip_path)
+            except zipfile.BadZipFile:
+                old_members = {}
+        reusable = {}
+        for (name, data, digest), method in zip(members, methods):
+            old = old_members.get(name)
+            if old and old['sha256'] == digest and old_zip is not None:
+                try:
+                    info = old_zip.getinfo(name)
+                except KeyError:
+                    continue
+                if info.CRC == old['crc32'] and info.compress_type == method:
+                    reusable[name] = info
+        fresh = _encode_members(
+            [(data, method) for (name, data, _), method in zip(members, methods) if name not in reusable],
+            level, jobs)
+        with open(tmp_path, 'wb') as out, ZipStreamWriter(out) as writer:
+            for (name, data, _), method in zip(members, methods):
+                info = reusable.get(name)
+                if info is not None:
+                    writer.write_raw(name, method, info.CRC, info.file_size, read_raw(old_zip.fp, info))
+                    reused.append(name)
+                else:
+                    writer.write_raw(name, method, zlib.crc32(data), len(data), next(fresh))
+                    compressed.append(name)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        if old_zip is not None:
+            old_zip.close()
+    os.replace(tmp_path, zip_path)
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'archive': os.path.basename(zip_path),
+        'sha256': _file_sha256(zip_path),
+        'size': os.path.getsize(zip_path),
+        'level': level,
+        'members': [
+            {'name': e.name, 'sha256': digest, 'size': e.size,
+             'compressed_size': e.compressed_size, 'crc32': e.crc}
+            for e, (_, _, digest) in zip(writer.entries, members)
+        ],
+    }
+    write_if_changed(manifest_path, json.dumps(manifest, indent=2) + '\n')
+    return BuildReport(zip_path, manifest_path, compressed, reused, missing, False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Incrementally build a deterministic zip package.')
+    parser.add_argument('zip_path')
+    parser.add_argument('files', nargs='*')
+    parser.add_argument('--extra', action='append', default=[], metavar='NAME=PATH',
+                        help='add PATH to the archive under NAME')
+    parser.add_argument('--level', type=int, default=6)
+    parser.add_argument('--full', action='store_true', help='ignore the previous archive')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='deflate worker processes')
+    args = parser.parse_args(argv)
+
+    extra = {}
+    for item in args.extra:
+        name, _, path = item.partition('=')
+        with open(path, 'rb') as f:
+            extra[name] = f.read()
+    report = build_package(args.zip_path, args.files, extra, level=args.level, full=args.full,
+                           jobs=args.jobs)
+    for path in report.missing:
+        print(f'missing {path}')
+    if report.unchanged:
+        print(f'{report.zip_path}: up to date')
+    else:
+        print(f'{report.zip_path}: {len(report.compressed)} compressed, {len(report.reused)} reused')
+
+
+if __name__ == '__main__':
+    main()
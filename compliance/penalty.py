@@ -0,0 +1,251 @@
+"""Late-payment interest from the ``Penalty_Rate`` column.
+
+``due_date_tracking_matrix.csv`` writes penalties as free text: ``"18% p.a."``,
+``"1.5% p.m."``, ``"Base+2%"``, ``"Bank Rate+2%"``. :func:`parse_rate` compiles
+them into :class:`RateRule` values. Floating rules name a curve (``base``,
+``bank_rate``) that the caller supplies as a :class:`RateCurve`, because the
+benchmark rates change over time and are not part of the reference data.
+
+:class:`PenaltyEngine.accrue` handles whole arrays of overdue amounts in one
+NumPy pass. Floating rates are integrated over each row's late window with
+prefix sums over the curve steps, so a rate change mid-window is exact.
+:meth:`PenaltyEngine.accrue_exact` repeats the computation in ``Decimal`` for
+filing figures. Both round half-up to the paisa.
+
+Day counts: ``p.a.`` rates accrue actual/365. ``p.m.`` rates charge each
+month or part of a month, as section 201(1A) does for TDS; pass
+``monthly='pro_rata'`` for days x 12 / 365 instead.
+
+    python -m compliance.penalty --curve base=0.0925 "Tax Invoice" 150000 40
+"""
+import argparse
+import csv
+import re
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from compliance import DOCS_DIR
+
+MATRIX_PATH = DOCS_DIR / 'due_date_tracking_matrix.csv'
+
+ANNUAL = 'annum'
+MONTHLY = 'month'
+PAISE = Decimal('0.01')
+
+_FIXED_RE = re.compile(r'^(\d+(?:\.\d+)?)\s*%\s*p\.?\s*([am])\.?$', re.IGNORECASE)
+_FLOATING_RE = re.compile(r'^([A-Za-z][A-Za-z ]*?)\s*\+\s*(\d+(?:\.\d+)?)\s*%$')
+
+
+class RateRule(NamedTuple):
+    text: str
+    rate: Decimal            # fixed rate, or spread over the curve, as a fraction
+    period: str              # ANNUAL or MONTHLY
+    curve: Optional[str]     # curve name for floating rules
+
+
+def parse_rate(text: str) -> RateRule:
+    """Compile one ``Penalty_Rate`` value."""
+    value = text.strip()
+    m = _FIXED_RE.match(value)
+    if m:
+        return RateRule(text, Decimal(m.group(1)) / 100, ANNUAL if m.group(2).lower() == 'a' else MONTHLY, None)
+    m = _FLOATING_RE.match(value)
+    if m:
+        curve = re.sub(r'\s+', '_', m.group(1).strip().lower())
+        return RateRule(text, Decimal(m.group(2)) / 100, ANNUAL, curve)
+    raise ValueError(f'unrecognised Penalty_Rate {text!r}')
+
+
+def load_rules(path=MATRIX_PATH) -> Dict[str, RateRule]:
+    """``Penalty_Rate`` of every matrix row, keyed by ``Document``."""
+    with open(path, newline='', encoding='utf-8') as f:
+        return {row['Document']: parse_rate(row['Penalty_Rate']) for row in csv.DictReader(f)}
+
+
+def _day_numbers(values) -> np.ndarray:
+    return np.asarray(values, dtype='datetime64[D]').astype(np.int64)
+
+
+def _round_paise(values: np.ndarray) -> np.ndarray:
+    """Round rupee amounts half-up (away from zero) to paise, as ``Decimal`` ``ROUND_HALF_UP`` does.
+
+    ``np.round`` rounds half to even. The paise are first rounded to 1e-6 to
+    drop float noise, so an exact half such as 6287.055 is not read as
+    6287.05499999.
+    """
+    paise = np.round(np.asarray(values, dtype=np.float64) * 100, 6)
+    return np.copysign(np.floor(np.abs(paise) + 0.5), paise) / 100
+
+
+class RateCurve:
+    """Step curve of annual rates, each effective from its date onward.
+
+    The first rate also applies before the first date.
+    """
+
+    __slots__ = ('days', 'rates', 'decimal_rates', '_cum')
+
+    def __init__(self, effective_dates: Sequence, annual_rates: Sequence):
+        if not len(effective_dates) or len(effective_dates) != len(annual_rates):
+            raise ValueError('need matching, non-empty effective_dates and annual_rates')
+        self.days = _day_numbers(effective_dates)
+        if np.any(np.diff(self.days) <= 0):
+            raise ValueError('effective_dates must be strictly increasing')
+        self.decimal_rates = [Decimal(str(r)) for r in annual_rates]
+        self.rates = np.array([float(r) for r in self.decimal_rates])
+        # Rate-days accumulated up to each step: F(t) = cum[k] + rate[k] * (t - day[k]).
+        self._cum = np.concatenate(([0.0], np.cumsum(np.diff(self.days) * self.rates[:-1])))
+
+    @classmethod
+    def constant(cls, annual_rate) -> 'RateCurve':
+        return cls(['1970-01-01'], [annual_rate])
+
+    def _integral(self, t: np.ndarray) -> np.ndarray:
+        k = np.maximum(np.searchsorted(self.days, t, side='right') - 1, 0)
+        return self._cum[k] + self.rates[k] * (t - self.days[k])
+
+    def rate_days(self, start_days: np.ndarray, end_days: np.ndarray) -> np.ndarray:
+        """Integral of the annual rate over ``[start, end)``, in rate x days."""
+        return self._integral(end_days) - self._integral(start_days)
+
+    def current(self) -> float:
+        return float(self.rates[-1])
+
+    def segments(self, start: int, end: int):
+        """``(days, Decimal rate)`` pieces covering ``[start, end)`` (day numbers)."""
+        days = self.days.tolist()
+        out = []
+        t = start
+        k = max(int(np.searchsorted(self.days, start, side='right')) - 1, 0)
+        while t < end:
+            stop = min(end, days[k + 1]) if k + 1 < len(days) else end
+            out.append((stop - t, self.decimal_rates[k]))
+            t, k = stop, k + 1
+        return out
+
+
+class PenaltyEngine:
+    """Vectorized accrual for :class:`RateRule` values."""
+
+    def __init__(self, curves: Optional[Dict[str, RateCurve]] = None, monthly: str = 'month_or_part',
+                 year_days: int = 365):
+        if monthly not in ('month_or_part', 'pro_rata'):
+            raise ValueError(f'unknown monthly convention {monthly!r}')
+        self.curves = dict(curves or {})
+        self.monthly = monthly
+        self.year_days = year_days
+
+    def _curve(self, rule: RateRule) -> RateCurve:
+        try:
+            return self.curves[rule.curve]
+        except KeyError:
+            raise KeyError(f'no rate curve configured for {rule.curve!r} ({rule.text})') from None
+
+    def _months(self, days: np.ndarray, start: Optional[np.ndarray]) -> np.ndarray:
+        if self.monthly == 'pro_rata':
+            return days * 12.0 / self.year_days
+        if start is None:
+            return np.ceil(days / 30.0)
+        end = start + days
+        s, e = start.astype('datetime64[D]'), end.astype('datetime64[D]')
+        sm, em = s.astype('datetime64[M]'), e.astype('datetime64[M]')
+        whole = (em - sm).astype(np.int64)
+        part = (e - em).astype(np.int64) > (s - sm).astype(np.int64)
+        return np.where(days > 0, whole + part, 0).astype(np.float64)
+
+    def accrue(self, rule: RateRule, amounts, days_late, start=None) -> np.ndarray:
+        """Interest on each overdue amount, rounded to paise.
+
+        ``start`` (due dates, anything ``np.datetime64`` accepts) is needed to
+        integrate floating curves and to count calendar months; without it
+        floating rules use the curve's current rate and months are 30 days.
+        Negative ``days_late`` count as zero.
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        days = np.maximum(np.asarray(days_late, dtype=np.int64), 0)
+        start_days = None if start is None else _day_numbers(start)
+        rate = float(rule.rate)
+        if rule.curve is not None:
+            curve = self._curve(rule)
+            if start_days is None:
+                rate_days = (curve.current() + rate) * days
+            else:
+                rate_days = curve.rate_days(start_days, start_days + days) + rate * days
+            interest = amounts * rate_days / self.year_days
+        elif rule.period == MONTHLY:
+            interest = amounts * rate * self._months(days, start_days)
+        else:
+            interest = amounts * rate * days / self.year_days
+        return _round_paise(interest)
+
+    def accrue_exact(self, rule: RateRule, amounts, days_late, start=None) -> List[Decimal]:
+        """Same as :meth:`accrue` in ``Decimal``, rounded half-up to paise."""
+        amounts = [a if isinstance(a, Decimal) else Decimal(str(a)) for a in amounts]
+        days = [max(int(d), 0) for d in days_late]
+        start_days = None if start is None else _day_numbers(start).tolist()
+        months = None
+        if rule.curve is None and rule.period == MONTHLY and self.monthly == 'month_or_part':
+            months = self._months(np.asarray(days, dtype=np.int64),
+                                  None if start_days is None else np.asarray(start_days, dtype=np.int64)).tolist()
+        curve = self._curve(rule) if rule.curve is not None else None
+        year = Decimal(self.year_days)
+        out = []
+        for i, (amount, d) in enumerate(zip(amounts, days)):
+            if curve is not None:
+                if start_days is None:
+                    rate_days = (curve.decimal_rates[-1] + rule.rate) * d
+                else:
+                    s = start_days[i]
+                    rate_days = sum((r * n for n, r in curve.segments(s, s + d)), Decimal(0)) + rule.rate * d
+                value = amount * rate_days / year
+            elif rule.period == MONTHLY:
+                m = Decimal(int(months[i])) if months is not None else Decimal(d * 12) / year
+                value = amount * rule.rate * m
+            else:
+                value = amount * rule.rate * d / year
+            out.append(value.quantize(PAISE, rounding=ROUND_HALF_UP))
+        return out
+
+    def accrue_documents(self, rules: Dict[str, RateRule], documents, amounts, days_late, start=None) -> np.ndarray:
+        """Mixed batch: one ``Document`` name per row, grouped so each rule runs vectorized."""
+        documents = np.asarray(documents)
+        amounts = np.asarray(amounts, dtype=np.float64)
+        days = np.asarray(days_late, dtype=np.int64)
+        start_arr = None if start is None else np.asarray(start, dtype='datetime64[D]')
+        out = np.zeros(len(amounts))
+        kinds, inverse = np.unique(documents, return_inverse=True)
+        for k, document in enumerate(kinds):
+            idx = np.nonzero(inverse == k)[0]
+            out[idx] = self.accrue(rules[str(document)], amounts[idx], days[idx],
+                                   None if start_arr is None else start_arr[idx])
+        return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Late interest for one obligation.')
+    parser.add_argument('document', help='Document name from the matrix, e.g. "Tax Invoice"')
+    parser.add_argument('amount', type=Decimal)
+    parser.add_argument('days_late', type=int)
+    parser.add_argument('--due', type=date.fromisoformat, default=None, help='due date (ISO)')
+    parser.add_argument('--curve', action='append', default=[], metavar='NAME=RATE',
+                        help='constant annual rate for a floating curve, e.g. base=0.0925')
+    parser.add_argument('--matrix', default=str(MATRIX_PATH))
+    args = parser.parse_args(argv)
+
+    curves = {}
+    for item in args.curve:
+        name, _, rate = item.partition('=')
+        # The names parse_rate gives: "Bank Rate+2%" uses the curve bank_rate.
+        curves[re.sub(r'\s+', '_', name.strip().lower())] = RateCurve.constant(Decimal(rate))
+    rule = load_rules(args.matrix)[args.document]
+    engine = PenaltyEngine(curves)
+    start = None if args.due is None else [args.due.isoformat()]
+    value = engine.accrue_exact(rule, [args.amount], [args.days_late], start)[0]
+    print(f'{args.document} ({rule.text}): {value}')
+
+
+if __name__ == '__main__':
+    main()
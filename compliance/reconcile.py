@@ -0,0 +1,360 @@
+"""Payment-to-invoice reconciliation over per-vendor amount and date indexes.
+
+``payments`` points at invoices only through the free-text ``invoice_ref``,
+so month-end reconciliation compares every payment with every open invoice.
+:func:`reconcile` builds two sorted indexes per vendor once instead. One is
+invoices by amount, the other by anchor date (the due date, else the day
+the invoice was recorded). Then it runs four passes over the payments, in
+payment-date order:
+
+1. ``exact``: an untouched invoice for exactly the payment amount within
+   ``window_days``. The invoice named by ``invoice_ref`` wins, then the
+   oldest. A bisect on the amount index finds the candidates;
+2. ``tolerance``: the untouched invoice whose amount is closest to the
+   payment within ``tolerance_paise`` (bank charges, rounding). It is
+   settled, and the difference is recorded;
+3. ``subset``: 2 to ``max_invoices`` untouched invoices in the date window
+   that add up to the payment within tolerance. This is a bounded
+   subset-sum search over at most ``max_candidates`` invoices nearest the
+   payment date, largest amounts first, with a node budget;
+4. ``partial``: what is left goes to the invoice ``invoice_ref`` names,
+   then oldest-first to invoices in the window with an open balance. The
+   last one may stay part-paid. A payment smaller than the open balance of
+   the invoice it names is taken to be an instalment, and it skips pass 3.
+
+Each pass only sees payments the earlier ones left untouched, so an exact
+match is never taken by a near one. Results replace the previous run's
+rows in ``payment_applications`` (``0016_payment_applications.sql``).
+``manual`` rows are kept and count against the balances first. Every run
+reports its match rates and per-pass timings and is logged in
+``reconcile_runs``.
+
+    python -m compliance.reconcile local.sqlite
+    python -m compliance.reconcile local.sqlite --tolerance 25 --window-days 120 --dry-run
+"""
+import argparse
+import json
+import sqlite3
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date
+from decimal import Decimal
+from itertools import chain
+from typing import Dict, List, NamedTuple, Optional
+
+from compliance.reports import rupees
+
+DEFAULT_TOLERANCE_PAISE = 1000          # Rs 10
+DEFAULT_WINDOW_DAYS = 90
+DEFAULT_MAX_INVOICES = 4
+DEFAULT_MAX_CANDIDATES = 24
+DEFAULT_SEARCH_BUDGET = 20_000          # subset-search nodes per payment
+METHODS = ('exact', 'tolerance', 'subset', 'partial')
+PASSES = ('load', 'index') + METHODS + ('write',)
+
+_PAISE = 'CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER)'
+
+
+class Reconciliation(NamedTuple):
+    run_id: Optional[int]           # None for a dry run
+    payments: int
+    invoices: int
+    by_method: Dict[str, int]       # payments settled by each pass
+    applied_paise: Dict[str, int]   # amount applied by each pass
+    unapplied: int                  # payments with nothing applied
+    unapplied_paise: int            # payment amount not applied to any invoice
+    total_paise: int
+    timings: Dict[str, float]       # seconds per pass
+
+    @property
+    def match_rate(self) -> float:
+        """Share of payments with at least one application."""
+        return 1 - self.unapplied / self.payments if self.payments else 1.0
+
+    @property
+    def amount_rate(self) -> float:
+        return 1 - self.unapplied_paise / self.total_paise if self.total_paise else 1.0
+
+
+class _Book:
+    """One vendor's invoices: by (amount, anchor), by anchor, by normalised number."""
+
+    __slots__ = ('amounts', 'amount_keys', 'dates', 'date_keys', 'numbers')
+
+    def __init__(self):
+        self.amounts: list = []
+        self.dates: list = []
+        self.numbers: Dict[str, int] = {}
+
+    def freeze(self):
+        self.amounts.sort()
+        self.amount_keys = [a for a, _, _ in self.amounts]
+        self.dates.sort()
+        self.date_keys = [d for d, _ in self.dates]
+
+
+def _normalise(number: Optional[str]) -> str:
+    return ''.join(number.split()).upper() if number else ''
+
+
+def _day(value) -> Optional[int]:
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def _subset(values: List[int], target: int, tolerance: int, max_items: int, budget: int) -> Optional[List[int]]:
+    """Indexes of 2..``max_items`` of ``values`` summing to ``target`` within ``tolerance``, or None.
+
+    Tries pairs, then triples, and so on, so the fewest invoices win.
+    Each size is a depth-first search over the values in descending order.
+    A branch is cut when the largest (or smallest) values still available
+    cannot land in range. All sizes share a budget of ``budget`` nodes.
+    """
+    order = sorted(range(len(values)), key=values.__getitem__, reverse=True)
+    vals = [values[k] for k in order]
+    n = len(vals)
+    prefix = [0]
+    for v in vals:
+        prefix.append(prefix[-1] + v)
+    lo, hi = target - tolerance, target + tolerance
+    nodes = 0
+    picked: List[int] = []
+
+    def search(start: int, total: int, left: int) -> bool:
+        nonlocal nodes
+        nodes += 1
+        if not left:
+            return lo <= total <= hi
+        if nodes > budget or start + left > n:
+            return False
+        if total + prefix[n] - prefix[n - left] > hi:     # even the smallest ``left`` overshoot
+            return False
+        for k in range(start, n - left + 1):
+            if total + prefix[k + left] - prefix[k] < lo:   # the largest ``left`` from k fall short
+                return False
+            if total + vals[k] + prefix[n] - prefix[n - left + 1] > hi:
+                continue
+            picked.append(k)
+            if search(k + 1, total + vals[k], left - 1):
+                return True
+            picked.pop()
+        return False
+
+    for size in range(2, max_items + 1):
+        if search(0, 0, size):
+            return [order[k] for k in picked]
+    return None
+
+
+def reconcile(conn: sqlite3.Connection, tolerance_paise: int = DEFAULT_TOLERANCE_PAISE,
+              window_days: int = DEFAULT_WINDOW_DAYS, max_invoices: int = DEFAULT_MAX_INVOICES,
+              max_candidates: int = DEFAULT_MAX_CANDIDATES, search_budget: int = DEFAULT_SEARCH_BUDGET,
+              dry_run: bool = False) -> Reconciliation:
+    """Match every payment that is not rejected against the invoices that are not, and store the result."""
+    timings = dict.fromkeys(PASSES, 0.0)
+    t0 = time.perf_counter()
+    conn.execute('BEGIN')
+    try:
+        invoices = conn.execute(f"SELECT id, COALESCE(vendor_id, 0), invoice_number, {_PAISE}, "
+                                f"COALESCE(NULLIF(due_date, ''), created_at) FROM invoices "
+                                f"WHERE status <> 'rejected'").fetchall()
+        payments = conn.execute(f"SELECT id, vendor_id, invoice_ref, {_PAISE}, created_at FROM payments "
+                                f"WHERE status <> 'rejected' ORDER BY created_at, id").fetchall()
+        manual = conn.execute("SELECT payment_id, invoice_id, amount_paise FROM payment_applications "
+                              "WHERE method = 'manual'").fetchall()
+    finally:
+        conn.execute('ROLLBACK')
+    timings['load'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    position = {}
+    amount, anchor, balance = [], [], []
+    books: Dict[int, _Book] = {}
+    for i, (invoice_id, vendor_id, number, paise, day) in enumerate(invoices):
+        position[invoice_id] = i
+        day = _day(day)
+        amount.append(paise)
+        anchor.append(day)
+        balance.append(paise)
+        book = books.get(vendor_id)
+        if book is None:
+            book = books[vendor_id] = _Book()
+        book.amounts.append((paise, day or 0, i))
+        book.dates.append((day or 0, i))
+        if number:
+            book.numbers.setdefault(_normalise(number), i)
+    for book in books.values():
+        book.freeze()
+    remaining = [p[3] for p in payments]
+    paid_index = {p[0]: k for k, p in enumerate(payments)}
+    for payment_id, invoice_id, paise in manual:
+        if invoice_id in position:
+            balance[position[invoice_id]] -= paise
+        if payment_id in paid_index:
+            remaining[paid_index[payment_id]] -= paise
+    days = [_day(p[4]) for p in payments]
+    timings['index'] = time.perf_counter() - t0
+
+    applications: List[tuple] = []          # (payment_id, invoice_id, amount_paise, difference_paise, method)
+    settled_by: Dict[int, str] = {}
+
+    def fits(i: int, day: Optional[int]) -> bool:
+        return balance[i] == amount[i] and (day is None or anchor[i] is None or abs(day - anchor[i]) <= window_days)
+
+    def open_payments():
+        for k, (payment_id, vendor_id, ref, paise, _) in enumerate(payments):
+            if vendor_id is not None and paise > 0 and remaining[k] == paise and vendor_id in books:
+                yield k, payment_id, books[vendor_id], ref, paise, days[k]
+
+    # 1. exact
+    t0 = time.perf_counter()
+    for k, payment_id, book, ref, paise, day in open_payments():
+        i = book.numbers.get(_normalise(ref)) if ref else None
+        if i is None or amount[i] != paise or not fits(i, day):
+            i = None
+            for j in range(bisect_left(book.amount_keys, paise), bisect_right(book.amount_keys, paise)):
+                if fits(book.amounts[j][2], day):
+                    i = book.amounts[j][2]
+                    break
+        if i is not None:
+            applications.append((payment_id, invoices[i][0], paise, 0, 'exact'))
+            balance[i] = remaining[k] = 0
+            settled_by[payment_id] = 'exact'
+    timings['exact'] = time.perf_counter() - t0
+
+    # 2. tolerance
+    t0 = time.perf_counter()
+    for k, payment_id, book, ref, paise, day in open_payments():
+        best = None
+        for j in range(bisect_left(book.amount_keys, paise - tolerance_paise),
+                       bisect_right(book.amount_keys, paise + tolerance_paise)):
+            a, d, i = book.amounts[j]
+            if fits(i, day):
+                key = (abs(a - paise), d)
+                if best is None or key < best[0]:
+                    best = (key, i)
+        if best is not None:
+            i = best[1]
+            applications.append((payment_id, invoices[i][0], paise, paise - amount[i], 'tolerance'))
+            balance[i] = remaining[k] = 0
+            settled_by[payment_id] = 'tolerance'
+    timings['tolerance'] = time.perf_counter() - t0
+
+    def window(book: _Book, day: Optional[int]) -> range:
+        if day is None:
+            return range(len(book.dates))
+        return range(bisect_left(book.date_keys, day - window_days), bisect_right(book.date_keys, day + window_days))
+
+    # 3. subset
+    t0 = time.perf_counter()
+    for k, payment_id, book, ref, paise, day in open_payments():
+        i = book.numbers.get(_normalise(ref)) if ref else None
+        if i is not None and balance[i] > paise:
+            continue                    # an instalment on the invoice it names
+        candidates = [book.dates[j][1] for j in window(book, day)]
+        candidates = [i for i in candidates if balance[i] == amount[i] and 0 < amount[i] <= paise + tolerance_paise]
+        if len(candidates) < 2:
+            continue
+        if len(candidates) > max_candidates and day is not None:
+            candidates.sort(key=lambda i: abs((anchor[i] or day) - day))
+            del candidates[max_candidates:]
+        found = _subset([amount[i] for i in candidates], paise, tolerance_paise, max_invoices, search_budget)
+        if found is None:
+            continue
+        chosen = sorted((candidates[j] for j in found), key=lambda i: (anchor[i] or 0, i))
+        total = sum(amount[i] for i in chosen)
+        for n, i in enumerate(chosen):
+            last = n == len(chosen) - 1
+            applied = amount[i] + (paise - total if last else 0)
+            applications.append((payment_id, invoices[i][0], applied, paise - total if last else 0, 'subset'))
+            balance[i] = 0
+        remaining[k] = 0
+        settled_by[payment_id] = 'subset'
+    timings['subset'] = time.perf_counter() - t0
+
+    # 4. partial: the invoice named by invoice_ref, then the oldest open balances
+    # in the window, including for payments part-applied by hand.
+    t0 = time.perf_counter()
+    for k, (payment_id, vendor_id, ref, paise, _) in enumerate(payments):
+        book = books.get(vendor_id)
+        if book is None or remaining[k] <= 0 or vendor_id is None:
+            continue
+        named = book.numbers.get(_normalise(ref)) if ref else None
+        targets = (book.dates[j][1] for j in window(book, days[k]))
+        for i in targets if named is None else chain((named,), targets):
+            if balance[i] <= 0:
+                continue
+            applied = min(remaining[k], balance[i])
+            applications.append((payment_id, invoices[i][0], applied, 0, 'partial'))
+            balance[i] -= applied
+            remaining[k] -= applied
+            settled_by.setdefault(payment_id, 'partial')
+            if remaining[k] == 0:
+                break
+    timings['partial'] = time.perf_counter() - t0
+
+    by_method = dict.fromkeys(METHODS, 0)
+    for method in settled_by.values():
+        by_method[method] += 1
+    applied_paise = dict.fromkeys(METHODS, 0)
+    for _, _, paise, _, method in applications:
+        applied_paise[method] += paise
+    manual_paid = {payment_id for payment_id, _, _ in manual}
+    unapplied = sum(1 for p in payments if p[0] not in settled_by and p[0] not in manual_paid)
+    unapplied_paise = sum(max(r, 0) for r in remaining)
+    total_paise = sum(p[3] for p in payments)
+
+    run_id = None
+    t0 = time.perf_counter()
+    if not dry_run:
+        stats = {'by_method': by_method, 'applied_paise': applied_paise,
+                 'timings': {k: round(v, 4) for k, v in timings.items()}, 'tolerance_paise': tolerance_paise,
+                 'window_days': window_days}
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            run_id = conn.execute('INSERT INTO reconcile_runs (payments, invoices, applied, unapplied_paise, stats) '
+                                  'VALUES (?, ?, ?, ?, ?)',
+                                  (len(payments), len(invoices), len(settled_by), unapplied_paise,
+                                   json.dumps(stats))).lastrowid
+            conn.execute("DELETE FROM payment_applications WHERE method <> 'manual'")
+            conn.executemany('INSERT INTO payment_applications (payment_id, invoice_id, amount_paise, '
+                             f'difference_paise, method, run_id) VALUES (?, ?, ?, ?, ?, {run_id})', applications)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+    timings['write'] = time.perf_counter() - t0
+    return Reconciliation(run_id, len(payments), len(invoices), by_method, applied_paise, unapplied,
+                          unapplied_paise, total_paise, timings)
+
+
+def main(argv=None):
+    from compliance import db
+
+    parser = argparse.ArgumentParser(description='Match payments to invoices and fill payment_applications.')
+    parser.add_argument('db', help='SQLite mirror of the D1 database')
+    parser.add_argument('--tolerance', type=Decimal, default=rupees(DEFAULT_TOLERANCE_PAISE),
+                        help='rupees a payment may differ from the invoice(s) it settles (default: %(default)s)')
+    parser.add_argument('--window-days', type=int, default=DEFAULT_WINDOW_DAYS,
+                        help='days between payment and invoice due date (default: %(default)s)')
+    parser.add_argument('--max-invoices', type=int, default=DEFAULT_MAX_INVOICES,
+                        help='most invoices one payment may settle in the subset pass (default: %(default)s)')
+    parser.add_argument('--dry-run', action='store_true', help='report without writing')
+    args = parser.parse_args(argv)
+
+    conn = db.open_mirror(args.db)
+    r = reconcile(conn, int(args.tolerance.scaleb(2)), args.window_days, args.max_invoices, dry_run=args.dry_run)
+    conn.close()
+    print(f'{r.payments:,} payments, {r.invoices:,} invoices' + ('' if r.run_id is None else f' (run {r.run_id})'))
+    for method in METHODS:
+        print(f'  {method:<10} {r.by_method[method]:>10,} payments  {rupees(r.applied_paise[method]):>18,}  '
+              f'{r.timings[method]:7.3f}s')
+    print(f'  {"unapplied":<10} {r.unapplied:>10,} payments  {rupees(r.unapplied_paise):>18,}')
+    print(f'  match rate {r.match_rate:.1%} of payments, {r.amount_rate:.1%} of amount; '
+          + ', '.join(f'{k} {r.timings[k]:.3f}s' for k in ('load', 'index', 'write')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""Dashboard KPIs, AP ageing and instrument exposure from trigger-maintained summary tables.
+
+``/api/reports/summary`` counts vendors, payments and instruments with five
+``COUNT(*)`` queries per dashboard load. ``0014_report_summary.sql`` keeps
+three small tables current from triggers on every insert, update and delete:
+
+* ``report_status_totals``: rows and amount per (entity, status);
+* ``report_ap_open``: open (pending/approved) invoice amount per vendor and
+  due date. Ageing buckets move with the calendar, so they are summed at
+  read time. That costs one row per vendor and due date, not per invoice;
+* ``report_instrument_exposure``: rows and amount per vendor, instrument
+  type and status.
+
+Amounts are integer paise, so the running sums are exact. :func:`rebuild`
+recomputes all three in one pass over the base tables. :func:`check` diffs
+them against a full recount.
+
+    python -m compliance.reports local.sqlite summary
+    python -m compliance.reports local.sqlite ageing --as-of 2025-10-01
+    python -m compliance.reports local.sqlite check
+"""
+import argparse
+import json
+import sqlite3
+import sys
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Worker response key -> (entity, status); status None counts every row.
+SUMMARY_KPIS: Dict[str, Tuple[str, Optional[str]]] = {
+    'vendor_count': ('vendors', None),
+    'vendor_pending': ('vendors', 'pending'),
+    'payments_pending': ('payments', 'pending'),
+    'payments_done': ('payments', 'done'),
+    'instruments_active': ('instruments', 'active'),
+}
+
+OPEN_INVOICE_STATUSES = ('pending', 'approved')
+AGEING_BUCKETS = (('not_due', None, 0), ('1_30', 1, 30), ('31_60', 31, 60), ('61_90', 61, 90),
+                  ('over_90', 91, None))
+
+_PAISE = 'CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER)'
+
+# The same aggregates the triggers maintain, computed from scratch.
+RECOUNT: Dict[str, Tuple[Tuple[str, ...], str]] = {
+    'report_status_totals': (
+        ('entity', 'status'),
+        f"""SELECT 'vendors', status, COUNT(*), 0 FROM vendors GROUP BY status
+            UNION ALL SELECT 'payments', status, COUNT(*), SUM({_PAISE}) FROM payments GROUP BY status
+            UNION ALL SELECT 'instruments', status, COUNT(*), SUM({_PAISE}) FROM financial_instruments GROUP BY status
+            UNION ALL SELECT 'invoices', status, COUNT(*), SUM({_PAISE}) FROM invoices GROUP BY status
+            UNION ALL SELECT 'pos', status, COUNT(*), SUM({_PAISE}) FROM purchase_orders GROUP BY status"""),
+    'report_ap_open': (
+        ('vendor_id', 'due_date'),
+        f"""SELECT COALESCE(vendor_id, 0), COALESCE(due_date, ''), COUNT(*), SUM({_PAISE})
+            FROM invoices WHERE status IN {OPEN_INVOICE_STATUSES} GROUP BY 1, 2"""),
+    'report_instrument_exposure': (
+        ('vendor_id', 'type_id', 'status'),
+        f"""SELECT COALESCE(vendor_id, 0), COALESCE(type_id, 0), status, COUNT(*), SUM({_PAISE})
+            FROM financial_instruments GROUP BY 1, 2, 3"""),
+}
+
+
+def rupees(paise: int) -> Decimal:
+    return Decimal(paise).scaleb(-2)
+
+
+class StatusTotal(NamedTuple):
+    row_count: int
+    amount_paise: int
+
+    @property
+    def amount(self) -> Decimal:
+        return rupees(self.amount_paise)
+
+
+class AgeingRow(NamedTuple):
+    vendor_id: int
+    invoices: int
+    not_due: int          # paise
+    d1_30: int
+    d31_60: int
+    d61_90: int
+    over_90: int
+    no_due_date: int
+    invalid_due_date: int     # set but not a date SQLite can read
+
+    @property
+    def total(self) -> int:
+        return (self.not_due + self.d1_30 + self.d31_60 + self.d61_90 + self.over_90 + self.no_due_date
+                + self.invalid_due_date)
+
+
+class Exposure(NamedTuple):
+    vendor_id: int
+    type_id: int
+    type_name: Optional[str]
+    row_count: int
+    amount_paise: int
+
+
+class Mismatch(NamedTuple):
+    table: str
+    key: tuple
+    maintained: Tuple[int, int]     # (row_count, amount_paise); (0, 0) when the row is missing
+    recounted: Tuple[int, int]
+
+
+def summary(conn: sqlite3.Connection) -> Dict[str, int]:
+    """The Worker's ``/api/reports/summary`` payload, from one read of a few dozen rows."""
+    counts: Dict[Tuple[str, Optional[str]], int] = {}
+    entities = sorted({e for e, _ in SUMMARY_KPIS.values()})
+    rows = conn.execute(f'SELECT entity, status, row_count FROM report_status_totals '
+                        f'WHERE entity IN ({", ".join("?" * len(entities))})', entities)
+    for entity, status, n in rows:
+        counts[(entity, status)] = n
+        counts[(entity, None)] = counts.get((entity, None), 0) + n
+    return {kpi: counts.get(key, 0) for kpi, key in SUMMARY_KPIS.items()}
+
+
+def status_totals(conn: sqlite3.Connection) -> Dict[str, Dict[str, StatusTotal]]:
+    out: Dict[str, Dict[str, StatusTotal]] = {}
+    for entity, status, n, paise in conn.execute('SELECT entity, status, row_count, amount_paise '
+                                                 'FROM report_status_totals WHERE row_count <> 0 ORDER BY 1, 2'):
+        out.setdefault(entity, {})[status] = StatusTotal(n, paise)
+    return out
+
+
+def ap_ageing(conn: sqlite3.Connection, as_of: Optional[date] = None,
+              vendor_id: Optional[int] = None) -> List[AgeingRow]:
+    """Open payables per vendor in days-past-due buckets as of ``as_of`` (default today).
+
+    A ``due_date`` that ``julianday`` cannot read goes to ``invalid_due_date``,
+    so every open invoice counted is in exactly one bucket.
+    """
+    cases = []
+    for _, lo, hi in AGEING_BUCKETS:
+        cond = ['overdue IS NOT NULL']
+        if lo is not None:
+            cond.append(f'overdue >= {lo}')
+        if hi is not None:
+            cond.append(f'overdue <= {hi}')
+        cases.append(f'SUM(CASE WHEN {" AND ".join(cond)} THEN amount_paise ELSE 0 END)')
+    cases.append("SUM(CASE WHEN due_date = '' THEN amount_paise ELSE 0 END)")
+    cases.append("SUM(CASE WHEN due_date <> '' AND overdue IS NULL THEN amount_paise ELSE 0 END)")
+    where, params = '', [(as_of or date.today()).isoformat()]
+    if vendor_id is not None:
+        where = 'WHERE vendor_id = ?'
+        params.append(vendor_id)
+    sql = (f'SELECT vendor_id, SUM(row_count), {", ".join(cases)} FROM '
+           f'(SELECT vendor_id, due_date, row_count, amount_paise, '
+           f'CAST(julianday(?) - julianday(due_date) AS INTEGER) AS overdue FROM report_ap_open {where}) '
+           f'GROUP BY vendor_id HAVING SUM(row_count) > 0 ORDER BY vendor_id')
+    return [AgeingRow(*r) for r in conn.execute(sql, params)]
+
+
+def instrument_exposure(conn: sqlite3.Connection, statuses: Sequence[str] = ('active',),
+                        vendor_id: Optional[int] = None) -> List[Exposure]:
+    """Instrument count and amount per vendor and type, for the given statuses."""
+    where, params = [f'e.status IN ({", ".join("?" * len(statuses))})', 'e.row_count > 0'], list(statuses)
+    if vendor_id is not None:
+        where.append('e.vendor_id = ?')
+        params.append(vendor_id)
+    sql = (f'SELECT e.vendor_id, e.type_id, t.name, SUM(e.row_count), SUM(e.amount_paise) '
+           f'FROM report_instrument_exposure e LEFT JOIN instrument_types t ON t.id = e.type_id '
+           f'WHERE {" AND ".join(where)} GROUP BY e.vendor_id, e.type_id ORDER BY e.vendor_id, e.type_id')
+    return [Exposure(*r) for r in conn.execute(sql, params)]
+
+
+def rebuild(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Recompute every summary table from the base tables in one transaction; returns row counts."""
+    out = {}
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for table, (key, select) in RECOUNT.items():
+            conn.execute(f'DELETE FROM {table}')
+            conn.execute(f'INSERT INTO {table} ({", ".join(key)}, row_count, amount_paise) {select}')
+            out[table] = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return out
+
+
+def check(conn: sqlite3.Connection) -> List[Mismatch]:
+    """Differences between the maintained tables and a full recount (empty when consistent)."""
+    out = []
+    conn.execute('BEGIN')   # one snapshot for both sides
+    try:
+        for table, (key, select) in RECOUNT.items():
+            width = len(key)
+            maintained = {tuple(r[:width]): (r[width], r[width + 1])
+                          for r in conn.execute(f'SELECT {", ".join(key)}, row_count, amount_paise FROM {table}')}
+            recounted = {tuple(r[:width]): (r[width], r[width + 1] or 0) for r in conn.execute(select)}
+            for k in sorted(maintained.keys() | recounted.keys(), key=lambda k: tuple(map(str, k))):
+                have, want = maintained.get(k, (0, 0)), recounted.get(k, (0, 0))
+                if have != want:
+                    out.append(Mismatch(table, k, have, want))
+    finally:
+        conn.execute('ROLLBACK')
+    return out
+
+
+def main(argv=None):
+    from compliance import db
+
+    parser = argparse.ArgumentParser(description='Dashboard summary, AP ageing and instrument exposure.')
+    parser.add_argument('db', help='SQLite mirror of the D1 database')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('summary', help="the Worker's /api/reports/summary payload")
+    sub.add_parser('totals', help='row count and amount per entity and status')
+    p = sub.add_parser('ageing', help='open payables per vendor by days past due')
+    p.add_argument('--as-of', type=date.fromisoformat)
+    p.add_argument('--vendor-id', type=int)
+    p = sub.add_parser('exposure', help='instrument amount per vendor and type')
+    p.add_argument('--status', action='append', help="repeatable (default: active)")
+    p.add_argument('--vendor-id', type=int)
+    sub.add_parser('rebuild', help='recompute the summary tables from the base tables')
+    sub.add_parser('check', help='compare the summary tables with a full recount; exit 1 on drift')
+    args = parser.parse_args(argv)
+
+    conn = db.open_mirror(args.db)
+    if args.command == 'summary':
+        print(json.dumps(summary(conn), indent=2))
+    elif args.command == 'totals':
+        for entity, by_status in status_totals(conn).items():
+            for status, t in by_status.items():
+                print(f'{entity:<12} {status:<10} {t.row_count:>10,} {t.amount:>20,}')
+    elif args.command == 'ageing':
+        print('vendor_id,invoices,' + ','.join(b for b, _, _ in AGEING_BUCKETS)
+              + ',no_due_date,invalid_due_date,total')
+        for r in ap_ageing(conn, args.as_of, args.vendor_id):
+            amounts = [r.not_due, r.d1_30, r.d31_60, r.d61_90, r.over_90, r.no_due_date, r.invalid_due_date,
+                       r.total]
+            print(f'{r.vendor_id},{r.invoices},' + ','.join(str(rupees(a)) for a in amounts))
+    elif args.command == 'exposure':
+        print('vendor_id,type_id,type,instruments,amount')
+        for e in instrument_exposure(conn, args.status or ('active',), args.vendor_id):
+            print(f'{e.vendor_id},{e.type_id},{e.type_name or ""},{e.row_count},{rupees(e.amount_paise)}')
+    elif args.command == 'rebuild':
+        for table, n in rebuild(conn).items():
+            print(f'{table}: {n} rows')
+    else:
+        mismatches = check(conn)
+        for m in mismatches[:50]:
+            print(f'{m.table} {m.key}: maintained {m.maintained} recount {m.recounted}')
+        print(f'{len(mismatches)} mismatch(es)')
+        conn.close()
+        sys.exit(1 if mismatches else 0)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
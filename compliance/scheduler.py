@@ -0,0 +1,329 @@
+"""Due-date and reminder scheduler over ``due_date_tracking_matrix.csv``.
+
+Each matrix row compiles into a :class:`DueRule`. ``Standard_Terms`` becomes a
+due-date function. Reminders follow the documented escalation ladder
+:data:`DOCUMENTED_OFFSETS`: T-5, T-1, T+1 and T+7. ``offsets=None`` takes each
+row's own ``Reminder_Days`` instead, as offsets around the due day: ``Net 30``
+with ``[25, 28, 30, 37]`` gives T-5, T-2, T+0 and T+7.
+
+:class:`ReminderScheduler` keeps one heap entry per open obligation: its next
+reminder. Firing pops that entry and pushes the obligation's following
+reminder. Asking what fires in the next 24 hours costs O(k log n) for k
+events, and hourly runs never rescan the whole book. Settled obligations are
+removed lazily: stale heap entries are skipped when they surface.
+
+The database feed covers open invoices, approved POs and TDS deposits. TDS
+deducted in a month (``tds_ledger``, migration 0022) is due on the 7th of the
+next month, and March's on 30 April. Deposits are not recorded yet, so every
+month with TDS stays open and past ones are skipped like any other reminder.
+
+    python -m compliance.scheduler --db local.sqlite --hours 24
+    python -m compliance.scheduler --db local.sqlite --offsets matrix
+    python -m compliance.scheduler --db local.sqlite --offsets=-3,0,3
+"""
+import argparse
+import calendar
+import csv
+import heapq
+import itertools
+import json
+import re
+import sys
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from compliance import DOCS_DIR
+
+MATRIX_PATH = DOCS_DIR / 'due_date_tracking_matrix.csv'
+
+# The escalation ladder described in COMPREHENSIVE_SYSTEM_DOCUMENTATION.md,
+# used for every row unless ``offsets=None`` asks for the row's Reminder_Days.
+DOCUMENTED_OFFSETS = (-5, -1, 1, 7)
+
+_NET_RE = re.compile(r'^Net\s+(\d+)$', re.IGNORECASE)
+_MONTHLY_DAY_RE = re.compile(r'^Monthly\s+(\d{1,2})(?:st|nd|rd|th)$', re.IGNORECASE)
+
+
+def add_months(d: date, months: int) -> date:
+    """Same day ``months`` later, clamped to the end of shorter months."""
+    index = d.month - 1 + months
+    year, month = d.year + index // 12, index % 12 + 1
+    return date(year, month, min(d.day, calendar.monthrange(year, month)[1]))
+
+
+def compile_terms(terms: str) -> Tuple[Callable[[date], date], int]:
+    """``(due_date_fn, anchor_day)`` for a ``Standard_Terms`` value.
+
+    ``anchor_day`` is the Reminder_Days value that corresponds to the due
+    date itself (30 for "Net 30", 20 for "Monthly 20th").
+    """
+    text = terms.strip()
+    m = _NET_RE.match(text)
+    if m:
+        days = int(m.group(1))
+        return (lambda base: base + timedelta(days=days)), days
+    m = _MONTHLY_DAY_RE.match(text)
+    if m:
+        day = int(m.group(1))
+        if not 1 <= day <= 31:
+            raise ValueError(f'invalid day in terms {terms!r}')
+
+        def monthly_on(base: date) -> date:
+            nxt = add_months(base.replace(day=1), 1)
+            return nxt.replace(day=min(day, calendar.monthrange(nxt.year, nxt.month)[1]))
+        return monthly_on, day
+    if text.lower() == 'monthly':
+        return (lambda base: add_months(base, 1)), 30
+    if text.lower() == 'quarterly':
+        return (lambda base: add_months(base, 3)), 90
+    raise ValueError(f'unrecognised Standard_Terms {terms!r}')
+
+
+class DueRule(NamedTuple):
+    transaction_type: str
+    document: str
+    terms: str
+    offsets: Tuple[int, ...]       # days relative to the due date, ascending
+    penalty_rate: str
+    due_date: Callable[[date], date]
+
+    @staticmethod
+    def label(offset: int) -> str:
+        return f'T{offset:+d}' if offset else 'T+0'
+
+
+def load_rules(path=MATRIX_PATH, offsets: Optional[Sequence[int]] = DOCUMENTED_OFFSETS) -> Dict[str, DueRule]:
+    """Compile every matrix row, keyed by ``Document`` ("Tax Invoice", ...).
+
+    ``offsets`` are days around the due date for every row; None uses each
+    row's ``Reminder_Days``.
+    """
+    rules = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            due_fn, anchor = compile_terms(row['Standard_Terms'])
+            if offsets is None:
+                days = json.loads(row['Reminder_Days'])
+                row_offsets = tuple(sorted(int(d) - anchor for d in days))
+            else:
+                row_offsets = tuple(sorted(offsets))
+            rules[row['Document']] = DueRule(
+                row['Transaction_Type'], row['Document'], row['Standard_Terms'],
+                row_offsets, row['Penalty_Rate'], due_fn)
+    return rules
+
+
+class ReminderEvent(NamedTuple):
+    fire_at: datetime
+    key: str
+    document: str
+    label: str           # "T-5", "T+7", ...
+    due: date
+
+
+class _Obligation:
+    __slots__ = ('key', 'rule', 'due', 'step', 'version')
+
+    def __init__(self, key, rule, due, version):
+        self.key = key
+        self.rule = rule
+        self.due = due
+        self.step = 0
+        self.version = version
+
+
+class ReminderScheduler:
+    """Heap-ordered timeline of the next reminder for every open obligation."""
+
+    def __init__(self, rules: Dict[str, DueRule], fire_time: time = time(9, 0)):
+        self.rules = rules
+        self.fire_time = fire_time
+        self._heap: List[tuple] = []
+        self._open: Dict[str, _Obligation] = {}
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._open)
+
+    def _fire_at(self, ob: _Obligation) -> datetime:
+        day = ob.due + timedelta(days=ob.rule.offsets[ob.step])
+        return datetime.combine(day, self.fire_time)
+
+    def _entry(self, ob: _Obligation) -> tuple:
+        return (self._fire_at(ob), next(self._seq), ob.key, ob.version)
+
+    def _make(self, key: str, document: str, due: Optional[date], base: Optional[date]) -> _Obligation:
+        rule = self.rules.get(document)
+        if rule is None:
+            raise KeyError(f'no due-date rule for document type {document!r}')
+        if due is None:
+            if base is None:
+                raise ValueError(f'{key}: need either due or base date')
+            due = rule.due_date(base)
+        previous = self._open.get(key)
+        ob = _Obligation(key, rule, due, previous.version + 1 if previous else 0)
+        self._open[key] = ob
+        return ob
+
+    def add(self, key: str, document: str, due: Optional[date] = None, base: Optional[date] = None) -> date:
+        """Track an obligation; ``due`` wins over deriving it from ``base`` via the terms.
+
+        Re-adding a key replaces the earlier schedule. Returns the due date.
+        """
+        ob = self._make(key, document, due, base)
+        heapq.heappush(self._heap, self._entry(ob))
+        return ob.due
+
+    def add_many(self, obligations: Iterable[Tuple[str, str, Optional[date], Optional[date]]]):
+        """Bulk-load ``(key, document, due, base)`` tuples with one O(n) heapify."""
+        for key, document, due, base in obligations:
+            self._heap.append(self._entry(self._make(key, document, due, base)))
+        heapq.heapify(self._heap)
+
+    def remove(self, key: str) -> bool:
+        """Stop reminding about ``key`` (paid, cancelled). O(1); the heap entry goes stale."""
+        return self._open.pop(key, None) is not None
+
+    def _live(self, entry) -> Optional[_Obligation]:
+        ob = self._open.get(entry[2])
+        return ob if ob is not None and ob.version == entry[3] else None
+
+    def fire_until(self, until: datetime) -> Iterator[ReminderEvent]:
+        """Pop every reminder due at or before ``until``, advancing each obligation.
+
+        Obligations whose last reminder fired are dropped from the book.
+        """
+        heap = self._heap
+        while heap and heap[0][0] <= until:
+            entry = heapq.heappop(heap)
+            ob = self._live(entry)
+            if ob is None:
+                continue
+            offset = ob.rule.offsets[ob.step]
+            yield ReminderEvent(entry[0], ob.key, ob.rule.document, DueRule.label(offset), ob.due)
+            ob.step += 1
+            if ob.step < len(ob.rule.offsets):
+                heapq.heappush(heap, self._entry(ob))
+            else:
+                del self._open[ob.key]
+
+    def upcoming(self, until: datetime) -> List[ReminderEvent]:
+        """Reminders due by ``until`` without consuming them.
+
+        Pops the k matching entries and pushes them back: O(k log n).
+        Only each obligation's next reminder is reported.
+        """
+        heap = self._heap
+        taken, events = [], []
+        while heap and heap[0][0] <= until:
+            entry = heapq.heappop(heap)
+            ob = self._live(entry)
+            if ob is None:
+                continue
+            taken.append(entry)
+            offset = ob.rule.offsets[ob.step]
+            events.append(ReminderEvent(entry[0], ob.key, ob.rule.document, DueRule.label(offset), ob.due))
+        for entry in taken:
+            heapq.heappush(heap, entry)
+        return events
+
+    def skip_past(self, now: datetime):
+        """Advance obligations past reminders already in the past without emitting them.
+
+        Useful after a bulk load, so a backlog of old T-5 alerts is not replayed.
+        """
+        for _ in self.fire_until(now):
+            pass
+
+
+def _parse_date(value) -> Optional[date]:
+    """The leading YYYY-MM-DD of ``value``; None when empty, ValueError when it is not a date."""
+    if not value:
+        return None
+    return date.fromisoformat(str(value)[:10])
+
+
+def tds_due_date(month: date) -> date:
+    """Deposit date for TDS deducted in ``month``: the 7th of the next month, 30 April for March."""
+    if month.month == 3:
+        return date(month.year, 4, 30)
+    return add_months(month.replace(day=1), 1).replace(day=7)
+
+
+def obligations_from_db(conn, invalid: Optional[List[str]] = None
+                        ) -> Iterator[Tuple[str, str, Optional[date], Optional[date]]]:
+    """Open invoices (explicit ``due_date``), approved POs (terms from ``created_at``) and
+    monthly TDS deposits per section (when the mirror has ``tds_ledger``).
+
+    An obligation whose date is not YYYY-MM-DD ('31/08/2025') is skipped,
+    and its key appended to ``invalid`` when given.
+    """
+    skipped = invalid if invalid is not None else []
+    for inv_id, number, due, created in conn.execute(
+            "SELECT id, invoice_number, due_date, created_at FROM invoices "
+            "WHERE status IN ('pending','approved')"):
+        try:
+            due_d = _parse_date(due)
+            start = None if due_d else _parse_date(created)
+        except ValueError:
+            skipped.append(f'invoice:{inv_id}')
+            continue
+        yield f'invoice:{inv_id}', 'Tax Invoice', due_d, start
+    for po_id, number, created in conn.execute(
+            "SELECT id, po_number, created_at FROM purchase_orders WHERE status = 'approved'"):
+        try:
+            start = _parse_date(created)
+        except ValueError:
+            skipped.append(f'po:{po_id}')
+            continue
+        yield f'po:{po_id}', 'Purchase Order', None, start
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tds_ledger'").fetchone():
+        for section, month in conn.execute(
+                "SELECT l.section, substr(p.created_at, 1, 7) AS month FROM tds_ledger l "
+                "JOIN payments p ON p.id = l.payment_id WHERE l.tds_paise > 0 AND p.created_at IS NOT NULL "
+                "GROUP BY l.section, month ORDER BY month, l.section"):
+            try:
+                deducted = _parse_date(month + '-01')
+            except ValueError:
+                skipped.append(f'tds:{section}:{month}')
+                continue
+            yield f'tds:{section}:{month}', 'TDS Payment', tds_due_date(deducted), None
+
+
+def _offsets(text: str) -> Optional[Tuple[int, ...]]:
+    if text == 'matrix':
+        return None
+    try:
+        return tuple(int(part) for part in text.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected 'matrix' or comma-separated days, got {text!r}") from None
+
+
+def main(argv=None):
+    import sqlite3
+
+    parser = argparse.ArgumentParser(description='List reminders firing in the next N hours.')
+    parser.add_argument('--db', required=True, help='SQLite mirror of the D1 database')
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--now', type=datetime.fromisoformat, default=None, help='ISO timestamp (default: now)')
+    parser.add_argument('--matrix', default=str(MATRIX_PATH))
+    parser.add_argument('--offsets', type=_offsets, default=DOCUMENTED_OFFSETS,
+                        help="reminder days around the due date, e.g. --offsets=-5,-1,1,7 (the default); "
+                             "'matrix' uses each row's Reminder_Days")
+    args = parser.parse_args(argv)
+
+    now = args.now or datetime.now()
+    scheduler = ReminderScheduler(load_rules(args.matrix, offsets=args.offsets))
+    invalid: List[str] = []
+    with sqlite3.connect(args.db) as conn:
+        scheduler.add_many(ob for ob in obligations_from_db(conn, invalid) if ob[2] or ob[3])
+    if invalid:
+        print(f'{len(invalid)} obligation(s) skipped, date is not YYYY-MM-DD: {", ".join(invalid[:20])}'
+              f'{" ..." if len(invalid) > 20 else ""}', file=sys.stderr)
+    scheduler.skip_past(now)
+    for event in scheduler.upcoming(now + timedelta(hours=args.hours)):
+        print(f'{event.fire_at.isoformat()} {event.label:>4} {event.document}: {event.key} due {event.due}')
+
+
+if __name__ == '__main__':
+    main()
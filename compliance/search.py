@@ -0,0 +1,154 @@
+"""Vendor search over the FTS5 index from ``0018_vendor_search.sql``.
+
+``/api/vendors?search=`` and the CSV export filtered with
+``company_name LIKE '%x%' OR legal_name LIKE ... OR gstin LIKE ...``. The
+leading wildcard rules out every index, so each keystroke in a vendor
+picker scanned the whole table. ``vendors_fts`` indexes the tokens of
+company_name, legal_name, gstin and pan, and triggers keep it in step with
+``vendors``. Every search token becomes a prefix query, so "shree gan"
+finds "Shree Ganesh Traders". Matching is on token prefixes, no longer
+on arbitrary substrings.
+
+:func:`lookup` serves type-ahead. It ranks vendors whose company_name
+starts with the typed text first. After those it weighs how many tokens
+each column matches, with company_name counting most and whole words more
+than prefixes. Ranking has to look at every match, and a two-letter prefix
+can match a tenth of the table. So only the newest ``RANK_WINDOW``
+matches with the requested status are ranked, read newest first from the
+index. The scoring is done in Python over those rows. bm25 needs document
+counts for every query token across the whole index, which alone costs
+more than the 20 ms budget for common words.
+
+:func:`search_clause` is the filter the list endpoint and the export use.
+
+    python -m compliance.search local.sqlite "shree gan" [--limit 10] [--status approved]
+    python -m compliance.search local.sqlite --rebuild
+"""
+import argparse
+import re
+import sqlite3
+from typing import List, NamedTuple, Optional, Tuple
+
+DEFAULT_LIMIT = 10
+RANK_WINDOW = 500
+WEIGHTS = (4.0, 2.0, 1.0, 1.0)      # company_name, legal_name, gstin, pan
+
+# unicode61 splits on everything but letters and digits (underscore included).
+_TOKEN = re.compile(r'[^\W_]+')
+
+
+class VendorHit(NamedTuple):
+    id: int
+    company_name: str
+    legal_name: Optional[str]
+    gstin: Optional[str]
+    pan: Optional[str]
+    status: str
+    score: float                    # higher is better
+
+
+def match_expression(text: Optional[str]) -> str:
+    """FTS5 query for ``text``: every token as a prefix, or '' when there are none."""
+    return ' AND '.join(f'"{t}" *' for t in _TOKEN.findall(text or ''))
+
+
+def search_clause(text: Optional[str], column: str = 'id') -> Tuple[Optional[str], list]:
+    """SQL condition and parameters restricting vendors to ``text``; (None, []) when it has no tokens."""
+    expr = match_expression(text)
+    if not expr:
+        return None, []
+    return f'{column} IN (SELECT rowid FROM vendors_fts WHERE vendors_fts MATCH ?)', [expr]
+
+
+class _Scorer:
+    """Ranks rows for one query.
+
+    The score is the weighted share of tokens each column has a word
+    starting with, and whole words count 1.5x. A company_name that starts
+    with the typed text gets more than any other row can.
+    """
+
+    __slots__ = ('tokens', 'start')
+
+    def __init__(self, tokens: List[str]):
+        self.tokens = [(re.compile(rf'(?<![^\W_]){re.escape(t)}', re.I),
+                        re.compile(rf'(?<![^\W_]){re.escape(t)}(?![^\W_])', re.I)) for t in tokens]
+        words = [re.escape(t) + r'(?![^\W_])' for t in tokens[:-1]] + [re.escape(tokens[-1])]
+        self.start = re.compile(r'[\W_]*' + r'[\W_]+'.join(words), re.I)
+
+    def __call__(self, row: tuple) -> float:
+        score = 0.0
+        for weight, value in zip(WEIGHTS, row[1:5]):
+            if value:
+                for prefix, word in self.tokens:
+                    if prefix.search(value):
+                        score += weight * (1.5 if word.search(value) else 1.0)
+        score /= len(self.tokens)
+        if row[1] and self.start.match(row[1]):
+            score += 1.5 * sum(WEIGHTS)
+        return score
+
+
+def lookup(conn: sqlite3.Connection, text: str, limit: int = DEFAULT_LIMIT,
+           status: Optional[str] = None) -> List[VendorHit]:
+    """Up to ``limit`` vendors for a type-ahead box, best first."""
+    tokens = _TOKEN.findall(text or '')
+    # One letter matches too much to rank, and has no prefix index to find it with.
+    expr = match_expression(' '.join(t for t in tokens if len(t) > 1))
+    if not expr:
+        return []
+    # The status filter goes inside the window, or newer matches with another status would crowd it out.
+    rows = conn.execute('SELECT v.id, v.company_name, v.legal_name, v.gstin, v.pan, v.status '
+                        'FROM vendors_fts f JOIN vendors v ON v.id = f.rowid WHERE vendors_fts MATCH ?'
+                        + (' AND v.status = ?' if status else '') + ' ORDER BY f.rowid DESC LIMIT ?',
+                        [expr] + ([status] if status else []) + [RANK_WINDOW]).fetchall()
+    score = _Scorer(tokens)
+    ranked = sorted(((score(row), row) for row in rows), key=lambda sr: (-sr[0], len(sr[1][1] or ''), -sr[1][0]))
+    return [VendorHit(*row, round(score, 3)) for score, row in ranked[:limit]]
+
+
+def rebuild(conn: sqlite3.Connection):
+    """Re-index every vendor, e.g. after a bulk load with the triggers dropped."""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute("INSERT INTO vendors_fts (vendors_fts) VALUES ('rebuild')")
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def check(conn: sqlite3.Connection):
+    """Raise sqlite3.DatabaseError if the index disagrees with ``vendors``."""
+    conn.execute("INSERT INTO vendors_fts (vendors_fts, rank) VALUES ('integrity-check', 1)")
+
+
+def main(argv=None):
+    from compliance import db
+
+    parser = argparse.ArgumentParser(description='Search vendors through the full-text index.')
+    parser.add_argument('db', help='SQLite mirror of the D1 database')
+    parser.add_argument('text', nargs='?', help='what a user typed')
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+    parser.add_argument('--status', help='only vendors with this status')
+    parser.add_argument('--rebuild', action='store_true', help='re-index every vendor first')
+    parser.add_argument('--check', action='store_true', help='verify the index against vendors')
+    args = parser.parse_args(argv)
+
+    conn = db.open_mirror(args.db)
+    if args.rebuild:
+        rebuild(conn)
+    if args.check:
+        try:
+            check(conn)
+        except sqlite3.DatabaseError as exc:
+            raise SystemExit(f'vendors_fts: {exc}')
+        print('vendors_fts: ok')
+    if args.text:
+        for hit in lookup(conn, args.text, args.limit, args.status):
+            print(f'{hit.id:>9}  {hit.score:6.2f}  {hit.gstin or "":<15}  {hit.status:<9}  {hit.company_name}')
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
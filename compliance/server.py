@@ -0,0 +1,167 @@
+"""Local stand-in for the Worker's list endpoints, served from the SQLite mirror.
+
+Speaks the Worker's JSON envelope (``{"success": true, "data": ...}`` /
+``{"success": false, "error": {"message": ...}}``) for
+``/api/{vendors,payments,pos,invoices,dcs}``: list, get by id, create and
+update. Lists go through :class:`compliance.listing.ListStore`, so they
+accept ``?cursor=`` as well as ``?page=``, and ``total`` comes from the
+count cache. Writes need ``x-user-level`` of 2 or more, like the Worker.
+``/api/reports/summary`` reads the summary tables (:mod:`compliance.reports`).
+``/api/vendors/lookup?q=`` is the type-ahead search (:mod:`compliance.search`).
+
+    python -m compliance.server local.sqlite --port 8787
+    curl 'http://127.0.0.1:8787/api/invoices?status=pending&size=100'
+"""
+import argparse
+import json
+import re
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from compliance import reports, search
+from compliance.export import STATUS_ALIASES, VENDOR_STATUSES
+from compliance.listing import LISTS, ListStore
+
+MIN_WRITE_LEVEL = 2  # LEVEL.L2: canCreateEntries
+
+_ROUTE = re.compile(r'^/api/(?P<entity>[a-z]+)(?:/(?P<id>[0-9]+))?/?$')
+
+
+class Handler(BaseHTTPRequestHandler):
+    store: ListStore = None      # set by make_server()
+    server_version = 'ODICMirror/1.0'
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def ok(self, data):
+        self._send(200, {'success': True, 'data': data})
+
+    def bad(self, message: str, status: int = 400):
+        self._send(status, {'success': False, 'error': {'message': message}})
+
+    def _route(self):
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path in ('/api/health', '/api/reports/summary', '/api/vendors/lookup'):
+            return url.path, None, query
+        m = _ROUTE.match(url.path)
+        if not m or m['entity'] not in LISTS:
+            return None, None, {}
+        return m['entity'], (int(m['id']) if m['id'] else None), query
+
+    def _body(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return {}
+        return body if isinstance(body, dict) else {}
+
+    def _level(self) -> int:
+        try:
+            return int(self.headers.get('x-user-level') or 0)
+        except ValueError:
+            return 0
+
+    def do_GET(self):
+        entity, row_id, query = self._route()
+        if entity == '/api/health':
+            return self.ok({'status': 'healthy'})
+        if entity == '/api/reports/summary':
+            return self.ok(reports.summary(self.store.conn))
+        if entity == '/api/vendors/lookup':
+            return self._lookup(query)
+        if entity is None:
+            return self.bad('Not found', 404)
+        if row_id is not None:
+            row = self.store.get(entity, row_id)
+            if row is None:
+                return self.bad('Not found', 404)
+            return self.ok(row)
+        try:
+            page = query.get('page')
+            page = int(page) if page and page.lstrip('-').isdigit() else None
+            result = self.store.list(entity, status=query.get('status'), vendor_id=query.get('vendor_id'),
+                                     search=query.get('search'), size=query.get('size'),
+                                     cursor=query.get('cursor'), page=page)
+        except ValueError as exc:
+            return self.bad(str(exc))
+        self.ok(result.to_json())
+
+    def _lookup(self, query: dict):
+        limit = query.get('limit', '')
+        limit = min(max(int(limit), 1), 50) if limit.isdigit() else search.DEFAULT_LIMIT
+        status = (query.get('status') or '').strip().lower()
+        status = STATUS_ALIASES.get(status, status)
+        if status and status not in VENDOR_STATUSES:
+            return self.bad(f'Invalid status filter. Allowed: {", ".join(sorted(VENDOR_STATUSES))}')
+        self.ok([hit._asdict() for hit in search.lookup(self.store.conn, query.get('q', ''), limit, status or None)])
+
+    def do_POST(self):
+        entity, row_id, _ = self._route()
+        if entity not in LISTS or row_id is not None:
+            return self.bad('Not found', 404)
+        level = self._level()
+        if level < MIN_WRITE_LEVEL:
+            return self.bad('forbidden', 403)
+        try:
+            self.ok(self.store.create(entity, self._body(), actor_level=level))
+        except ValueError as exc:
+            self.bad(str(exc))
+
+    def do_PUT(self):
+        entity, row_id, _ = self._route()
+        if entity not in LISTS or row_id is None:
+            return self.bad('Not found', 404)
+        if self._level() < MIN_WRITE_LEVEL:
+            return self.bad('forbidden', 403)
+        try:
+            row = self.store.update(entity, row_id, self._body())
+        except ValueError as exc:
+            return self.bad(str(exc))
+        if row is None:
+            return self.bad('Not found', 404)
+        self.ok(row)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(conn, host: str = '127.0.0.1', port: int = 8787, verbose: bool = False) -> HTTPServer:
+    """One connection, one thread: requests are served in order, like a single Worker isolate."""
+    handler = type('MirrorHandler', (Handler,), {'store': ListStore(conn)})
+    server = HTTPServer((host, port), handler)
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    from compliance import db
+
+    parser = argparse.ArgumentParser(description="Serve the Worker's list endpoints from the SQLite mirror.")
+    parser.add_argument('db', help='SQLite mirror of the D1 database')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('-v', '--verbose', action='store_true', help='log each request')
+    args = parser.parse_args(argv)
+
+    server = make_server(db.open_mirror(args.db), args.host, args.port, args.verbose)
+    print(f'serving {args.db} on http://{args.host}:{server.server_port}', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Minimal list-of-dicts to CSV writer, byte-compatible with pandas for plain Python values.
+
+The generator scripts only used pandas for
+``pd.DataFrame(records).to_csv(path, index=False)``; importing pandas cost more
+than everything else they do. :func:`to_csv` streams the same bytes through
+``csv.writer``:
+
+* columns in order of first appearance across the records;
+* ``True``/``False`` for bools, ``str()`` for everything else;
+* missing keys, ``None`` and NaN as empty fields;
+* a numeric column with gaps or any float is written as floats (``20.0``),
+  as pandas does after upcasting it to float64;
+* minimal quoting, so ``"[25, 28, 30, 37]"`` is quoted like pandas does.
+
+Values are str, int, float, bool, None or anything written with ``str()``
+(lists); NumPy scalars, dates and Decimals are not given pandas' dtype
+handling. ``tests/test_tables.py`` compares the output with pandas.
+"""
+import csv
+import io
+import os
+from typing import Iterable, List, Mapping, Optional, Sequence
+
+_MISSING = object()
+
+
+def _columns(records: Sequence[Mapping]) -> List[str]:
+    seen = {}
+    for record in records:
+        for key in record:
+            seen.setdefault(key, None)
+    return list(seen)
+
+
+def _float_columns(records: Sequence[Mapping], columns: Sequence[str]) -> List[bool]:
+    """Columns pandas would make float64: numbers (not bools) with a gap or a float among them."""
+    flags = []
+    for col in columns:
+        has_gap = has_float = False
+        numeric = True
+        for record in records:
+            value = record.get(col, _MISSING)
+            if value is _MISSING or value is None:
+                has_gap = True
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                numeric = False
+                break
+            elif isinstance(value, float):
+                has_float = True
+        flags.append(numeric and (has_gap or has_float))
+    return flags
+
+
+def _cell(value, as_float: bool) -> str:
+    if value is _MISSING or value is None or value != value:    # NaN is missing to pandas
+        return ''
+    if as_float:
+        return repr(float(value))
+    return str(value)
+
+
+def write_rows(fp, records: Sequence[Mapping], columns: Optional[Sequence[str]] = None):
+    """Stream ``records`` as CSV (header first) into the text file ``fp``."""
+    if columns is None:
+        columns = _columns(records)
+    floats = _float_columns(records, columns)
+    writer = csv.writer(fp, lineterminator=os.linesep)
+    writer.writerow(columns)
+    for record in records:
+        writer.writerow([_cell(record.get(c, _MISSING), f) for c, f in zip(columns, floats)])
+
+
+def to_csv(records: Iterable[Mapping], path=None, columns: Optional[Sequence[str]] = None,
+           encoding: str = 'utf-8') -> Optional[str]:
+    """``pd.DataFrame(records).to_csv(path, index=False)`` without pandas.
+
+    Returns the CSV text when ``path`` is None, like pandas.
+    """
+    records = records if isinstance(records, (list, tuple)) else list(records)
+    if path is None:
+        buf = io.StringIO()
+        write_rows(buf, records, columns)
+        return buf.getvalue()
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        write_rows(f, records, columns)
+    return None
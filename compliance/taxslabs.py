@@ -0,0 +1,195 @@
+"""Vectorized income-tax slab engine.
+
+``script_1.py`` publishes the New and Old regime slabs as display strings
+("4,00,001 - 8,00,000", "5%") inside ``indian_taxation_document_structure.json``.
+This module parses those strings once into NumPy arrays of slab floors, rates
+and cumulative tax-at-floor, so liability for any number of incomes is one
+``np.searchsorted`` plus a fused multiply-add.
+
+    >>> regimes = load_regimes()
+    >>> regimes['NEW_TAX_REGIME_2025'].liability([1200000, 1500000]).net
+    array([     0., 105000.])
+
+Run ``python -m compliance.taxslabs 1275000 1800000`` for a quick comparison.
+"""
+import argparse
+import json
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from compliance import DOCS_DIR
+
+STRUCTURE_PATH = DOCS_DIR / 'indian_taxation_document_structure.json'
+
+# Section 87A rebate: full rebate up to the limit. The New regime also grants
+# marginal relief, so tax just above the limit never exceeds the excess income.
+REBATE_LIMITS = {
+    'NEW_TAX_REGIME_2025': 1200000,
+    'OLD_TAX_REGIME': 500000,
+}
+MARGINAL_RELIEF = {'NEW_TAX_REGIME_2025'}
+
+_RANGE_RE = re.compile(r'^\s*(\d[\d,]*)\s*-\s*(\d[\d,]*)\s*$')
+_ABOVE_RE = re.compile(r'^\s*Above\s+(\d[\d,]*)\s*$', re.IGNORECASE)
+_RATE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*%\s*$')
+
+
+def _amount(text: str) -> int:
+    return int(text.replace(',', ''))
+
+
+class TaxResult(NamedTuple):
+    gross: np.ndarray
+    rebate: np.ndarray
+    net: np.ndarray
+
+
+class SlabTable:
+    """One regime's slabs compiled into floor/rate/base arrays."""
+
+    __slots__ = ('name', 'floors', 'rates', 'base', 'rebate_limit', 'marginal_relief')
+
+    def __init__(self, name: str, floors, rates, rebate_limit: Optional[float] = None,
+                 marginal_relief: bool = False):
+        self.name = name
+        self.floors = np.asarray(floors, dtype=np.float64)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        if self.floors.ndim != 1 or self.floors.shape != self.rates.shape or not len(self.floors):
+            raise ValueError(f'{name}: floors and rates must be equal-length 1-D arrays')
+        if self.floors[0] != 0 or np.any(np.diff(self.floors) <= 0):
+            raise ValueError(f'{name}: slab floors must start at 0 and increase strictly')
+        # Tax owed on income exactly at each floor: running sum of full slabs below it.
+        widths = np.diff(self.floors)
+        self.base = np.concatenate(([0.0], np.cumsum(widths * self.rates[:-1])))
+        self.rebate_limit = rebate_limit
+        self.marginal_relief = marginal_relief
+
+    @classmethod
+    def from_slabs(cls, name: str, slabs: Iterable[dict], **kwargs) -> 'SlabTable':
+        """Compile ``[{"income_range": ..., "tax_rate": ...}, ...]`` display rows."""
+        floors: List[int] = []
+        rates: List[float] = []
+        prev_ceiling = None
+        for slab in slabs:
+            text = slab['income_range']
+            m = _RANGE_RE.match(text)
+            if m:
+                low, high = _amount(m.group(1)), _amount(m.group(2))
+            else:
+                m = _ABOVE_RE.match(text)
+                if not m:
+                    raise ValueError(f'{name}: unrecognised income_range {text!r}')
+                low, high = _amount(m.group(1)) + 1, None
+            # "4,00,001 - 8,00,000" starts taxing the rupee after 4,00,000.
+            floor = 0 if low == 0 else low - 1
+            if prev_ceiling is None and floor != 0:
+                raise ValueError(f'{name}: first slab must start at 0, got {text!r}')
+            if prev_ceiling is not None and floor != prev_ceiling:
+                raise ValueError(f'{name}: slab {text!r} is not contiguous with the previous one')
+            rate = _RATE_RE.match(slab['tax_rate'])
+            if not rate:
+                raise ValueError(f'{name}: unrecognised tax_rate {slab["tax_rate"]!r}')
+            floors.append(floor)
+            rates.append(float(rate.group(1)) / 100.0)
+            prev_ceiling = high
+        if prev_ceiling is not None:
+            raise ValueError(f'{name}: last slab must be open-ended ("Above ...")')
+        return cls(name, floors, rates, **kwargs)
+
+    def gross_tax(self, incomes) -> np.ndarray:
+        x = np.maximum(np.asarray(incomes, dtype=np.float64), 0.0)
+        idx = np.searchsorted(self.floors, x, side='right') - 1
+        return self.base[idx] + (x - self.floors[idx]) * self.rates[idx]
+
+    def liability(self, incomes) -> TaxResult:
+        x = np.asarray(incomes, dtype=np.float64)
+        gross = self.gross_tax(x)
+        if self.rebate_limit is None:
+            return TaxResult(gross, np.zeros_like(gross), gross)
+        above = x > self.rebate_limit
+        if self.marginal_relief:
+            net = np.where(above, np.minimum(gross, x - self.rebate_limit), 0.0)
+        else:
+            net = np.where(above, gross, 0.0)
+        return TaxResult(gross, gross - net, net)
+
+    def liability_py(self, income: float) -> float:
+        """Per-row reference implementation; used by the benchmark as a baseline."""
+        income = max(float(income), 0.0)
+        if self.rebate_limit is not None and income <= self.rebate_limit:
+            return 0.0
+        tax = 0.0
+        floors, rates = self.floors.tolist(), self.rates.tolist()
+        for i, floor in enumerate(floors):
+            if income <= floor:
+                break
+            ceiling = floors[i + 1] if i + 1 < len(floors) else income
+            tax += (min(income, ceiling) - floor) * rates[i]
+        if self.marginal_relief and self.rebate_limit is not None:
+            tax = min(tax, income - self.rebate_limit)
+        return tax
+
+    def __repr__(self):
+        return f'SlabTable({self.name!r}, slabs={len(self.floors)}, rebate_limit={self.rebate_limit})'
+
+
+def load_regimes(path=STRUCTURE_PATH) -> Dict[str, SlabTable]:
+    """Compile every regime under ``TAX_REGIMES`` in the structure JSON.
+
+    The default regime (``"default_regime": true``) is returned first.
+    """
+    with open(path, encoding='utf-8') as f:
+        structure = json.load(f)
+    regimes = structure['TAX_REGIMES']
+    order = sorted(regimes, key=lambda k: not regimes[k].get('default_regime', False))
+    return {
+        name: SlabTable.from_slabs(
+            name, regimes[name]['tax_slabs'],
+            rebate_limit=REBATE_LIMITS.get(name),
+            marginal_relief=name in MARGINAL_RELIEF,
+        )
+        for name in order
+    }
+
+
+class RegimeComparison(NamedTuple):
+    names: List[str]
+    net: np.ndarray        # shape (len(names), len(incomes))
+    best: np.ndarray       # index into names of the cheaper regime per income
+    saving: np.ndarray     # default-regime tax minus best-regime tax (>= 0)
+
+
+def compare_regimes(incomes, regimes: Optional[Dict[str, SlabTable]] = None) -> RegimeComparison:
+    """Net liability under every regime and the cheapest choice per income.
+
+    Ties resolve to the first (default) regime.
+    """
+    if regimes is None:
+        regimes = load_regimes()
+    x = np.asarray(incomes, dtype=np.float64)
+    names = list(regimes)
+    net = np.stack([regimes[n].liability(x).net for n in names])
+    best = np.argmin(net, axis=0)
+    saving = net[0] - np.take_along_axis(net, best[None, :], axis=0)[0]
+    return RegimeComparison(names, net, best, saving)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare tax regimes for one or more incomes.')
+    parser.add_argument('incomes', nargs='+', type=float, help='taxable income in rupees')
+    parser.add_argument('--structure', default=str(STRUCTURE_PATH),
+                        help='path to indian_taxation_document_structure.json')
+    args = parser.parse_args(argv)
+
+    result = compare_regimes(args.incomes, load_regimes(args.structure))
+    print('income,' + ','.join(result.names) + ',best,saving')
+    for i, income in enumerate(args.incomes):
+        cells = [f'{income:.0f}'] + [f'{v:.2f}' for v in result.net[:, i]]
+        cells += [result.names[result.best[i]], f'{result.saving[i]:.2f}']
+        print(','.join(cells))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,442 @@
+"""TDS on vendor payments under ``tds_sections`` (194C, 194J, ...).
+
+A payment under a section attracts TDS when it exceeds the section's
+``single_payment_threshold``, or when the vendor's payments under that
+section in the financial year exceed ``aggregate_threshold``. On the
+payment that crosses the aggregate threshold, TDS is due on the whole
+year's total, less what was already taxed as single payments. That is
+the catch-up. After the crossing, every payment is taxed in full.
+``tds_sections`` only has ``rate_company``, so that rate applies. TDS is
+rounded half up to the rupee.
+
+Deciding a payment needs only the running totals of its (vendor, section,
+FY): payments, amount paid, amount taxed and TDS. :class:`TdsEngine` keeps
+them in a dict, so each decision is O(1) however many payments came
+before. :func:`record` decides every payment newer than the last one in
+``tds_ledger``, in id order, and writes the decisions and the updated
+``tds_accumulators`` rows (``0022_tds.sql``) in one transaction. Each
+payment is decided once, including payments with no ``tds_section``
+(``no_section``), rejected ones (``not_counted``) and ones whose
+``created_at`` is not a date (``invalid_date``, with no FY,
+``0024_tds_invalid_date.sql``). The section is set by ``POST``/``PUT
+/api/payments`` and :mod:`compliance.listing`; one set after the payment
+was decided shows up in :func:`check`.
+
+:func:`recompute` replays a whole financial year from ``payments`` in one
+NumPy pass: cumulative sums per (vendor, section) give every payment's
+year-to-date total. :func:`check` diffs that against the stored ledger and
+accumulators, for example after payments were rejected or edited once
+decided. ``recompute(..., write=True)`` replaces the year's stored state.
+
+    python -m compliance.tds local.sqlite record
+    python -m compliance.tds local.sqlite preview --vendor-id 12 --section 194C --amount 45000
+    python -m compliance.tds local.sqlite vendor 12 [--fy 2025]
+    python -m compliance.tds local.sqlite check --fy 2025 [--fix]
+"""
+import argparse
+import sqlite3
+import sys
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from compliance.reports import rupees
+
+REASONS = ('single', 'aggregate', 'below_threshold', 'no_section', 'unknown_section', 'not_counted',
+           'invalid_date')
+NOT_COUNTED_STATUSES = ('rejected',)
+
+_PAISE = 'CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER)'
+# April-March financial year of created_at, as the year it starts in; NULL unless it starts with a date.
+_FY = ("(CASE WHEN created_at GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*' "
+       "AND date(substr(created_at, 1, 10)) IS NOT NULL "
+       "THEN CAST(substr(created_at, 1, 4) AS INTEGER) - (CAST(substr(created_at, 6, 2) AS INTEGER) < 4) END)")
+_PAYMENTS = f'SELECT id, COALESCE(vendor_id, 0), tds_section, {_FY}, {_PAISE}, status FROM payments'
+_LEDGER_COLUMNS = ('payment_id', 'vendor_id', 'section', 'fy', 'amount_paise', 'base_paise', 'rate_bp',
+                   'tds_paise', 'reason')
+_ACCUMULATOR_COLUMNS = ('vendor_id', 'section', 'fy', 'payments', 'paid_paise', 'base_paise', 'tds_paise',
+                        'last_payment_id')
+
+
+class Section(NamedTuple):
+    section: str
+    rate_bp: int                # hundredths of a percent
+    single_paise: int           # TDS applies to a single payment above this
+    aggregate_paise: int        # ... or once the year's payments exceed this
+
+
+class Decision(NamedTuple):
+    payment_id: int
+    vendor_id: int
+    section: Optional[str]
+    fy: Optional[int]           # None: created_at is not a date
+    amount_paise: int
+    base_paise: int
+    rate_bp: int
+    tds_paise: int
+    reason: str
+
+    @property
+    def net_paise(self) -> int:
+        """What the vendor is paid after TDS."""
+        return self.amount_paise - self.tds_paise
+
+
+class Totals(NamedTuple):
+    """Stored or recomputed state of one (vendor, section, FY)."""
+    payments: int
+    paid_paise: int
+    base_paise: int
+    tds_paise: int
+    last_payment_id: Optional[int]
+
+
+class Mismatch(NamedTuple):
+    kind: str                   # 'payment' or 'accumulator'
+    key: tuple                  # (payment_id,) or (vendor_id, section, fy)
+    stored: Optional[tuple]
+    expected: Optional[tuple]
+
+
+def financial_year(day: date) -> int:
+    """The year an April-March financial year starts in: 2025 for FY 2025-26."""
+    return day.year - (day.month < 4)
+
+
+def fy_label(fy: int) -> str:
+    return f'{fy}-{(fy + 1) % 100:02d}'
+
+
+def tds_on(base_paise: int, rate_bp: int) -> int:
+    """TDS at ``rate_bp`` on ``base_paise``, rounded half up to the rupee, in paise."""
+    return (base_paise * rate_bp + 500_000) // 1_000_000 * 100
+
+
+def _rupee_tds(base: np.ndarray, rate_bp: np.ndarray) -> np.ndarray:
+    return (base * rate_bp + 500_000) // 1_000_000 * 100
+
+
+def load_sections(conn: sqlite3.Connection) -> Dict[str, Section]:
+    out = {}
+    for section, rate, single, aggregate in conn.execute(
+            'SELECT section, rate_company, single_payment_threshold, aggregate_threshold FROM tds_sections '
+            'WHERE is_active'):
+        out[section] = Section(section, int(Decimal(str(rate or 0)) * 100),
+                               int(Decimal(str(single or 0)) * 100), int(Decimal(str(aggregate or 0)) * 100))
+    return out
+
+
+class _Accumulator:
+    __slots__ = ('payments', 'paid', 'base', 'tds', 'last_payment_id')
+
+    def __init__(self, payments=0, paid=0, base=0, tds=0, last_payment_id=None):
+        self.payments, self.paid, self.base, self.tds = payments, paid, base, tds
+        self.last_payment_id = last_payment_id
+
+    def totals(self) -> Totals:
+        return Totals(self.payments, self.paid, self.base, self.tds, self.last_payment_id)
+
+
+class TdsEngine:
+    """Running totals per (vendor, section, FY) and the O(1) decision on each new payment."""
+
+    __slots__ = ('sections', 'accumulators', 'touched')
+
+    def __init__(self, sections: Dict[str, Section]):
+        self.sections = sections
+        self.accumulators: Dict[Tuple[int, str, int], _Accumulator] = {}
+        self.touched: set = set()       # keys changed since load, for :func:`record`
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> 'TdsEngine':
+        engine = cls(load_sections(conn))
+        for vendor_id, section, fy, *totals in conn.execute(
+                f'SELECT {", ".join(_ACCUMULATOR_COLUMNS)} FROM tds_accumulators'):
+            engine.accumulators[vendor_id, section, fy] = _Accumulator(*totals)
+        return engine
+
+    def totals(self, vendor_id: int, section: str, fy: int) -> Totals:
+        acc = self.accumulators.get((vendor_id, section, fy))
+        return acc.totals() if acc else Totals(0, 0, 0, 0, None)
+
+    def preview(self, vendor_id: int, section: Optional[str], fy: Optional[int], amount_paise: int,
+                counted: bool = True) -> Tuple[int, int, str]:
+        """(base, TDS, reason) for a payment of ``amount_paise``, without recording it."""
+        if section is None:
+            return 0, 0, 'no_section'
+        if fy is None:
+            return 0, 0, 'invalid_date'
+        rule = self.sections.get(section)
+        if rule is None:
+            return 0, 0, 'unknown_section'
+        if not counted or amount_paise <= 0:
+            return 0, 0, 'not_counted'
+        acc = self.accumulators.get((vendor_id, section, fy))
+        paid, taxed = (acc.paid, acc.base) if acc else (0, 0)
+        if paid + amount_paise > rule.aggregate_paise:
+            base, reason = paid + amount_paise - taxed, 'aggregate'
+        elif amount_paise > rule.single_paise:
+            base, reason = amount_paise, 'single'
+        else:
+            return 0, 0, 'below_threshold'
+        return base, tds_on(base, rule.rate_bp), reason
+
+    def apply(self, payment_id: int, vendor_id: int, section: Optional[str], fy: Optional[int], amount_paise: int,
+              status: str = 'pending') -> Decision:
+        """Decide a payment and add it to the running totals. Payments must come in id order."""
+        counted = status not in NOT_COUNTED_STATUSES
+        base, tds, reason = self.preview(vendor_id, section, fy, amount_paise, counted)
+        rate = self.sections[section].rate_bp if reason in ('single', 'aggregate') else 0
+        if reason in ('single', 'aggregate', 'below_threshold'):
+            key = (vendor_id, section, fy)
+            acc = self.accumulators.get(key)
+            if acc is None:
+                acc = self.accumulators[key] = _Accumulator()
+            acc.payments += 1
+            acc.paid += amount_paise
+            acc.base += base
+            acc.tds += tds
+            acc.last_payment_id = payment_id
+            self.touched.add(key)
+        return Decision(payment_id, vendor_id, section, fy, amount_paise, base, rate, tds, reason)
+
+
+def record(conn: sqlite3.Connection, engine: Optional[TdsEngine] = None) -> List[Decision]:
+    """Decide every payment newer than the ledger's last, and store decisions and totals.
+
+    Pass a long-lived ``engine`` to skip reloading the accumulators on
+    every call; it must only ever be fed through this function.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if engine is None:
+            engine = TdsEngine.load(conn)
+        engine.touched.clear()
+        last = conn.execute('SELECT COALESCE(MAX(payment_id), 0) FROM tds_ledger').fetchone()[0]
+        decisions = [engine.apply(*row) for row in conn.execute(f'{_PAYMENTS} WHERE id > ? ORDER BY id', (last,))]
+        conn.executemany(f'INSERT INTO tds_ledger ({", ".join(_LEDGER_COLUMNS)}) '
+                         f'VALUES ({", ".join("?" * len(_LEDGER_COLUMNS))})', decisions)
+        conn.executemany(f'INSERT OR REPLACE INTO tds_accumulators ({", ".join(_ACCUMULATOR_COLUMNS)}) '
+                         f'VALUES ({", ".join("?" * len(_ACCUMULATOR_COLUMNS))})',
+                         ((*key, *engine.accumulators[key].totals()) for key in engine.touched))
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return decisions
+
+
+def _group_cumsum(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Running sum of ``values`` restarting at each index in ``starts`` (sorted, starting with 0)."""
+    total = np.cumsum(values)
+    offsets = np.concatenate(([0], total[starts[1:] - 1]))
+    return total - np.repeat(offsets, np.diff(np.append(starts, len(values))))
+
+
+def recompute(conn: sqlite3.Connection, fy: int,
+              write: bool = False) -> Tuple[List[Decision], Dict[Tuple[int, str, int], Totals]]:
+    """Every decision and running total of financial year ``fy`` from ``payments``, in one pass.
+
+    With ``write``, the year's ledger rows and accumulators are replaced.
+    """
+    sections = load_sections(conn)
+    names = sorted(sections)
+    conn.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+    try:
+        rows = conn.execute(f'{_PAYMENTS} WHERE {_FY} = ? ORDER BY id', (fy,)).fetchall()
+        n = len(rows)
+        ids = np.fromiter((r[0] for r in rows), np.int64, n)
+        vendor = np.fromiter((r[1] for r in rows), np.int64, n)
+        amount = np.fromiter((r[4] for r in rows), np.int64, n)
+        code_of = {s: k for k, s in enumerate(names)}
+        code = np.fromiter((code_of.get(r[2], -1) for r in rows), np.int64, n)
+        rejected = np.fromiter((r[5] in NOT_COUNTED_STATUSES for r in rows), bool, n)
+
+        known = code >= 0
+        counted = known & ~rejected & (amount > 0)
+        rule = np.array([[sections[s].rate_bp, sections[s].single_paise, sections[s].aggregate_paise]
+                         for s in names] or [[0, 0, 0]], dtype=np.int64)[np.where(known, code, 0)]
+        rate, single, aggregate = rule[:, 0], rule[:, 1], rule[:, 2]
+
+        # Group by (vendor, section); payments stay in id order within a group.
+        order = np.argsort(vendor * (len(names) + 1) + code + 1, kind='stable')
+        key = (vendor * (len(names) + 1) + code + 1)[order]
+        starts = np.flatnonzero(np.concatenate(([True], key[1:] != key[:-1])))
+        paid_amount = np.where(counted, amount, 0)[order]
+        cum = _group_cumsum(paid_amount, starts)
+        single_hit = (counted[order] & (amount[order] > single[order]))
+        singles = np.where(single_hit, amount[order], 0)
+        singles_before = _group_cumsum(singles, starts) - singles
+        agg = aggregate[order]
+        crossed_before = (cum - paid_amount) > agg
+        crosses = (cum > agg) & ~crossed_before
+        c = counted[order]
+        base_sorted = np.where(~c, 0, np.where(crossed_before, paid_amount,
+                                               np.where(crosses, cum - singles_before,
+                                                        np.where(single_hit, paid_amount, 0))))
+        base = np.empty(n, np.int64)
+        base[order] = base_sorted
+        taxed = counted & (base > 0)
+        rate_used = np.where(taxed, rate, 0)
+        tds = _rupee_tds(base, rate_used)
+        aggregate_hit = np.empty(n, bool)
+        aggregate_hit[order] = crossed_before | crosses
+
+        decisions = []
+        for k, (payment_id, vendor_id, sec, _, paise, _) in enumerate(rows):
+            if sec is None:
+                reason = 'no_section'
+            elif not known[k]:
+                reason = 'unknown_section'
+            elif not counted[k]:
+                reason = 'not_counted'
+            elif aggregate_hit[k]:
+                reason = 'aggregate'
+            elif base[k]:
+                reason = 'single'
+            else:
+                reason = 'below_threshold'
+            decisions.append(Decision(payment_id, vendor_id, sec, fy, paise, int(base[k]), int(rate_used[k]),
+                                      int(tds[k]), reason))
+
+        totals: Dict[Tuple[int, str, int], Totals] = {}
+        if counted.any():
+            groups, inverse = np.unique(vendor[counted] * (len(names) + 1) + code[counted] + 1, return_inverse=True)
+            inverse = inverse.reshape(-1)
+
+            def per_group(values: np.ndarray) -> List[int]:
+                out = np.zeros(len(groups), np.int64)
+                np.add.at(out, inverse, values[counted])
+                return out.tolist()
+
+            last = np.zeros(len(groups), np.int64)
+            np.maximum.at(last, inverse, ids[counted])
+            width = len(names) + 1
+            for g, n_pay, paid, b, t, lp in zip(groups.tolist(), np.bincount(inverse).tolist(), per_group(amount),
+                                                per_group(base), per_group(tds), last.tolist()):
+                totals[g // width, names[g % width - 1], fy] = Totals(n_pay, paid, b, t, lp)
+
+        if write:
+            conn.execute(f'DELETE FROM tds_ledger WHERE payment_id IN (SELECT id FROM payments WHERE {_FY} = ?)',
+                         (fy,))
+            conn.execute('DELETE FROM tds_ledger WHERE fy = ?', (fy,))
+            conn.execute('DELETE FROM tds_accumulators WHERE fy = ?', (fy,))
+            conn.executemany(f'INSERT INTO tds_ledger ({", ".join(_LEDGER_COLUMNS)}) '
+                             f'VALUES ({", ".join("?" * len(_LEDGER_COLUMNS))})', decisions)
+            conn.executemany(f'INSERT INTO tds_accumulators ({", ".join(_ACCUMULATOR_COLUMNS)}) '
+                             f'VALUES ({", ".join("?" * len(_ACCUMULATOR_COLUMNS))})',
+                             ((*k, *t) for k, t in totals.items()))
+            conn.execute('COMMIT')
+        else:
+            conn.execute('ROLLBACK')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return decisions, totals
+
+
+def check(conn: sqlite3.Connection, fy: int) -> List[Mismatch]:
+    """Stored ledger rows and accumulators of ``fy`` that differ from :func:`recompute`.
+
+    Only payments already in the ledger are compared; newer ones are
+    :func:`record`'s to decide.
+    """
+    conn.execute('BEGIN')
+    try:
+        stored = {r[0]: Decision(*r) for r in conn.execute(
+            f'SELECT {", ".join(_LEDGER_COLUMNS)} FROM tds_ledger WHERE fy = ?', (fy,))}
+        last = conn.execute('SELECT COALESCE(MAX(payment_id), 0) FROM tds_ledger').fetchone()[0]
+        accumulators = {tuple(r[:3]): Totals(*r[3:]) for r in conn.execute(
+            f'SELECT {", ".join(_ACCUMULATOR_COLUMNS)} FROM tds_accumulators WHERE fy = ?', (fy,))}
+    finally:
+        conn.execute('ROLLBACK')
+    decisions, totals = recompute(conn, fy)
+    # Payments the ledger has not reached yet are not drift.
+    if decisions and decisions[-1].payment_id > last:
+        decisions = [d for d in decisions if d.payment_id <= last]
+        totals = _totals_of(decisions, fy)
+    out: List[Mismatch] = []
+    expected = {d.payment_id: d for d in decisions}
+    for payment_id in sorted(stored.keys() | expected.keys()):
+        if stored.get(payment_id) != expected.get(payment_id):
+            out.append(Mismatch('payment', (payment_id,), stored.get(payment_id), expected.get(payment_id)))
+    for key in sorted(accumulators.keys() | totals.keys()):
+        if accumulators.get(key) != totals.get(key):
+            out.append(Mismatch('accumulator', key, accumulators.get(key), totals.get(key)))
+    return out
+
+
+def _totals_of(decisions: List[Decision], fy: int) -> Dict[Tuple[int, str, int], Totals]:
+    out: Dict[Tuple[int, str, int], Totals] = {}
+    for d in decisions:
+        if d.reason in ('single', 'aggregate', 'below_threshold'):
+            n, paid, base, tds, _ = out.get((d.vendor_id, d.section, fy), (0, 0, 0, 0, None))
+            out[d.vendor_id, d.section, fy] = Totals(n + 1, paid + d.amount_paise, base + d.base_paise,
+                                                     tds + d.tds_paise, d.payment_id)
+    return out
+
+
+def main(argv=None):
+    from compliance import db
+
+    parser = argparse.ArgumentParser(description='TDS decisions on vendor payments.')
+    parser.add_argument('db', help='SQLite mirror of the D1 database')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('record', help='decide and store every payment not yet in the ledger')
+    p = sub.add_parser('preview', help='TDS on a prospective payment, without recording it')
+    p.add_argument('--vendor-id', type=int, required=True)
+    p.add_argument('--section', required=True)
+    p.add_argument('--amount', type=Decimal, required=True, help='rupees')
+    p.add_argument('--on', type=date.fromisoformat, default=date.today(), help='payment date (default: today)')
+    p = sub.add_parser('vendor', help="a vendor's running totals")
+    p.add_argument('vendor_id', type=int)
+    p.add_argument('--fy', type=int, help='year the financial year starts in, e.g. 2025')
+    p = sub.add_parser('check', help='compare the stored state with a full-year recompute; exit 1 on drift')
+    p.add_argument('--fy', type=int, default=financial_year(date.today()))
+    p.add_argument('--fix', action='store_true', help="replace the year's stored state with the recompute")
+    args = parser.parse_args(argv)
+
+    conn = db.open_mirror(args.db)
+    if args.command == 'record':
+        decisions = record(conn)
+        taxed = [d for d in decisions if d.tds_paise]
+        print(f'{len(decisions)} payment(s) decided, {len(taxed)} with TDS of '
+              f'{rupees(sum(d.tds_paise for d in taxed))}')
+        invalid = [d.payment_id for d in decisions if d.reason == 'invalid_date']
+        if invalid:
+            print(f'{len(invalid)} payment(s) with no readable created_at, not taxed: '
+                  f'{", ".join(map(str, invalid[:20]))}{" ..." if len(invalid) > 20 else ""}')
+    elif args.command == 'preview':
+        engine = TdsEngine.load(conn)
+        fy = financial_year(args.on)
+        base, tds, reason = engine.preview(args.vendor_id, args.section, fy, int(args.amount.scaleb(2)))
+        t = engine.totals(args.vendor_id, args.section, fy)
+        print(f'{args.section} FY {fy_label(fy)}: paid so far {rupees(t.paid_paise)}, taxed {rupees(t.base_paise)}')
+        print(f'{reason}: TDS {rupees(tds)} on {rupees(base)}; net payable '
+              f'{rupees(int(args.amount.scaleb(2)) - tds)}')
+    elif args.command == 'vendor':
+        sql = f'SELECT {", ".join(_ACCUMULATOR_COLUMNS)} FROM tds_accumulators WHERE vendor_id = ?'
+        params = [args.vendor_id]
+        if args.fy is not None:
+            sql += ' AND fy = ?'
+            params.append(args.fy)
+        print('fy,section,payments,paid,taxed,tds')
+        for _, section, fy, n, paid, base, tds, _ in conn.execute(sql + ' ORDER BY fy, section', params):
+            print(f'{fy_label(fy)},{section},{n},{rupees(paid)},{rupees(base)},{rupees(tds)}')
+    else:
+        mismatches = check(conn, args.fy)
+        for m in mismatches[:50]:
+            print(f'{m.kind} {m.key}: stored {m.stored} expected {m.expected}')
+        print(f'{len(mismatches)} mismatch(es)')
+        if mismatches and args.fix:
+            recompute(conn, args.fy, write=True)
+            print(f'FY {fy_label(args.fy)} rewritten from payments')
+        conn.close()
+        sys.exit(1 if mismatches and not args.fix else 0)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
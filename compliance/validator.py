@@ -0,0 +1,266 @@
+"""Record validators compiled from the document field specifications.
+
+``purchase_order_fields.csv`` and ``purchase_requisition_fields.csv`` give
+each field a ``Data_Type`` (Alphanumeric, Text, Numeric, Decimal, Date,
+Dropdown), a ``Required`` flag and a ``Max_Length``.
+``indian_taxation_document_structure.json`` lists ``mandatory_fields`` per
+document type, including types with no field table (GRN, tax invoice).
+:func:`load_schemas` merges the two into one :class:`DocumentSchema` per
+document type.
+
+:func:`compile_validator` turns a schema plus a CSV header into Python
+source for one straight-line function. Column indexes, coercers and length
+limits are baked in as literals, and ``exec`` builds the function, much as
+``collections.namedtuple`` does. Rows are never checked by walking the spec
+table or by looking fields up in dicts. Each call returns the coerced values
+and every error in the row, not just the first.
+
+Fields listed only in ``mandatory_fields`` get a type inferred from the
+name (``*_date`` -> Date, ``*_amount``/``*_quantity``/``*_rate``/... ->
+Decimal, ``approval_required`` -> Boolean), and are required.
+
+    python -m compliance.validator PURCHASE_ORDER po_export.csv
+    python -m compliance.validator PURCHASE_ORDER --show-source
+"""
+import argparse
+import csv
+import json
+import re
+import sys
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from compliance import DOCS_DIR
+
+STRUCTURE_PATH = DOCS_DIR / 'indian_taxation_document_structure.json'
+FIELD_SPECS = {
+    'PURCHASE_ORDER': DOCS_DIR / 'purchase_order_fields.csv',
+    'PURCHASE_REQUISITION': DOCS_DIR / 'purchase_requisition_fields.csv',
+}
+
+TYPES = ('Alphanumeric', 'Text', 'Numeric', 'Decimal', 'Date', 'Dropdown', 'Boolean')
+
+# A mandatory field satisfied by a differently named spec field.
+FIELD_ALIASES = {'supplier_name': 'supplier_legal_name'}
+
+_ALNUM_RE = re.compile(r'[A-Za-z0-9][A-Za-z0-9/_.\-]*\Z')   # PO/2025-26/0001, EMP-001
+_BOOLEANS = {'true': True, 'yes': True, 'y': True, '1': True, 'false': False, 'no': False, 'n': False, '0': False}
+_DECIMAL_SUFFIXES = ('_amount', '_quantity', '_price', '_rate', '_value', 'quantity')
+
+
+class FieldSpec(NamedTuple):
+    name: str
+    data_type: str
+    required: bool
+    max_length: Optional[int]
+    category: str = ''
+
+
+class DocumentSchema(NamedTuple):
+    doc_type: str
+    fields: Tuple[FieldSpec, ...]
+
+    def field_names(self) -> List[str]:
+        return [f.name for f in self.fields]
+
+
+def infer_type(name: str) -> str:
+    if name.endswith('_date'):
+        return 'Date'
+    if name == 'approval_required':
+        return 'Boolean'
+    if name.endswith(_DECIMAL_SUFFIXES):
+        return 'Decimal'
+    return 'Text'
+
+
+def load_field_specs(path) -> List[FieldSpec]:
+    specs = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            data_type = row['Data_Type'].strip()
+            if data_type not in TYPES:
+                raise ValueError(f'{path}: unknown Data_Type {data_type!r} for {row["Field_Name"]}')
+            max_length = row['Max_Length'].strip()
+            specs.append(FieldSpec(row['Field_Name'].strip(), data_type, row['Required'].strip() == 'True',
+                                   int(max_length) if max_length.isdigit() else None, row['Category']))
+    return specs
+
+
+def load_mandatory(path=STRUCTURE_PATH) -> Dict[str, List[str]]:
+    """``mandatory_fields`` by document type (``PURCHASE_ORDER``, ``TAX_INVOICE``, ...)."""
+    with open(path, encoding='utf-8') as f:
+        structure = json.load(f)
+    out = {}
+    for group in structure.values():
+        for doc_type, body in group.items():
+            if isinstance(body, dict) and 'mandatory_fields' in body:
+                out[doc_type] = list(body['mandatory_fields'])
+    return out
+
+
+def load_schemas(structure_path=STRUCTURE_PATH, field_specs: Optional[Dict[str, object]] = None
+                 ) -> Dict[str, DocumentSchema]:
+    """Spec-table fields first, then mandatory fields the table does not cover."""
+    field_specs = FIELD_SPECS if field_specs is None else field_specs
+    mandatory = load_mandatory(structure_path)
+    schemas = {}
+    for doc_type in list(field_specs) + [d for d in mandatory if d not in field_specs]:
+        fields = load_field_specs(field_specs[doc_type]) if doc_type in field_specs else []
+        names = {f.name for f in fields}
+        required = set(mandatory.get(doc_type, ()))
+        required |= {FIELD_ALIASES[n] for n in required if n in FIELD_ALIASES}
+        fields = [f._replace(required=True) if f.name in required else f for f in fields]
+        for name in mandatory.get(doc_type, ()):
+            if name not in names and FIELD_ALIASES.get(name) not in names:
+                fields.append(FieldSpec(name, infer_type(name), True, None, 'mandatory_fields'))
+        schemas[doc_type] = DocumentSchema(doc_type, tuple(fields))
+    return schemas
+
+
+def _field_source(i: int, col: Optional[int], spec: FieldSpec, choices: Optional[str]) -> List[str]:
+    """Statements that leave the coerced value of field ``i`` in ``v{i}``."""
+    v = f'v{i}'
+
+    def err(message: str) -> str:
+        return f'errors.append({spec.name + ": " + message!r})'
+
+    if col is None:
+        return [f'{v} = None'] + ([err('missing column')] if spec.required else [])
+    lines = [f'{v} = row[{col}].strip()', f'if not {v}:']
+    lines.append('    ' + err('required') if spec.required else '    pass')
+    lines.append(f'    {v} = None')
+    body = []
+    if spec.max_length is not None and spec.data_type in ('Alphanumeric', 'Text', 'Numeric', 'Dropdown'):
+        body += [f'if len({v}) > {spec.max_length}:',
+                 '    ' + err(f'longer than {spec.max_length} characters')]
+    t = spec.data_type
+    if t == 'Alphanumeric':
+        body += [f'if not _alnum({v}):', '    ' + err('not alphanumeric')]
+    elif t == 'Numeric':
+        body += [f'if not ({v}.isascii() and {v}.isdigit()):', '    ' + err('not numeric')]
+    elif t == 'Decimal':
+        body += ['try:', f'    {v} = _Decimal({v})', 'except _InvalidOperation:', f'    {v} = None',
+                 f'if {v} is None or not {v}.is_finite():', '    ' + err('not a decimal number'), f'    {v} = None']
+    elif t == 'Date':
+        body += ['try:', f'    {v} = _date({v})', 'except ValueError:',
+                 '    ' + err('not a date (YYYY-MM-DD)'), f'    {v} = None']
+    elif t == 'Boolean':
+        body += [f'{v} = _bools.get({v}.lower())', f'if {v} is None:',
+                 '    ' + err('not a yes/no value')]
+    if t == 'Dropdown' and choices:
+        body += [f'if {v} not in {choices}:', '    ' + err('not an allowed value')]
+    if body:
+        lines.append('else:')
+        lines += ['    ' + b for b in body]
+    return lines
+
+
+class CompiledValidator:
+    """Specialized ``validate(row) -> (values, errors)`` for one schema and CSV header."""
+
+    __slots__ = ('schema', 'header', 'fields', 'source', 'validate')
+
+    def __init__(self, schema: DocumentSchema, fields: Tuple[str, ...], header: Tuple[str, ...], source: str,
+                 validate):
+        self.schema = schema
+        self.fields = fields       # names of the values returned, in order
+        self.header = header
+        self.source = source
+        self.validate = validate
+
+    def __call__(self, row: Sequence[str]):
+        return self.validate(row)
+
+
+def compile_validator(schema: DocumentSchema, header: Sequence[str],
+                      choices: Optional[Dict[str, Iterable[str]]] = None) -> CompiledValidator:
+    """Compile ``schema`` against the column order of ``header``.
+
+    ``choices`` gives the allowed values of Dropdown fields; without them a
+    Dropdown is any non-empty text. Required fields missing from ``header``
+    are reported on every row, so a wrong file fails loudly.
+    """
+    header = tuple(h.strip() for h in header)
+    position = {name: i for i, name in enumerate(header)}
+    namespace = {'_alnum': _ALNUM_RE.match, '_Decimal': Decimal, '_InvalidOperation': InvalidOperation,
+                 '_date': date.fromisoformat, '_bools': _BOOLEANS}
+    func = 'validate_' + re.sub(r'\W', '_', schema.doc_type.lower())
+    body = [f'if len(row) < {len(header)}:', f'    row = list(row) + [""] * ({len(header)} - len(row))',
+            'errors = []']
+    for i, spec in enumerate(schema.fields):
+        col = position.get(spec.name)
+        if col is None and spec.name in FIELD_ALIASES.values():
+            col = next((position[m] for m, s in FIELD_ALIASES.items() if s == spec.name and m in position), None)
+        allowed = None
+        if choices and spec.name in choices:
+            allowed = f'_choices{i}'
+            namespace[allowed] = frozenset(choices[spec.name])
+        body += _field_source(i, col, spec, allowed)
+    values = ', '.join(f'v{i}' for i in range(len(schema.fields)))
+    body.append(f'return ({values}{"," if len(schema.fields) == 1 else ""}), errors')
+    source = f'def {func}(row):\n' + ''.join(f'    {line}\n' for line in body)
+    exec(compile(source, f'<validator {schema.doc_type}>', 'exec'), namespace)
+    return CompiledValidator(schema, tuple(schema.field_names()), header, source, namespace[func])
+
+
+class RowResult(NamedTuple):
+    line: int               # 1-based line number of the row in the file
+    values: tuple           # coerced values, in schema field order
+    errors: List[str]
+
+
+def validate_rows(validator: CompiledValidator, rows: Iterable[Sequence[str]], first_line: int = 2
+                  ) -> Iterator[RowResult]:
+    validate = validator.validate
+    for line, row in enumerate(rows, first_line):
+        if not row:
+            continue
+        values, errors = validate(row)
+        yield RowResult(line, values, errors)
+
+
+def validate_csv(path, doc_type: str, schemas: Optional[Dict[str, DocumentSchema]] = None,
+                 choices: Optional[Dict[str, Iterable[str]]] = None) -> Iterator[RowResult]:
+    """Stream ``path`` through the validator for ``doc_type``."""
+    schemas = load_schemas() if schemas is None else schemas
+    if doc_type not in schemas:
+        raise KeyError(f'no schema for document type {doc_type!r}; known: {", ".join(sorted(schemas))}')
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f'{path}: empty CSV')
+        validator = compile_validator(schemas[doc_type], header, choices)
+        yield from validate_rows(validator, reader)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate document CSVs against the field specifications.')
+    parser.add_argument('doc_type', help='PURCHASE_ORDER, PURCHASE_REQUISITION, GOODS_RECEIPT_NOTE, TAX_INVOICE')
+    parser.add_argument('csv', nargs='?')
+    parser.add_argument('--show-source', action='store_true', help='print the generated function and exit')
+    parser.add_argument('--limit', type=int, default=50, help='invalid rows to print')
+    args = parser.parse_args(argv)
+
+    schemas = load_schemas()
+    if args.show_source:
+        schema = schemas[args.doc_type]
+        print(compile_validator(schema, schema.field_names()).source)
+        return
+    if not args.csv:
+        parser.error('csv is required unless --show-source is given')
+    total = bad = 0
+    for result in validate_csv(args.csv, args.doc_type, schemas):
+        total += 1
+        if result.errors:
+            bad += 1
+            if bad <= args.limit:
+                print(f'Row {result.line}: ' + '; '.join(result.errors))
+    print(f'{total} rows, {bad} invalid')
+    sys.exit(1 if bad else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+"""Deterministic, forward-only ZIP writer with parallel deflate.
+
+``zipfile.ZipFile`` stamps members with file mtimes, deflates one member at a
+time on one core, and cannot take a member's already-compressed bytes from
+another archive. This writer emits local headers, payloads and the central
+directory strictly in order (so it also works on pipes) with a fixed
+timestamp, which makes the archive a pure function of its members.
+
+:func:`write_files` splits files into fixed-size chunks and deflates them in a
+process pool the way pigz does: every chunk but the last ends on a sync flush
+and is primed with the previous 32 KiB, so the concatenated chunks form one
+valid deflate stream. Output depends on ``chunk_size`` and ``level`` only, not
+on the number of workers, and at most ``window`` chunks are in memory.
+
+    python -m compliance.zipstream bundle.zip data/*.csv attachments/ -j 8
+    python -m compliance.zipstream - exports/ --level 1 > bundle.zip
+"""
+import argparse
+import os
+import struct
+import sys
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+STORED = zipfile.ZIP_STORED
+DEFLATED = zipfile.ZIP_DEFLATED
+
+# 1980-01-01 00:00:00, the DOS epoch: keeps archives reproducible.
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+_CENTRAL_HEADER = struct.Struct('<4s6H3L5H2L')
+_END_RECORD = struct.Struct('<4s4H2LH')
+_DATA_DESCRIPTOR = struct.Struct('<4s3L')
+_UTF8_FLAG = 0x800
+_DESCRIPTOR_FLAG = 0x08
+_VERSION = 20
+_CREATE_SYSTEM = 3  # unix, so external_attr carries permission bits
+_EXTERNAL_ATTR = 0o100644 << 16
+_ZIP32_MAX = 0xFFFFFFFF
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+_DICT_SIZE = 32 * 1024
+
+# Inputs that are already compressed gain nothing from deflate: store them.
+STORE_SUFFIXES = frozenset({
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.7z', '.rar',
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.mp3', '.mp4',
+    '.docx', '.xlsx', '.pptx', '.odt', '.ods',
+})
+
+
+class ZipEntry(NamedTuple):
+    name: str
+    method: int
+    crc: int
+    size: int
+    compressed_size: int
+    offset: int
+    flags: int = 0
+
+
+def _dos_date_time(date_time):
+    year, month, day, hour, minute, second = date_time
+    return (((year - 1980) << 9) | (month << 5) | day,
+            (hour << 11) | (minute << 5) | (second // 2))
+
+
+def deflate(data: bytes, level: int = 6) -> bytes:
+    """Raw (headerless) deflate stream as stored inside ZIP members."""
+    co = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return co.compress(data) + co.flush()
+
+
+def deflate_chunk(data: bytes, level: int, zdict: bytes, last: bool) -> bytes:
+    """Deflate one chunk of a member so chunks can be concatenated.
+
+    Runs in pool workers. ``zdict`` is the tail of the preceding chunk so
+    back-references across the boundary are still found.
+    """
+    if zdict:
+        co = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=zdict)
+    else:
+        co = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return co.compress(data) + co.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class ZipStreamWriter:
+    """Append members to ``fp`` in order; call :meth:`close` to finish.
+
+    ``fp`` only needs ``write``; offsets are tracked here rather than via
+    ``tell()`` so stdout and sockets work. ``fp`` is not closed.
+    """
+
+    def __init__(self, fp: BinaryIO, date_time=FIXED_DATE_TIME):
+        self.fp = fp
+        self.entries: List[ZipEntry] = []
+        self._names = set()
+        self._offset = 0
+        self._date, self._time = _dos_date_time(date_time)
+        self._closed = False
+
+    def _write(self, data: bytes):
+        self.fp.write(data)
+        self._offset += len(data)
+
+    def write_bytes(self, name: str, data: bytes, method: int = DEFLATED, level: int = 6) -> ZipEntry:
+        """Compress ``data`` (unless ``method`` is STORED) and append it."""
+        payload = deflate(data, level) if method == DEFLATED else data
+        return self.write_raw(name, method, zlib.crc32(data), len(data), payload)
+
+    def write_raw(self, name: str, method: int, crc: int, size: int, payload: bytes) -> ZipEntry:
+        """Append a member whose payload is already encoded with ``method``."""
+        if size > _ZIP32_MAX or len(payload) > _ZIP32_MAX:
+            raise ValueError(f'{name!r} exceeds ZIP32 limits')
+        encoded, flags = self._start(name, method)
+        entry = ZipEntry(name, method, crc & 0xFFFFFFFF, size, len(payload), self._offset, flags)
+        self._write(_LOCAL_HEADER.pack(
+            b'PK\x03\x04', _VERSION, flags, method, self._time, self._date,
+            entry.crc, entry.compressed_size, entry.size, len(encoded), 0))
+        self._write(encoded)
+        self._write(payload)
+        self._names.add(name)
+        self.entries.append(entry)
+        return entry
+
+    def write_stream(self, name: str, method: int, parts: Iterable[bytes], sizes: 'CrcCounter') -> ZipEntry:
+        """Append a member whose encoded payload arrives as ``parts``.
+
+        CRC and sizes are not known up front, so they follow the payload in a
+        data descriptor. ``sizes`` must have consumed the plain data by the
+        time ``parts`` is exhausted.
+        """
+        encoded, flags = self._start(name, method)
+        flags |= _DESCRIPTOR_FLAG
+        offset = self._offset
+        self._write(_LOCAL_HEADER.pack(
+            b'PK\x03\x04', _VERSION, flags, method, self._time, self._date,
+            0, 0, 0, len(encoded), 0))
+        self._write(encoded)
+        start = self._offset
+        for part in parts:
+            self._write(part)
+        compressed = self._offset - start
+        if sizes.size > _ZIP32_MAX or compressed > _ZIP32_MAX:
+            raise ValueError(f'{name!r} exceeds ZIP32 limits')
+        entry = ZipEntry(name, method, sizes.crc, sizes.size, compressed, offset, flags)
+        self._write(_DATA_DESCRIPTOR.pack(b'PK\x07\x08', entry.crc, compressed, entry.size))
+        self._names.add(name)
+        self.entries.append(entry)
+        return entry
+
+    def _start(self, name: str, method: int) -> Tuple[bytes, int]:
+        if self._closed:
+            raise ValueError('writer is closed')
+        if name in self._names:
+            raise ValueError(f'duplicate archive member {name!r}')
+        if method not in (STORED, DEFLATED):
+            raise ValueError(f'unsupported compression method {method}')
+        if self._offset > _ZIP32_MAX:
+            raise ValueError('archive exceeds ZIP32 limits')
+        encoded = name.encode('utf-8')
+        return encoded, (0 if encoded.isascii() else _UTF8_FLAG)
+
+    def close(self):
+        if self._closed:
+            return
+        start = self._offset
+        for e in self.entries:
+            encoded = e.name.encode('utf-8')
+            self._write(_CENTRAL_HEADER.pack(
+                b'PK\x01\x02', (_CREATE_SYSTEM << 8) | _VERSION, _VERSION, e.flags, e.method,
+                self._time, self._date, e.crc, e.compressed_size, e.size,
+                len(encoded), 0, 0, 0, 0, _EXTERNAL_ATTR, e.offset))
+            self._write(encoded)
+        if len(self.entries) > 0xFFFF or self._offset > _ZIP32_MAX:
+            raise ValueError('archive exceeds ZIP32 limits')
+        self._write(_END_RECORD.pack(
+            b'PK\x05\x06', 0, 0, len(self.entries), len(self.entries),
+            self._offset - start, start, 0))
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+def read_raw(fp: BinaryIO, info: zipfile.ZipInfo) -> bytes:
+    """Return a member's compressed payload without inflating it.
+
+    ``fp`` is the archive opened in binary mode and ``info`` comes from
+    ``zipfile.ZipFile(...).getinfo``.
+    """
+    fp.seek(info.header_offset)
+    header = fp.read(_LOCAL_HEADER.size)
+    if len(header) != _LOCAL_HEADER.size or header[:4] != b'PK\x03\x04':
+        raise zipfile.BadZipFile(f'bad local header for {info.filename!r}')
+    fields = _LOCAL_HEADER.unpack(header)
+    fp.seek(fields[-2] + fields[-1], 1)
+    payload = fp.read(info.compress_size)
+    if len(payload) != info.compress_size:
+        raise zipfile.BadZipFile(f'truncated member {info.filename!r}')
+    return payload
+
+
+def arcname(path: str) -> str:
+    """Archive name ``zipfile.ZipFile.write`` would use for ``path``."""
+    name = os.path.normpath(os.path.splitdrive(path)[1])
+    return name.lstrip(os.sep + (os.altsep or '')).replace(os.sep, '/')
+
+
+def choose_method(name: str, level: int, store_suffixes=STORE_SUFFIXES) -> int:
+    """STORED for level 0 and already-compressed inputs, DEFLATED otherwise."""
+    if level == 0 or os.path.splitext(name)[1].lower() in store_suffixes:
+        return STORED
+    return DEFLATED
+
+
+def collect_files(paths: Iterable[str]) -> List[Tuple[str, str]]:
+    """Expand files and directories into sorted ``(arcname, path)`` pairs.
+
+    Directories are walked recursively and named relative to their parent,
+    like ``zip -r``; the sort keeps the archive order reproducible.
+    """
+    members = []
+    for path in paths:
+        if os.path.isdir(path):
+            base = os.path.dirname(os.path.normpath(path))
+            found = []
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for fname in files:
+                    full = os.path.join(root, fname)
+                    found.append((arcname(os.path.relpath(full, base)), full))
+            members.extend(sorted(found))
+        else:
+            members.append((arcname(path), path))
+    return members
+
+
+class CrcCounter:
+    """Running CRC-32 and length of one member's plain bytes."""
+
+    __slots__ = ('crc', 'size')
+
+    def __init__(self):
+        self.crc = 0
+        self.size = 0
+
+    def update(self, data: bytes):
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+
+
+class _InlineExecutor(Executor):
+    """Runs submissions immediately; used for ``jobs=1``."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+
+
+def _chunk_tasks(members, methods, counters, executor, level, chunk_size) -> Iterator[Tuple[int, object, bool]]:
+    """Read members in order, yielding ``(index, payload-or-future, last)``."""
+    for i, (_, path) in enumerate(members):
+        counter = counters[i]
+        with open(path, 'rb') as f:
+            chunk = f.read(chunk_size)
+            zdict = b''
+            while True:
+                following = f.read(chunk_size) if chunk else b''
+                last = not following
+                counter.update(chunk)
+                if methods[i] == STORED:
+                    yield i, chunk, last
+                else:
+                    yield i, executor.submit(deflate_chunk, chunk, level, zdict, last), last
+                    zdict = (zdict + chunk)[-_DICT_SIZE:]
+                if last:
+                    break
+                chunk = following
+
+
+def write_files(writer: ZipStreamWriter, members: Sequence[Tuple[str, str]], jobs: Optional[int] = None,
+                level: int = 6, chunk_size: int = DEFAULT_CHUNK_SIZE, window: Optional[int] = None,
+                store_suffixes=STORE_SUFFIXES) -> List[ZipEntry]:
+    """Deflate ``(arcname, path)`` members in a process pool and append them in order.
+
+    ``jobs`` defaults to the CPU count; ``jobs=1`` compresses in-process.
+    At most ``window`` chunks (default ``4 * jobs``) are read ahead.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    window = window or 4 * jobs
+    methods = [choose_method(name, level, store_suffixes) for name, _ in members]
+    counters = [CrcCounter() for _ in members]
+    if jobs == 1:
+        executor = _InlineExecutor()
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(jobs)
+    entries = []
+    try:
+        tasks = _chunk_tasks(members, methods, counters, executor, level, chunk_size)
+        pending = deque()
+
+        def parts(index):
+            while True:
+                while len(pending) < window:
+                    task = next(tasks, None)
+                    if task is None:
+                        break
+                    pending.append(task)
+                owner, part, last = pending.popleft()
+                assert owner == index
+                yield part.result() if isinstance(part, Future) else part
+                if last:
+                    return
+
+        for i, (name, _) in enumerate(members):
+            entries.append(writer.write_stream(name, methods[i], parts(i), counters[i]))
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a deterministic zip with parallel deflate.')
+    parser.add_argument('output', help="archive path, or '-' for stdout")
+    parser.add_argument('paths', nargs='+', help='files or directories to add')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--level', type=int, default=6, choices=range(10), metavar='0-9',
+                        help='deflate level; 0 stores everything')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--no-store', action='store_true',
+                        help='deflate already-compressed inputs too')
+    args = parser.parse_args(argv)
+
+    members = collect_files(args.paths)
+    store = frozenset() if args.no_store else STORE_SUFFIXES
+    if args.output == '-':
+        out, close = sys.stdout.buffer, False
+    else:
+        out, close = open(args.output, 'wb'), True
+    try:
+        with ZipStreamWriter(out) as writer:
+            write_files(writer, members, args.jobs, args.level, args.chunk_size, store_suffixes=store)
+        out.flush()
+    finally:
+        if close:
+            out.close()
+    if close:
+        total = sum(e.size for e in writer.entries)
+        packed = sum(e.compressed_size for e in writer.entries)
+        print(f'{args.output}: {len(writer.entries)} members, {total:,} -> {packed:,} bytes', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
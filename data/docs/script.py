@@ -1,11 +1,19 @@
 # Create a comprehensive documentation and structure files for the complete Indian taxation and compliance system
 # Then package everything into a single downloadable zip file
 
-import zipfile
 import json
-import pandas as pd
 import os
-from datetime import datetime
+import sys
+
+# Shared packaging helpers live in the repository's compliance/ package.
+# Pass --full to rewrite every file and re-deflate every zip member.
+_repo_root = os.path.dirname(os.path.abspath(__file__))
+while not os.path.isdir(os.path.join(_repo_root, 'compliance')) and os.path.dirname(_repo_root) != _repo_root:
+    _repo_root = os.path.dirname(_repo_root)
+sys.path.insert(0, _repo_root)
+from compliance.package import build_package, write_if_changed
+
+FULL_REBUILD = '--full' in sys.argv[1:]
 
 # Create comprehensive documentation file
 documentation_content = """
@@ -241,8 +249,7 @@ For detailed field structures, refer to the accompanying CSV and JSON files in t
 """
 
 # Save documentation
-with open('COMPREHENSIVE_SYSTEM_DOCUMENTATION.md', 'w', encoding='utf-8') as f:
-    f.write(documentation_content)
+write_if_changed('COMPREHENSIVE_SYSTEM_DOCUMENTATION.md', documentation_content, force=FULL_REBUILD)
 
 # Create implementation guide
 implementation_guide = """
@@ -292,8 +299,7 @@ implementation_guide = """
 4. User training and support
 """
 
-with open('IMPLEMENTATION_GUIDE.md', 'w', encoding='utf-8') as f:
-    f.write(implementation_guide)
+write_if_changed('IMPLEMENTATION_GUIDE.md', implementation_guide, force=FULL_REBUILD)
 
 # Create a master configuration file
 master_config = {
@@ -323,8 +329,7 @@ master_config = {
     }
 }
 
-with open('MASTER_CONFIG.json', 'w') as f:
-    json.dump(master_config, f, indent=2)
+write_if_changed('MASTER_CONFIG.json', json.dumps(master_config, indent=2), force=FULL_REBUILD)
 
 # Create API documentation
 api_documentation = """
@@ -370,8 +375,7 @@ Various bank-specific APIs for:
 ```
 """
 
-with open('API_DOCUMENTATION.md', 'w') as f:
-    f.write(api_documentation)
+write_if_changed('API_DOCUMENTATION.md', api_documentation, force=FULL_REBUILD)
 
 # Get list of all files to include in zip
 files_to_zip = [
@@ -391,16 +395,8 @@ files_to_zip = [
 # Create the zip file
 zip_filename = 'COMPLETE_INDIAN_TAXATION_COMPLIANCE_SYSTEM.zip'
 
-with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-    for file in files_to_zip:
-        if os.path.exists(file):
-            zipf.write(file)
-            print(f"Added {file} to zip")
-        else:
-            print(f"Warning: {file} not found")
-    
-    # Add README file
-    readme_content = """
+# README file added alongside the data files
+readme_content = """
 # COMPLETE INDIAN TAXATION & BUSINESS COMPLIANCE SYSTEM
 ## Package Contents
 
@@ -453,9 +449,18 @@ For implementation support and queries, refer to the documentation files include
 **Created:** September 19, 2025  
 **Compliance:** GST, TDS, RBI 2025, E-Way Bill 2.0, New Tax Regime
     """
-    
-    zipf.writestr('README.txt', readme_content)
-    print("Added README.txt to zip")
+
+# Only changed members are re-deflated; a no-op rebuild leaves the zip untouched
+report = build_package(zip_filename, files_to_zip, {'README.txt': readme_content}, full=FULL_REBUILD)
+for file in report.missing:
+    print(f"Warning: {file} not found")
+if report.unchanged:
+    print(f"{zip_filename} is up to date")
+else:
+    for file in report.compressed:
+        print(f"Added {file} to zip")
+    for file in report.reused:
+        print(f"Reused {file} from previous zip")
 
 print(f"\n✅ Successfully created {zip_filename}")
 print(f"📦 Package contains {len(files_to_zip) + 1} files")
@@ -0,0 +1,32 @@
+-- 0013_list_indexes.sql
+-- Composite indexes for the list endpoints: newest first, keyset on (created_at, id).
+-- Each filter the endpoints accept (status, vendor_id) gets an index that also
+-- carries the sort key, so a page is an index range scan with no temp B-tree.
+-- The single-column status/vendor indexes are prefixes of these and are dropped.
+
+CREATE INDEX IF NOT EXISTS idx_vendors_created ON vendors(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_vendors_status_created ON vendors(status, created_at, id);
+DROP INDEX IF EXISTS idx_vendors_status;
+
+CREATE INDEX IF NOT EXISTS idx_payments_created ON payments(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_payments_status_created ON payments(status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_payments_vendor_created ON payments(vendor_id, created_at, id);
+DROP INDEX IF EXISTS idx_payments_vendor;
+
+CREATE INDEX IF NOT EXISTS idx_po_created ON purchase_orders(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_po_status_created ON purchase_orders(status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_po_vendor_created ON purchase_orders(vendor_id, created_at, id);
+DROP INDEX IF EXISTS idx_po_status;
+DROP INDEX IF EXISTS idx_po_vendor;
+
+CREATE INDEX IF NOT EXISTS idx_inv_created ON invoices(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_inv_status_created ON invoices(status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_inv_vendor_created ON invoices(vendor_id, created_at, id);
+DROP INDEX IF EXISTS idx_inv_status;
+DROP INDEX IF EXISTS idx_inv_vendor;
+
+CREATE INDEX IF NOT EXISTS idx_dc_created ON delivery_challans(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_dc_status_created ON delivery_challans(status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_dc_vendor_created ON delivery_challans(vendor_id, created_at, id);
+DROP INDEX IF EXISTS idx_dc_status;
+DROP INDEX IF EXISTS idx_dc_vendor;
@@ -0,0 +1,222 @@
+-- 0014_report_summary.sql
+-- Summary tables behind /api/reports/summary and the AP / exposure reports,
+-- kept current by triggers so a dashboard load reads a handful of rows instead
+-- of counting whole tables. Amounts are stored in paise (integers) so repeated
+-- +/- updates never drift and a full recount compares exactly.
+-- compliance/reports.py rebuilds and checks them (python -m compliance.reports local.sqlite check).
+
+-- Row count and amount per (entity, status): vendors, payments, instruments, invoices, pos.
+CREATE TABLE IF NOT EXISTS report_status_totals (
+  entity TEXT NOT NULL,
+  status TEXT NOT NULL,
+  row_count INTEGER NOT NULL DEFAULT 0,
+  amount_paise INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (entity, status)
+) WITHOUT ROWID;
+
+-- Open payables (invoices pending/approved) per vendor and due date; ageing
+-- buckets depend on the day the report runs, so they are derived at read time.
+CREATE TABLE IF NOT EXISTS report_ap_open (
+  vendor_id INTEGER NOT NULL,      -- 0: no vendor
+  due_date TEXT NOT NULL,          -- '': no due date
+  row_count INTEGER NOT NULL DEFAULT 0,
+  amount_paise INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (vendor_id, due_date)
+) WITHOUT ROWID;
+
+-- Instrument count and amount per vendor, type and status.
+CREATE TABLE IF NOT EXISTS report_instrument_exposure (
+  vendor_id INTEGER NOT NULL,      -- 0: no vendor
+  type_id INTEGER NOT NULL,        -- 0: no type
+  status TEXT NOT NULL,
+  row_count INTEGER NOT NULL DEFAULT 0,
+  amount_paise INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (vendor_id, type_id, status)
+) WITHOUT ROWID;
+
+-- Backfill from the current data.
+DELETE FROM report_status_totals;
+INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+SELECT 'vendors', status, COUNT(*), 0 FROM vendors GROUP BY status;
+INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+SELECT 'payments', status, COUNT(*), SUM(CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER)) FROM payments GROUP BY status;
+INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+SELECT 'instruments', status, COUNT(*), SUM(CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER)) FROM financial_instruments GROUP BY status;
+INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+SELECT 'invoices', status, COUNT(*), SUM(CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER)) FROM invoices GROUP BY status;
+INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+SELECT 'pos', status, COUNT(*), SUM(CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER)) FROM purchase_orders GROUP BY status;
+DELETE FROM report_ap_open;
+INSERT INTO report_ap_open (vendor_id, due_date, row_count, amount_paise)
+SELECT COALESCE(vendor_id, 0), COALESCE(due_date, ''), COUNT(*), SUM(CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER))
+FROM invoices WHERE status IN ('pending', 'approved') GROUP BY 1, 2;
+DELETE FROM report_instrument_exposure;
+INSERT INTO report_instrument_exposure (vendor_id, type_id, status, row_count, amount_paise)
+SELECT COALESCE(vendor_id, 0), COALESCE(type_id, 0), status, COUNT(*), SUM(CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER))
+FROM financial_instruments GROUP BY 1, 2, 3;
+
+-- vendors: counts only
+CREATE TRIGGER IF NOT EXISTS trg_report_vendors_ins AFTER INSERT ON vendors BEGIN
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('vendors', NEW.status, 1, 0)
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_report_vendors_del AFTER DELETE ON vendors BEGIN
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('vendors', OLD.status, -1, 0)
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_report_vendors_upd AFTER UPDATE OF status ON vendors BEGIN
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('vendors', OLD.status, -1, 0)
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('vendors', NEW.status, 1, 0)
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+END;
+
+-- payments
+CREATE TRIGGER IF NOT EXISTS trg_report_payments_ins AFTER INSERT ON payments BEGIN
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('payments', NEW.status, 1, CAST(ROUND(COALESCE(NEW.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_report_payments_del AFTER DELETE ON payments BEGIN
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('payments', OLD.status, -1, -CAST(ROUND(COALESCE(OLD.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_report_payments_upd AFTER UPDATE OF status, amount ON payments BEGIN
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('payments', OLD.status, -1, -CAST(ROUND(COALESCE(OLD.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('payments', NEW.status, 1, CAST(ROUND(COALESCE(NEW.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+END;
+
+-- purchase orders
+CREATE TRIGGER IF NOT EXISTS trg_report_pos_ins AFTER INSERT ON purchase_orders BEGIN
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('pos', NEW.status, 1, CAST(ROUND(COALESCE(NEW.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_report_pos_del AFTER DELETE ON purchase_orders BEGIN
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('pos', OLD.status, -1, -CAST(ROUND(COALESCE(OLD.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_report_pos_upd AFTER UPDATE OF status, amount ON purchase_orders BEGIN
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('pos', OLD.status, -1, -CAST(ROUND(COALESCE(OLD.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('pos', NEW.status, 1, CAST(ROUND(COALESCE(NEW.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+END;
+
+-- invoices: status totals and open payables
+CREATE TRIGGER IF NOT EXISTS trg_report_invoices_ins AFTER INSERT ON invoices BEGIN
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('invoices', NEW.status, 1, CAST(ROUND(COALESCE(NEW.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+  INSERT INTO report_ap_open (vendor_id, due_date, row_count, amount_paise)
+  SELECT COALESCE(NEW.vendor_id, 0), COALESCE(NEW.due_date, ''), 1, CAST(ROUND(COALESCE(NEW.amount, 0) * 100) AS INTEGER)
+  WHERE NEW.status IN ('pending', 'approved')
+  ON CONFLICT (vendor_id, due_date) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                              amount_paise = amount_paise + excluded.amount_paise;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_report_invoices_del AFTER DELETE ON invoices BEGIN
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('invoices', OLD.status, -1, -CAST(ROUND(COALESCE(OLD.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+  INSERT INTO report_ap_open (vendor_id, due_date, row_count, amount_paise)
+  SELECT COALESCE(OLD.vendor_id, 0), COALESCE(OLD.due_date, ''), -1, -CAST(ROUND(COALESCE(OLD.amount, 0) * 100) AS INTEGER)
+  WHERE OLD.status IN ('pending', 'approved')
+  ON CONFLICT (vendor_id, due_date) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                              amount_paise = amount_paise + excluded.amount_paise;
+  DELETE FROM report_ap_open
+  WHERE vendor_id = COALESCE(OLD.vendor_id, 0) AND due_date = COALESCE(OLD.due_date, '') AND row_count = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_report_invoices_upd AFTER UPDATE OF status, amount, vendor_id, due_date ON invoices BEGIN
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('invoices', OLD.status, -1, -CAST(ROUND(COALESCE(OLD.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('invoices', NEW.status, 1, CAST(ROUND(COALESCE(NEW.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+  INSERT INTO report_ap_open (vendor_id, due_date, row_count, amount_paise)
+  SELECT COALESCE(OLD.vendor_id, 0), COALESCE(OLD.due_date, ''), -1, -CAST(ROUND(COALESCE(OLD.amount, 0) * 100) AS INTEGER)
+  WHERE OLD.status IN ('pending', 'approved')
+  ON CONFLICT (vendor_id, due_date) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                              amount_paise = amount_paise + excluded.amount_paise;
+  DELETE FROM report_ap_open
+  WHERE vendor_id = COALESCE(OLD.vendor_id, 0) AND due_date = COALESCE(OLD.due_date, '') AND row_count = 0;
+  INSERT INTO report_ap_open (vendor_id, due_date, row_count, amount_paise)
+  SELECT COALESCE(NEW.vendor_id, 0), COALESCE(NEW.due_date, ''), 1, CAST(ROUND(COALESCE(NEW.amount, 0) * 100) AS INTEGER)
+  WHERE NEW.status IN ('pending', 'approved')
+  ON CONFLICT (vendor_id, due_date) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                              amount_paise = amount_paise + excluded.amount_paise;
+END;
+
+-- financial instruments: status totals and exposure
+CREATE TRIGGER IF NOT EXISTS trg_report_instruments_ins AFTER INSERT ON financial_instruments BEGIN
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('instruments', NEW.status, 1, CAST(ROUND(COALESCE(NEW.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+  INSERT INTO report_instrument_exposure (vendor_id, type_id, status, row_count, amount_paise)
+  VALUES (COALESCE(NEW.vendor_id, 0), COALESCE(NEW.type_id, 0), NEW.status, 1, CAST(ROUND(COALESCE(NEW.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (vendor_id, type_id, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                                         amount_paise = amount_paise + excluded.amount_paise;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_report_instruments_del AFTER DELETE ON financial_instruments BEGIN
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('instruments', OLD.status, -1, -CAST(ROUND(COALESCE(OLD.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+  INSERT INTO report_instrument_exposure (vendor_id, type_id, status, row_count, amount_paise)
+  VALUES (COALESCE(OLD.vendor_id, 0), COALESCE(OLD.type_id, 0), OLD.status, -1, -CAST(ROUND(COALESCE(OLD.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (vendor_id, type_id, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                                         amount_paise = amount_paise + excluded.amount_paise;
+  DELETE FROM report_instrument_exposure
+  WHERE vendor_id = COALESCE(OLD.vendor_id, 0) AND type_id = COALESCE(OLD.type_id, 0)
+    AND status = OLD.status AND row_count = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_report_instruments_upd AFTER UPDATE OF status, amount, vendor_id, type_id ON financial_instruments BEGIN
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('instruments', OLD.status, -1, -CAST(ROUND(COALESCE(OLD.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+  INSERT INTO report_status_totals (entity, status, row_count, amount_paise)
+  VALUES ('instruments', NEW.status, 1, CAST(ROUND(COALESCE(NEW.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (entity, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                             amount_paise = amount_paise + excluded.amount_paise;
+  INSERT INTO report_instrument_exposure (vendor_id, type_id, status, row_count, amount_paise)
+  VALUES (COALESCE(OLD.vendor_id, 0), COALESCE(OLD.type_id, 0), OLD.status, -1, -CAST(ROUND(COALESCE(OLD.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (vendor_id, type_id, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                                         amount_paise = amount_paise + excluded.amount_paise;
+  DELETE FROM report_instrument_exposure
+  WHERE vendor_id = COALESCE(OLD.vendor_id, 0) AND type_id = COALESCE(OLD.type_id, 0)
+    AND status = OLD.status AND row_count = 0;
+  INSERT INTO report_instrument_exposure (vendor_id, type_id, status, row_count, amount_paise)
+  VALUES (COALESCE(NEW.vendor_id, 0), COALESCE(NEW.type_id, 0), NEW.status, 1, CAST(ROUND(COALESCE(NEW.amount, 0) * 100) AS INTEGER))
+  ON CONFLICT (vendor_id, type_id, status) DO UPDATE SET row_count = row_count + excluded.row_count,
+                                                         amount_paise = amount_paise + excluded.amount_paise;
+END;
@@ -0,0 +1,52 @@
+-- 0015_three_way_match.sql
+-- Results of the PO <-> DC <-> invoice three-way match (compliance/matching.py).
+-- Invoices carry no line items, so quantities are matched per vendor and SKU
+-- (ordered on POs vs. delivered on DCs) and billing per vendor (invoiced vs.
+-- the delivered quantity valued at the PO rate). Rejected documents are left
+-- out. Amounts are in paise, as in the report tables.
+
+-- Ordered vs. delivered quantity per vendor and SKU.
+CREATE TABLE IF NOT EXISTS match_lines (
+  vendor_id INTEGER NOT NULL,           -- 0: no vendor
+  sku TEXT NOT NULL,                    -- '': item without a sku
+  ordered_qty REAL NOT NULL DEFAULT 0,
+  delivered_qty REAL NOT NULL DEFAULT 0,
+  ordered_paise INTEGER NOT NULL DEFAULT 0,
+  delivered_paise INTEGER NOT NULL DEFAULT 0,   -- delivered qty at the average PO rate
+  status TEXT NOT NULL CHECK (status IN ('matched','short','over_delivered')),
+  PRIMARY KEY (vendor_id, sku)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_match_lines_status ON match_lines(status);
+
+-- One row per vendor with documents. The *_count columns count every status;
+-- an incremental run compares them with the live tables to catch deletes and
+-- documents moved to another vendor.
+CREATE TABLE IF NOT EXISTS match_vendors (
+  vendor_id INTEGER PRIMARY KEY,
+  po_count INTEGER NOT NULL DEFAULT 0,
+  dc_count INTEGER NOT NULL DEFAULT 0,
+  invoice_count INTEGER NOT NULL DEFAULT 0,
+  ordered_paise INTEGER NOT NULL DEFAULT 0,
+  delivered_paise INTEGER NOT NULL DEFAULT 0,
+  invoiced_paise INTEGER NOT NULL DEFAULT 0,
+  short_lines INTEGER NOT NULL DEFAULT 0,
+  status TEXT NOT NULL CHECK (status IN ('matched','short','over_billed')),
+  matched_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_match_vendors_status ON match_vendors(status);
+
+-- One row per run. An incremental run re-reads documents with updated_at at or
+-- after the last run's watermark (the time that run read the documents).
+CREATE TABLE IF NOT EXISTS match_runs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  mode TEXT NOT NULL CHECK (mode IN ('full','incremental')),
+  watermark TEXT,
+  tolerance_paise INTEGER NOT NULL,
+  vendors INTEGER NOT NULL,
+  lines INTEGER NOT NULL,
+  finished_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_po_updated ON purchase_orders(updated_at);
+CREATE INDEX IF NOT EXISTS idx_dc_updated ON delivery_challans(updated_at);
+CREATE INDEX IF NOT EXISTS idx_inv_updated ON invoices(updated_at);
@@ -0,0 +1,31 @@
+-- 0016_payment_applications.sql
+-- Which invoices each payment settles (docs/DATA_MODEL.md: payments,
+-- payment_applications). payments.invoice_ref is free text, so
+-- compliance/reconcile.py fills this table by amount, date window and vendor.
+-- Rows with method 'manual' are entered by hand and are never replaced by a run.
+CREATE TABLE IF NOT EXISTS payment_applications (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  payment_id INTEGER NOT NULL,
+  invoice_id INTEGER NOT NULL,
+  amount_paise INTEGER NOT NULL,            -- part of the payment applied to this invoice
+  difference_paise INTEGER NOT NULL DEFAULT 0,  -- payment minus invoice accepted within tolerance
+  method TEXT NOT NULL CHECK (method IN ('exact','tolerance','subset','partial','manual')),
+  run_id INTEGER,                           -- reconcile_runs.id; NULL for manual rows
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (payment_id) REFERENCES payments(id),
+  FOREIGN KEY (invoice_id) REFERENCES invoices(id)
+);
+CREATE INDEX IF NOT EXISTS idx_payapp_payment ON payment_applications(payment_id);
+CREATE INDEX IF NOT EXISTS idx_payapp_invoice ON payment_applications(invoice_id);
+CREATE INDEX IF NOT EXISTS idx_payapp_method ON payment_applications(method);
+
+-- One row per reconciliation run with its match rates and pass timings (JSON).
+CREATE TABLE IF NOT EXISTS reconcile_runs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  payments INTEGER NOT NULL,
+  invoices INTEGER NOT NULL,
+  applied INTEGER NOT NULL,                 -- payments with at least one application
+  unapplied_paise INTEGER NOT NULL,
+  stats TEXT,
+  finished_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,44 @@
+-- 0017_vendor_dedup.sql
+-- Likely duplicate vendors found by compliance/dedup.py. 0006 only removes rows
+-- sharing a GSTIN; these are candidates for review, nothing is merged or deleted.
+
+-- Scored pairs at or above the run's min_confidence (vendor_a < vendor_b).
+CREATE TABLE IF NOT EXISTS vendor_duplicate_pairs (
+  vendor_a INTEGER NOT NULL,
+  vendor_b INTEGER NOT NULL,
+  name_score REAL NOT NULL,             -- Jaccard similarity of name trigrams
+  same_pan INTEGER NOT NULL DEFAULT 0,
+  confidence REAL NOT NULL,
+  run_id INTEGER,
+  PRIMARY KEY (vendor_a, vendor_b)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_vendor_dup_pairs_b ON vendor_duplicate_pairs(vendor_b);
+
+-- Members of every cluster of two or more vendors. cluster_id is the vendor
+-- to keep: the lowest id with a GSTIN, else the lowest id.
+CREATE TABLE IF NOT EXISTS vendor_duplicates (
+  vendor_id INTEGER PRIMARY KEY,
+  cluster_id INTEGER NOT NULL,
+  confidence REAL NOT NULL,             -- the cluster's weakest link
+  run_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_vendor_dups_cluster ON vendor_duplicates(cluster_id);
+
+-- One row per run. An incremental run compares vendors with id above the last
+-- run's last_vendor_id against the blocks they fall in.
+CREATE TABLE IF NOT EXISTS dedup_runs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  mode TEXT NOT NULL CHECK (mode IN ('full','incremental')),
+  last_vendor_id INTEGER NOT NULL,
+  min_confidence REAL NOT NULL,
+  vendors INTEGER NOT NULL,             -- vendors loaded (new ones and their block-mates)
+  candidates INTEGER NOT NULL,          -- pairs scored
+  pairs INTEGER NOT NULL,
+  clusters INTEGER NOT NULL,            -- clusters written
+  finished_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Blocking keys, for incremental runs.
+CREATE INDEX IF NOT EXISTS idx_vendors_pan ON vendors(pan);
+CREATE INDEX IF NOT EXISTS idx_vendors_gstin_pan ON vendors(substr(gstin, 3, 10));
+CREATE INDEX IF NOT EXISTS idx_vendors_state_pin ON vendors(state_code, pin_code);
@@ -0,0 +1,34 @@
+-- 0018_vendor_search.sql
+-- Full-text index over vendor names, GSTIN and PAN for /api/vendors?search=,
+-- the CSV export and the type-ahead lookup (compliance/search.py). It replaces
+-- company_name/legal_name/gstin LIKE '%x%', which scans the whole table.
+-- External content: the text lives only in vendors. The index holds tokens,
+-- with 2- and 3-character prefix indexes for type-ahead, and the triggers
+-- below keep it in step.
+CREATE VIRTUAL TABLE IF NOT EXISTS vendors_fts USING fts5(
+  company_name, legal_name, gstin, pan,
+  content = 'vendors', content_rowid = 'id',
+  prefix = '2 3',
+  tokenize = 'unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_vendors_fts_insert AFTER INSERT ON vendors BEGIN
+  INSERT INTO vendors_fts (rowid, company_name, legal_name, gstin, pan)
+  VALUES (new.id, new.company_name, new.legal_name, new.gstin, new.pan);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_vendors_fts_delete AFTER DELETE ON vendors BEGIN
+  INSERT INTO vendors_fts (vendors_fts, rowid, company_name, legal_name, gstin, pan)
+  VALUES ('delete', old.id, old.company_name, old.legal_name, old.gstin, old.pan);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_vendors_fts_update AFTER UPDATE OF company_name, legal_name, gstin, pan ON vendors
+BEGIN
+  INSERT INTO vendors_fts (vendors_fts, rowid, company_name, legal_name, gstin, pan)
+  VALUES ('delete', old.id, old.company_name, old.legal_name, old.gstin, old.pan);
+  INSERT INTO vendors_fts (rowid, company_name, legal_name, gstin, pan)
+  VALUES (new.id, new.company_name, new.legal_name, new.gstin, new.pan);
+END;
+
+-- Backfill from the current rows.
+INSERT INTO vendors_fts (vendors_fts) VALUES ('rebuild');
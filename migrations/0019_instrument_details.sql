@@ -0,0 +1,183 @@
+-- 0019_instrument_details.sql
+-- Typed side tables for financial_instruments.details, one per details shape
+-- the Worker's parseDetailsByType writes (compliance/instruments.py). Reports
+-- read these columns instead of decoding the JSON blob on every row. A row
+-- exists only when the instrument's type has that shape and details is a JSON
+-- object. The triggers below keep the tables current; the INSERTs at the end
+-- backfill them.
+CREATE TABLE IF NOT EXISTS instrument_bank_guarantees (
+  instrument_id INTEGER PRIMARY KEY,
+  bank_name TEXT,
+  bg_number TEXT,
+  beneficiary TEXT,
+  margin_percent REAL,
+  claimable_until TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_instr_bg_bank ON instrument_bank_guarantees(bank_name);
+
+CREATE TABLE IF NOT EXISTS instrument_letters_of_credit (
+  instrument_id INTEGER PRIMARY KEY,
+  issuing_bank TEXT,
+  advising_bank TEXT,
+  lc_number TEXT,
+  shipment_terms TEXT,
+  expiry_date TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_instr_lc_bank ON instrument_letters_of_credit(issuing_bank);
+
+-- RTGS, NEFT and UPI_B2B.
+CREATE TABLE IF NOT EXISTS instrument_transfers (
+  instrument_id INTEGER PRIMARY KEY,
+  utr TEXT,
+  txn_date TEXT,
+  payer_bank TEXT,
+  payee_bank TEXT,
+  channel TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_instr_transfer_channel ON instrument_transfers(channel, payee_bank);
+
+-- e-Kuber and PFMS.
+CREATE TABLE IF NOT EXISTS instrument_pfms_releases (
+  instrument_id INTEGER PRIMARY KEY,
+  pfms_id TEXT,
+  sanction_no TEXT,
+  scheme TEXT,
+  fund_source TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_instr_pfms_scheme ON instrument_pfms_releases(scheme);
+
+CREATE TABLE IF NOT EXISTS instrument_gem_payments (
+  instrument_id INTEGER PRIMARY KEY,
+  gem_order_no TEXT,
+  gem_invoice_no TEXT,
+  gem_seller_id TEXT
+);
+
+CREATE TABLE IF NOT EXISTS instrument_signatures (
+  instrument_id INTEGER PRIMARY KEY,
+  signer_id TEXT,
+  dsc_serial TEXT,
+  signed_at TEXT,
+  audit_trail_url TEXT
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_instr_details_ins AFTER INSERT ON financial_instruments
+WHEN CASE WHEN json_valid(new.details) THEN json_type(new.details) END = 'object'
+BEGIN
+  INSERT INTO instrument_bank_guarantees (instrument_id, bank_name, bg_number, beneficiary, margin_percent, claimable_until)
+  SELECT new.id, json_extract(new.details, '$.bank_name'), json_extract(new.details, '$.bg_number'),
+         json_extract(new.details, '$.beneficiary'), json_extract(new.details, '$.margin_percent'),
+         json_extract(new.details, '$.claimable_until')
+  FROM instrument_types t WHERE t.id = new.type_id AND lower(t.name) = 'bank guarantee';
+  INSERT INTO instrument_letters_of_credit (instrument_id, issuing_bank, advising_bank, lc_number, shipment_terms, expiry_date)
+  SELECT new.id, json_extract(new.details, '$.issuing_bank'), json_extract(new.details, '$.advising_bank'),
+         json_extract(new.details, '$.lc_number'), json_extract(new.details, '$.shipment_terms'),
+         json_extract(new.details, '$.expiry_date')
+  FROM instrument_types t WHERE t.id = new.type_id AND lower(t.name) = 'letter of credit';
+  INSERT INTO instrument_transfers (instrument_id, utr, txn_date, payer_bank, payee_bank, channel)
+  SELECT new.id, json_extract(new.details, '$.utr'), json_extract(new.details, '$.txn_date'),
+         json_extract(new.details, '$.payer_bank'), json_extract(new.details, '$.payee_bank'),
+         json_extract(new.details, '$.channel')
+  FROM instrument_types t WHERE t.id = new.type_id AND lower(t.name) IN ('rtgs', 'neft', 'upi_b2b');
+  INSERT INTO instrument_pfms_releases (instrument_id, pfms_id, sanction_no, scheme, fund_source)
+  SELECT new.id, json_extract(new.details, '$.pfms_id'), json_extract(new.details, '$.sanction_no'),
+         json_extract(new.details, '$.scheme'), json_extract(new.details, '$.fund_source')
+  FROM instrument_types t WHERE t.id = new.type_id AND lower(t.name) IN ('e-kuber', 'pfms');
+  INSERT INTO instrument_gem_payments (instrument_id, gem_order_no, gem_invoice_no, gem_seller_id)
+  SELECT new.id, json_extract(new.details, '$.gem_order_no'), json_extract(new.details, '$.gem_invoice_no'),
+         json_extract(new.details, '$.gem_seller_id')
+  FROM instrument_types t WHERE t.id = new.type_id AND lower(t.name) = 'gem payment';
+  INSERT INTO instrument_signatures (instrument_id, signer_id, dsc_serial, signed_at, audit_trail_url)
+  SELECT new.id, json_extract(new.details, '$.signer_id'), json_extract(new.details, '$.dsc_serial'),
+         json_extract(new.details, '$.signed_at'), json_extract(new.details, '$.audit_trail_url')
+  FROM instrument_types t WHERE t.id = new.type_id AND lower(t.name) = 'digital signature';
+END;
+
+-- A changed type or details: drop the old side row, then shred the new details.
+CREATE TRIGGER IF NOT EXISTS trg_instr_details_upd AFTER UPDATE OF type_id, details ON financial_instruments
+BEGIN
+  DELETE FROM instrument_bank_guarantees WHERE instrument_id = old.id;
+  DELETE FROM instrument_letters_of_credit WHERE instrument_id = old.id;
+  DELETE FROM instrument_transfers WHERE instrument_id = old.id;
+  DELETE FROM instrument_pfms_releases WHERE instrument_id = old.id;
+  DELETE FROM instrument_gem_payments WHERE instrument_id = old.id;
+  DELETE FROM instrument_signatures WHERE instrument_id = old.id;
+  INSERT INTO instrument_bank_guarantees (instrument_id, bank_name, bg_number, beneficiary, margin_percent, claimable_until)
+  SELECT new.id, json_extract(new.details, '$.bank_name'), json_extract(new.details, '$.bg_number'),
+         json_extract(new.details, '$.beneficiary'), json_extract(new.details, '$.margin_percent'),
+         json_extract(new.details, '$.claimable_until')
+  FROM instrument_types t WHERE t.id = new.type_id AND lower(t.name) = 'bank guarantee'
+    AND CASE WHEN json_valid(new.details) THEN json_type(new.details) END = 'object';
+  INSERT INTO instrument_letters_of_credit (instrument_id, issuing_bank, advising_bank, lc_number, shipment_terms, expiry_date)
+  SELECT new.id, json_extract(new.details, '$.issuing_bank'), json_extract(new.details, '$.advising_bank'),
+         json_extract(new.details, '$.lc_number'), json_extract(new.details, '$.shipment_terms'),
+         json_extract(new.details, '$.expiry_date')
+  FROM instrument_types t WHERE t.id = new.type_id AND lower(t.name) = 'letter of credit'
+    AND CASE WHEN json_valid(new.details) THEN json_type(new.details) END = 'object';
+  INSERT INTO instrument_transfers (instrument_id, utr, txn_date, payer_bank, payee_bank, channel)
+  SELECT new.id, json_extract(new.details, '$.utr'), json_extract(new.details, '$.txn_date'),
+         json_extract(new.details, '$.payer_bank'), json_extract(new.details, '$.payee_bank'),
+         json_extract(new.details, '$.channel')
+  FROM instrument_types t WHERE t.id = new.type_id AND lower(t.name) IN ('rtgs', 'neft', 'upi_b2b')
+    AND CASE WHEN json_valid(new.details) THEN json_type(new.details) END = 'object';
+  INSERT INTO instrument_pfms_releases (instrument_id, pfms_id, sanction_no, scheme, fund_source)
+  SELECT new.id, json_extract(new.details, '$.pfms_id'), json_extract(new.details, '$.sanction_no'),
+         json_extract(new.details, '$.scheme'), json_extract(new.details, '$.fund_source')
+  FROM instrument_types t WHERE t.id = new.type_id AND lower(t.name) IN ('e-kuber', 'pfms')
+    AND CASE WHEN json_valid(new.details) THEN json_type(new.details) END = 'object';
+  INSERT INTO instrument_gem_payments (instrument_id, gem_order_no, gem_invoice_no, gem_seller_id)
+  SELECT new.id, json_extract(new.details, '$.gem_order_no'), json_extract(new.details, '$.gem_invoice_no'),
+         json_extract(new.details, '$.gem_seller_id')
+  FROM instrument_types t WHERE t.id = new.type_id AND lower(t.name) = 'gem payment'
+    AND CASE WHEN json_valid(new.details) THEN json_type(new.details) END = 'object';
+  INSERT INTO instrument_signatures (instrument_id, signer_id, dsc_serial, signed_at, audit_trail_url)
+  SELECT new.id, json_extract(new.details, '$.signer_id'), json_extract(new.details, '$.dsc_serial'),
+         json_extract(new.details, '$.signed_at'), json_extract(new.details, '$.audit_trail_url')
+  FROM instrument_types t WHERE t.id = new.type_id AND lower(t.name) = 'digital signature'
+    AND CASE WHEN json_valid(new.details) THEN json_type(new.details) END = 'object';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_instr_details_del AFTER DELETE ON financial_instruments
+BEGIN
+  DELETE FROM instrument_bank_guarantees WHERE instrument_id = old.id;
+  DELETE FROM instrument_letters_of_credit WHERE instrument_id = old.id;
+  DELETE FROM instrument_transfers WHERE instrument_id = old.id;
+  DELETE FROM instrument_pfms_releases WHERE instrument_id = old.id;
+  DELETE FROM instrument_gem_payments WHERE instrument_id = old.id;
+  DELETE FROM instrument_signatures WHERE instrument_id = old.id;
+END;
+
+-- Backfill from the current rows.
+INSERT OR REPLACE INTO instrument_bank_guarantees (instrument_id, bank_name, bg_number, beneficiary, margin_percent, claimable_until)
+SELECT f.id, json_extract(f.details, '$.bank_name'), json_extract(f.details, '$.bg_number'),
+       json_extract(f.details, '$.beneficiary'), json_extract(f.details, '$.margin_percent'),
+       json_extract(f.details, '$.claimable_until')
+FROM financial_instruments f JOIN instrument_types t ON t.id = f.type_id
+WHERE lower(t.name) = 'bank guarantee' AND CASE WHEN json_valid(f.details) THEN json_type(f.details) END = 'object';
+INSERT OR REPLACE INTO instrument_letters_of_credit (instrument_id, issuing_bank, advising_bank, lc_number, shipment_terms, expiry_date)
+SELECT f.id, json_extract(f.details, '$.issuing_bank'), json_extract(f.details, '$.advising_bank'),
+       json_extract(f.details, '$.lc_number'), json_extract(f.details, '$.shipment_terms'),
+       json_extract(f.details, '$.expiry_date')
+FROM financial_instruments f JOIN instrument_types t ON t.id = f.type_id
+WHERE lower(t.name) = 'letter of credit' AND CASE WHEN json_valid(f.details) THEN json_type(f.details) END = 'object';
+INSERT OR REPLACE INTO instrument_transfers (instrument_id, utr, txn_date, payer_bank, payee_bank, channel)
+SELECT f.id, json_extract(f.details, '$.utr'), json_extract(f.details, '$.txn_date'),
+       json_extract(f.details, '$.payer_bank'), json_extract(f.details, '$.payee_bank'),
+       json_extract(f.details, '$.channel')
+FROM financial_instruments f JOIN instrument_types t ON t.id = f.type_id
+WHERE lower(t.name) IN ('rtgs', 'neft', 'upi_b2b') AND CASE WHEN json_valid(f.details) THEN json_type(f.details) END = 'object';
+INSERT OR REPLACE INTO instrument_pfms_releases (instrument_id, pfms_id, sanction_no, scheme, fund_source)
+SELECT f.id, json_extract(f.details, '$.pfms_id'), json_extract(f.details, '$.sanction_no'),
+       json_extract(f.details, '$.scheme'), json_extract(f.details, '$.fund_source')
+FROM financial_instruments f JOIN instrument_types t ON t.id = f.type_id
+WHERE lower(t.name) IN ('e-kuber', 'pfms') AND CASE WHEN json_valid(f.details) THEN json_type(f.details) END = 'object';
+INSERT OR REPLACE INTO instrument_gem_payments (instrument_id, gem_order_no, gem_invoice_no, gem_seller_id)
+SELECT f.id, json_extract(f.details, '$.gem_order_no'), json_extract(f.details, '$.gem_invoice_no'),
+       json_extract(f.details, '$.gem_seller_id')
+FROM financial_instruments f JOIN instrument_types t ON t.id = f.type_id
+WHERE lower(t.name) = 'gem payment' AND CASE WHEN json_valid(f.details) THEN json_type(f.details) END = 'object';
+INSERT OR REPLACE INTO instrument_signatures (instrument_id, signer_id, dsc_serial, signed_at, audit_trail_url)
+SELECT f.id, json_extract(f.details, '$.signer_id'), json_extract(f.details, '$.dsc_serial'),
+       json_extract(f.details, '$.signed_at'), json_extract(f.details, '$.audit_trail_url')
+FROM financial_instruments f JOIN instrument_types t ON t.id = f.type_id
+WHERE lower(t.name) = 'digital signature' AND CASE WHEN json_valid(f.details) THEN json_type(f.details) END = 'object';
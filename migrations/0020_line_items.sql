@@ -0,0 +1,87 @@
+-- 0020_line_items.sql
+-- Line items of purchase orders and delivery challans as rows, exploded from
+-- the JSON ``items`` arrays by compliance/lineitems.py. These are the po_items
+-- of docs/DATA_MODEL.md. Invoices carry no items column, so there is no
+-- invoice_items yet. Amounts are in paise, as in the report tables. A NULL
+-- amount or rate means the line did not carry it and it could not be derived.
+
+CREATE TABLE IF NOT EXISTS po_items (
+  po_id INTEGER NOT NULL,
+  status TEXT NOT NULL,                 -- the document's, kept in step by trigger
+  sn INTEGER NOT NULL,                  -- 1-based position in the items array
+  sku TEXT,
+  hsn_sac TEXT,
+  description TEXT,
+  qty REAL NOT NULL DEFAULT 0,
+  uom TEXT,
+  rate REAL,
+  taxable_paise INTEGER,
+  tax_type TEXT CHECK (tax_type IN ('IGST','CGST_SGST')),
+  tax_rate REAL,                        -- total GST rate in percent
+  tax_paise INTEGER,
+  total_paise INTEGER,
+  PRIMARY KEY (po_id, sn)
+) WITHOUT ROWID;
+-- Covering: a per-HSN or per-SKU total by status never reads the table.
+CREATE INDEX IF NOT EXISTS idx_po_items_hsn ON po_items(hsn_sac, status, qty, taxable_paise, tax_paise, total_paise);
+CREATE INDEX IF NOT EXISTS idx_po_items_sku ON po_items(sku, status, qty, taxable_paise, tax_paise, total_paise);
+
+CREATE TABLE IF NOT EXISTS dc_items (
+  dc_id INTEGER NOT NULL,
+  status TEXT NOT NULL,
+  sn INTEGER NOT NULL,
+  sku TEXT,
+  hsn_sac TEXT,
+  description TEXT,
+  qty REAL NOT NULL DEFAULT 0,
+  uom TEXT,
+  rate REAL,
+  taxable_paise INTEGER,
+  tax_type TEXT CHECK (tax_type IN ('IGST','CGST_SGST')),
+  tax_rate REAL,
+  tax_paise INTEGER,
+  total_paise INTEGER,
+  PRIMARY KEY (dc_id, sn)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_dc_items_hsn ON dc_items(hsn_sac, status, qty, taxable_paise, tax_paise, total_paise);
+CREATE INDEX IF NOT EXISTS idx_dc_items_sku ON dc_items(sku, status, qty, taxable_paise, tax_paise, total_paise);
+
+-- Deletes and status changes need no normalizer run; other edits and inserts
+-- are picked up by updated_at.
+CREATE TRIGGER IF NOT EXISTS trg_po_items_del AFTER DELETE ON purchase_orders
+BEGIN
+  DELETE FROM po_items WHERE po_id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_po_items_status AFTER UPDATE OF status ON purchase_orders
+WHEN NEW.status IS NOT OLD.status
+BEGIN
+  UPDATE po_items SET status = NEW.status WHERE po_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_dc_items_del AFTER DELETE ON delivery_challans
+BEGIN
+  DELETE FROM dc_items WHERE dc_id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_dc_items_status AFTER UPDATE OF status ON delivery_challans
+WHEN NEW.status IS NOT OLD.status
+BEGIN
+  UPDATE dc_items SET status = NEW.status WHERE dc_id = NEW.id;
+END;
+
+-- One row per normalizer run, inserted when it starts. An incremental run
+-- re-explodes documents with updated_at at or after the last finished run's
+-- watermark, or with an id above that run's high-water ids.
+CREATE TABLE IF NOT EXISTS line_item_runs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  mode TEXT NOT NULL CHECK (mode IN ('full','incremental')),
+  watermark TEXT NOT NULL,
+  po_max_id INTEGER NOT NULL DEFAULT 0,
+  dc_max_id INTEGER NOT NULL DEFAULT 0,
+  documents INTEGER NOT NULL DEFAULT 0,
+  lines INTEGER NOT NULL DEFAULT 0,
+  undecodable INTEGER NOT NULL DEFAULT 0,
+  started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  finished_at DATETIME
+);
@@ -0,0 +1,21 @@
+-- 0021_hsn_gst_rates.sql
+-- GST rate per HSN/SAC prefix for compliance/gst.py. gst_rates (0001) lists
+-- the rates in use but not which goods carry them. A line's HSN/SAC code takes
+-- the rate of its longest matching prefix (chapter, heading, subheading or
+-- the full 8-digit tariff item).
+
+CREATE TABLE IF NOT EXISTS hsn_gst_rates (
+  hsn_prefix TEXT PRIMARY KEY,          -- 2 to 8 digits
+  rate DECIMAL(5,2) NOT NULL,           -- total GST in percent, one of gst_rates.rate
+  description TEXT,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (rate) REFERENCES gst_rates(rate)
+);
+
+-- The headings the import templates and sample documents use.
+INSERT OR IGNORE INTO hsn_gst_rates (hsn_prefix, rate, description) VALUES
+  ('8443', 18, 'Printers, copiers and their parts'),
+  ('8471', 18, 'Computers and their units'),
+  ('8504', 18, 'Transformers, converters and UPS'),
+  ('8544', 18, 'Insulated wire and cable'),
+  ('9987', 18, 'Maintenance, repair and installation services');
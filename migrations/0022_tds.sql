@@ -0,0 +1,35 @@
+-- 0022_tds.sql
+-- TDS decisions for vendor payments (compliance/tds.py) under the tds_sections
+-- seeded in 0002. A payment's financial year follows its created_at
+-- (April-March; fy 2025 is FY 2025-26). Amounts are in paise.
+
+ALTER TABLE payments ADD COLUMN tds_section TEXT;   -- e.g. '194C'; NULL: no TDS applies
+
+-- One row per payment, decided once, in id order.
+CREATE TABLE IF NOT EXISTS tds_ledger (
+  payment_id INTEGER PRIMARY KEY,
+  vendor_id INTEGER NOT NULL,           -- 0: no vendor
+  section TEXT,
+  fy INTEGER NOT NULL,
+  amount_paise INTEGER NOT NULL,
+  base_paise INTEGER NOT NULL DEFAULT 0,      -- amount TDS was computed on (with catch-up, more than the payment)
+  rate_bp INTEGER NOT NULL DEFAULT 0,         -- hundredths of a percent
+  tds_paise INTEGER NOT NULL DEFAULT 0,
+  reason TEXT NOT NULL CHECK (reason IN ('single','aggregate','below_threshold','no_section',
+                                         'unknown_section','not_counted')),
+  decided_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_tds_ledger_key ON tds_ledger(vendor_id, section, fy);
+
+-- Running totals per (vendor, section, financial year) of the counted payments.
+CREATE TABLE IF NOT EXISTS tds_accumulators (
+  vendor_id INTEGER NOT NULL,
+  section TEXT NOT NULL,
+  fy INTEGER NOT NULL,
+  payments INTEGER NOT NULL DEFAULT 0,
+  paid_paise INTEGER NOT NULL DEFAULT 0,
+  base_paise INTEGER NOT NULL DEFAULT 0,
+  tds_paise INTEGER NOT NULL DEFAULT 0,
+  last_payment_id INTEGER,
+  PRIMARY KEY (vendor_id, section, fy)
+) WITHOUT ROWID;
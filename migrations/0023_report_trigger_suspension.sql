@@ -0,0 +1,12 @@
+-- 0023_report_trigger_suspension.sql
+-- The 0014 report triggers dropped by a bulk import with deferred reports
+-- (compliance/bulkimport.py), recorded in the same transaction as the drop.
+-- A row left behind by a process that died is restored, and the summary
+-- tables recounted, the next time the mirror is opened.
+
+CREATE TABLE IF NOT EXISTS report_triggers_suspended (
+  name TEXT PRIMARY KEY,
+  sql TEXT NOT NULL,
+  pid INTEGER NOT NULL,                 -- process that dropped the trigger
+  suspended_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,26 @@
+-- 0024_tds_invalid_date.sql
+-- Payments whose created_at is NULL, empty or not a YYYY-MM-DD date have no
+-- financial year. compliance/tds.py records them with reason 'invalid_date'
+-- and a NULL fy instead of failing on fy NOT NULL. SQLite cannot alter a
+-- CHECK constraint, so the 0022 ledger is rebuilt with its rows.
+
+CREATE TABLE tds_ledger_0024 (
+  payment_id INTEGER PRIMARY KEY,
+  vendor_id INTEGER NOT NULL,           -- 0: no vendor
+  section TEXT,
+  fy INTEGER,                           -- NULL: created_at has no readable date
+  amount_paise INTEGER NOT NULL,
+  base_paise INTEGER NOT NULL DEFAULT 0,      -- amount TDS was computed on (with catch-up, more than the payment)
+  rate_bp INTEGER NOT NULL DEFAULT 0,         -- hundredths of a percent
+  tds_paise INTEGER NOT NULL DEFAULT 0,
+  reason TEXT NOT NULL CHECK (reason IN ('single','aggregate','below_threshold','no_section',
+                                         'unknown_section','not_counted','invalid_date')),
+  decided_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO tds_ledger_0024 (payment_id, vendor_id, section, fy, amount_paise, base_paise, rate_bp, tds_paise,
+                             reason, decided_at)
+  SELECT payment_id, vendor_id, section, fy, amount_paise, base_paise, rate_bp, tds_paise, reason, decided_at
+  FROM tds_ledger;
+DROP TABLE tds_ledger;
+ALTER TABLE tds_ledger_0024 RENAME TO tds_ledger;
+CREATE INDEX IF NOT EXISTS idx_tds_ledger_key ON tds_ledger(vendor_id, section, fy);
@@ -2,8 +2,19 @@
 
 import zipfile
 import json
-import pandas as pd
 import os
+import sys
+
+# Shared packaging helpers live in the repository's compliance/ package.
+# Pass --full to rewrite every file and re-deflate every zip member.
+_repo_root = os.path.dirname(os.path.abspath(__file__))
+while not os.path.isdir(os.path.join(_repo_root, 'compliance')) and os.path.dirname(_repo_root) != _repo_root:
+    _repo_root = os.path.dirname(_repo_root)
+sys.path.insert(0, _repo_root)
+from compliance.package import build_package, write_if_changed
+from compliance.tables import to_csv
+
+FULL_REBUILD = '--full' in sys.argv[1:]
 
 # Recreate the indian taxation document structure
 indian_taxation_structure = {
@@ -65,8 +76,7 @@ indian_taxation_structure = {
     }
 }
 
-with open('indian_taxation_document_structure.json', 'w') as f:
-    json.dump(indian_taxation_structure, f, indent=2)
+write_if_changed('indian_taxation_document_structure.json', json.dumps(indian_taxation_structure, indent=2), force=FULL_REBUILD)
 
 # Recreate document field summary
 document_summary = [
@@ -78,8 +88,7 @@ document_summary = [
     {'Category': 'GST COMPLIANCE DOCUMENTS', 'Document Type': 'CREDIT DEBIT NOTE', 'Field Count': 13, 'Integration Required': 'Yes'}
 ]
 
-summary_df = pd.DataFrame(document_summary)
-summary_df.to_csv('document_field_summary.csv', index=False)
+write_if_changed('document_field_summary.csv', to_csv(document_summary), force=FULL_REBUILD)
 
 # Recreate Purchase Requisition fields
 pr_fields = [
@@ -98,8 +107,7 @@ pr_fields = [
     {'Category': 'Approval Workflow', 'Field_Name': 'business_justification', 'Data_Type': 'Text', 'Required': True, 'Max_Length': 1000}
 ]
 
-pr_df = pd.DataFrame(pr_fields)
-pr_df.to_csv('purchase_requisition_fields.csv', index=False)
+write_if_changed('purchase_requisition_fields.csv', to_csv(pr_fields), force=FULL_REBUILD)
 
 # Recreate Purchase Order fields
 po_fields = [
@@ -119,8 +127,7 @@ po_fields = [
     {'Category': 'Terms and Conditions', 'Field_Name': 'payment_terms', 'Data_Type': 'Dropdown', 'Required': True, 'Max_Length': 'N/A'}
 ]
 
-po_df = pd.DataFrame(po_fields)
-po_df.to_csv('purchase_order_fields.csv', index=False)
+write_if_changed('purchase_order_fields.csv', to_csv(po_fields), force=FULL_REBUILD)
 
 # Recreate banking instruments structure
 banking_structure = {
@@ -160,8 +167,7 @@ banking_structure = {
     }
 }
 
-with open('banking_instruments_compliance_structure.json', 'w') as f:
-    json.dump(banking_structure, f, indent=2)
+write_if_changed('banking_instruments_compliance_structure.json', json.dumps(banking_structure, indent=2), force=FULL_REBUILD)
 
 # Recreate due date tracking matrix
 due_dates = [
@@ -175,8 +181,7 @@ due_dates = [
     {'Transaction_Type': 'B2G', 'Document': 'Tax Payment', 'Standard_Terms': 'Quarterly', 'Reminder_Days': '[85, 88, 90, 95]', 'Penalty_Rate': '12% p.a.'}
 ]
 
-due_dates_df = pd.DataFrame(due_dates)
-due_dates_df.to_csv('due_date_tracking_matrix.csv', index=False)
+write_if_changed('due_date_tracking_matrix.csv', to_csv(due_dates), force=FULL_REBUILD)
 
 # Recreate RBI compliance checklist
 rbi_compliance = [
@@ -188,8 +193,7 @@ rbi_compliance = [
     {'Compliance_Area': 'Project Finance', 'Requirement': 'New Directions 2025', 'Deadline': 'June 19, 2025', 'Penalty': 'Asset Classification', 'Auto_Check': 'Yes'}
 ]
 
-rbi_df = pd.DataFrame(rbi_compliance)
-rbi_df.to_csv('rbi_compliance_checklist.csv', index=False)
+write_if_changed('rbi_compliance_checklist.csv', to_csv(rbi_compliance), force=FULL_REBUILD)
 
 print("✅ All data files recreated successfully!")
 
@@ -208,23 +212,11 @@ files_to_zip = [
     'API_DOCUMENTATION.md'
 ]
 
-# Remove old zip file if it exists
-if os.path.exists('COMPLETE_INDIAN_TAXATION_COMPLIANCE_SYSTEM.zip'):
-    os.remove('COMPLETE_INDIAN_TAXATION_COMPLIANCE_SYSTEM.zip')
-
-# Create the complete zip file
+# Create the complete zip file (incrementally: unchanged members are reused)
 zip_filename = 'COMPLETE_INDIAN_TAXATION_COMPLIANCE_SYSTEM.zip'
 
-with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-    for file in files_to_zip:
-        if os.path.exists(file):
-            zipf.write(file)
-            print(f"✓ Added {file}")
-        else:
-            print(f"✗ Missing {file}")
-    
-    # Add README file
-    readme_content = """
+# Add README file
+readme_content = """
 COMPLETE INDIAN TAXATION & BUSINESS COMPLIANCE SYSTEM
 ======================================================
 
@@ -337,9 +329,17 @@ refer to individual files in this package.
 © 2025 - Indian Taxation & Business Compliance System
 Developed for complete regulatory adherence and business efficiency
     """
-    
-    zipf.writestr('README.txt', readme_content)
-    print("✓ Added README.txt")
+
+report = build_package(zip_filename, files_to_zip, {'README.txt': readme_content}, full=FULL_REBUILD)
+for file in report.missing:
+    print(f"✗ Missing {file}")
+if report.unchanged:
+    print(f"✓ {zip_filename} is up to date")
+else:
+    for file in report.compressed:
+        print(f"✓ Added {file}")
+    for file in report.reused:
+        print(f"✓ Reused {file}")
 
 print(f"\n🎉 COMPLETE ZIP PACKAGE CREATED SUCCESSFULLY!")
 print(f"📦 File: {zip_filename}")
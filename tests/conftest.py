@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compliance import db  # noqa: E402
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    """A migrated, empty SQLite mirror."""
+    conn = db.open_mirror(str(tmp_path / 'mirror.sqlite'))
+    yield conn
+    conn.close()
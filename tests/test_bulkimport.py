@@ -0,0 +1,109 @@
+import csv
+import io
+import os
+import shutil
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from compliance import TEMPLATES_DIR, bulkimport, db, loader, reports
+
+ENTITY_TEMPLATES = ('vendors', 'po', 'invoice', 'dc', 'instruments')
+TABLES = ('vendors', 'purchase_orders', 'invoices', 'delivery_challans', 'financial_instruments')
+
+
+@pytest.fixture
+def drop(tmp_path):
+    folder = tmp_path / 'drop'
+    folder.mkdir()
+    for name in ENTITY_TEMPLATES:
+        shutil.copy(TEMPLATES_DIR / f'{name}_import_template.csv', folder)
+    return folder
+
+
+def contents(conn):
+    return {t: conn.execute(f'SELECT * FROM {t} ORDER BY id').fetchall() for t in TABLES}
+
+
+def without_timestamps(tables):
+    return {t: [tuple(v for v in row if not (isinstance(v, str) and v[:2] == '20' and v[10:11] == ' '))
+                for row in rows] for t, rows in tables.items()}
+
+
+@pytest.mark.parametrize('workers, chunk_bytes', [(1, 1 << 20), (2, 64)])
+def test_matches_the_loader(drop, tmp_path, workers, chunk_bytes):
+    reference = db.open_mirror(str(tmp_path / 'reference.sqlite'))
+    for name in ENTITY_TEMPLATES:
+        path = drop / f'{name}_import_template.csv'
+        assert loader.load_csv(reference, loader.entity_for_path(str(path)), path).errors == []
+    conn = db.open_mirror(str(tmp_path / 'bulk.sqlite'))
+    results = bulkimport.import_files(conn, [str(drop)], workers=workers, chunk_bytes=chunk_bytes)
+    assert all(r.ok for r in results) and len(results) == 5
+    assert without_timestamps(contents(conn)) == without_timestamps(contents(reference))
+
+
+def test_bad_file_is_rolled_back_alone(drop, tmp_path):
+    (drop / 'invoice_extra.csv').write_text('amount,status\n1,pending\n')
+    conn = db.open_mirror(str(tmp_path / 'bulk.sqlite'))
+    results = {r.path.rsplit('/', 1)[-1]: r for r in bulkimport.import_files(conn, [str(drop)], workers=1)}
+    assert not results['invoice_extra.csv'].ok
+    assert all(r.ok for name, r in results.items() if name != 'invoice_extra.csv')
+    assert conn.execute('SELECT count(*) FROM invoices').fetchone()[0] == 2
+
+
+def test_split_ranges_ignores_escaped_quotes(tmp_path, monkeypatch):
+    path = tmp_path / 'dc_escaped.csv'
+    records = ['dc_number,items,status']
+    for k in range(400):
+        cell = ['"[{\\"sku\\":\\"A\\",\\"qty\\":1}]"', '"O\\"Brien\nsecond line"', '"C:\\\\"', 'plain'][k % 4]
+        records.append(f'DC-{k},{cell},pending')
+    path.write_bytes(('\n'.join(records) + '\n').encode())
+    with open(path, newline='') as f:
+        want = list(csv.reader(f, escapechar='\\'))[1:]
+    header, start = bulkimport.read_header(path)
+    assert len(want) == 400
+    monkeypatch.setattr(bulkimport, '_SCAN_BLOCK', 61)      # block ends fall on backslashes and quotes too
+    data = path.read_bytes()
+    for chunk_bytes in (1, 37, 500, 1 << 20):
+        ranges = bulkimport.split_ranges(path, start, chunk_bytes)
+        got = [row for lo, hi in ranges
+               for row in csv.reader(io.StringIO(data[lo:hi].decode(), newline=''), escapechar='\\')]
+        assert got == want
+        assert chunk_bytes > 500 or len(ranges) > 10
+
+
+def test_triggers_left_dropped_by_a_dead_import_are_restored(tmp_path):
+    path = tmp_path / 'mirror.sqlite'
+    script = textwrap.dedent(f'''
+        import os, sys
+        sys.path.insert(0, {os.path.dirname(os.path.dirname(os.path.abspath(__file__)))!r})
+        from compliance import bulkimport, db
+        conn = db.open_mirror({str(path)!r})
+        conn.execute("INSERT INTO invoices (invoice_number, amount, status) VALUES ('INV-1', 100, 'pending')")
+        bulkimport.suspend_report_triggers(conn)
+        conn.execute("INSERT INTO invoices (invoice_number, amount, status) VALUES ('INV-2', 250, 'pending')")
+        os._exit(1)
+    ''')
+    assert subprocess.run([sys.executable, '-c', script]).returncode == 1
+    conn = db.connect(str(path))
+    assert reports.check(conn) != []
+    assert conn.execute('SELECT count(*) FROM report_triggers_suspended').fetchone()[0] > 0
+    conn.close()
+
+    conn = db.open_mirror(str(path))
+    assert reports.check(conn) == []
+    assert conn.execute('SELECT count(*) FROM report_triggers_suspended').fetchone()[0] == 0
+    conn.execute("INSERT INTO invoices (invoice_number, amount, status) VALUES ('INV-3', 5, 'approved')")
+    assert reports.check(conn) == []
+    assert reports.status_totals(conn)['invoices']['approved'].row_count == 1
+    conn.close()
+
+
+def test_live_suspension_is_left_to_its_owner(mirror):
+    names = bulkimport.suspend_report_triggers(mirror)
+    assert names and bulkimport.recover_report_triggers(mirror) == []
+    mirror.execute("INSERT INTO invoices (invoice_number, amount, status) VALUES ('INV-1', 100, 'pending')")
+    assert bulkimport.restore_report_triggers(mirror) == names
+    assert reports.check(mirror) == []
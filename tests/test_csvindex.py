@@ -0,0 +1,52 @@
+import csv
+import random
+
+import pytest
+
+from compliance import csvindex
+from compliance.csvindex import Condition, IndexedCSV
+
+NAMES = ['Acme Traders', 'O"Brien & Sons', 'He said "hi"', 'Multi\nline "quoted"', 'Plain, with comma', '"']
+
+
+@pytest.fixture
+def export(tmp_path):
+    rng = random.Random(16)
+    rows = [[f'INV-{k}', rng.choice(NAMES), str(rng.randrange(0, 5000)), rng.choice(('pending', 'paid'))]
+            for k in range(3000)]
+    path = tmp_path / 'invoices.csv'
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['invoice_number', 'vendor', 'amount', 'status'])
+        writer.writerows(rows)
+    return path, rows
+
+
+def naive(rows, keep):
+    return [(i, tuple(r)) for i, r in enumerate(rows) if keep(r)]
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+@pytest.mark.parametrize('text, keep', [
+    ('vendor=O"Brien & Sons', lambda r: r[1] == 'O"Brien & Sons'),
+    ('vendor~said "hi"', lambda r: 'said "hi"' in r[1]),
+    ('vendor="', lambda r: r[1] == '"'),
+    ('vendor~line "', lambda r: 'line "' in r[1]),
+    ('vendor~Traders', lambda r: 'Traders' in r[1]),
+])
+def test_scan_matches_a_naive_pass(export, text, keep, workers):
+    path, rows = export
+    with IndexedCSV(path) as table:
+        got = list(table.scan([Condition.parse(text)], workers=workers, chunk_rows=500))
+    assert got == naive(rows, keep) and got
+
+
+def test_numeric_conditions_and_rows(export):
+    path, rows = export
+    with IndexedCSV(path) as table:
+        where = [Condition.parse('amount>=4000'), Condition.parse('status=paid')]
+        got = list(table.scan(where, columns=['invoice_number']))
+        assert got == [(i, (r[0],)) for i, r in naive(rows, lambda r: int(r[2]) >= 4000 and r[3] == 'paid')]
+        assert len(table) == len(rows)
+        assert [table.row(i) for i in (0, 1234, 2999)] == [tuple(rows[i]) for i in (0, 1234, 2999)]
+    assert csvindex.index_path(path) == f'{path}.idx'
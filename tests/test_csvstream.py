@@ -0,0 +1,35 @@
+import csv
+import io
+import random
+from datetime import date
+from decimal import Decimal
+
+from compliance import csvstream
+
+CELLS = ('plain', 'with, comma', 'say "hi"', 'two\nlines', '', ' padded ', 'O\'Brien', '[{"sku": "A"}]')
+
+
+def test_matches_csv_reader_across_block_edges():
+    rng = random.Random(15)
+    rows = [[rng.choice(CELLS) + str(rng.randrange(100)) for _ in range(rng.randint(1, 6))] for _ in range(500)]
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator=rng.choice(('\n', '\r\n'))).writerows(rows)
+    data = buf.getvalue().encode()
+    want = list(csv.reader(io.StringIO(buf.getvalue(), newline='')))
+    for block_size in (7, 64, 1 << 20):
+        assert list(csvstream.iter_rows(data, block_size=block_size)) == want
+
+
+def test_template_quirks():
+    data = ('id,items,route\n'
+            '1,"[{\\"sku\\":\\"A1\\"}]",\'Noida, UP\'\n'
+            "2,,O'Brien Road\n").encode()
+    assert list(csvstream.iter_rows(data)) == [
+        ['id', 'items', 'route'], ['1', '[{"sku":"A1"}]', 'Noida, UP'], ['2', '', "O'Brien Road"]]
+
+
+def test_read_records_converts_columns():
+    data = b'vendor_id,amount,due_date,items\n7,12.50,2025-04-01,"[1, 2]"\n8,,,\n'
+    first, second = csvstream.read_records(data)
+    assert first == (7, Decimal('12.50'), date(2025, 4, 1), [1, 2])
+    assert second == (8, None, None, None)
@@ -0,0 +1,23 @@
+import pytest
+
+from compliance import db
+
+
+def test_migrations_apply_once(mirror):
+    assert db.pending_migrations(mirror) == []
+    assert db.apply_migrations(mirror) == []
+    names = {r[0] for r in mirror.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'vendors', 'invoices', 'payments', 'financial_instruments'} <= names
+
+
+def test_failed_migration_rolls_back(tmp_path, mirror):
+    (tmp_path / '9999_bad.sql').write_text('CREATE TABLE half_done (id INTEGER);\nINSERT INTO nowhere VALUES (1);\n')
+    with pytest.raises(Exception, match='9999_bad.sql'):
+        db.apply_migrations(mirror, tmp_path)
+    assert mirror.execute("SELECT count(*) FROM sqlite_master WHERE name = 'half_done'").fetchone()[0] == 0
+    assert db.pending_migrations(mirror, tmp_path) == ['9999_bad.sql']
+
+
+def test_split_statements_keeps_trigger_bodies():
+    sql = 'CREATE TRIGGER t AFTER INSERT ON a BEGIN\n  UPDATE b SET n = n + 1;\nEND;\nSELECT 1;\n-- tail\n'
+    assert len(db._split_statements(sql)) == 3
@@ -0,0 +1,72 @@
+import random
+from itertools import combinations
+
+import pytest
+
+from compliance import dedup
+
+WORDS = ('Shree', 'Ganesh', 'Balaji', 'Sai', 'Krishna', 'Om', 'Laxmi', 'Durga')
+KINDS = ('Traders', 'Trading', 'Enterprises', 'Industries', 'Steels')
+SUFFIXES = ('Pvt Ltd', 'Private Limited', 'Ltd', 'LLP', '', 'M/s.')
+
+
+def vendors(n, seed):
+    rng = random.Random(seed)
+    pans = [f'AAAP{c}{k:04d}A' for c in 'BCD' for k in range(3)] + ['']
+    rows = []
+    for vendor_id in range(1, n + 1):
+        name = f'{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(KINDS)}'
+        suffix = rng.choice(SUFFIXES)
+        company = f'M/s. {name}' if suffix == 'M/s.' else f'{name} {suffix}'.strip()
+        legal = rng.choice(('', name.upper(), company))
+        pan = rng.choice(pans)
+        gstin = f'27{pan}1Z5' if pan and rng.random() < 0.3 else ''
+        rows.append((vendor_id, company, legal, gstin, '' if gstin else pan, rng.choice(('27', '29', '')),
+                     rng.choice(('411001', '560001'))))
+    return rows
+
+
+def brute_pairs(rows, min_confidence):
+    """Every pair sharing a block, scored by Jaccard over the trigram sets."""
+    info = []
+    for vendor_id, company, legal, gstin, pan, state, pin in rows:
+        gstin = (gstin or '').strip().upper()
+        grams = dedup.trigrams(dedup.normalise_name(company)) | dedup.trigrams(dedup.normalise_name(legal))
+        info.append((vendor_id, grams, gstin, dedup._pan(pan, gstin), (state or '', pin or '')))
+    pairs = {}
+    for (a, ga, xa, pa, la), (b, gb, xb, pb, lb) in combinations(info, 2):
+        same_pan = bool(pa) and pa == pb
+        if not (same_pan or all(la) and la == lb) or pa and pb and pa != pb or xa and xb and xa != xb:
+            continue
+        if not ga or not gb:
+            continue
+        name = len(ga & gb) / len(ga | gb)
+        confidence = 0.5 + 0.5 * name if same_pan else name
+        if confidence >= min_confidence:
+            pairs[min(a, b), max(a, b)] = round(confidence, 4)
+    return pairs
+
+
+@pytest.mark.parametrize('min_confidence', [0.6, 0.8, 0.95])
+def test_find_pairs_matches_brute_force(min_confidence):
+    rows = vendors(400, seed=19)
+    pairs, _ = dedup.find_pairs(rows, min_confidence)
+    assert {(p.vendor_a, p.vendor_b): p.confidence for p in pairs} == brute_pairs(rows, min_confidence)
+
+
+def test_normalise_name():
+    assert dedup.normalise_name('M/s. Shree Balaji Traders Pvt. Ltd.') == 'SHREE BALAJI TRADERS'
+    assert dedup.normalise_name('A&B Co') == 'A AND B'
+
+
+def test_incremental_run_grows_clusters(mirror):
+    # GSTINs are unique in the mirror; keep only their PANs.
+    rows = [(i, c, legal, '', pan or gstin[2:12], s, pin) for i, c, legal, gstin, pan, s, pin in vendors(200, seed=7)]
+    mirror.executemany('INSERT INTO vendors (id, company_name, legal_name, gstin, pan, state_code, pin_code) '
+                       "VALUES (?, ?, ?, NULLIF(?, ''), ?, ?, ?)", rows[:150])
+    dedup.dedup(mirror)
+    mirror.executemany('INSERT INTO vendors (id, company_name, legal_name, gstin, pan, state_code, pin_code) '
+                       "VALUES (?, ?, ?, NULLIF(?, ''), ?, ?, ?)", rows[150:])
+    dedup.dedup(mirror, incremental=True)
+    stored = set(mirror.execute('SELECT vendor_a, vendor_b FROM vendor_duplicate_pairs'))
+    assert stored and stored == set(brute_pairs(rows, dedup.DEFAULT_MIN_CONFIDENCE))
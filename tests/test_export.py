@@ -0,0 +1,63 @@
+import gzip
+
+import pytest
+
+from compliance import export
+
+
+@pytest.fixture
+def invoices(mirror):
+    mirror.executemany('INSERT INTO invoices (vendor_id, invoice_number, amount, status, due_date, created_at) '
+                       'VALUES (?, ?, ?, ?, ?, ?)',
+                       [(1, 'INV-1', 100.0, 'pending', '2025-05-01', '2025-04-01 10:00:00'),
+                        (2, 'INV "2", part', 99.5, 'approved', None, '2025-04-02 10:00:00'),
+                        (None, 'INV-3\nsecond line', 0, 'pending', '', '2025-04-03 10:00:00')])
+    return mirror
+
+
+def worker_csv(conn):
+    """What the Worker's export handler builds: newest first, joined with newlines."""
+    def cell(v):
+        if v is None:
+            return ''
+        if isinstance(v, float) and v.is_integer():
+            v = int(v)
+        s = str(v)
+        return '"' + s.replace('"', '""') + '"' if any(c in s for c in '",\n') else s
+    cols = export.EXPORTS['invoices'].columns
+    rows = conn.execute(f'SELECT {", ".join(cols)} FROM invoices ORDER BY created_at DESC')
+    return '\n'.join([','.join(cols)] + [','.join(cell(v) for v in row) for row in rows])
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 1000])
+def test_csv_matches_worker(invoices, tmp_path, chunk_size):
+    path = tmp_path / 'invoices.csv'
+    assert export.export(invoices, 'invoices', path, chunk_size=chunk_size) == 3
+    assert path.read_bytes().decode() == worker_csv(invoices)
+
+
+def test_carriage_return_is_not_quoted(invoices, tmp_path):
+    invoices.execute("INSERT INTO invoices (invoice_number, status, created_at) "
+                     "VALUES ('INV-4\rreturn', 'pending', '2025-04-04 10:00:00')")
+    path = tmp_path / 'invoices.csv'
+    export.export(invoices, 'invoices', path)
+    text = path.read_bytes().decode()
+    assert text == worker_csv(invoices) and ',INV-4\rreturn,' in text
+
+
+def test_gzip_is_reproducible(invoices, tmp_path):
+    path = tmp_path / 'invoices.csv.gz'
+    export.export(invoices, 'invoices', path)
+    first = path.read_bytes()
+    export.export(invoices, 'invoices', path)
+    assert path.read_bytes() == first
+    assert gzip.decompress(first).decode() == worker_csv(invoices)
+
+
+def test_parquet_round_trip(invoices, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = tmp_path / 'invoices.parquet'
+    export.export(invoices, 'invoices', path, status='pending')
+    table = pq.read_table(path)
+    assert table.column('invoice_number').to_pylist() == ['INV-3\nsecond line', 'INV-1']
+    assert table.schema.field('amount').type == 'double'
@@ -0,0 +1,58 @@
+import random
+from datetime import date, timedelta
+
+from compliance import exposure
+from compliance.exposure import Exposure
+
+START = date(2025, 1, 1)
+
+
+def instruments(rng, ids):
+    for instrument_id in ids:
+        issued = START + timedelta(days=rng.randrange(400))
+        expires = issued + timedelta(days=rng.randrange(-10, 300))
+        yield (instrument_id, rng.randrange(1, 6), rng.randrange(1, 4), rng.randrange(1, 10**7),
+               issued.isoformat() if rng.random() < 0.9 else None,
+               expires.isoformat() if rng.random() < 0.95 else None)
+
+
+def naive(book, on, vendor_id=None, type_id=None):
+    hits = [amount for _, v, t, amount, issued, expires in book.values()
+            if expires and (not issued or issued <= on.isoformat()) and expires >= on.isoformat()
+            and (issued or '') <= expires and vendor_id in (None, v) and type_id in (None, t)]
+    return Exposure(len(hits), sum(hits))
+
+
+def naive_expiring(book, first, last, vendor_id=None):
+    return sorted((expires, i) for i, v, _, _, issued, expires in book.values()
+                  if expires and first.isoformat() <= expires <= last.isoformat() and (issued or '') <= expires
+                  and vendor_id in (None, v))
+
+
+def assert_matches(index, book, rng):
+    for _ in range(50):
+        on = START + timedelta(days=rng.randrange(-5, 720))
+        vendor_id, type_id = rng.choice((None, 1, 2, 3)), rng.choice((None, 1, 2))
+        assert index.exposure(on, vendor_id, type_id) == naive(book, on, vendor_id, type_id)
+        last = on + timedelta(days=rng.randrange(60))
+        assert [(e.expiry_date.isoformat(), e.id) for e in index.expiring(on, last, vendor_id)] == \
+            naive_expiring(book, on, last, vendor_id)
+
+
+def test_index_matches_naive_scan_through_writes():
+    rng = random.Random(21)
+    book = {row[0]: row for row in instruments(rng, range(1, 2001))}
+    index = exposure.ExposureIndex()
+    index.add_many(book.values())
+    assert_matches(index, book, rng)
+    for row in instruments(rng, rng.sample(range(1, 2500), 300)):
+        book[row[0]] = row
+        index.add(*row)
+    for instrument_id in rng.sample(sorted(book), 200):
+        del book[instrument_id]
+        index.remove(instrument_id)
+    assert_matches(index, book, rng)
+
+
+def test_month_ends():
+    assert exposure.month_ends(date(2025, 1, 15), 3) == [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31)]
@@ -0,0 +1,46 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from compliance import gst
+
+
+def test_breakup_matches_decimal():
+    rng = random.Random(24)
+    table = gst.RateTable({'84': Decimal(18), '8471': Decimal(12), '847130': Decimal(5), '99': Decimal(0)})
+    n = 3000
+    taxable = [rng.randrange(1, 10**7) for _ in range(n)]
+    hsn = [rng.choice(('84713010', '84715000', '84430000', '99871300')) for _ in range(n)]
+    rates = [rng.choice((28.0, float('nan'))) for _ in range(n)]
+    seller = [rng.choice(('07', '04')) for _ in range(n)]
+    buyer = [rng.choice(('07', '04', '27')) for _ in range(n)]
+    lines = gst.breakup(taxable, seller, buyer, hsn, table, rates)
+    exact = gst.breakup_exact(taxable, seller, buyer, hsn, table, rates)
+    cents = Decimal('0.01')
+    assert [(Decimal(int(r)) / 100, Decimal(int(c)) * cents, Decimal(int(s)) * cents, Decimal(int(i)) * cents)
+            for r, c, s, i in zip(lines.rate_bp, lines.cgst, lines.sgst, lines.igst)] == [tuple(t) for t in exact]
+    assert lines.utgst.tolist() == [s == b == '04' for s, b in zip(seller, buyer)]
+
+
+def test_half_paisa_rounds_up():
+    # 18% of Rs 0.25 is 4.5 paise: IGST 5 paise; CGST and SGST 2.25 paise each, so 2 each.
+    lines = gst.breakup([25, 25], ['07', '07'], ['27', '07'], rates=[18, 18])
+    assert lines.igst.tolist() == [5, 0] and lines.cgst.tolist() == [0, 2]
+
+
+def test_invoice_totals_round_to_the_rupee():
+    lines = gst.breakup([10050, 20000, 33333], '07', ['27', '27', '07'], rates=[18, 18, 5])
+    totals = gst.invoice_totals(lines, [1, 1, 2])
+    assert totals.total.tolist() == [35459, 34999]
+    assert totals.payable.tolist() == [35500, 35000]
+    assert totals.round_off.tolist() == [41, 1]
+
+
+def test_longest_prefix_and_unknown_codes():
+    table = gst.RateTable({'84': Decimal(18), '8471': Decimal(12)})
+    assert table.rate('8471 30 10') == Decimal(12)
+    assert table.rate('8443') == Decimal(18)
+    assert table.rate('1001') is None
+    with pytest.raises(ValueError):
+        gst.breakup([100], '07', '07', ['1001'], table)
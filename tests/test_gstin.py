@@ -0,0 +1,23 @@
+from compliance import gstin
+
+VALID = '27AAPFU0939F1ZV'
+
+
+def test_check_digit():
+    assert gstin.check_digit(VALID[:14]) == 'V'
+
+
+def test_check_gstins_flags_each_error():
+    bad_digit = VALID[:14] + 'A'
+    bad_state = '41AAPFU0939F1Z' + gstin.check_digit('41AAPFU0939F1Z')
+    checked = gstin.check_gstins([VALID, ' ' + VALID + ' ', bad_digit, bad_state, 'not a gstin', None])
+    assert checked.valid.tolist() == [True, True, False, False, False, False]
+    assert checked.errors.tolist() == [0, 0, gstin.ERR_CHECKSUM, gstin.ERR_STATE, gstin.ERR_FORMAT, 0]
+    assert checked.pan[0] == b'AAPFU0939F'
+
+
+def test_validate_vendors_consistency():
+    errors = gstin.validate_vendors([VALID, VALID, VALID], ['AAPFU0939F', 'AAPFU0939G', ''], ['27', '7', ''])
+    assert gstin.describe(int(errors[0])) == []
+    assert gstin.describe(int(errors[1])) == ['PAN does not match GSTIN', 'state_code does not match GSTIN']
+    assert errors[2] == 0
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from compliance import instruments
+from compliance.instruments import BankGuarantee
+
+BG, LC, NEFT, PFMS = 1, 2, 4, 9
+
+
+def bg(bank, margin, amount, status='active', vendor=1):
+    return BG, vendor, amount, status, json.dumps({'bank_name': bank, 'bg_number': f'BG-{bank}-{margin}',
+                                                   'margin_percent': margin})
+
+
+@pytest.fixture
+def treasury(mirror):
+    mirror.executemany('INSERT INTO financial_instruments (type_id, vendor_id, amount, status, details, title) '
+                       "VALUES (?, ?, ?, ?, ?, 'x')",
+                       [bg('SBI', 10, 1000), bg('SBI', '12.5', 2000), bg('HDFC', None, 500),
+                        bg('HDFC', 'nan', 700, status='expired'), bg('ICICI', 20, 300, vendor=2),
+                        (NEFT, 1, 50, 'approved', json.dumps({'utr': 12345678901234, 'channel': True})),
+                        (LC, 1, 10, 'pending', json.dumps({'lc_number': ['nested'], 'expiry_date': 2.0})),
+                        (PFMS, 1, 10, 'pending', '[1, 2]'), (LC, 1, 10, 'pending', 'not json')])
+    return mirror
+
+
+def test_triggers_match_a_python_decode(treasury):
+    assert instruments.check(treasury) == []
+    treasury.execute("UPDATE financial_instruments SET details = '{\"bank_name\": \"Axis\"}' WHERE id = 1")
+    treasury.execute('UPDATE financial_instruments SET type_id = ? WHERE id = 2', (NEFT,))
+    treasury.execute('DELETE FROM financial_instruments WHERE id = 3')
+    assert instruments.check(treasury) == []
+    assert [r.bank_name for r in instruments.records(treasury, BankGuarantee)] == ['Axis', 'HDFC', 'ICICI']
+
+
+def test_shred_rebuilds_the_side_tables(treasury):
+    for cls in instruments.DETAIL_CLASSES:
+        treasury.execute(f'DELETE FROM {cls.TABLE}')
+    assert instruments.check(treasury) != []
+    assert instruments.shred(treasury)['instrument_bank_guarantees'] == 5
+    assert instruments.check(treasury) == []
+    transfer = next(instruments.records(treasury, instruments.Transfer))
+    assert (transfer.utr, transfer.channel) == ('12345678901234', '1')
+
+
+def test_totals_match_a_naive_pass(treasury):
+    columns = instruments.load_columns(treasury, BankGuarantee)
+    recs = [(r.bank_name, r.margin_percent, *treasury.execute(
+        'SELECT status, vendor_id, amount FROM financial_instruments WHERE id = ?', (r.instrument_id,)).fetchone())
+        for r in instruments.records(treasury, BankGuarantee)]
+    naive = {}
+    for bank, margin, status, vendor, amount in recs:
+        if status == 'active' and isinstance(margin, float):
+            count, total = naive.get(bank, (0, 0))
+            naive[bank] = (count + 1, total + round(amount * 100 * margin / 100))
+    got = columns.totals_by('bank_name', statuses=['active'], weight='margin_percent')
+    assert {t.label: (t.instruments, t.amount_paise) for t in got} == naive
+    assert [t.label for t in columns.totals_by('bank_name', vendor_id=1)] == ['SBI', 'HDFC']
+    with pytest.raises(ValueError):
+        columns.totals_by('margin_percent')
@@ -0,0 +1,44 @@
+import json
+
+from compliance import lineitems
+
+
+def test_explode_reads_every_tax_shape():
+    items = json.dumps([
+        {'sku': 'A', 'hsn_sac_code': 84713010, 'qty': 2, 'rate': 1000.5, 'tax': {'type': 'IGST', 'rate': 18}},
+        {'sku': 'B', 'hsn': '9983', 'quantity': '3', 'taxable_value': 300, 'cgst_rate': 9, 'sgst_rate': 9,
+         'tax_amount': 54},
+        {'sku': 'C', 'qty': 4},
+        'not a line',
+    ])
+    a, b, c = lineitems.explode(items, amount=1000, valued=True)
+    assert (a.hsn_sac, a.taxable_paise, a.tax_rate, a.tax_paise, a.total_paise) == \
+        ('84713010', 200100, 18.0, 36018, 236118)
+    assert (b.sn, b.qty, b.tax_rate, b.tax_paise) == (2, 3.0, 18.0, 5400)
+    assert (c.sn, c.rate, c.taxable_paise, c.tax_paise) == (3, None, 66667, None)
+    assert lineitems.explode('{"sku": "A"}') is None and lineitems.explode('') == []
+
+
+def test_tax_on_rounds_half_up():
+    assert [lineitems.tax_on(p, 18) for p in (25, -25, 1000)] == [5, -5, 180]
+
+
+def test_incremental_normalize_keeps_lines_in_step(mirror):
+    mirror.executemany('INSERT INTO purchase_orders (vendor_id, po_number, items, amount, status) VALUES (?, ?, ?, ?, ?)',
+                       [(1, f'PO-{k}', json.dumps([{'sku': f'S{k}', 'qty': k + 1, 'rate': 10, 'gst_rate': 12}]),
+                         0, 'pending') for k in range(30)] + [(1, 'PO-bad', 'not json', 0, 'pending')])
+    mirror.execute('INSERT INTO delivery_challans (vendor_id, dc_number, items, status) VALUES (?, ?, ?, ?)',
+                   (1, 'DC-1', json.dumps([{'sku': 'S1', 'qty': 2}]), 'pending'))
+    run = lineitems.normalize(mirror)
+    assert run.undecodable == 1 and lineitems.check(mirror) == []
+
+    mirror.execute("UPDATE purchase_orders SET items = ?, updated_at = CURRENT_TIMESTAMP WHERE po_number = 'PO-3'",
+                   (json.dumps([{'sku': 'X', 'qty': 1, 'rate': 5}, {'sku': 'Y', 'qty': 1, 'rate': 6}]),))
+    mirror.execute("UPDATE purchase_orders SET status = 'approved' WHERE po_number = 'PO-4'")
+    mirror.execute("DELETE FROM purchase_orders WHERE po_number = 'PO-5'")
+    mirror.execute("INSERT INTO purchase_orders (vendor_id, po_number, items, status, updated_at) "
+                   "VALUES (2, 'PO-old', '[{\"sku\": \"Z\", \"qty\": 1}]', 'pending', '2000-01-01 00:00:00')")
+    assert lineitems.check(mirror) != []
+    lineitems.normalize(mirror, incremental=True)
+    assert lineitems.check(mirror) == []
+    assert [line.sku for line in lineitems.lines(mirror, 'pos', 4)] == ['X', 'Y']
@@ -0,0 +1,41 @@
+import pytest
+
+from compliance import TEMPLATES_DIR, db, loader
+
+TEMPLATES = sorted(TEMPLATES_DIR.glob('*_import_template.csv'))
+
+
+def test_rows_upsert_with_exact_counts(mirror):
+    header = ['invoice_number', 'vendor_id', 'amount', 'status', 'due_date']
+    rows = [['INV-1', '1', '100', 'pending', '2025-10-15'], ['', '1', '5', 'pending', ''],
+            ['INV-2', '2', 'lots', 'pending', ''], ['INV-3', '', '', '', '']]
+    first = loader.load_rows(mirror, 'invoices', header, rows, batch_size=2)
+    assert (first.inserted, first.updated, first.skipped) == (2, 0, 1)
+    assert len(first.errors) == 1 and first.errors[0].startswith('Row 4:')
+    again = loader.load_rows(mirror, 'invoices', header, [['INV-1', '1', '250', 'approved', '']])
+    assert (again.inserted, again.updated) == (0, 1)
+    assert mirror.execute("SELECT amount, status FROM invoices WHERE invoice_number = 'INV-1'").fetchone() == \
+        (250, 'approved')
+    dry = loader.load_rows(mirror, 'invoices', header, [['INV-9', '1', '1', 'pending', '']], dry_run=True)
+    assert dry.dryRun and dry.inserted == 1
+    assert mirror.execute("SELECT count(*) FROM invoices WHERE invoice_number = 'INV-9'").fetchone()[0] == 0
+
+
+def test_main_reports_unknown_files_and_loads_the_rest(tmp_path, capsys):
+    path = tmp_path / 'mirror.sqlite'
+    with pytest.raises(SystemExit) as exit_info:
+        loader.main([str(path)] + [str(p) for p in TEMPLATES])
+    assert exit_info.value.code == 1
+    out, err = capsys.readouterr()
+    assert 'inventory_import_template.csv: cannot tell the entity' in err
+    assert out.count('"errors": []') == 5
+    conn = db.connect(str(path))
+    assert conn.execute('SELECT count(*) FROM invoices').fetchone()[0] == 2
+    conn.close()
+
+
+def test_entity_for_path():
+    assert loader.entity_for_path('x/po_import_template.csv') == 'pos'
+    assert loader.entity_for_path('Delivery_Challans.csv') == 'dcs'
+    with pytest.raises(ValueError):
+        loader.entity_for_path('inventory.csv')
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from compliance import matching
+
+
+def po(vendor, number, items, amount=0, status='pending'):
+    return vendor, number, json.dumps(items), amount, status
+
+
+@pytest.fixture
+def documents(mirror):
+    mirror.executemany('INSERT INTO purchase_orders (vendor_id, po_number, items, amount, status) '
+                       'VALUES (?, ?, ?, ?, ?)',
+                       [po(1, 'PO-1', [{'sku': 'A', 'qty': 10, 'rate': 100}, {'sku': 'B', 'qty': 5, 'rate': 20}]),
+                        po(2, 'PO-2', [{'sku': 'C', 'qty': 4}], amount=400),
+                        po(3, 'PO-3', [{'sku': 'D', 'qty': 2, 'rate': 50}]),
+                        po(3, 'PO-4', [{'sku': 'D', 'qty': 100, 'rate': 1}], status='rejected')])
+    mirror.executemany('INSERT INTO delivery_challans (vendor_id, dc_number, items, status) VALUES (?, ?, ?, ?)',
+                       [(1, 'DC-1', json.dumps([{'sku': 'A', 'qty': 10}, {'sku': 'B', 'qty': 3}]), 'pending'),
+                        (2, 'DC-2', json.dumps([{'sku': 'C', 'qty': 4}]), 'pending'),
+                        (3, 'DC-3', json.dumps([{'sku': 'D', 'qty': 3}]), 'pending')])
+    mirror.executemany('INSERT INTO invoices (vendor_id, invoice_number, amount, status) VALUES (?, ?, ?, ?)',
+                       [(1, 'INV-1', 1060, 'pending'), (2, 'INV-2', 500, 'pending'), (3, 'INV-3', 150, 'pending')])
+    return mirror
+
+
+def test_three_way_match(documents):
+    run = matching.match(documents)
+    assert run.statuses == {'matched': 1, 'short': 1, 'over_billed': 1}
+    assert [(v.vendor_id, v.delivered_paise, v.status) for v in matching.vendor_matches(documents)] == [
+        (1, 106000, 'short'), (2, 40000, 'over_billed'), (3, 15000, 'matched')]
+    assert [(m.sku, m.status) for m in matching.line_matches(documents)] == [
+        ('A', 'matched'), ('B', 'short'), ('C', 'matched'), ('D', 'over_delivered')]
+    assert matching.vendor_matches(documents, vendor_id=2)[0].amount_variance == 100
+
+
+def test_incremental_agrees_with_full(documents):
+    matching.match(documents)
+    documents.execute("UPDATE delivery_challans SET items = ?, updated_at = CURRENT_TIMESTAMP WHERE dc_number = 'DC-1'",
+                      (json.dumps([{'sku': 'A', 'qty': 10}, {'sku': 'B', 'qty': 5}]),))
+    documents.execute("INSERT INTO invoices (vendor_id, invoice_number, amount, status) VALUES (3, 'INV-4', 90, 'pending')")
+    documents.execute("DELETE FROM invoices WHERE invoice_number = 'INV-2'")
+    run = matching.match(documents, incremental=True)
+    assert run.mode == 'incremental' and run.vendors == 3
+    incremental = matching.vendor_matches(documents), matching.line_matches(documents)
+    matching.match(documents)
+    assert (matching.vendor_matches(documents), matching.line_matches(documents)) == incremental
+    assert [v.status for v in incremental[0]] == ['matched', 'matched', 'over_billed']
@@ -0,0 +1,33 @@
+import zipfile
+
+from compliance import package
+
+
+def test_rebuild_reuses_unchanged_members(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # member names are the paths as given
+    a, b = tmp_path / 'a.csv', tmp_path / 'b.json'
+    a.write_text('x,y\n1,2\n')
+    b.write_text('{"k": 1}\n')
+    out = tmp_path / 'out.zip'
+    first = package.build_package(out, ['a.csv', 'b.json', 'gone.csv'], {'README.txt': 'hi'})
+    assert first.compressed == ['a.csv', 'b.json', 'README.txt'] and first.missing == ['gone.csv']
+    snapshot = out.read_bytes()
+
+    again = package.build_package(out, ['a.csv', 'b.json'], {'README.txt': 'hi'})
+    assert again.unchanged and out.read_bytes() == snapshot
+
+    b.write_text('{"k": 2}\n')
+    changed = package.build_package(out, ['a.csv', 'b.json'], {'README.txt': 'hi'})
+    assert changed.reused == ['a.csv', 'README.txt'] and changed.compressed == ['b.json']
+    full = tmp_path / 'full.zip'
+    package.build_package(full, ['a.csv', 'b.json'], {'README.txt': 'hi'}, full=True)
+    assert out.read_bytes() == full.read_bytes()
+    with zipfile.ZipFile(out) as zf:
+        assert zf.read('b.json') == b'{"k": 2}\n'
+
+
+def test_write_if_changed(tmp_path):
+    path = tmp_path / 'f.txt'
+    assert package.write_if_changed(path, 'one')
+    assert not package.write_if_changed(path, 'one')
+    assert package.write_if_changed(path, b'two') and path.read_bytes() == b'two'
@@ -0,0 +1,58 @@
+import random
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from compliance import penalty
+from compliance.penalty import PenaltyEngine, RateCurve
+
+
+def test_parse_rate():
+    assert penalty.parse_rate('18% p.a.')[1:] == (Decimal('0.18'), penalty.ANNUAL, None)
+    assert penalty.parse_rate('1.5% p.m.')[1:] == (Decimal('0.015'), penalty.MONTHLY, None)
+    assert penalty.parse_rate('Bank Rate+2%')[1:] == (Decimal('0.02'), penalty.ANNUAL, 'bank_rate')
+    with pytest.raises(ValueError):
+        penalty.parse_rate('a lot')
+
+
+@pytest.mark.parametrize('text', ['18% p.a.', '1.5% p.m.', 'Base+2%'])
+def test_vectorized_matches_decimal(text):
+    rng = random.Random(6)
+    rule = penalty.parse_rate(text)
+    engine = PenaltyEngine({'base': RateCurve(['2025-01-01', '2025-06-15', '2025-09-01'], ['0.09', '0.0925', '0.085'])})
+    amounts = [Decimal(rng.randrange(100, 10**8)) / 100 for _ in range(2000)]
+    days = [rng.randrange(-5, 400) for _ in amounts]
+    start = [np.datetime64('2025-01-01') + rng.randrange(300) for _ in amounts]
+    got = engine.accrue(rule, [float(a) for a in amounts], days, start)
+    want = engine.accrue_exact(rule, amounts, days, start)
+    assert got.tolist() == [float(w) for w in want]
+
+
+def test_floating_rate_changes_mid_window():
+    engine = PenaltyEngine({'base': RateCurve(['2025-01-01', '2025-01-11'], ['0.0365', '0.073'])})
+    rule = penalty.parse_rate('Base+0%')
+    # 10 days at 1 paisa a day per Rs 100, then 10 at 2 paise: Rs 0.30 on Rs 100.
+    assert engine.accrue(rule, [100], [20], ['2025-01-01']).tolist() == [0.3]
+
+
+def test_months_or_part():
+    rule = penalty.parse_rate('1.5% p.m.')
+    engine = PenaltyEngine()
+    # 31 Jan to 1 Mar touches February and part of March: two months.
+    assert engine.accrue(rule, [1000], [29], ['2025-01-31']).tolist() == [30.0]
+
+
+def test_half_paisa_rounds_up():
+    # 1.5% of Rs 75 is Rs 1.125: half-up gives 1.13 where half-to-even would give 1.12.
+    engine = PenaltyEngine()
+    rule = penalty.parse_rate('1.5% p.m.')
+    assert engine.accrue(rule, [75, 175, -75], [1, 1, 1], ['2025-01-01'] * 3).tolist() == [1.13, 2.63, -1.13]
+    assert engine.accrue_exact(rule, [75, 175, -75], [1, 1, 1], ['2025-01-01'] * 3) == \
+        [Decimal('1.13'), Decimal('2.63'), Decimal('-1.13')]
+
+
+def test_cli_curve_names_match_parse_rate(capsys):
+    penalty.main(['--curve', 'Bank Rate=0.0365', 'Government Contract', '36500', '10'])
+    # Bank rate 3.65% + 2% on Rs 36,500 for 10 days: Rs 56.50.
+    assert capsys.readouterr().out == 'Government Contract (Bank Rate+2%): 56.50\n'
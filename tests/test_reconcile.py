@@ -0,0 +1,39 @@
+import random
+from itertools import combinations
+
+from compliance import reconcile
+
+
+def brute_subset_size(values, target, tolerance, max_items):
+    """Fewest of 2..max_items values summing to target within tolerance, or None."""
+    for size in range(2, max_items + 1):
+        if any(abs(sum(c) - target) <= tolerance for c in combinations(values, size)):
+            return size
+    return None
+
+
+def test_subset_against_brute_force():
+    rng = random.Random(18)
+    for _ in range(300):
+        values = [rng.randrange(1, 50) * 100 for _ in range(rng.randint(2, 9))]
+        target = rng.randrange(100, 20000)
+        tolerance = rng.choice((0, 100, 250))
+        picked = reconcile._subset(values, target, tolerance, 4, 10**6)
+        want = brute_subset_size(values, target, tolerance, 4)
+        if want is None:
+            assert picked is None
+        else:
+            assert len(picked) == want and len(set(picked)) == want
+            assert abs(sum(values[k] for k in picked) - target) <= tolerance
+
+
+def test_reconcile_exact_and_subset(mirror):
+    mirror.executemany('INSERT INTO invoices (id, vendor_id, invoice_number, amount, status, due_date) '
+                       "VALUES (?, 1, ?, ?, 'pending', '2025-05-01')",
+                       [(1, 'INV-1', 1000), (2, 'INV-2', 300), (3, 'INV-3', 450)])
+    mirror.executemany("INSERT INTO payments (id, vendor_id, amount, status, created_at) "
+                       "VALUES (?, 1, ?, 'done', '2025-05-02')", [(1, 1000), (2, 750)])
+    result = reconcile.reconcile(mirror)
+    assert result.unapplied == 0
+    applied = sorted(mirror.execute('SELECT payment_id, invoice_id, amount_paise, method FROM payment_applications'))
+    assert applied == [(1, 1, 100000, 'exact'), (2, 2, 30000, 'subset'), (2, 3, 45000, 'subset')]
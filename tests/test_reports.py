@@ -0,0 +1,52 @@
+from datetime import date
+
+from compliance import reports
+
+
+def write_everything(conn):
+    conn.executemany("INSERT INTO vendors (id, company_name, status) VALUES (?, ?, ?)",
+                     [(1, 'Alpha Traders', 'approved'), (2, 'Beta Steels', 'pending')])
+    conn.executemany('INSERT INTO invoices (vendor_id, invoice_number, amount, status, due_date) VALUES (?, ?, ?, ?, ?)',
+                     [(1, 'A-1', 1000.5, 'pending', '2025-09-20'), (1, 'A-2', 200, 'approved', '2025-06-01'),
+                      (2, 'B-1', 300, 'pending', None), (2, 'B-2', 400, 'paid', '2025-01-01')])
+    conn.executemany("INSERT INTO payments (vendor_id, amount, status) VALUES (?, ?, ?)",
+                     [(1, 500, 'pending'), (2, 250.25, 'done')])
+    conn.executemany('INSERT INTO financial_instruments (type_id, title, vendor_id, amount, status) '
+                     'VALUES (?, ?, ?, ?, ?)', [(1, 'BG', 1, 10000, 'active'), (2, 'LC', 2, 5000, 'pending')])
+    conn.execute("UPDATE invoices SET status = 'approved', amount = 350 WHERE invoice_number = 'B-1'")
+    conn.execute("UPDATE payments SET status = 'done' WHERE vendor_id = 1")
+    conn.execute("UPDATE financial_instruments SET status = 'active' WHERE title = 'LC'")
+    conn.execute("DELETE FROM invoices WHERE invoice_number = 'A-2'")
+    conn.execute("DELETE FROM vendors WHERE id = 2")
+
+
+def test_triggers_keep_summaries_consistent(mirror):
+    write_everything(mirror)
+    assert reports.check(mirror) == []
+    assert reports.summary(mirror) == {'vendor_count': 1, 'vendor_pending': 0, 'payments_pending': 0,
+                                       'payments_done': 2, 'instruments_active': 2}
+    assert reports.status_totals(mirror)['payments']['done'].amount_paise == 75025
+
+
+def test_rebuild_repairs_drift(mirror):
+    write_everything(mirror)
+    mirror.execute('DELETE FROM report_status_totals')
+    assert reports.check(mirror)
+    reports.rebuild(mirror)
+    assert reports.check(mirror) == []
+
+
+def test_ap_ageing_buckets(mirror):
+    write_everything(mirror)
+    rows = {r.vendor_id: r for r in reports.ap_ageing(mirror, as_of=date(2025, 10, 1))}
+    assert rows[1].d1_30 == 100050 and rows[1].total == 100050
+    assert rows[2].no_due_date == 35000 and rows[2].invoices == 1
+
+
+def test_ap_ageing_keeps_unreadable_due_dates(mirror):
+    mirror.executemany('INSERT INTO invoices (vendor_id, invoice_number, amount, status, due_date) VALUES (?, ?, ?, ?, ?)',
+                       [(7, 'INV-a', 100, 'pending', '2025-09-30'), (7, 'INV-b', 200, 'approved', '31/08/2025'),
+                        (7, 'INV-c', 300, 'pending', 'soon'), (7, 'INV-d', 400, 'pending', None)])
+    [row] = reports.ap_ageing(mirror, as_of=date(2025, 10, 1), vendor_id=7)
+    assert (row.invoices, row.d1_30, row.invalid_due_date, row.no_due_date) == (4, 10000, 50000, 40000)
+    assert row.total == 100000
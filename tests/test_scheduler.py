@@ -0,0 +1,76 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from compliance import scheduler, tds
+from compliance.scheduler import ReminderScheduler
+
+
+def test_rules_default_to_the_documented_ladder():
+    rules = scheduler.load_rules()
+    assert {rule.offsets for rule in rules.values()} == {scheduler.DOCUMENTED_OFFSETS}
+    matrix = scheduler.load_rules(offsets=None)
+    assert matrix['Purchase Order'].offsets == (-5, -2, 0, 7)
+    assert matrix['TDS Payment'].offsets == (-5, -2, 0, 3)
+    assert rules['GST Return'].due_date(date(2025, 1, 31)) == date(2025, 2, 20)
+    assert rules['EMI Payment'].due_date(date(2025, 1, 31)) == date(2025, 2, 28)
+
+
+def test_heap_fires_what_a_rescan_finds():
+    rules = scheduler.load_rules()
+    rng = random.Random(5)
+    book = [(f'doc:{k}', rng.choice(list(rules)), None, date(2025, 10, 1) + timedelta(days=rng.randrange(90)))
+            for k in range(2000)]
+    timeline = ReminderScheduler(rules)
+    timeline.add_many(book)
+    start = datetime(2025, 11, 1)
+    timeline.skip_past(start)
+    for key, *_ in book[:100]:
+        timeline.remove(key)
+    fired = sorted((e.fire_at, e.key, e.label) for e in timeline.fire_until(start + timedelta(days=10)))
+    naive = sorted((datetime.combine(rules[doc].due_date(base) + timedelta(days=off), timeline.fire_time),
+                    key, scheduler.DueRule.label(off))
+                   for key, doc, _, base in book[100:] for off in rules[doc].offsets
+                   if start < datetime.combine(rules[doc].due_date(base) + timedelta(days=off), timeline.fire_time)
+                   <= start + timedelta(days=10))
+    assert fired == naive and fired
+
+
+def test_tds_deposits_from_the_ledger(mirror):
+    mirror.executemany('INSERT INTO payments (vendor_id, tds_section, amount, status, created_at) '
+                       'VALUES (?, ?, ?, ?, ?)',
+                       [(1, '194C', 40000, 'done', '2025-06-03 10:00:00'), (2, '194J', 50000, 'done', '2025-06-20'),
+                        (1, '194C', 10000, 'done', '2025-07-01'), (3, '194J', 90000, 'done', '2026-03-15')])
+    tds.record(mirror)
+    tds_obligations = [ob for ob in scheduler.obligations_from_db(mirror) if ob[1] == 'TDS Payment']
+    assert tds_obligations == [('tds:194C:2025-06', 'TDS Payment', date(2025, 7, 7), None),
+                               ('tds:194J:2025-06', 'TDS Payment', date(2025, 7, 7), None),
+                               ('tds:194J:2026-03', 'TDS Payment', date(2026, 4, 30), None)]
+
+
+def test_cli_offsets(mirror, capsys):
+    path = mirror.execute('PRAGMA database_list').fetchone()[2]
+    mirror.execute("INSERT INTO invoices (invoice_number, status, due_date) VALUES ('INV-1', 'pending', '2025-10-10')")
+    scheduler.main(['--db', path, '--now', '2025-10-05T00:00', '--hours', '24'])
+    assert capsys.readouterr().out == '2025-10-05T09:00:00  T-5 Tax Invoice: invoice:1 due 2025-10-10\n'
+    scheduler.main(['--db', path, '--now', '2025-10-07T12:00', '--hours', '24', '--offsets', 'matrix'])
+    assert capsys.readouterr().out == '2025-10-08T09:00:00  T-2 Tax Invoice: invoice:1 due 2025-10-10\n'
+    scheduler.main(['--db', path, '--now', '2025-10-11T00:00', '--hours', '24', '--offsets=-3,0,1'])
+    assert capsys.readouterr().out == '2025-10-11T09:00:00  T+1 Tax Invoice: invoice:1 due 2025-10-10\n'
+    with pytest.raises(SystemExit):
+        scheduler.main(['--db', path, '--offsets', 'soon'])
+
+
+def test_malformed_dates_are_skipped_and_reported(mirror, capsys):
+    path = mirror.execute('PRAGMA database_list').fetchone()[2]
+    mirror.executemany('INSERT INTO invoices (invoice_number, status, due_date) VALUES (?, ?, ?)',
+                       [('INV-1', 'pending', '31/08/2025'), ('INV-2', 'pending', '2025-10-10')])
+    mirror.execute("INSERT INTO purchase_orders (po_number, status, created_at) VALUES ('PO-1', 'approved', 'junk')")
+    invalid = []
+    assert [ob[0] for ob in scheduler.obligations_from_db(mirror, invalid)] == ['invoice:2']
+    assert invalid == ['invoice:1', 'po:1']
+    scheduler.main(['--db', path, '--now', '2025-10-05T00:00', '--hours', '24'])
+    out = capsys.readouterr()
+    assert out.out == '2025-10-05T09:00:00  T-5 Tax Invoice: invoice:2 due 2025-10-10\n'
+    assert out.err == '2 obligation(s) skipped, date is not YYYY-MM-DD: invoice:1, po:1\n'
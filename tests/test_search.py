@@ -0,0 +1,41 @@
+import pytest
+
+from compliance import search
+
+
+@pytest.fixture
+def vendors(mirror):
+    mirror.executemany('INSERT INTO vendors (id, company_name, legal_name, gstin, status) VALUES (?, ?, ?, ?, ?)',
+                       [(1, 'Balaji Steels', 'Shree Balaji Steels Pvt Ltd', None, 'approved'),
+                        (2, 'Steel Balaji Works', None, None, 'pending'),
+                        (3, 'Krishna Traders', 'Krishna Trading Co', '27AAPFU0939F1ZV', 'approved'),
+                        (4, 'Balajee Steel', None, None, 'approved')])
+    return mirror
+
+
+def test_lookup_ranks_prefix_of_company_name_first(vendors):
+    assert [h.id for h in search.lookup(vendors, 'bala ste')] == [1, 4, 2]
+    assert [h.id for h in search.lookup(vendors, 'balaji', status='pending')] == [2]
+    assert [h.id for h in search.lookup(vendors, '27AAPFU')] == [3]
+    assert search.lookup(vendors, 'b') == []
+
+
+def test_index_follows_writes(vendors):
+    vendors.execute("UPDATE vendors SET company_name = 'Ganesh Steels' WHERE id = 4")
+    vendors.execute('DELETE FROM vendors WHERE id = 2')
+    assert [h.id for h in search.lookup(vendors, 'steel')] == [1, 4]
+    search.check(vendors)
+
+
+def test_search_clause(vendors):
+    clause, params = search.search_clause('kri trad')
+    ids = [r[0] for r in vendors.execute(f'SELECT id FROM vendors WHERE {clause}', params)]
+    assert ids == [3]
+    assert search.search_clause('  ') == (None, [])
+
+
+def test_status_filter_reaches_past_newer_matches(vendors, monkeypatch):
+    monkeypatch.setattr(search, 'RANK_WINDOW', 2)
+    vendors.executemany("INSERT INTO vendors (id, company_name, status) VALUES (?, 'Steel Depot', 'pending')",
+                        [(5,), (6,)])
+    assert sorted(h.id for h in search.lookup(vendors, 'steel', status='approved')) == [1, 4]
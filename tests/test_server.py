@@ -0,0 +1,61 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from compliance import db, server
+
+
+@pytest.fixture
+def base_url(tmp_path):
+    """A mirror server on a free port; the connection lives in the serving thread."""
+    ready, stop = threading.Event(), threading.Event()
+    state = {}
+
+    def serve():
+        conn = db.open_mirror(str(tmp_path / 'mirror.sqlite'))
+        httpd = server.make_server(conn, port=0)
+        httpd.timeout = 0.05
+        state['port'] = httpd.server_address[1]
+        ready.set()
+        while not stop.is_set():
+            httpd.handle_request()
+        httpd.server_close()
+        conn.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    ready.wait(5)
+    yield f'http://127.0.0.1:{state["port"]}'
+    stop.set()
+    thread.join(5)
+
+
+def call(url, method='GET', body=None, level=None):
+    request = urllib.request.Request(url, method=method, data=None if body is None else json.dumps(body).encode())
+    if level is not None:
+        request.add_header('x-user-level', str(level))
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.load(exc)
+
+
+def test_create_list_and_summary(base_url):
+    assert call(f'{base_url}/api/vendors', 'POST', {'company_name': 'Alpha'}, level=1)[0] == 403
+    status, created = call(f'{base_url}/api/vendors', 'POST', {'company_name': 'Alpha Traders'}, level=2)
+    assert status == 200 and created['data']['company_name'] == 'Alpha Traders'
+    status, page = call(f'{base_url}/api/vendors?size=10')
+    assert page['data']['total'] == 1 and page['data']['items'][0]['id'] == created['data']['id']
+    assert call(f'{base_url}/api/reports/summary')[1]['data']['vendor_count'] == 1
+    assert [h['id'] for h in call(f'{base_url}/api/vendors/lookup?q=alpha')[1]['data']] == [created['data']['id']]
+
+
+def test_errors(base_url):
+    assert call(f'{base_url}/api/nothing')[0] == 404
+    assert call(f'{base_url}/api/invoices/99')[0] == 404
+    assert call(f'{base_url}/api/invoices?cursor=junk')[0] == 400
+    assert call(f'{base_url}/api/invoices', 'POST', {}, level=2)[1]['error']['message'] == 'invoice_number required'
@@ -0,0 +1,45 @@
+import math
+import random
+
+import pytest
+
+from compliance import tables
+
+pd = pytest.importorskip('pandas')
+
+CASES = [
+    [{'a': 1.0}, {'a': 2}],
+    [{'a': 1}, {'a': 2.5}],
+    [{'a': 1}, {'a': float('nan')}, {'a': 3}],
+    [{'a': 'x', 'b': float('nan')}, {'a': float('nan'), 'b': 'y'}],
+    [{'a': 1, 'b': None}, {'c': True}, {'a': 3, 'b': None, 'c': False}],
+    [{'a': True}, {'a': 1}, {'a': 2.0}],
+    [{'Reminder_Days': [25, 28, 30, 37], 'Note': 'say "hi", then\nleave'}],
+    [{'a': 0.1}, {'a': 1e20}, {'a': -0.0}, {'a': float('inf')}, {'a': 123456789.123}],
+]
+
+
+def pandas_csv(records):
+    return pd.DataFrame(records).to_csv(index=False)
+
+
+@pytest.mark.parametrize('records', CASES)
+def test_matches_pandas(records):
+    assert tables.to_csv(records) == pandas_csv(records)
+
+
+def test_random_records_match_pandas():
+    rng = random.Random(4)
+    pool = [None, 0, 7, -3, 2.5, 1e-7, float('nan'), True, 'text', 'a,b', '', [1, 2]]
+    for _ in range(300):
+        keys = rng.sample('abcd', rng.randrange(1, 5))
+        records = [{k: rng.choice(pool) for k in keys if rng.random() < 0.8} for _ in range(rng.randrange(1, 6))]
+        if not any(records):
+            continue
+        assert tables.to_csv(records) == pandas_csv(records), records
+
+
+def test_writes_to_a_file(tmp_path):
+    path = tmp_path / 'out.csv'
+    assert tables.to_csv(iter([{'x': 1}, {'y': math.pi}]), path) is None
+    assert path.read_text() == pandas_csv([{'x': 1}, {'y': math.pi}])
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from compliance import taxslabs
+
+
+@pytest.fixture(scope='module')
+def regimes():
+    return taxslabs.load_regimes()
+
+
+def test_87a_marginal_relief(regimes):
+    new = regimes['NEW_TAX_REGIME_2025']
+    net = new.liability([1200000, 1200100, 1275000, 1500000]).net
+    # Tax just above the rebate limit is capped at the income above it.
+    assert net.tolist() == [0.0, 100.0, 71250.0, 105000.0]
+
+
+def test_vectorized_matches_per_row(regimes):
+    incomes = np.random.default_rng(1).integers(0, 5_000_000, 2000)
+    for table in regimes.values():
+        assert table.liability(incomes).net.tolist() == pytest.approx([table.liability_py(x) for x in incomes])
+
+
+def test_compare_regimes_picks_the_cheaper(regimes):
+    result = taxslabs.compare_regimes([1275000, 3000000], regimes)
+    cheapest = result.net.min(axis=0)
+    assert result.net[result.best, [0, 1]].tolist() == cheapest.tolist()
+    assert (result.saving >= 0).all()
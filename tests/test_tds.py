@@ -0,0 +1,77 @@
+import random
+from datetime import date
+
+import pytest
+
+from compliance import listing, tds
+
+
+def insert_payments(conn, rows):
+    conn.executemany('INSERT INTO payments (vendor_id, tds_section, amount, status, created_at) '
+                     'VALUES (?, ?, ?, ?, ?)', rows)
+
+
+def test_single_then_aggregate_catch_up(mirror):
+    # 194C: single payments above 30,000, or once the year passes 1,00,000, at 2%.
+    insert_payments(mirror, [(1, '194C', 25000, 'pending', '2025-05-01'),
+                             (1, '194C', 40000, 'approved', '2025-06-01'),
+                             (1, '194C', 50000, 'done', '2025-07-01'),
+                             (1, '194C', 1000, 'done', '2025-08-01'),
+                             (1, None, 99999, 'done', '2025-08-01'),
+                             (2, '194J', 31000, 'rejected', '2026-02-01')])
+    decisions = tds.record(mirror)
+    assert [(d.base_paise, d.tds_paise, d.reason) for d in decisions] == [
+        (0, 0, 'below_threshold'), (4000000, 80000, 'single'), (7500000, 150000, 'aggregate'),
+        (100000, 2000, 'aggregate'), (0, 0, 'no_section'), (0, 0, 'not_counted')]
+    assert tds.TdsEngine.load(mirror).totals(1, '194C', 2025) == tds.Totals(4, 11600000, 11600000, 232000, 4)
+
+
+def test_record_matches_recompute(mirror):
+    rng = random.Random(25)
+    engine = tds.TdsEngine.load(mirror)
+    for month in list(range(4, 13)) + [1, 2, 3]:
+        year = 2025 if month >= 4 else 2026
+        insert_payments(mirror, [(rng.randrange(1, 30), rng.choice(('194C', '194J', '194C', None, '194Q')),
+                                  round(rng.uniform(500, 60000), 2), rng.choice(('pending', 'done', 'rejected')),
+                                  f'{year}-{month:02d}-{rng.randrange(1, 28):02d}') for _ in range(80)])
+        tds.record(mirror, engine)
+    ledger = [tds.Decision._make(r) for r in mirror.execute(
+        f'SELECT {", ".join(tds._LEDGER_COLUMNS)} FROM tds_ledger ORDER BY payment_id')]
+    decisions, _ = tds.recompute(mirror, 2025)
+    assert decisions == ledger
+    assert any(d.reason == 'aggregate' for d in decisions) and any(d.reason == 'single' for d in decisions)
+    assert tds.check(mirror, 2025) == []
+
+
+def test_check_reports_drift_and_recompute_clears_it(mirror):
+    insert_payments(mirror, [(1, '194J', 35000, 'done', '2025-05-01'), (1, '194J', 5000, 'done', '2025-06-01')])
+    tds.record(mirror)
+    mirror.execute("UPDATE payments SET status = 'rejected' WHERE id = 1")
+    assert {m.kind for m in tds.check(mirror, 2025)} == {'payment', 'accumulator'}
+    tds.recompute(mirror, 2025, write=True)
+    assert tds.check(mirror, 2025) == []
+
+
+def test_payment_writes_carry_the_section(mirror):
+    store = listing.ListStore(mirror)
+    taxed = store.create('payments', {'invoice_ref': 'INV-1', 'vendor_id': 1, 'amount': 45000, 'tds_section': ' 194C'})
+    plain = store.create('payments', {'invoice_ref': 'INV-2', 'vendor_id': 1, 'amount': 45000, 'tds_section': ''})
+    assert (taxed['tds_section'], plain['tds_section']) == ('194C', None)
+    with pytest.raises(ValueError, match='Unknown tds_section 194Z'):
+        store.update('payments', plain['id'], {'tds_section': '194Z'})
+    assert [(d.tds_paise, d.reason) for d in tds.record(mirror)] == [(90000, 'single'), (0, 'no_section')]
+
+
+def test_unreadable_created_at_is_recorded_without_a_year(mirror):
+    insert_payments(mirror, [(1, '194C', 45000, 'done', None), (1, '194C', 45000, 'done', ''),
+                             (1, '194C', 45000, 'done', '31/08/2025'), (1, '194C', 45000, 'done', '2025-13-01')])
+    assert [(d.fy, d.reason) for d in tds.record(mirror)] == [(None, 'invalid_date')] * 4
+    insert_payments(mirror, [(1, '194C', 45000, 'done', '2025-08-01 10:00:00')])
+    assert [(d.fy, d.tds_paise, d.reason) for d in tds.record(mirror)] == [(2025, 90000, 'single')]
+    assert tds.check(mirror, 2025) == []
+
+
+def test_financial_year():
+    assert tds.financial_year(date(2026, 3, 31)) == 2025
+    assert tds.financial_year(date(2026, 4, 1)) == 2026
+    assert tds.fy_label(2025) == '2025-26'
@@ -0,0 +1,36 @@
+from decimal import Decimal
+from datetime import date
+
+from compliance import validator
+from compliance.validator import DocumentSchema, FieldSpec
+
+SCHEMA = DocumentSchema('PO', [FieldSpec('po_number', 'Alphanumeric', True, 20),
+                               FieldSpec('po_date', 'Date', True, None),
+                               FieldSpec('total_amount', 'Decimal', False, None),
+                               FieldSpec('currency', 'Dropdown', True, None),
+                               FieldSpec('remarks', 'Text', False, 5)])
+
+
+def test_compiled_validator_reports_every_error():
+    v = validator.compile_validator(SCHEMA, ['currency', 'po_number', 'po_date', 'total_amount', 'remarks'],
+                                    {'currency': ['INR', 'USD']})
+    assert v(['INR', 'PO/2025-26/0001', '2025-04-01', '1200.50', '']) == (
+        ('PO/2025-26/0001', date(2025, 4, 1), Decimal('1200.50'), 'INR', None), [])
+    values, errors = v(['EUR', '', '2025-13-01', 'NaN', 'too long'])
+    assert values == (None, None, None, 'EUR', 'too long')
+    assert errors == ['po_number: required', 'po_date: not a date (YYYY-MM-DD)',
+                      'total_amount: not a decimal number', 'currency: not an allowed value',
+                      'remarks: longer than 5 characters']
+
+
+def test_missing_required_column_fails_every_row():
+    v = validator.compile_validator(SCHEMA, ['po_number', 'currency'])
+    rows = list(validator.validate_rows(v, [['PO-1', 'INR'], [], ['PO-2']]))
+    assert [r.line for r in rows] == [2, 4]
+    assert rows[1].errors == ['po_date: missing column', 'currency: required']
+
+
+def test_shipped_schemas_load():
+    schemas = validator.load_schemas()
+    assert 'PURCHASE_ORDER' in schemas
+    assert all(f.data_type in validator.TYPES for s in schemas.values() for f in s.fields)
@@ -0,0 +1,41 @@
+import io
+import zipfile
+
+import pytest
+
+from compliance import zipstream
+
+
+@pytest.fixture
+def members(tmp_path):
+    text = b''.join(b'row %d,INV-%d,%d\n' % (k, k % 97, k * 7) for k in range(20000))
+    paths = {'data.csv': text, 'empty.txt': b'', 'photo.png': bytes(range(256)) * 40}
+    for name, data in paths.items():
+        (tmp_path / name).write_bytes(data)
+    return [(name, str(tmp_path / name)) for name in paths], paths
+
+
+def build(members, jobs):
+    out = io.BytesIO()
+    with zipstream.ZipStreamWriter(out) as writer:
+        zipstream.write_files(writer, members, jobs=jobs, chunk_size=64 * 1024)
+    return out.getvalue()
+
+
+def test_output_is_independent_of_workers_and_readable(members):
+    members, contents = members
+    single = build(members, 1)
+    assert build(members, 3) == single
+    with zipfile.ZipFile(io.BytesIO(single)) as zf:
+        assert zf.testzip() is None
+        assert {i.filename: zf.read(i) for i in zf.infolist()} == contents
+        assert zf.getinfo('photo.png').compress_type == zipfile.ZIP_STORED
+        assert {i.date_time for i in zf.infolist()} == {zipstream.FIXED_DATE_TIME}
+
+
+def test_write_bytes_round_trip():
+    out = io.BytesIO()
+    with zipstream.ZipStreamWriter(out) as writer:
+        writer.write_bytes('a/b.txt', 'नमस्ते'.encode())
+    with zipfile.ZipFile(io.BytesIO(out.getvalue())) as zf:
+        assert zf.read('a/b.txt').decode() == 'नमस्ते'
@@ -97,6 +97,34 @@ const normalizeStatus = (val) => {
   return mapped;
 };
 
+// Vendor search: every word typed becomes a prefix query on vendors_fts
+// (migrations/0018_vendor_search.sql), the same as compliance/search.py.
+const FTS_TOKEN = /[\p{L}\p{N}]+/gu;
+const ftsQuery = (text) => (String(text || '').match(FTS_TOKEN) || []).map((t) => `"${t}" *`).join(' AND ');
+const VENDOR_SEARCH_SQL = 'id IN (SELECT rowid FROM vendors_fts WHERE vendors_fts MATCH ?)';
+const LOOKUP_WINDOW = 500;
+const LOOKUP_WEIGHTS = [4, 2, 1, 1]; // company_name, legal_name, gstin, pan
+const reEscape = (t) => t.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+function lookupScorer(tokens) {
+  const res = tokens.map((t) => [new RegExp(`(?<![\\p{L}\\p{N}])${reEscape(t)}`, 'iu'),
+                                 new RegExp(`(?<![\\p{L}\\p{N}])${reEscape(t)}(?![\\p{L}\\p{N}])`, 'iu')]);
+  const words = tokens.map((t, i) => reEscape(t) + (i < tokens.length - 1 ? '(?![\\p{L}\\p{N}])' : ''));
+  const start = new RegExp(`^[^\\p{L}\\p{N}]*${words.join('[^\\p{L}\\p{N}]+')}`, 'iu');
+  const bonus = 1.5 * LOOKUP_WEIGHTS.reduce((a, b) => a + b, 0);
+  return (row) => {
+    let score = 0;
+    [row.company_name, row.legal_name, row.gstin, row.pan].forEach((value, k) => {
+      if (!value) return;
+      for (const [prefix, word] of res) {
+        if (prefix.test(value)) score += LOOKUP_WEIGHTS[k] * (word.test(value) ? 1.5 : 1);
+      }
+    });
+    score /= res.length;
+    if (row.company_name && start.test(row.company_name)) score += bonus;
+    return score;
+  };
+}
+
 // DB param sanitizers: D1 does not allow `undefined` in .bind()
 const toDb = (v) => (v === undefined ? null : v);
 const toJsonOrNull = (v) => (v === undefined || v === null ? null : JSON.stringify(v));
@@ -159,8 +187,11 @@ app.get('/api/vendors', async (c) => {
   const where = [];
   const params = [];
   if (search) {
-    where.push('(company_name LIKE ? OR legal_name LIKE ? OR gstin LIKE ?)');
-    params.push(`%${search}%`, `%${search}%`, `%${search}%`);
+    const match = ftsQuery(search);
+    if (match) {
+      where.push(VENDOR_SEARCH_SQL);
+      params.push(match);
+    }
   }
   if (status) {
     if (!ALLOWED_STATUSES.has(status)) {
@@ -184,6 +215,32 @@ app.get('/api/vendors', async (c) => {
   return ok(c, { page, size, total, items: rows.results || [] });
 });
 
+// Type-ahead: up to `limit` vendors, company names starting with the text first.
+// Only the newest LOOKUP_WINDOW matches are ranked, as in compliance/search.py.
+app.get('/api/vendors/lookup', async (c) => {
+  const { DB } = c.env;
+  const url = new URL(c.req.url);
+  const limit = Math.min(Math.max(parseInt(url.searchParams.get('limit') || '10', 10), 1), 50);
+  const status = normalizeStatus((url.searchParams.get('status') || '').trim());
+  if (status && !ALLOWED_STATUSES.has(status)) {
+    return bad(c, `Invalid status filter. Allowed: ${[...ALLOWED_STATUSES].join(', ')}`);
+  }
+  const tokens = (url.searchParams.get('q') || '').match(FTS_TOKEN) || [];
+  // One letter matches too much to rank, and has no prefix index to find it with.
+  const match = ftsQuery(tokens.filter((t) => t.length > 1).join(' '));
+  if (!match) return ok(c, []);
+  // The status filter goes inside the window, or newer matches with another status would crowd it out.
+  const rows = await DB.prepare(`SELECT v.id, v.company_name, v.legal_name, v.gstin, v.pan, v.status
+                                 FROM vendors_fts f JOIN vendors v ON v.id = f.rowid
+                                 WHERE vendors_fts MATCH ?${status ? ' AND v.status = ?' : ''}
+                                 ORDER BY f.rowid DESC LIMIT ?`)
+    .bind(...(status ? [match, status, LOOKUP_WINDOW] : [match, LOOKUP_WINDOW])).all();
+  const score = lookupScorer(tokens);
+  const ranked = (rows.results || []).map((r) => ({ ...r, score: Math.round(score(r) * 1000) / 1000 }));
+  ranked.sort((a, b) => b.score - a.score || (a.company_name || '').length - (b.company_name || '').length || b.id - a.id);
+  return ok(c, ranked.slice(0, limit));
+});
+
 app.get('/api/vendors/:id{[0-9]+}', async (c) => {
   const { DB } = c.env;
   const id = Number(c.req.param('id'));
@@ -369,8 +426,11 @@ app.get('/api/vendors/export.csv', async (c) => {
   const where = [];
   const params = [];
   if (search) {
-    where.push('(company_name LIKE ? OR legal_name LIKE ? OR gstin LIKE ?)');
-    params.push(`%${search}%`, `%${search}%`, `%${search}%`);
+    const match = ftsQuery(search);
+    if (match) {
+      where.push(VENDOR_SEARCH_SQL);
+      params.push(match);
+    }
   }
   if (status) {
     if (!ALLOWED_STATUSES.has(status)) {
@@ -601,6 +661,15 @@ app.get('/api/payments/:id{[0-9]+}', async (c) => {
   return ok(c, row);
 });
 
+// payments.tds_section (0022_tds.sql): blank clears it, anything else must be an active tds_sections row.
+async function tdsSection(DB, value) {
+  const section = (value == null ? '' : value).toString().trim();
+  if (!section) return null;
+  const row = await DB.prepare('SELECT section FROM tds_sections WHERE section = ? AND is_active').bind(section).first();
+  if (!row) throw new Error(`Unknown tds_section ${section}`);
+  return row.section;
+}
+
 app.post('/api/payments', async (c) => {
   const lvl = Number(c.req.header('x-user-level')||0);
   if (!canCreateEntries(lvl)) return bad(c,'forbidden',403);
@@ -609,7 +678,9 @@ app.post('/api/payments', async (c) => {
   const amount = b.amount ? Number(b.amount) : 0;
   const invoice_ref = (b.invoice_ref||'').toString();
   const status = (b.status||'pending').toString();
-  await c.env.DB.prepare('INSERT INTO payments (vendor_id, invoice_ref, amount, status, created_by_level) VALUES (?,?,?,?,?)').bind(vendor_id, toDb(invoice_ref), amount, status, lvl).run();
+  let tds_section;
+  try { tds_section = await tdsSection(c.env.DB, b.tds_section); } catch (e) { return bad(c, e.message); }
+  await c.env.DB.prepare('INSERT INTO payments (vendor_id, invoice_ref, amount, status, tds_section, created_by_level) VALUES (?,?,?,?,?,?)').bind(vendor_id, toDb(invoice_ref), amount, status, tds_section, lvl).run();
   const row = await c.env.DB.prepare('SELECT * FROM payments ORDER BY id DESC LIMIT 1').first();
   try { await c.env.DB.prepare('INSERT INTO audit_log (actor_level, action, entity_type, entity_id, payload) VALUES (?,?,?,?,?)').bind(lvl,'create','payment',row?.id||null, JSON.stringify({vendor_id, amount})).run(); } catch(_){ }
   return ok(c, row);
@@ -623,8 +694,13 @@ app.put('/api/payments/:id{[0-9]+}', async (c) => {
   const b = await c.req.json().catch(()=>({}));
   const fields = [];
   const params = [];
-  for (const k of ['vendor_id','invoice_ref','amount','status','proof_url']) {
-    if (k in b) { fields.push(`${k} = ?`); params.push(b[k]); }
+  for (const k of ['vendor_id','invoice_ref','amount','status','proof_url','tds_section']) {
+    if (!(k in b)) continue;
+    let v = b[k];
+    if (k === 'tds_section') {
+      try { v = await tdsSection(c.env.DB, v); } catch (e) { return bad(c, e.message); }
+    }
+    fields.push(`${k} = ?`); params.push(v);
   }
   if (!fields.length) return bad(c, 'No updatable fields provided');
   params.push(id);
@@ -1024,13 +1100,10 @@ app.post('/api/instruments/import.csv', async (c) => {
 
 // Reports
 app.get('/api/reports/summary', async (c) => {
-  const DB=c.env.DB;
-  const vendor_count = (await DB.prepare('SELECT COUNT(*) AS c FROM vendors').first())?.c||0;
-  const vendor_pending = (await DB.prepare("SELECT COUNT(*) AS c FROM vendors WHERE status='pending'").first())?.c||0;
-  const payments_pending = (await DB.prepare("SELECT COUNT(*) AS c FROM payments WHERE status='pending'").first())?.c||0;
-  const payments_done = (await DB.prepare("SELECT COUNT(*) AS c FROM payments WHERE status='done'").first())?.c||0;
-  const instruments_active = (await DB.prepare("SELECT COUNT(*) AS c FROM financial_instruments WHERE status='active'").first())?.c||0;
-  return ok(c,{vendor_count,vendor_pending,payments_pending,payments_done,instruments_active});
+  // report_status_totals is kept current by triggers (0014_report_summary.sql): a few rows, no table scans.
+  const rows = await c.env.DB.prepare("SELECT entity, status, row_count FROM report_status_totals WHERE entity IN ('vendors','payments','instruments')").all();
+  const n = (entity, status) => (rows.results||[]).filter(r => r.entity===entity && (status===undefined || r.status===status)).reduce((s, r) => s + r.row_count, 0);
+  return ok(c,{vendor_count:n('vendors'),vendor_pending:n('vendors','pending'),payments_pending:n('payments','pending'),payments_done:n('payments','done'),instruments_active:n('instruments','active')});
 });
 
 export default app;